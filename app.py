@@ -361,6 +361,10 @@ is_docker = os.path.exists('/.dockerenv') or os.environ.get('APP_MODE', '').stri
 
 if is_docker:
     logger.info("Running in Docker/standalone mode - WebSocket server started separately by start.sh")
+elif __name__ == '__mp_main__':
+    # Processes spawned by the sharded WebSocket proxy (WEBSOCKET_WORKERS > 1)
+    # re-import this module as __mp_main__; only the Flask process starts the proxy
+    pass
 else:
     logger.info("Running in local/integrated mode - Starting WebSocket proxy in Flask")
     start_websocket_proxy(app)
@@ -18,6 +18,8 @@ from sqlalchemy.ext.declarative import declarative_base
 from database.auth_db import get_auth_token
 from extensions import socketio  # Import SocketIO
 from utils.logging import get_logger
+from database.symtoken_loader import bulk_load_symtoken, clear_symtoken
+from database.master_contract_refresh import contract_downloaded
 
 logger = get_logger(__name__)
 
@@ -89,28 +91,17 @@ def init_db():
 
 def delete_symtoken_table():
     logger.info("Deleting Symtoken Table")
-    SymToken.query.delete()
+    clear_symtoken(db_session.connection())
     db_session.commit()
 
 def copy_from_dataframe(df):
     logger.info("Performing Bulk Insert")
-    # Convert DataFrame to a list of dictionaries
-    data_dict = df.to_dict(orient='records')
-
-    # Retrieve existing tokens to filter them out from the insert
-    existing_tokens = {result.token for result in db_session.query(SymToken.token).all()}
-
-    # Filter out data_dict entries with tokens that already exist
-    filtered_data_dict = [row for row in data_dict if row['token'] not in existing_tokens]
-
-    # Insert in bulk the filtered records
+    # Staged load that skips rows whose token already exists and rebuilds
+    # the indexes once instead of updating them row by row
     try:
-        if filtered_data_dict:  # Proceed only if there's anything to insert
-            db_session.bulk_insert_mappings(SymToken, filtered_data_dict)
-            db_session.commit()
-            logger.info(f"Bulk insert completed successfully with {len(filtered_data_dict)} new records.")
-        else:
-            logger.info("No new records to insert.")
+        inserted = bulk_load_symtoken(db_session.connection(), df)
+        db_session.commit()
+        logger.info(f"Bulk insert completed successfully with {inserted} new records.")
     except Exception as e:
         logger.error(f"Error during bulk insert: {e}")
         db_session.rollback()
@@ -629,6 +620,7 @@ def master_contract_download():
         copy_from_dataframe(token_df)
         delete_aliceblue_temp_data(output_path)
         
+        contract_downloaded()
         return socketio.emit('master_contract_download', {'status': 'success', 'message': 'Successfully Downloaded'})
 
     
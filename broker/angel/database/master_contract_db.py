@@ -2,16 +2,17 @@
 
 import os
 import pandas as pd
-import requests
 import gzip
 import shutil
-from datetime import datetime
 
 from sqlalchemy import create_engine, Column, Integer, String, Float , Sequence, Index
 from sqlalchemy.orm import scoped_session, sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from extensions import socketio  # Import SocketIO
 from utils.logging import get_logger
+from database.symtoken_loader import bulk_load_symtoken, clear_symtoken
+from database.master_contract_refresh import contract_downloaded, source_unchanged
+from utils.master_contract import format_expiry, future_symbols, option_symbols, download_to_file, iter_json_records
 
 logger = get_logger(__name__)
 
@@ -47,44 +48,28 @@ def init_db():
 
 def delete_symtoken_table():
     logger.info("Deleting Symtoken Table")
-    SymToken.query.delete()
+    clear_symtoken(db_session.connection())
     db_session.commit()
 
 def copy_from_dataframe(df):
     logger.info("Performing Bulk Insert")
-    # Convert DataFrame to a list of dictionaries
-    data_dict = df.to_dict(orient='records')
-
-    # Retrieve existing tokens to filter them out from the insert
-    existing_tokens = {result.token for result in db_session.query(SymToken.token).all()}
-
-    # Filter out data_dict entries with tokens that already exist
-    filtered_data_dict = [row for row in data_dict if row['token'] not in existing_tokens]
-
-    # Insert in bulk the filtered records
+    # Staged load that skips rows whose token already exists and rebuilds
+    # the indexes once instead of updating them row by row
     try:
-        if filtered_data_dict:  # Proceed only if there's anything to insert
-            db_session.bulk_insert_mappings(SymToken, filtered_data_dict)
-            db_session.commit()
-            logger.info(f"Bulk insert completed successfully with {len(filtered_data_dict)} new records.")
-        else:
-            logger.info("No new records to insert.")
+        inserted = bulk_load_symtoken(db_session.connection(), df)
+        db_session.commit()
+        logger.info(f"Bulk insert completed successfully with {inserted} new records.")
     except Exception as e:
         logger.error(f"Error during bulk insert: {e}")
         db_session.rollback()
 
 def download_json_angel_data(url, output_path):
     """
-    Downloads a JSON file from the specified URL and saves it to the specified path.
+    Streams a JSON file from the specified URL to the specified path.
     """
     logger.info("Downloading JSON data")
-    response = requests.get(url, timeout=10)  # timeout after 10 seconds
-    if response.status_code == 200:  # Successful download
-        with open(output_path, 'wb') as f:
-            f.write(response.content)
-        logger.info("Download complete")
-    else:
-        logger.error(f"Failed to download data. Status code: {response.status_code}")
+    size = download_to_file(url, output_path)
+    logger.info(f"Download complete ({size / (1024 * 1024):.1f} MB)")
 
 
 def reformat_symbol(row):
@@ -107,14 +92,6 @@ def reformat_symbol(row):
     return symbol
 
 
-def convert_date(date_str):
-    # Convert from '19MAR2024' to '19-MAR-24'
-    try:
-        return datetime.strptime(date_str, '%d%b%Y').strftime('%d-%b-%y')
-    except ValueError:
-        # Return the original date if it doesn't match the format
-        return date_str
-
 def process_angel_json(path):
     """
     Processes the Angel JSON file to fit the existing database schema.
@@ -125,8 +102,24 @@ def process_angel_json(path):
     DataFrame: The processed DataFrame ready to be inserted into the database.
     """
     # Read JSON data into a DataFrame
-    df = pd.read_json(path)
-    
+    return process_angel_frame(pd.read_json(path))
+
+
+def iter_angel_json(path, chunk_rows=None):
+    """
+    Processes the Angel JSON file in chunks of instruments, keeping memory bounded by the chunk size.
+
+    Yields:
+    DataFrame: Each processed chunk
+    """
+    for records in iter_json_records(path, chunk_rows):
+        yield process_angel_frame(pd.DataFrame.from_records(records))
+
+
+def process_angel_frame(df):
+    """
+    Maps Angel instruments to the database schema; rows are processed independently.
+    """
     # Rename the columns based on the database schema
     # Assuming that the JSON structure matches the sample response provided
     df = df.rename(columns={
@@ -158,51 +151,36 @@ def process_angel_json(path):
     
     
     # Assuming the 'expiry' field in the JSON is in the format '19MAR2024'
-    df['expiry'] = df['expiry'].apply(lambda x: convert_date(x) if pd.notnull(x) else x)
+    df['expiry'] = format_expiry(df['expiry'], '%d%b%Y', keep_unparsed=True)
     df['expiry'] = df['expiry'].str.upper()
 
-    
-
-
     # Convert 'strike' to float, 'lotsize' to int, and 'tick_size' to float as per the database schema
     df['strike'] = df['strike'].astype(float) / 100
-    df.loc[(df['instrumenttype'] == 'OPTCUR') & (df['exchange'] == 'CDS'), 'strike'] = df['strike'].astype(float) / 100000
-    df.loc[(df['instrumenttype'] == 'OPTIRC') & (df['exchange'] == 'CDS'), 'strike'] = df['strike'].astype(float) / 100000
-    
+    currency_options = df['instrumenttype'].isin(['OPTCUR', 'OPTIRC']) & (df['exchange'] == 'CDS')
+    df.loc[currency_options, 'strike'] = df['strike'].astype(float) / 100000
 
     df['lotsize'] = df['lotsize'].astype(int)
     df['tick_size'] = df['tick_size'].astype(float) / 100  # Divide tick_size by 100
 
-    # Futures Symbol Update in CDS and MCX Exchanges
-    df.loc[(df['instrumenttype'] == 'FUTCUR') & (df['exchange'] == 'CDS'), 'symbol'] = df['name'] + df['expiry'].str.replace('-', '', regex=False) + 'FUT'
-    df.loc[(df['instrumenttype'] == 'FUTIRC') & (df['exchange'] == 'CDS'), 'symbol'] = df['name'] + df['expiry'].str.replace('-', '', regex=False) + 'FUT' 
-    df.loc[(df['instrumenttype'] == 'FUTCOM') & (df['exchange'] == 'MCX'), 'symbol'] = df['name'] + df['expiry'].str.replace('-', '', regex=False) + 'FUT'
-    # Options Symbol Update in CDS and MCX Exchanges
-    df.loc[(df['instrumenttype'] == 'OPTCUR') & (df['exchange'] == 'CDS'), 'symbol'] = df['name'] + df['expiry'].str.replace('-', '', regex=False) + df['strike'].astype(str).str.replace(r'\.0', '', regex=True) + df['symbol'].str[-2:]
-    df.loc[(df['instrumenttype'] == 'OPTIRC') & (df['exchange'] == 'CDS'), 'symbol'] = df['name'] + df['expiry'].str.replace('-', '', regex=False) + df['strike'].astype(str).str.replace(r'\.0', '', regex=True) + df['symbol'].str[-2:]
-    df.loc[(df['instrumenttype'] == 'OPTFUT') & (df['exchange'] == 'MCX'), 'symbol'] = df['name'] + df['expiry'].str.replace('-', '', regex=False) + df['strike'].astype(str).str.replace(r'\.0', '', regex=True) + df['symbol'].str[-2:]
-
-    # BFO Index Futures Symbol Update (SENSEX, BANKEX, etc.)
-    # Format: SYMBOL[DDMMMYY]FUT
-    # Example: SENSEX28MAR24FUT
-    df.loc[(df['instrumenttype'] == 'FUTIDX') & (df['exchange'] == 'BFO'), 'symbol'] = df['name'] + df['expiry'].str.replace('-', '', regex=False) + 'FUT'
-
-    # BFO Stock Futures Symbol Update (RELIANCE, TCS, etc.)
-    # Format: SYMBOL[DDMMMYY]FUT
-    # Example: RELIANCE30OCT25FUT
-    df.loc[(df['instrumenttype'] == 'FUTSTK') & (df['exchange'] == 'BFO'), 'symbol'] = df['name'] + df['expiry'].str.replace('-', '', regex=False) + 'FUT'
-
-    # BFO Index Options Symbol Update (SENSEX, BANKEX, etc.)
-    # Format: SYMBOL[DDMMMYY][StrikePrice][CE/PE]
-    # Example: SENSEX28MAR2475000CE
-    df.loc[(df['instrumenttype'] == 'OPTIDX') & (df['exchange'] == 'BFO') & (df['symbol'].str.endswith('CE', na=False)), 'symbol'] = df['name'] + df['expiry'].str.replace('-', '', regex=False) + df['strike'].astype(str).str.replace(r'\.0', '', regex=True) + 'CE'
-    df.loc[(df['instrumenttype'] == 'OPTIDX') & (df['exchange'] == 'BFO') & (df['symbol'].str.endswith('PE', na=False)), 'symbol'] = df['name'] + df['expiry'].str.replace('-', '', regex=False) + df['strike'].astype(str).str.replace(r'\.0', '', regex=True) + 'PE'
-
-    # BFO Stock Options Symbol Update (RELIANCE, TCS, etc.)
-    # Format: SYMBOL[DDMMMYY][StrikePrice][CE/PE]
-    # Example: RELIANCE30OCT251330PE
-    df.loc[(df['instrumenttype'] == 'OPTSTK') & (df['exchange'] == 'BFO') & (df['symbol'].str.endswith('CE', na=False)), 'symbol'] = df['name'] + df['expiry'].str.replace('-', '', regex=False) + df['strike'].astype(str).str.replace(r'\.0', '', regex=True) + 'CE'
-    df.loc[(df['instrumenttype'] == 'OPTSTK') & (df['exchange'] == 'BFO') & (df['symbol'].str.endswith('PE', na=False)), 'symbol'] = df['name'] + df['expiry'].str.replace('-', '', regex=False) + df['strike'].astype(str).str.replace(r'\.0', '', regex=True) + 'PE'
+    instrumenttype, exchange = df['instrumenttype'], df['exchange']
+
+    # Futures in CDS, MCX and BFO (index and stock): SYMBOL[DDMMMYY]FUT
+    # Example: SENSEX28MAR24FUT, RELIANCE30OCT25FUT
+    futures = ((instrumenttype.isin(['FUTCUR', 'FUTIRC']) & (exchange == 'CDS')) |
+               ((instrumenttype == 'FUTCOM') & (exchange == 'MCX')) |
+               (instrumenttype.isin(['FUTIDX', 'FUTSTK']) & (exchange == 'BFO')))
+
+    # Options in CDS, MCX and BFO (index and stock): SYMBOL[DDMMMYY][StrikePrice][CE/PE]
+    # Example: SENSEX28MAR2475000CE, RELIANCE30OCT251330PE
+    option_type = df['symbol'].str[-2:]
+    options = ((instrumenttype.isin(['OPTCUR', 'OPTIRC']) & (exchange == 'CDS')) |
+               ((instrumenttype == 'OPTFUT') & (exchange == 'MCX')) |
+               (instrumenttype.isin(['OPTIDX', 'OPTSTK']) & (exchange == 'BFO') & option_type.isin(['CE', 'PE'])))
+
+    expiry = df['expiry'].str.replace('-', '', regex=False)
+    strike = df.loc[options, 'strike'].astype(str).str.replace(r'\.0', '', regex=True)
+    df.loc[futures, 'symbol'] = future_symbols(df['name'][futures], expiry[futures])
+    df.loc[options, 'symbol'] = option_symbols(df['name'][options], expiry[options], strike, option_type[options])
 
     # Common Index Symbol Formats
 
@@ -239,15 +217,16 @@ def master_contract_download():
     output_path = 'tmp/angel.json'
     try:
         download_json_angel_data(url,output_path)
-        token_df = process_angel_json(output_path)
-        delete_angel_temp_data(output_path)
-        #token_df['token'] = pd.to_numeric(token_df['token'], errors='coerce').fillna(-1).astype(int)
-        
-        #token_df = token_df.drop_duplicates(subset='symbol', keep='first')
+        if source_unchanged(output_path):
+            delete_angel_temp_data(output_path)
+            return socketio.emit('master_contract_download', {'status': 'success', 'message': 'Master contract unchanged'})
 
         delete_symtoken_table()  # Consider the implications of this action
-        copy_from_dataframe(token_df)
+        for token_df in iter_angel_json(output_path):
+            copy_from_dataframe(token_df)
+        delete_angel_temp_data(output_path)
                 
+        contract_downloaded()
         return socketio.emit('master_contract_download', {'status': 'success', 'message': 'Successfully Downloaded'})
 
     
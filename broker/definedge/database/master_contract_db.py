@@ -17,6 +17,8 @@ from database.auth_db import get_auth_token
 from database.user_db import find_user_by_username
 from extensions import socketio  # Import SocketIO
 from utils.logging import get_logger
+from database.symtoken_loader import bulk_load_symtoken, clear_symtoken
+from database.master_contract_refresh import contract_downloaded
 
 logger = get_logger(__name__)
 
@@ -48,7 +50,7 @@ def init_db():
 def delete_symtoken_table():
     """Delete all records from symtoken table"""
     try:
-        db_session.query(SymToken).delete()
+        clear_symtoken(db_session.connection())
         db_session.commit()
         logger.info("All records deleted from symtoken table")
     except Exception as e:
@@ -58,10 +60,12 @@ def delete_symtoken_table():
 def copy_from_dataframe(df):
     """Copy dataframe to database"""
     try:
-        df.to_sql('symtoken', con=engine, if_exists='append', index=False)
-        logger.info(f"Inserted {len(df)} records into symtoken table")
+        inserted = bulk_load_symtoken(db_session.connection(), df, key_columns=None)
+        db_session.commit()
+        logger.info(f"Inserted {inserted} records into symtoken table")
     except Exception as e:
         logger.error(f"Error copying dataframe to database: {e}")
+        db_session.rollback()
 
 def download_definedge_master_files(auth_token, output_path):
     """Download master contract files from DefinedGe Securities using shared connection pooling"""
@@ -592,6 +596,8 @@ def master_contract_download():
 
         logger.info("DefinedGe master contract download completed successfully")
         
+        contract_downloaded()
+
         # Emit socketio event if available
         try:
             return socketio.emit('master_contract_download', {'status': 'success', 'message': 'Successfully Downloaded'})
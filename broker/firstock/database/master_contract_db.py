@@ -6,6 +6,8 @@ from sqlalchemy.orm import scoped_session, sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from extensions import socketio
 from utils.logging import get_logger
+from database.symtoken_loader import bulk_load_symtoken, clear_symtoken
+from database.master_contract_refresh import contract_downloaded
 from utils.httpx_client import get_httpx_client
 
 logger = get_logger(__name__)
@@ -42,22 +44,17 @@ def init_db():
 
 def delete_symtoken_table():
     logger.info("Deleting Symtoken Table")
-    SymToken.query.delete()
+    clear_symtoken(db_session.connection())
     db_session.commit()
 
 def copy_from_dataframe(df):
     logger.info("Performing Bulk Insert")
-    data_dict = df.to_dict(orient='records')
-    existing_tokens = {result.token for result in db_session.query(SymToken.token).all()}
-    filtered_data_dict = [row for row in data_dict if row['token'] not in existing_tokens]
-
+    # Staged load that skips rows whose token already exists and rebuilds
+    # the indexes once instead of updating them row by row
     try:
-        if filtered_data_dict:
-            db_session.bulk_insert_mappings(SymToken, filtered_data_dict)
-            db_session.commit()
-            logger.info(f"Bulk insert completed successfully with {len(filtered_data_dict)} new records.")
-        else:
-            logger.info("No new records to insert.")
+        inserted = bulk_load_symtoken(db_session.connection(), df)
+        db_session.commit()
+        logger.info(f"Bulk insert completed successfully with {inserted} new records.")
     except Exception as e:
         logger.error(f"Error during bulk insert: {e}")
         db_session.rollback()
@@ -468,6 +465,7 @@ def master_contract_download():
             # Clean up temporary files
             delete_firstock_temp_data(output_path)
             
+            contract_downloaded()
             logger.info("Master contract download completed successfully")
             socketio.emit('download_progress', 'Download completed')
         else:
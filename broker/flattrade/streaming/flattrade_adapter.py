@@ -245,14 +245,8 @@ class FlattradeWebSocketAdapter(BaseBrokerWebSocketAdapter):
         super().__init__()
         self.logger = logging.getLogger("flattrade_websocket")
 
-        # Log the actual ZMQ port being used
-        actual_zmq_port = os.getenv('ZMQ_PORT', '5555')
-        self.logger.info(f"Flattrade adapter initialized - Expected ZMQ port: {actual_zmq_port}, Actual bound port: {self.zmq_port}")
-
-        # Warn if there's a mismatch
-        if str(self.zmq_port) != str(actual_zmq_port):
-            self.logger.warning(f"ZMQ port mismatch! Server expects {actual_zmq_port} but adapter bound to {self.zmq_port}")
-            self.logger.warning("Data may not reach clients properly!")
+        # Log where market data is published
+        self.logger.info(f"Flattrade adapter initialized - publishing to {', '.join(self.zmq_endpoints)}")
 
         self._setup_adapter()
         self._setup_market_cache()
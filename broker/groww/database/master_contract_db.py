@@ -12,6 +12,8 @@ from sqlalchemy.orm import scoped_session, sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from extensions import socketio  # Import SocketIO
 from utils.logging import get_logger
+from database.symtoken_loader import bulk_load_symtoken, clear_symtoken
+from database.master_contract_refresh import contract_downloaded
 
 logger = get_logger(__name__)
 
@@ -49,48 +51,23 @@ def init_db():
 
 def delete_symtoken_table():
     logger.info("Deleting Symtoken Table")
-    SymToken.query.delete()
+    clear_symtoken(db_session.connection())
     db_session.commit()
 
 def copy_from_dataframe(df):
     logger.info("Performing Bulk Insert")
-    # Convert DataFrame to a list of dictionaries
-    data_dict = df.to_dict(orient='records')
-
-    # Retrieve existing tokens to filter them out from the insert
-    existing_tokens = {result.token for result in db_session.query(SymToken.token).all()}
-
-    # Filter out data_dict entries with tokens that already exist
-    filtered_data_dict = [row for row in data_dict if row['token'] not in existing_tokens]
-
-    # Insert in bulk the filtered records
+    # Missing numeric fields are stored as 0
+    df = df.copy()
+    for column in ('strike', 'lotsize', 'tick_size'):
+        if column in df:
+            df[column] = pd.to_numeric(df[column], errors='coerce').fillna(0)
+
+    # Staged load that skips rows whose token already exists and rebuilds
+    # the indexes once instead of updating them row by row
     try:
-        if filtered_data_dict:  # Proceed only if there's anything to insert
-            logger.info(f"Inserting {len(filtered_data_dict)} new records into the database")
-            # Create a list of SymToken objects from the filtered data
-            symtoken_objects = []
-            for item in filtered_data_dict:
-                symtoken = SymToken(
-                    symbol=item.get('symbol', ''),
-                    brsymbol=item.get('brsymbol', ''),
-                    name=item.get('name', ''),
-                    exchange=item.get('exchange', ''),
-                    brexchange=item.get('brexchange', ''),
-                    token=item.get('token', ''),
-                    expiry=item.get('expiry', ''),
-                    strike=float(item.get('strike', 0)) if item.get('strike') else 0,
-                    lotsize=int(item.get('lotsize', 0)) if item.get('lotsize') else 0,
-                    instrumenttype=item.get('instrumenttype', ''),
-                    tick_size=float(item.get('tick_size', 0)) if item.get('tick_size') else 0
-                )
-                symtoken_objects.append(symtoken)
-            
-            # Add all objects and commit in one transaction
-            db_session.add_all(symtoken_objects)
-            db_session.commit()
-            logger.info(f"Successfully inserted {len(symtoken_objects)} records into the database")
-        else:
-            logger.info("No new records to insert")
+        inserted = bulk_load_symtoken(db_session.connection(), df)
+        db_session.commit()
+        logger.info(f"Successfully inserted {inserted} records into the database")
     except Exception as e:
         db_session.rollback()
         logger.error(f"Error during bulk insert: {e}")
@@ -873,6 +850,7 @@ def master_contract_download():
         count = db_session.query(SymToken).count()
         logger.info(f"Total records in database after insertion: {count}")
         
+        contract_downloaded()
         return socketio.emit('master_contract_download', {'status': 'success', 'message': f'Successfully downloaded and inserted {count} symbols'})
     
     except Exception as e:
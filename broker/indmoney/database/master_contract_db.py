@@ -20,6 +20,8 @@ from sqlalchemy.ext.declarative import declarative_base
 from database.auth_db import get_auth_token
 from extensions import socketio  # Import SocketIO
 from utils.logging import get_logger
+from database.symtoken_loader import bulk_load_symtoken, clear_symtoken
+from database.master_contract_refresh import contract_downloaded
 
 logger = get_logger(__name__)
 
@@ -77,66 +79,17 @@ def init_db():
 
 def delete_symtoken_table():
     logger.info("Deleting Symtoken Table")
-    SymToken.query.delete()
+    clear_symtoken(db_session.connection())
     db_session.commit()
 
 def copy_from_dataframe(df):
     logger.info("Performing Bulk Insert")
-    # Convert DataFrame to a list of dictionaries
-    data_dict = df.to_dict(orient='records')
-
-    # Retrieve existing tokens to filter them out from the insert
-    existing_tokens = {result.token for result in db_session.query(SymToken.token).all()}
-
-    # Filter out data_dict entries with tokens that already exist
-    filtered_data_dict = [row for row in data_dict if row['token'] not in existing_tokens]
-
-    # Insert in smaller chunks to minimize database lock time
-    chunk_size = 500  # Reduced chunk size for shorter lock duration
-    total_inserted = 0
-    
+    # Staged load that skips rows whose token already exists and rebuilds
+    # the indexes once instead of updating them row by row
     try:
-        if filtered_data_dict:  # Proceed only if there's anything to insert
-            logger.info(f"Starting bulk insert of {len(filtered_data_dict)} records in chunks of {chunk_size}")
-            
-            # Process data in chunks
-            for i in range(0, len(filtered_data_dict), chunk_size):
-                chunk = filtered_data_dict[i:i + chunk_size]
-                
-                # Use a separate transaction for each chunk with retry logic
-                try:
-                    # Insert chunk
-                    db_session.bulk_insert_mappings(SymToken, chunk)
-                    db_session.commit()  # Commit each chunk immediately
-                    
-                    total_inserted += len(chunk)
-                    
-                    # Log progress every 20 chunks (10,000 records)
-                    if (i // chunk_size + 1) % 20 == 0:
-                        logger.info(f"Processed {total_inserted} records so far...")
-                    
-                except Exception as chunk_error:
-                    logger.warning(f"Error inserting chunk {i//chunk_size + 1}, retrying: {chunk_error}")
-                    db_session.rollback()
-                    
-                    # Retry once for this chunk
-                    try:
-                        time.sleep(0.1)  # Brief pause before retry
-                        db_session.bulk_insert_mappings(SymToken, chunk)
-                        db_session.commit()
-                        total_inserted += len(chunk)
-                    except Exception as retry_error:
-                        logger.error(f"Failed to insert chunk {i//chunk_size + 1} after retry: {retry_error}")
-                        db_session.rollback()
-                        # Continue with next chunk instead of failing completely
-                        continue
-                
-                # Small delay to allow other operations
-                time.sleep(0.005)  # 5ms delay between chunks (reduced from 10ms)
-            
-            logger.info(f"Bulk insert completed successfully with {total_inserted} new records.")
-        else:
-            logger.info("No new records to insert.")
+        inserted = bulk_load_symtoken(db_session.connection(), df)
+        db_session.commit()
+        logger.info(f"Bulk insert completed successfully with {inserted} new records.")
     except Exception as e:
         logger.exception(f"Error during bulk insert: {e}")
         db_session.rollback()
@@ -436,6 +389,7 @@ def master_contract_download():
         if not token_df.empty:
             copy_from_dataframe(token_df)
             delete_indmoney_temp_data(output_path)
+            contract_downloaded()
             return socketio.emit('master_contract_download', {'status': 'success', 'message': 'Successfully Downloaded Indmoney Instruments'})
         else:
             return socketio.emit('master_contract_download', {'status': 'error', 'message': 'No data downloaded from Indmoney'})
@@ -10,6 +10,8 @@ from sqlalchemy.orm import scoped_session, sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from extensions import socketio  # Import SocketIO
 from utils.logging import get_logger
+from database.symtoken_loader import bulk_load_symtoken, clear_symtoken
+from database.master_contract_refresh import contract_downloaded
 
 logger = get_logger(__name__)
 
@@ -47,50 +49,25 @@ def init_db():
 
 def delete_symtoken_table():
     logger.info("Deleting Symtoken Table")
-    SymToken.query.delete()
+    clear_symtoken(db_session.connection())
     db_session.commit()
 
 def copy_from_dataframe(df):
     logger.info("Performing Bulk Insert")
-    # Convert DataFrame to a list of dictionaries
-    data_dict = df.to_dict(orient='records')
-
-    # Retrieve existing tokens to filter them out from the insert
-    existing_tokens = {result.token for result in db_session.query(SymToken.token).all()}
-
-    # Filter out data_dict entries with tokens that already exist
-    filtered_data_dict = [row for row in data_dict if row['token'] not in existing_tokens]
-
-    # Insert in bulk the filtered records
+    # Pre-validate records: symbol must be present, except for indices ("I")
+    symbol = df['symbol'].astype('string').str.strip()
+    invalid = (df['instrumenttype'] != 'I') & (symbol.isna() | (symbol == ''))
+    if invalid.any():
+        for record in df[invalid].head(10).to_dict(orient='records'):
+            logger.error(f"Schema validation failed for record: {record}")
+        logger.warning(f"{int(invalid.sum())} records failed schema validation and were skipped.")
+
+    # Staged load that skips rows whose token already exists and rebuilds
+    # the indexes once instead of updating them row by row
     try:
-        if filtered_data_dict:  # Proceed only if there's anything to insert
-            # Pre-validate records before insertion
-            invalid_records = []
-            valid_records = []
-            
-            for record in filtered_data_dict:
-                # Allow indices ("I") even if symbol is missing
-                if record.get('instrumenttype') == 'I':
-                    valid_records.append(record)
-                else:
-                    # Check if symbol exists and is not empty/null
-                    symbol = record.get('symbol')
-                    if not symbol or pd.isna(symbol) or str(symbol).strip() == '':
-                        invalid_records.append(record)
-                        logger.error(f"Schema validation failed for record: {record}")
-                        logger.debug("Symbol is missing, empty, or null")
-                    else:
-                        valid_records.append(record)
-            
-            if valid_records:
-                db_session.bulk_insert_mappings(SymToken, valid_records)
-                db_session.commit()
-                logger.info(f"Bulk insert completed successfully with {len(valid_records)} new records.")
-                
-            if invalid_records:
-                logger.warning(f"{len(invalid_records)} records failed schema validation and were skipped.")
-        else:
-            logger.info("No new records to insert.")
+        inserted = bulk_load_symtoken(db_session.connection(), df[~invalid])
+        db_session.commit()
+        logger.info(f"Bulk insert completed successfully with {inserted} new records.")
     except Exception as e:
         logger.exception(f"Error during bulk insert: {e}")
         if hasattr(e, '__cause__'):
@@ -291,6 +268,7 @@ def master_contract_download():
         
         #token_df = token_df.drop_duplicates(subset='symbol', keep='first')
         
+        contract_downloaded()
         return socketio.emit('master_contract_download', {'status': 'success', 'message': 'Successfully Downloaded'})
 
     
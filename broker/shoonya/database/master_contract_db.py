@@ -1,14 +1,18 @@
 import os
-import requests
 import zipfile
-import io
 import pandas as pd
-from datetime import datetime
+import numpy as np
 from sqlalchemy import create_engine, Column, Integer, String, Float, Sequence, Index
 from sqlalchemy.orm import scoped_session, sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from extensions import socketio  # Import SocketIO
 from utils.logging import get_logger
+from database.symtoken_loader import bulk_load_symtoken, clear_symtoken
+from database.master_contract_refresh import contract_downloaded, source_unchanged
+from utils.master_contract import (
+    format_expiry, compact_expiry, parse_strike, format_strike, future_symbols, option_symbols,
+    download_to_file
+)
 
 logger = get_logger(__name__)
 
@@ -47,28 +51,17 @@ def init_db():
 
 def delete_symtoken_table():
     logger.info("Deleting Symtoken Table")
-    SymToken.query.delete()
+    clear_symtoken(db_session.connection())
     db_session.commit()
 
 def copy_from_dataframe(df):
     logger.info("Performing Bulk Insert")
-    # Convert DataFrame to a list of dictionaries
-    data_dict = df.to_dict(orient='records')
-
-    # Retrieve existing token-exchange combinations to filter them out from the insert
-    existing_token_exchange = {(result.token, result.exchange) for result in db_session.query(SymToken.token, SymToken.exchange).all()}
-
-    # Filter out data_dict entries with token-exchange combinations that already exist
-    filtered_data_dict = [row for row in data_dict if (row['token'], row['exchange']) not in existing_token_exchange]
-
-    # Insert in bulk the filtered records
+    # Staged load that skips rows whose token and exchange already exists and rebuilds
+    # the indexes once instead of updating them row by row
     try:
-        if filtered_data_dict:  # Proceed only if there's anything to insert
-            db_session.bulk_insert_mappings(SymToken, filtered_data_dict)
-            db_session.commit()
-            logger.info(f"Bulk insert completed successfully with {len(filtered_data_dict)} new records.")
-        else:
-            logger.info("No new records to insert.")
+        inserted = bulk_load_symtoken(db_session.connection(), df, key_columns=('token', 'exchange'))
+        db_session.commit()
+        logger.info(f"Bulk insert completed successfully with {inserted} new records.")
     except Exception as e:
         logger.error(f"Error during bulk insert: {e}")
         db_session.rollback()
@@ -97,26 +90,33 @@ def download_and_unzip_shoonya_data(output_path):
 
     # Iterate through the shoonya URLs and download/unzip files
     for key, url in shoonya_urls.items():
+        zip_path = os.path.join(output_path, f"{key}_symbols.zip")
         try:
-            # Send GET request to download the zip file
-            response = requests.get(url, timeout=10)
+            # Stream the zip file to disk rather than holding it in memory
+            download_to_file(url, zip_path)
+            logger.info(f"Successfully downloaded {key} from {url}")
             
-            if response.status_code == 200:
-                logger.info(f"Successfully downloaded {key} from {url}")
-                
-                # Use in-memory file to handle the downloaded zip file
-                z = zipfile.ZipFile(io.BytesIO(response.content))
+            with zipfile.ZipFile(zip_path) as z:
                 z.extractall(output_path)
-                downloaded_files.append(f"{key}.txt")
-            else:
-                logger.error(f"Failed to download {key} from {url}. Status code: {response.status_code}")
+            downloaded_files.append(f"{key}.txt")
         except Exception as e:
             logger.error(f"Error downloading {key} from {url}: {e}")
+        finally:
+            if os.path.exists(zip_path):
+                os.remove(zip_path)
 
     return downloaded_files
 
 # Placeholder functions for processing data
 
+def format_expiry_dates(expiry):
+    """Format Shoonya's DD-MMM-YYYY expiries as DD-MMM-YY, None where they don't parse"""
+    formatted = format_expiry(expiry.fillna(''), '%d-%b-%Y')
+    invalid = formatted.isna()
+    if invalid.any():
+        logger.info(f"Invalid expiry date format in {invalid.sum()} rows, e.g. {expiry[invalid].iloc[0]!r}")
+    return formatted.astype(object).where(~invalid, None)
+
 def process_shoonya_nse_data(output_path):
     """
     Processes the shoonya NSE data (NSE_symbols.txt) to generate OpenAlgo symbols.
@@ -134,22 +134,14 @@ def process_shoonya_nse_data(output_path):
     # Add missing columns to ensure DataFrame matches the database structure
     df['symbol'] = df['brsymbol']  # Initialize 'symbol' with 'brsymbol'
 
-    # Apply transformation for OpenAlgo symbols
-    def get_openalgo_symbol(broker_symbol):
-        # Separate by hyphen and apply logic for EQ and BE
-        if '-EQ' in broker_symbol:
-            return broker_symbol.replace('-EQ', '')
-        elif '-BE' in broker_symbol:
-            return broker_symbol.replace('-BE', '')
-        else:
-            # For other symbols (including index), OpenAlgo symbol remains the same as broker symbol
-            return broker_symbol
-
-    # Update the 'symbol' column
-    df['symbol'] = df['brsymbol'].apply(get_openalgo_symbol)
+    # Apply transformation for OpenAlgo symbols: drop the -EQ or -BE series suffix.
+    # For other symbols (including index), OpenAlgo symbol remains the same as broker symbol
+    brsymbol = df['brsymbol']
+    is_eq = brsymbol.str.contains('-EQ', regex=False)
+    df['symbol'] = brsymbol.str.replace('-EQ', '', regex=False).where(is_eq, brsymbol.str.replace('-BE', '', regex=False))
 
     # Define Exchange: 'NSE' for EQ and BE, 'NSE_INDEX' for indexes
-    df['exchange'] = df.apply(lambda row: 'NSE_INDEX' if row['instrumenttype'] == 'INDEX' else 'NSE', axis=1)
+    df['exchange'] = np.where(df['instrumenttype'] == 'INDEX', 'NSE_INDEX', 'NSE')
     df['brexchange'] = df['exchange']  # Broker exchange is the same as exchange
 
     # Set empty columns for 'expiry' and fill -1 for 'strike' where the data is missing
@@ -157,7 +149,7 @@ def process_shoonya_nse_data(output_path):
     df['strike'] = -1  # Set default value -1 for strike price where missing
 
     # Ensure the instrument type is consistent
-    df['instrumenttype'] = df['instrumenttype'].apply(lambda x: 'EQ' if x in ['EQ', 'BE'] else x)
+    df['instrumenttype'] = df['instrumenttype'].replace({'BE': 'EQ'})
 
     # Handle missing or invalid numeric values in 'lotsize' and 'tick_size'
     df['lotsize'] = pd.to_numeric(df['lotsize'], errors='coerce').fillna(0).astype(int)  # Convert to int, default to 0
@@ -195,59 +187,27 @@ def process_shoonya_nfo_data(output_path):
 
     # Add missing columns to ensure DataFrame matches the database structure
     df['expiry'] = df['expiry'].fillna('')  # Fill expiry with empty strings if missing
-    df['strike'] = df['strike'].fillna('-1')  # Fill strike with -1 if missing
 
-    # Define a function to format the expiry date as DD-MMM-YY
-    def format_expiry_date(date_str):
-        try:
-            # Parse the input date and format it as DD-MMM-YY
-            date_obj = datetime.strptime(date_str, '%d-%b-%Y')
-            return date_obj.strftime('%d-%b-%y').upper()
-        except ValueError:
-            logger.info(f"Invalid expiry date format: {date_str}")
-            return None
-
-    # Apply the expiry date format
-    df['expiry'] = df['expiry'].apply(format_expiry_date)
+    # Format the expiry date as DD-MMM-YY
+    df['expiry'] = format_expiry_dates(df['expiry'])
 
     # Replace the 'XX' option type with 'FUT' for futures
-    df['instrumenttype'] = df.apply(lambda row: 'FUT' if row['optiontype'] == 'XX' else row['optiontype'], axis=1)
-
-    # Format the symbol column based on the instrument type
-    def format_symbol(row):
-        # Convert hyphenated date to compact format for symbol
-        expiry_date = row['expiry']
-        if expiry_date and isinstance(expiry_date, str):
-            compact_expiry = expiry_date.replace('-', '')
-        else:
-            compact_expiry = ''
-            
-        if row['instrumenttype'] == 'FUT':
-            return f"{row['name']}{compact_expiry}FUT"
-        else:
-            # Ensure strike prices are either integers or floats
-            formatted_strike = int(row['strike']) if float(row['strike']).is_integer() else row['strike']
-            return f"{row['name']}{compact_expiry}{formatted_strike}{row['instrumenttype']}"
+    df['instrumenttype'] = df['optiontype'].where(df['optiontype'] != 'XX', 'FUT')
+
+    # Ensure strike prices are numeric, -1 if missing
+    df['strike'] = parse_strike(df['strike'])
 
-    df['symbol'] = df.apply(format_symbol, axis=1)
+    # Format the symbol column based on the instrument type: options carry
+    # the strike (without .0 for whole numbers) and CE/PE
+    expiry = compact_expiry(df['expiry'])
+    futures = df['instrumenttype'] == 'FUT'
+    df['symbol'] = option_symbols(df['name'], expiry, format_strike(df['strike']), df['instrumenttype'])
+    df.loc[futures, 'symbol'] = future_symbols(df['name'][futures], expiry[futures])
 
     # Define Exchange
     df['exchange'] = 'NFO'
     df['brexchange'] = df['exchange']
 
-    # Ensure strike prices are handled as either float or int
-    def handle_strike_price(strike):
-        try:
-            if float(strike).is_integer():
-                return int(float(strike))  # Return as integer if no decimal
-            else:
-                return float(strike)  # Return as float if decimal exists
-        except (ValueError, TypeError):
-            return -1  # If there's an error or it's empty, return -1
-
-    # Apply the function to strike column
-    df['strike'] = df['strike'].apply(handle_strike_price)
-
     # Reorder the columns to match the database structure
     columns_to_keep = ['symbol', 'brsymbol', 'name', 'exchange', 'brexchange', 'token', 'expiry', 'strike', 'lotsize', 'instrumenttype', 'tick_size']
     df_filtered = df[columns_to_keep]
@@ -273,63 +233,30 @@ def process_shoonya_cds_data(output_path):
 
     # Add missing columns to ensure DataFrame matches the database structure
     df['expiry'] = df['expiry'].fillna('')  # Fill expiry with empty strings if missing
-    df['strike'] = df['strike'].fillna('-1')  # Fill strike with -1 if missing
-
-    # Define a function to format the expiry date as DD-MMM-YY
-    def format_expiry_date(date_str):
-        try:
-            return datetime.strptime(date_str, '%d-%b-%Y').strftime('%d-%b-%y').upper()
-        except ValueError:
-            logger.info(f"Invalid expiry date format: {date_str}")
-            return None
 
-    # Apply the expiry date format
-    df['expiry'] = df['expiry'].apply(format_expiry_date)
+    # Format the expiry date as DD-MMM-YY
+    df['expiry'] = format_expiry_dates(df['expiry'])
 
     # Replace the 'XX' option type with 'FUT' for futures
-    df['instrumenttype'] = df.apply(lambda row: 'FUT' if row['optiontype'] == 'XX' else row['instrumenttype'], axis=1)
+    df['instrumenttype'] = df['instrumenttype'].where(df['optiontype'] != 'XX', 'FUT')
 
     # Update instrumenttype to 'CE' or 'PE' based on the option type
-    df['instrumenttype'] = df.apply(lambda row: row['optiontype'] if row['instrumenttype'] == 'OPTCUR' else row['instrumenttype'], axis=1)
-
-    # Format the symbol column based on the instrument type
-    def format_symbol(row):
-        # Convert hyphenated date to compact format for symbol
-        expiry_date = row['expiry']
-        if expiry_date and isinstance(expiry_date, str):
-            compact_expiry = expiry_date.replace('-', '')
-        else:
-            compact_expiry = ''
-            
-        if row['instrumenttype'] == 'FUT':
-            return f"{row['name']}{compact_expiry}FUT"
-        else:
-            # Format strike price: remove .0 if it's a whole number
-            strike = row['strike']
-            if isinstance(strike, (int, float)):
-                if float(strike).is_integer():
-                    strike = int(float(strike))
-            return f"{row['name']}{compact_expiry}{strike}{row['instrumenttype']}"
-
-    df['symbol'] = df.apply(format_symbol, axis=1)
+    df['instrumenttype'] = df['optiontype'].where(df['instrumenttype'] == 'OPTCUR', df['instrumenttype'])
+
+    # Ensure strike prices are numeric, -1 if missing
+    df['strike'] = parse_strike(df['strike'])
+
+    # Format the symbol column based on the instrument type: options carry
+    # the strike (without .0 for whole numbers) and CE/PE
+    expiry = compact_expiry(df['expiry'])
+    futures = df['instrumenttype'] == 'FUT'
+    df['symbol'] = option_symbols(df['name'], expiry, format_strike(df['strike']), df['instrumenttype'])
+    df.loc[futures, 'symbol'] = future_symbols(df['name'][futures], expiry[futures])
 
     # Define Exchange
     df['exchange'] = 'CDS'
     df['brexchange'] = df['exchange']
 
-    # Ensure strike prices are handled as either float or int
-    def handle_strike_price(strike):
-        try:
-            if float(strike).is_integer():
-                return int(float(strike))  # Return as integer if no decimal
-            else:
-                return float(strike)  # Return as float if decimal exists
-        except (ValueError, TypeError):
-            return -1  # If there's an error or it's empty, return -1
-
-    # Apply the function to strike column
-    df['strike'] = df['strike'].apply(handle_strike_price)
-
     # Reorder the columns to match the database structure
     columns_to_keep = ['symbol', 'brsymbol', 'name', 'exchange', 'brexchange', 'token', 'expiry', 'strike', 'lotsize', 'instrumenttype', 'tick_size']
     df_filtered = df[columns_to_keep]
@@ -353,63 +280,30 @@ def process_shoonya_mcx_data(output_path):
 
     # Add missing columns to ensure DataFrame matches the database structure
     df['expiry'] = df['expiry'].fillna('')  # Fill expiry with empty strings if missing
-    df['strike'] = df['strike'].fillna('-1')  # Fill strike with -1 if missing
 
-    # Define a function to format the expiry date as DD-MMM-YY
-    def format_expiry_date(date_str):
-        try:
-            return datetime.strptime(date_str, '%d-%b-%Y').strftime('%d-%b-%y').upper()
-        except ValueError:
-            logger.info(f"Invalid expiry date format: {date_str}")
-            return None
-
-    # Apply the expiry date format
-    df['expiry'] = df['expiry'].apply(format_expiry_date)
+    # Format the expiry date as DD-MMM-YY
+    df['expiry'] = format_expiry_dates(df['expiry'])
 
     # Replace the 'XX' option type with 'FUT' for futures
-    df['instrumenttype'] = df.apply(lambda row: 'FUT' if row['optiontype'] == 'XX' else row['instrumenttype'], axis=1)
+    df['instrumenttype'] = df['instrumenttype'].where(df['optiontype'] != 'XX', 'FUT')
 
     # Update instrumenttype to 'CE' or 'PE' based on the option type
-    df['instrumenttype'] = df.apply(lambda row: row['optiontype'] if row['instrumenttype'] == 'OPTFUT' else row['instrumenttype'], axis=1)
-
-    # Format the symbol column based on the instrument type
-    def format_symbol(row):
-        # Convert hyphenated date to compact format for symbol
-        expiry_date = row['expiry']
-        if expiry_date and isinstance(expiry_date, str):
-            compact_expiry = expiry_date.replace('-', '')
-        else:
-            compact_expiry = ''
-            
-        if row['instrumenttype'] == 'FUT':
-            return f"{row['name']}{compact_expiry}FUT"
-        else:
-            # Format strike price: remove .0 if it's a whole number
-            strike = row['strike']
-            if isinstance(strike, (int, float)):
-                if float(strike).is_integer():
-                    strike = int(float(strike))
-            return f"{row['name']}{compact_expiry}{strike}{row['instrumenttype']}"
-
-    df['symbol'] = df.apply(format_symbol, axis=1)
+    df['instrumenttype'] = df['optiontype'].where(df['instrumenttype'] == 'OPTFUT', df['instrumenttype'])
+
+    # Ensure strike prices are numeric, -1 if missing
+    df['strike'] = parse_strike(df['strike'])
+
+    # Format the symbol column based on the instrument type: options carry
+    # the strike (without .0 for whole numbers) and CE/PE
+    expiry = compact_expiry(df['expiry'])
+    futures = df['instrumenttype'] == 'FUT'
+    df['symbol'] = option_symbols(df['name'], expiry, format_strike(df['strike']), df['instrumenttype'])
+    df.loc[futures, 'symbol'] = future_symbols(df['name'][futures], expiry[futures])
 
     # Define Exchange
     df['exchange'] = 'MCX'
     df['brexchange'] = df['exchange']
 
-    # Ensure strike prices are handled as either float or int
-    def handle_strike_price(strike):
-        try:
-            if float(strike).is_integer():
-                return int(float(strike))  # Return as integer if no decimal
-            else:
-                return float(strike)  # Return as float if decimal exists
-        except (ValueError, TypeError):
-            return -1  # If there's an error or it's empty, return -1
-
-    # Apply the function to strike column
-    df['strike'] = df['strike'].apply(handle_strike_price)
-
     # Reorder the columns to match the database structure
     columns_to_keep = ['symbol', 'brsymbol', 'name', 'exchange', 'brexchange', 'token', 'expiry', 'strike', 'lotsize', 'instrumenttype', 'tick_size']
     df_filtered = df[columns_to_keep]
@@ -434,13 +328,6 @@ def process_shoonya_bse_data(output_path):
     # Add missing columns to ensure DataFrame matches the database structure
     df['symbol'] = df['brsymbol']  # Initialize 'symbol' with 'brsymbol'
 
-    # Apply transformation for OpenAlgo symbols (no special logic needed here)
-    def get_openalgo_symbol(broker_symbol):
-        return broker_symbol
-
-    # Update the 'symbol' column
-    df['symbol'] = df['brsymbol'].apply(get_openalgo_symbol)
-
     # Set Exchange: 'BSE' for all rows initially
     df['exchange'] = 'BSE'
     df['brexchange'] = df['exchange']  # Broker exchange is the same as exchange
@@ -524,72 +411,29 @@ def process_shoonya_bfo_data(output_path):
 
     # Add missing columns to ensure DataFrame matches the database structure
     df['expiry'] = df['expiry'].fillna('')  # Fill expiry with empty strings if missing
-    df['strike'] = df['strike'].fillna('-1')  # Fill strike with -1 if missing
-
-    # Define a function to format the expiry date as DD-MMM-YY
-    def format_expiry_date(date_str):
-        try:
-            return datetime.strptime(date_str, '%d-%b-%Y').strftime('%d-%b-%y').upper()
-        except ValueError:
-            logger.info(f"Invalid expiry date format: {date_str}")
-            return None
 
-    # Apply the expiry date format
-    df['expiry'] = df['expiry'].apply(format_expiry_date)
+    # Format the expiry date as DD-MMM-YY
+    df['expiry'] = format_expiry_dates(df['expiry'])
 
     # Extract the 'name' from the 'TradingSymbol'
-    def extract_name(tradingsymbol):
-        import re
-        match = re.match(r'([A-Za-z]+)', tradingsymbol)
-        return match.group(1) if match else tradingsymbol
-
-    # Apply name extraction
-    df['name'] = df['brsymbol'].apply(extract_name)
-
-    # Extract the instrument type (CE, PE, FUT) from TradingSymbol
-    def extract_instrument_type(tradingsymbol):
-        if tradingsymbol.endswith('FUT'):
-            return 'FUT'
-        elif tradingsymbol.endswith('CE'):
-            return 'CE'
-        elif tradingsymbol.endswith('PE'):
-            return 'PE'
-        else:
-            return 'UNKNOWN'  # Handle cases where the suffix is not FUT, CE, or PE
-
-    # Apply instrument type extraction
-    df['instrumenttype'] = df['brsymbol'].apply(extract_instrument_type)
-
-    # Ensure strike prices are handled as either float or int
-    def handle_strike_price(strike):
-        try:
-            if float(strike).is_integer():
-                return int(float(strike))  # Return as integer if no decimal
-            else:
-                return float(strike)  # Return as float if decimal exists
-        except (ValueError, TypeError):
-            return -1  # If there's an error or it's empty, return -1
-
-    df['strike'] = df['strike'].apply(handle_strike_price)
-
-    # Format the symbol column based on the instrument type and correctly handle the strike price
-    def format_symbol(row):
-        # Convert hyphenated date to compact format for symbol
-        expiry_date = row['expiry']
-        if expiry_date and isinstance(expiry_date, str):
-            compact_expiry = expiry_date.replace('-', '')
-        else:
-            compact_expiry = ''
-            
-        if row['instrumenttype'] == 'FUT':
-            return f"{row['name']}{compact_expiry}FUT"
-        else:
-            # Correctly format the strike price based on whether it's an integer or a float
-            formatted_strike = f"{int(row['strike'])}" if isinstance(row['strike'], int) else f"{row['strike']:.2f}".rstrip('0').rstrip('.')
-            return f"{row['name']}{compact_expiry}{formatted_strike}{row['instrumenttype']}"
+    df['name'] = df['brsymbol'].str.extract(r'^([A-Za-z]+)', expand=False).fillna(df['brsymbol'])
+
+    # Extract the instrument type (CE, PE, FUT) from TradingSymbol, UNKNOWN for other suffixes
+    df['instrumenttype'] = np.select(
+        [df['brsymbol'].str.endswith(suffix) for suffix in ('FUT', 'CE', 'PE')],
+        ['FUT', 'CE', 'PE'],
+        default='UNKNOWN'
+    )
+
+    # Ensure strike prices are numeric, -1 if missing
+    df['strike'] = parse_strike(df['strike'])
 
-    # Apply the symbol format
-    df['symbol'] = df.apply(format_symbol, axis=1)
+    # Format the symbol column based on the instrument type, with fractional
+    # strike prices rounded to two decimals
+    expiry = compact_expiry(df['expiry'])
+    futures = df['instrumenttype'] == 'FUT'
+    df['symbol'] = option_symbols(df['name'], expiry, format_strike(df['strike'], decimals=2), df['instrumenttype'])
+    df.loc[futures, 'symbol'] = future_symbols(df['name'][futures], expiry[futures])
 
     # Define Exchange and Broker Exchange
     df['exchange'] = 'BFO'
@@ -621,6 +465,9 @@ def master_contract_download():
     output_path = 'tmp'
     try:
         download_and_unzip_shoonya_data(output_path)
+        if source_unchanged(*(f'{output_path}/{exchange}_symbols.txt' for exchange in sorted(shoonya_urls))):
+            delete_shoonya_temp_data(output_path)
+            return socketio.emit('master_contract_download', {'status': 'success', 'message': 'Master contract unchanged'})
         delete_symtoken_table()
         
         # Process exchange data
@@ -639,6 +486,7 @@ def master_contract_download():
         
         delete_shoonya_temp_data(output_path)
         
+        contract_downloaded()
         return socketio.emit('master_contract_download', {'status': 'success', 'message': 'Successfully Downloaded'})
     except Exception as e:
         logger.info(f"{str(e)}")
@@ -6,8 +6,6 @@ import numpy as np
 import gzip
 import shutil
 import json
-import io
-from utils.httpx_client import get_httpx_client
 
 
 from sqlalchemy import create_engine, Column, Integer, String, Float , Sequence, Index
@@ -16,6 +14,11 @@ from sqlalchemy.ext.declarative import declarative_base
 from database.auth_db import get_auth_token
 from extensions import socketio  # Import SocketIO
 from utils.logging import get_logger
+from database.symtoken_loader import bulk_load_symtoken, clear_symtoken
+from database.master_contract_refresh import contract_downloaded, source_unchanged
+from utils.master_contract import (
+    format_expiry, compact_expiry, future_symbols, option_symbols, download_to_file, iter_csv_chunks
+)
 
 logger = get_logger(__name__)
 
@@ -53,28 +56,17 @@ def init_db():
 
 def delete_symtoken_table():
     logger.info("Deleting Symtoken Table")
-    SymToken.query.delete()
+    clear_symtoken(db_session.connection())
     db_session.commit()
 
 def copy_from_dataframe(df):
     logger.info("Performing Bulk Insert")
-    # Convert DataFrame to a list of dictionaries
-    data_dict = df.to_dict(orient='records')
-
-    # Retrieve existing tokens to filter them out from the insert
-    existing_tokens = {result.token for result in db_session.query(SymToken.token).all()}
-
-    # Filter out data_dict entries with tokens that already exist
-    filtered_data_dict = [row for row in data_dict if row['token'] not in existing_tokens]
-
-    # Insert in bulk the filtered records
+    # Staged load that skips rows whose token already exists and rebuilds
+    # the indexes once instead of updating them row by row
     try:
-        if filtered_data_dict:  # Proceed only if there's anything to insert
-            db_session.bulk_insert_mappings(SymToken, filtered_data_dict)
-            db_session.commit()
-            logger.info(f"Bulk insert completed successfully with {len(filtered_data_dict)} new records.")
-        else:
-            logger.info("No new records to insert.")
+        inserted = bulk_load_symtoken(db_session.connection(), df)
+        db_session.commit()
+        logger.info(f"Bulk insert completed successfully with {inserted} new records.")
     except Exception as e:
         logger.error(f"Error during bulk insert: {e}")
         db_session.rollback()
@@ -82,43 +74,29 @@ def copy_from_dataframe(df):
 
 def download_csv_zerodha_data(output_path):
     """
-    Downloads the CSV file from Zerodha using Auth Credentials, saves it to the specified path and convert.
-    to pandas dataframe using shared httpx client with connection pooling.
+    Streams the instruments CSV from Zerodha using Auth Credentials to the specified path
+    using shared httpx client with connection pooling.
     
     Args:
         output_path (str): Path where the CSV file will be saved
         
     Returns:
-        pd.DataFrame: DataFrame containing the downloaded instrument data
+        str: The path of the saved file
     """
     try:
         login_username = os.getenv('LOGIN_USERNAME')
         AUTH_TOKEN = get_auth_token(login_username)
         
-        # Get the shared httpx client with connection pooling
-        client = get_httpx_client()
-        
         headers = {
             'X-Kite-Version': '3',
             'Authorization': f'token {AUTH_TOKEN}'
         }
         
-        # Make the GET request using the shared client
-        response = client.get(
-            'https://api.kite.trade/instruments',
-            headers=headers  # Increased timeout for potentially large file
-        )
-        response.raise_for_status()  # Raises an exception for 4XX/5XX responses
-        
-        # Process the response directly as CSV
-        csv_string = response.text
-        df = pd.read_csv(io.StringIO(csv_string))
+        # Written to disk as it arrives instead of being held as a string
+        size = download_to_file('https://api.kite.trade/instruments', output_path, headers=headers)
+        logger.info(f"Downloaded {size / (1024 * 1024):.1f} MB of Zerodha instruments")
         
-        # Save to output path if needed
-        if output_path:
-            df.to_csv(output_path, index=False)
-            
-        return df
+        return output_path
         
     except Exception as e:
         error_message = str(e)
@@ -133,25 +111,9 @@ def download_csv_zerodha_data(output_path):
         raise
 
 
-def reformat_symbol(row):
-    symbol = row['symbol']
-    instrument_type = row['instrumenttype']
-    
-    if instrument_type == 'FUT':
-        # For FUT, remove the spaces and append 'FUT' at the end
-        parts = symbol.split(' ')
-        if len(parts) == 5:  # Make sure the symbol has the correct format
-            symbol = parts[0] + parts[2] + parts[3] + parts[4] + parts[1]
-    elif instrument_type in ['CE', 'PE']:
-        # For CE/PE, rearrange the parts and remove spaces
-        parts = symbol.split(' ')
-        if len(parts) == 6:  # Make sure the symbol has the correct format
-            symbol = parts[0] + parts[3] + parts[4] + parts[5] + parts[1] + parts[2]
-    else:
-        symbol = symbol  # No change for other instrument types
-
-    return symbol
-
+# Read as text whatever rows a chunk holds, so every chunk is processed alike
+ZERODHA_CSV_DTYPES = {'tradingsymbol': str, 'name': str, 'expiry': str, 'instrument_type': str,
+                      'segment': str, 'exchange': str}
 
 
 def process_zerodha_csv(path):
@@ -159,8 +121,25 @@ def process_zerodha_csv(path):
     Processes the Zerodha CSV file to fit the existing database schema and performs exchange name mapping.
     """
     logger.info("Processing Zerodha CSV Data")
-    df = pd.read_csv(path)
+    return process_zerodha_frame(pd.read_csv(path, dtype=ZERODHA_CSV_DTYPES))
+
+
+def iter_zerodha_csv(path, chunk_rows=None):
+    """
+    Processes the Zerodha CSV file in chunks of rows, keeping memory bounded by the chunk size.
+    
+    Yields:
+        pd.DataFrame: Each processed chunk
+    """
+    logger.info("Processing Zerodha CSV Data in chunks")
+    for chunk in iter_csv_chunks(path, chunk_rows, dtype=ZERODHA_CSV_DTYPES):
+        yield process_zerodha_frame(chunk)
 
+
+def process_zerodha_frame(df):
+    """
+    Maps rows of the Zerodha instruments CSV to the database schema; rows are processed independently.
+    """
     # Map exchange names
     exchange_map = {
         "NSE": "NSE",
@@ -184,7 +163,7 @@ def process_zerodha_csv(path):
     df.loc[(df['segment'] == 'INDICES') & (df['exchange'] == 'CDS'), 'exchange'] = 'CDS_INDEX'
 
     # Format expiry date
-    df['expiry'] = pd.to_datetime(df['expiry']).dt.strftime('%d-%b-%y').str.upper()
+    df['expiry'] = format_expiry(df['expiry'], 'ISO8601')
 
     # Combine instrument_token and exchange_token
     df['token'] = df['instrument_token'].astype(str) + '::::' + df['exchange_token'].astype(str)
@@ -204,24 +183,20 @@ def process_zerodha_csv(path):
     })
 
     df['brsymbol'] = df['symbol']
-    df['symbol'] = df.apply(reformat_symbol, axis=1)
     df['brexchange'] = df['exchange']
 
     # Fill NaN values in the 'expiry' column with an empty string
     df['expiry'] = df['expiry'].fillna('')
-    
-    # Futures Symbol Update 
-    df.loc[(df['instrumenttype'] == 'FUT'), 'symbol'] = df['name'] + df['expiry'].str.replace('-', '', regex=False) + 'FUT'
-    
-    # Options Symbol Update 
-
-    def format_strike(strike):
-        # Convert the string to a float, then to an integer, and finally back to a string.
-        return str(int(float(strike)))
+    expiry = compact_expiry(df['expiry'])
 
+    # Futures Symbol Update
+    futures = df['instrumenttype'] == 'FUT'
+    df.loc[futures, 'symbol'] = future_symbols(df['name'][futures], expiry[futures])
 
-    df.loc[(df['instrumenttype'] == 'CE'), 'symbol'] = df['name'] + df['expiry'].str.replace('-', '', regex=False) + df['strike'].apply(format_strike) + df['instrumenttype']
-    df.loc[(df['instrumenttype'] == 'PE'), 'symbol'] = df['name'] + df['expiry'].str.replace('-', '', regex=False) + df['strike'].apply(format_strike) + df['instrumenttype']
+    # Options Symbol Update (fractional strikes are truncated)
+    options = df['instrumenttype'].isin(['CE', 'PE'])
+    strike = df.loc[options, 'strike'].astype(float).astype('int64').astype(str)
+    df.loc[options, 'symbol'] = option_symbols(df['name'][options], expiry[options], strike, df['instrumenttype'][options])
 
     df['symbol'] = df['symbol'].replace({
     'NIFTY 50': 'NIFTY',
@@ -256,15 +231,16 @@ def master_contract_download():
     output_path = 'tmp/zerodha.csv'
     try:
         download_csv_zerodha_data(output_path)
-        token_df = process_zerodha_csv(output_path)
-        delete_zerodha_temp_data(output_path)
-        #token_df['token'] = pd.to_numeric(token_df['token'], errors='coerce').fillna(-1).astype(int)
-        
-        #token_df = token_df.drop_duplicates(subset='symbol', keep='first')
+        if source_unchanged(output_path):
+            delete_zerodha_temp_data(output_path)
+            return socketio.emit('master_contract_download', {'status': 'success', 'message': 'Master contract unchanged'})
 
         delete_symtoken_table()  # Consider the implications of this action
-        copy_from_dataframe(token_df)
+        for token_df in iter_zerodha_csv(output_path):
+            copy_from_dataframe(token_df)
+        delete_zerodha_temp_data(output_path)
                 
+        contract_downloaded()
         return socketio.emit('master_contract_download', {'status': 'success', 'message': 'Successfully Downloaded'})
 
     
@@ -2,6 +2,11 @@
 
 import os
 import base64
+import hmac
+import hashlib
+import time
+from dataclasses import dataclass
+from typing import Optional
 from sqlalchemy import create_engine, UniqueConstraint
 from sqlalchemy.orm import scoped_session, sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
@@ -82,6 +87,16 @@ auth_cache = TTLCache(maxsize=1024, ttl=get_session_based_cache_ttl())
 feed_token_cache = TTLCache(maxsize=1024, ttl=get_session_based_cache_ttl())
 # Define a cache for broker names with a 5-minute TTL (longer since broker rarely changes)
 broker_cache = TTLCache(maxsize=1024, ttl=3000)
+# Define a cache of verified API keys so Argon2 only runs on the first request.
+# Keyed by an HMAC of the peppered key (never the plaintext); each entry expires
+# at the next session expiry and its stored hash is re-checked periodically so a
+# key regenerated by another process stops working within API_KEY_CACHE_RECHECK seconds.
+verified_api_key_cache = TTLCache(maxsize=1024, ttl=24 * 3600)
+API_KEY_CACHE_RECHECK = int(os.getenv('API_KEY_CACHE_RECHECK', '60'))
+# Define a cache of invalid API keys so repeated bad keys skip Argon2
+invalid_api_key_cache = TTLCache(maxsize=4096, ttl=int(os.getenv('INVALID_API_KEY_CACHE_TTL', '300')))
+# Define a cache of decrypted auth contexts per user, invalidated by upsert_auth
+auth_context_cache = TTLCache(maxsize=1024, ttl=get_session_based_cache_ttl())
 
 # Conditionally create engine based on DB type
 if DATABASE_URL and 'sqlite' in DATABASE_URL:
@@ -110,6 +125,14 @@ class Auth(Base):
     user_id = Column(String(255), nullable=True)  # Add user_id column
     is_revoked = Column(Boolean, default=False)
 
+@dataclass(frozen=True)
+class AuthContext:
+    """Decrypted broker credentials of a logged-in user, as served to API key requests"""
+    user_id: str
+    broker: str
+    auth_token: str
+    feed_token: Optional[str] = None
+
 class ApiKeys(Base):
     __tablename__ = 'api_keys'
     id = Column(Integer, primary_key=True)
@@ -159,11 +182,15 @@ def upsert_auth(name, auth_token, broker, feed_token=None, user_id=None, revoke=
                 del auth_cache[cache_key_auth]
             if cache_key_feed in feed_token_cache:
                 del feed_token_cache[cache_key_feed]
+            invalidate_api_key_cache(name)
             logger.info(f"Cleared cache entries for revoked tokens of user: {name}")
     else:
         auth_obj = Auth(name=name, auth=encrypted_token, feed_token=encrypted_feed_token, broker=broker, user_id=user_id, is_revoked=revoke)
         db_session.add(auth_obj)
     db_session.commit()
+
+    # Login, logout and revoke all change the credentials served to API key requests
+    auth_context_cache.pop(name, None)
     return auth_obj.id
 
 def get_auth_token(name):
@@ -287,6 +314,11 @@ def upsert_api_key(user_id, api_key):
         )
         db_session.add(api_key_obj)
     db_session.commit()
+
+    # The old key must stop working and the new one may have been cached as invalid
+    invalidate_api_key_cache(user_id)
+    invalid_api_key_cache.clear()
+    broker_cache.clear()
     return api_key_obj.id
 
 def get_api_key(user_id):
@@ -309,15 +341,77 @@ def get_api_key_for_tradingview(user_id):
         logger.error(f"Error while querying the database for API key: {e}")
         return None
 
-def verify_api_key(provided_api_key):
-    """Verify an API key using Argon2"""
-    from flask import request, has_request_context
+def _api_key_digest(provided_api_key):
+    """Keyed SHA-256 of the peppered API key, used as the verification cache key"""
+    return hmac.new(PEPPER.encode(), (provided_api_key + PEPPER).encode(), hashlib.sha256).hexdigest()
+
+def invalidate_api_key_cache(user_id):
+    """Drop cached verifications of a user's API key (on regeneration or revocation)"""
+    for digest, entry in list(verified_api_key_cache.items()):
+        if entry[0] == user_id:
+            verified_api_key_cache.pop(digest, None)
+
+def _get_cached_api_key_user(digest):
+    """Get the user_id of a cached verified API key, or None if absent or stale"""
+    entry = verified_api_key_cache.get(digest)
+    if entry is None:
+        return None
+
+    user_id, api_key_hash, expires_at, checked_at = entry
+    now = time.time()
+    if now >= expires_at:
+        verified_api_key_cache.pop(digest, None)
+        return None
+
+    if now - checked_at >= API_KEY_CACHE_RECHECK:
+        # Cheap indexed lookup instead of Argon2: is this still the user's key?
+        stored_hash = db_session.query(ApiKeys.api_key_hash).filter_by(user_id=user_id).scalar()
+        if stored_hash != api_key_hash:
+            verified_api_key_cache.pop(digest, None)
+            return None
+        verified_api_key_cache[digest] = (user_id, api_key_hash, expires_at, now)
+    return user_id
+
+def _track_invalid_api_key(provided_api_key):
+    """Record an invalid API key attempt against the client IP"""
+    from flask import has_request_context
     from utils.ip_helper import get_real_ip
     from database.traffic_db import InvalidAPIKeyTracker
-    import hashlib
 
-    peppered_key = provided_api_key + PEPPER
     try:
+        # Check if we're in a request context
+        if has_request_context():
+            client_ip = get_real_ip()
+        else:
+            client_ip = '127.0.0.1'
+
+        # Hash the API key for tracking (don't store plaintext)
+        api_key_hash = hashlib.sha256(provided_api_key.encode()).hexdigest()[:16]
+
+        # Track the invalid API key attempt
+        InvalidAPIKeyTracker.track_invalid_api_key(client_ip, api_key_hash)
+
+    except Exception as track_error:
+        logger.warning(f"Could not track invalid API key attempt: {track_error}")
+
+def verify_api_key(provided_api_key):
+    """Verify an API key using Argon2, caching the result by a keyed digest"""
+    if not provided_api_key:
+        return None
+
+    try:
+        digest = _api_key_digest(provided_api_key)
+
+        user_id = _get_cached_api_key_user(digest)
+        if user_id:
+            return user_id
+
+        if digest in invalid_api_key_cache:
+            _track_invalid_api_key(provided_api_key)
+            return None
+
+        peppered_key = provided_api_key + PEPPER
+
         # Query all API keys
         api_keys = ApiKeys.query.all()
 
@@ -325,28 +419,18 @@ def verify_api_key(provided_api_key):
         for api_key_obj in api_keys:
             try:
                 ph.verify(api_key_obj.api_key_hash, peppered_key)
-                return api_key_obj.user_id
             except VerifyMismatchError:
                 continue
 
-        # If we reach here, the API key is invalid
-        # Track the invalid attempt
-        try:
-            # Check if we're in a request context
-            if has_request_context():
-                client_ip = get_real_ip()
-            else:
-                client_ip = '127.0.0.1'
-
-            # Hash the API key for tracking (don't store plaintext)
-            api_key_hash = hashlib.sha256(provided_api_key.encode()).hexdigest()[:16]
-
-            # Track the invalid API key attempt
-            InvalidAPIKeyTracker.track_invalid_api_key(client_ip, api_key_hash)
-
-        except Exception as track_error:
-            logger.warning(f"Could not track invalid API key attempt: {track_error}")
+            now = time.time()
+            verified_api_key_cache[digest] = (
+                api_key_obj.user_id, api_key_obj.api_key_hash, now + get_session_based_cache_ttl(), now
+            )
+            return api_key_obj.user_id
 
+        # If we reach here, the API key is invalid
+        invalid_api_key_cache[digest] = True
+        _track_invalid_api_key(provided_api_key)
         return None
     except Exception as e:
         logger.error(f"Error verifying API key: {e}")
@@ -380,21 +464,39 @@ def get_broker_name(provided_api_key):
             return None
     return None
 
+def get_auth_context(user_id):
+    """Get the cached AuthContext of a user, loading and decrypting it on a miss"""
+    auth_context = auth_context_cache.get(user_id)
+    if auth_context is not None:
+        return auth_context
+
+    auth_obj = Auth.query.filter_by(name=user_id).first()
+    if not auth_obj or auth_obj.is_revoked:
+        logger.warning(f"No valid auth token or broker found for user_id '{user_id}'.")
+        return None
+
+    auth_context = AuthContext(
+        user_id=user_id,
+        broker=auth_obj.broker,
+        auth_token=decrypt_token(auth_obj.auth),
+        feed_token=decrypt_token(auth_obj.feed_token) if auth_obj.feed_token else None
+    )
+    if auth_context.auth_token is not None:
+        auth_context_cache[user_id] = auth_context
+    return auth_context
+
 def get_auth_token_broker(provided_api_key, include_feed_token=False):
     """Get auth token, feed token (optional) and broker for a valid API key"""
     user_id = verify_api_key(provided_api_key)
     
     if user_id:
         try:
-            auth_obj = Auth.query.filter_by(name=user_id).first()
-            if auth_obj and not auth_obj.is_revoked:
-                decrypted_token = decrypt_token(auth_obj.auth)
+            auth_context = get_auth_context(user_id)
+            if auth_context:
                 if include_feed_token:
-                    decrypted_feed_token = decrypt_token(auth_obj.feed_token) if auth_obj.feed_token else None
-                    return decrypted_token, decrypted_feed_token, auth_obj.broker
-                return decrypted_token, auth_obj.broker
+                    return auth_context.auth_token, auth_context.feed_token, auth_context.broker
+                return auth_context.auth_token, auth_context.broker
             else:
-                logger.warning(f"No valid auth token or broker found for user_id '{user_id}'.")
                 return (None, None, None) if include_feed_token else (None, None)
         except Exception as e:
             logger.error(f"Error while querying the database for auth token and broker: {e}")
@@ -0,0 +1,152 @@
+"""
+Futures and option chains of the in-memory symbol cache
+
+Built from a SymbolStore and keyed by (underlying, exchange). OpenAlgo F&O
+symbols spell out their contract (NIFTY28OCT2525000CE, NIFTY28OCT25FUT),
+so the underlying is the part of the symbol before the compact expiry:
+
+- options: expiry -> OptionChain, with sorted strikes and the CE and PE
+  row of each strike in parallel arrays
+- futures: rows sorted by expiry date
+
+Expiry lists are sorted chronologically once, when the index is built.
+"""
+
+from array import array
+from bisect import bisect_left
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+# Row arrays use -1 for a strike listed on one side only
+MISSING_ROW = -1
+
+
+def parse_expiry(expiry: str) -> datetime:
+    """Parse an expiry like 28-OCT-25, placing unparseable dates last"""
+    for date_format in ("%d-%b-%y", "%d-%b-%Y"):
+        try:
+            return datetime.strptime(expiry, date_format)
+        except ValueError:
+            pass
+    return datetime.max
+
+
+def compact_expiry(expiry: str) -> str:
+    """The expiry as written in symbols: 28-OCT-25 -> 28OCT25"""
+    return expiry.replace('-', '').upper()
+
+
+class OptionChain:
+    """The strikes of one underlying and expiry, with their CE and PE rows"""
+
+    __slots__ = ('expiry', 'strikes', 'ce_rows', 'pe_rows')
+
+    def __init__(self, expiry: str, legs: Dict[float, List[int]]):
+        self.expiry = expiry
+        self.strikes = array('d', sorted(legs))
+        self.ce_rows = array('q', (legs[strike][0] for strike in self.strikes))
+        self.pe_rows = array('q', (legs[strike][1] for strike in self.strikes))
+
+    def __len__(self) -> int:
+        return len(self.strikes)
+
+    def atm_index(self, price: float) -> int:
+        """Index of the strike closest to price"""
+        i = bisect_left(self.strikes, price)
+        if i == len(self.strikes):
+            return i - 1
+        if i > 0 and price - self.strikes[i - 1] <= self.strikes[i] - price:
+            return i - 1
+        return i
+
+    def window(self, center: int, count: int) -> range:
+        """Indexes of up to count strikes on each side of center"""
+        return range(max(0, center - count), min(len(self.strikes), center + count + 1))
+
+
+class DerivativesIndex:
+    """Futures and option chains by (underlying, exchange)"""
+
+    def __init__(self, store):
+        self.store = store
+        strings = store.strings
+        columns = store.columns
+
+        # (underlying, exchange) -> compact expiry -> strike -> [ce row, pe row]
+        legs: Dict[Tuple[str, str], Dict[str, Dict[float, List[int]]]] = defaultdict(lambda: defaultdict(dict))
+        futures: Dict[Tuple[str, str], List[Tuple[str, int]]] = defaultdict(list)
+        expiry_names: Dict[str, str] = {}
+
+        # Compact form of each distinct expiry, computed once
+        compact_ids = {}
+        for string_id in set(columns['expiry']):
+            if string_id and strings[string_id]:
+                compact_ids[string_id] = compact_expiry(strings[string_id])
+
+        symbol_ids, exchange_ids, strikes = columns['symbol'], columns['exchange'], columns['strike']
+        for row, expiry_id in enumerate(columns['expiry']):
+            compact = compact_ids.get(expiry_id)
+            if compact is None:
+                continue
+            symbol = strings[symbol_ids[row]]
+            position = symbol.find(compact)
+            if position <= 0:
+                continue
+            underlying = symbol[:position]
+            suffix = symbol[position + len(compact):]
+            key = (underlying, strings[exchange_ids[row]])
+            expiry_names[compact] = strings[expiry_id]
+
+            if suffix == 'FUT':
+                futures[key].append((compact, row))
+            elif suffix[-2:] in ('CE', 'PE') and strikes[row] == strikes[row]:  # not NaN
+                leg = legs[key][compact].setdefault(strikes[row], [MISSING_ROW, MISSING_ROW])
+                leg[0 if suffix[-2:] == 'CE' else 1] = row
+
+        dates = {compact: parse_expiry(expiry) for compact, expiry in expiry_names.items()}
+        self.expiry_names = expiry_names
+        self.options: Dict[Tuple[str, str], Dict[str, OptionChain]] = {
+            key: {compact: OptionChain(expiry_names[compact], chain)
+                  for compact, chain in sorted(chains.items(), key=lambda item: dates[item[0]])}
+            for key, chains in legs.items()
+        }
+        self.futures: Dict[Tuple[str, str], List[Tuple[str, int]]] = {
+            key: sorted(contracts, key=lambda contract: dates[contract[0]])
+            for key, contracts in futures.items()
+        }
+        self.dates = dates
+
+    def option_expiries(self, underlying: str, exchange: str) -> List[str]:
+        """Option expiries of an underlying, nearest first"""
+        return [chain.expiry for chain in self.options.get((underlying, exchange), {}).values()]
+
+    def future_expiries(self, underlying: str, exchange: str) -> List[str]:
+        """Futures expiries of an underlying, nearest first"""
+        return [self.expiry_names[compact] for compact, _ in self.futures.get((underlying, exchange), ())]
+
+    def get_chain(self, underlying: str, exchange: str, expiry: str) -> Optional[OptionChain]:
+        """
+        Get the option chain of an underlying for one expiry
+
+        Args:
+            underlying: Underlying symbol (e.g., NIFTY)
+            exchange: F&O exchange (e.g., NFO)
+            expiry: Expiry as 28-OCT-25 or 28OCT25
+
+        Returns:
+            OptionChain: The chain, or None if the expiry is not listed
+        """
+        return self.options.get((underlying, exchange), {}).get(compact_expiry(expiry))
+
+    def nearest_future(self, underlying: str, exchange: str, expiry: Optional[str] = None) -> Optional[int]:
+        """Row of the first future expiring on or after expiry (or the nearest one)"""
+        contracts = self.futures.get((underlying, exchange))
+        if not contracts:
+            return None
+        if expiry:
+            date = parse_expiry(expiry)
+            for compact, row in contracts:
+                if self.dates[compact] >= date:
+                    return row
+        return contracts[0][1]
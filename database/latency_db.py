@@ -2,6 +2,7 @@ from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime,
 from sqlalchemy.orm import scoped_session, sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.sql import func
+from concurrent.futures import ThreadPoolExecutor
 import os
 import logging
 from datetime import datetime
@@ -34,7 +35,7 @@ class OrderLatency(LatencyBase):
     symbol = Column(String(50))
     order_type = Column(String(20))  # MARKET, LIMIT, etc.
     
-    # Round-trip time (comparable to Postman/Bruno)
+    # Round-trip time of the broker's HTTP calls (comparable to Postman/Bruno)
     rtt_ms = Column(Float)
     
     # Our processing overhead
@@ -152,6 +153,17 @@ class OrderLatency(LatencyBase):
                 'broker_stats': {}
             }
 
+# Executor for writing latency rows outside the request. One thread: SQLite
+# serializes the writes anyway, and rows are written in request order
+executor = ThreadPoolExecutor(1)
+
+def async_log_latency(**kwargs):
+    """Log order execution latency from the executor (see OrderLatency.log_latency)"""
+    try:
+        OrderLatency.log_latency(**kwargs)
+    finally:
+        latency_session.remove()
+
 def init_latency_db():
     """Initialize the latency database"""
     # Extract directory from database URL and create if it doesn't exist
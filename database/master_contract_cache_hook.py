@@ -9,13 +9,14 @@ import time
 
 logger = get_logger(__name__)
 
-def load_symbols_to_cache(broker: str) -> bool:
+def load_symbols_to_cache(broker: str, changes=None) -> bool:
     """
     Load all symbols into memory cache after master contract download
     This function is called automatically when master contract download completes
     
     Args:
         broker: The broker name for which symbols were downloaded
+        changes: ContractChanges of the download's incremental refresh, if any
     
     Returns:
         bool: True if cache loaded successfully, False otherwise
@@ -28,7 +29,7 @@ def load_symbols_to_cache(broker: str) -> bool:
         from database.token_db_enhanced import load_cache_for_broker, get_cache_stats
         
         # Load all symbols into cache
-        success = load_cache_for_broker(broker)
+        success = load_cache_for_broker(broker, changes)
         
         if success:
             load_time = time.time() - start_time
@@ -73,20 +74,21 @@ def load_symbols_to_cache(broker: str) -> bool:
         
         return False
 
-def hook_into_master_contract_download(broker: str):
+def hook_into_master_contract_download(broker: str, changes=None):
     """
     Hook function to be called after master contract download completes
     This should be integrated into the existing master contract download flow
     
     Args:
         broker: The broker name for which master contract was downloaded
+        changes: ContractChanges of the download's incremental refresh, if any
     """
     try:
         # Wait a moment for database transactions to complete
         time.sleep(0.5)
         
         # Load symbols into cache
-        load_symbols_to_cache(broker)
+        load_symbols_to_cache(broker, changes)
         
         # After successful master contract download, restore Python strategies
         try:
@@ -0,0 +1,441 @@
+"""
+Incremental master contract refresh
+
+Every login runs the broker's master_contract_download(), which clears
+symtoken and loads the whole contract again, although it is usually the
+same as the last import or differs by a few contracts. Inside
+master_contract_refresh(broker):
+
+- brokers that call source_unchanged() with their downloaded instrument
+  files stop there when the files hash the same as the last import's
+- clear_symtoken() and bulk_load_symtoken() stage the processed rows, with
+  a hash of each, in a temporary table on the refresh's own connection
+  instead of writing them; on exit the contract is hashed from the staged
+  row hashes and, if it changed, diffed against symtoken in SQL so only
+  removed rows are deleted and new rows inserted, in one transaction
+
+Memory stays bounded by the broker's chunks: symtoken is hashed a batch at
+a time and neither contract is held in memory.
+
+The refresh's changes (nothing, or the deleted ids and inserted rows) let
+the symbol cache apply the same diff instead of reloading every symbol.
+
+The hashes of the imported contract are kept in master_contract_source
+and forgotten whenever symtoken is changed outside a refresh. They are only
+recorded once the broker calls contract_downloaded() and every load was
+staged: a download that failed part way is applied as the broker left it,
+but processed again at the next login. Brokers log load errors and carry
+on, so a load that fails to stage marks the refresh failed itself.
+"""
+
+import hashlib
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from database.master_contract_status_db import get_contract_source, set_contract_source
+from database.symtoken_loader import (
+    CHUNK_SIZE, SYMTOKEN_COLUMNS, SYMTOKEN_TABLE, _placeholders, _rows, copy_into_symtoken,
+    insert_symtoken_rows, load_pragmas,
+)
+from utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Replace the whole table instead when more than this fraction of the contract changed
+FULL_RELOAD_FRACTION = 0.5
+
+# Ids per DELETE statement
+DELETE_CHUNK_SIZE = 10000
+
+# symtoken rows read and hashed at a time when diffing
+HASH_BATCH_SIZE = 50000
+
+# Temporary tables of a refresh, on its own connection:
+# the collected rows in load order, with their row hash
+REFRESH_TABLE = 'symtoken_refresh'
+# (row hash, occurrence among identical rows) of the collected rows and of symtoken's
+REFRESH_KEYS_TABLE = 'symtoken_refresh_keys'
+CURRENT_HASHES_TABLE = 'symtoken_refresh_current'
+CURRENT_KEYS_TABLE = 'symtoken_refresh_current_keys'
+# Collected rows missing from symtoken
+INSERTED_TABLE = 'symtoken_refresh_inserted'
+TEMPORARY_TABLES = (REFRESH_TABLE, REFRESH_KEYS_TABLE, CURRENT_HASHES_TABLE, CURRENT_KEYS_TABLE, INSERTED_TABLE)
+
+STRING_COLUMNS = ('symbol', 'brsymbol', 'name', 'exchange', 'brexchange', 'token', 'expiry', 'instrumenttype')
+NUMERIC_COLUMNS = ('strike', 'lotsize', 'tick_size')
+
+_local = threading.local()
+
+
+@dataclass
+class ContractChanges:
+    """
+    What a refresh changed in symtoken
+
+    unchanged: nothing changed
+    reloaded: the table was replaced (or loaded outside the diff), so the
+        cache has to be rebuilt from the database
+    deleted_ids / inserted: otherwise, the ids of the deleted rows and the
+        inserted rows in the symbol cache's SYMBOL_COLUMNS order (id last)
+    """
+    unchanged: bool = False
+    reloaded: bool = False
+    deleted_ids: List[int] = field(default_factory=list)
+    inserted: List[tuple] = field(default_factory=list)
+
+
+def current_refresh() -> Optional['MasterContractRefresh']:
+    """The refresh running in this thread, if any"""
+    return getattr(_local, 'refresh', None)
+
+
+def normalize_contract(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Master contract rows as symtoken stores them: the symtoken columns only,
+    strings as str and numbers as float, missing values as NaN
+    """
+    df = df.reindex(columns=list(SYMTOKEN_COLUMNS))
+    normalized = {}
+    for column in STRING_COLUMNS:
+        values = df[column]
+        normalized[column] = values.astype(str).where(values.notna())
+    for column in NUMERIC_COLUMNS:
+        normalized[column] = pd.to_numeric(df[column], errors='coerce').astype(float)
+    return pd.DataFrame(normalized, columns=list(SYMTOKEN_COLUMNS)).reset_index(drop=True)
+
+
+def _row_hashes(df: pd.DataFrame) -> pd.Series:
+    return pd.util.hash_pandas_object(df, index=False)
+
+
+def contract_hash(df: pd.DataFrame) -> str:
+    """Hash of normalized master contract rows, in order"""
+    return hashlib.sha256(_row_hashes(df).to_numpy().tobytes()).hexdigest()
+
+
+def hash_files(paths: Sequence[str]) -> str:
+    """Hash of instrument files' names and contents"""
+    digest = hashlib.sha256()
+    for path in paths:
+        digest.update(os.path.basename(path).encode() + b'\0')
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def _create_temporary(connection, table: str, definition: str):
+    """(Re)create a temporary table: a pooled connection may still hold one from an earlier refresh"""
+    connection.exec_driver_sql(f"DROP TABLE IF EXISTS {table}")
+    connection.exec_driver_sql(f"CREATE TEMPORARY TABLE {table} {definition}")
+
+
+class MasterContractRefresh:
+    """Collects a broker's master contract download and applies it to symtoken as a diff"""
+
+    def __init__(self, broker: str, engine):
+        self.broker = broker
+        self.engine = engine
+        self.cleared = False
+        self.downloaded = False
+        # A clear or load failed to stage, whether or not the broker noticed
+        self.failed = False
+        self.source_hash: Optional[str] = None
+        self.changes: Optional[ContractChanges] = None
+        # Key columns each collected load was loaded with, by load number
+        self.loads: List[Optional[Tuple[str, ...]]] = []
+        # Rows staged so far, numbering them in load order
+        self.staged = 0
+        self._connection = None
+        self._key_indexes = set()
+
+    def _symbol_count(self) -> int:
+        with self.engine.connect() as connection:
+            return connection.exec_driver_sql(f"SELECT COUNT(*) FROM {SYMTOKEN_TABLE}").scalar()
+
+    def _staging(self):
+        """The refresh's connection, holding the collected rows in REFRESH_TABLE"""
+        if self._connection is None:
+            connection = self.engine.connect()
+            columns = ', '.join(SYMTOKEN_COLUMNS)
+            _create_temporary(connection, REFRESH_TABLE,
+                              f"AS SELECT CAST(0 AS BIGINT) AS seq, 0 AS load_number, CAST(0 AS BIGINT) AS row_hash, "
+                              f"{columns} FROM {SYMTOKEN_TABLE} WHERE 1 = 0")
+            connection.commit()
+            self._connection = connection
+        return self._connection
+
+    def close(self):
+        """Drop the temporary tables and release the refresh's connection"""
+        connection, self._connection = self._connection, None
+        if connection is None:
+            return
+        try:
+            connection.rollback()
+            for table in TEMPORARY_TABLES:
+                connection.exec_driver_sql(f"DROP TABLE IF EXISTS {table}")
+            connection.commit()
+        except Exception as e:
+            logger.warning(f"Could not drop the master contract refresh tables: {e}")
+        finally:
+            connection.close()
+
+    def check_source(self, paths: Sequence[str]) -> bool:
+        """Hash the downloaded files; True if they match the contract in symtoken"""
+        self.source_hash = hash_files(paths)
+        source = get_contract_source(self.broker)
+        if (source and source['source_hash'] == self.source_hash
+                and source['total_symbols'] == self._symbol_count()):
+            logger.info(f"Master contract files for {self.broker} are unchanged, skipping processing")
+            self.changes = ContractChanges(unchanged=True)
+            return True
+        return False
+
+    def clear(self):
+        """The broker cleared symtoken: what it loads next is the whole contract"""
+        self.cleared = True
+        self.loads = []
+        if self._connection is not None:
+            try:
+                self._connection.exec_driver_sql(f"DELETE FROM {REFRESH_TABLE}")
+                self._connection.commit()
+            except Exception:
+                self.failed = True
+                raise
+
+    def collect(self, df: pd.DataFrame, key_columns: Optional[Sequence[str]]) -> int:
+        """Stage rows the broker loads, skipping keys already collected as the table would"""
+        try:
+            return self._stage(df, key_columns)
+        except Exception:
+            self.failed = True
+            raise
+
+    def _stage(self, df: pd.DataFrame, key_columns: Optional[Sequence[str]]) -> int:
+        df = normalize_contract(df)
+        key_columns = tuple(key_columns) if key_columns else None
+        connection = self._staging()
+        load_number = len(self.loads)
+        self.loads.append(key_columns)
+        if df.empty:
+            return 0
+
+        staged = pd.DataFrame({
+            'seq': np.arange(self.staged, self.staged + len(df), dtype=np.int64),
+            'load_number': load_number,
+            'row_hash': _row_hashes(df).to_numpy().view(np.int64),
+        })
+        rows = pd.concat([staged, df], axis=1)
+        self.staged += len(df)
+        columns = ', '.join(rows.columns)
+        insert = f"INSERT INTO {REFRESH_TABLE} ({columns}) VALUES ({_placeholders(connection.dialect, len(rows.columns))})"
+        cursor = connection.connection.cursor()
+        try:
+            for start in range(0, len(rows), CHUNK_SIZE):
+                cursor.executemany(insert, _rows(rows, start, start + CHUNK_SIZE))
+        finally:
+            cursor.close()
+
+        collected = len(df)
+        if self.cleared and key_columns and load_number:
+            if key_columns not in self._key_indexes:
+                connection.exec_driver_sql(
+                    f"CREATE INDEX {REFRESH_TABLE}_{'_'.join(key_columns)} ON {REFRESH_TABLE} ({', '.join(key_columns)})")
+                self._key_indexes.add(key_columns)
+            matches = ' AND '.join(f"r.{column} = {REFRESH_TABLE}.{column}" for column in key_columns)
+            collected -= connection.exec_driver_sql(
+                f"DELETE FROM {REFRESH_TABLE} WHERE load_number = {load_number} AND EXISTS "
+                f"(SELECT 1 FROM {REFRESH_TABLE} r WHERE r.load_number < {load_number} AND {matches})").rowcount
+        connection.commit()
+        return collected
+
+    def _load_frame(self, connection, load_number: int) -> pd.DataFrame:
+        columns = ', '.join(SYMTOKEN_COLUMNS)
+        result = connection.exec_driver_sql(
+            f"SELECT {columns} FROM {REFRESH_TABLE} WHERE load_number = {load_number} ORDER BY seq")
+        return pd.DataFrame(result.fetchall(), columns=list(SYMTOKEN_COLUMNS))
+
+    def _contract_hash(self, connection) -> Tuple[str, int]:
+        """contract_hash() of the staged rows, and their number"""
+        digest = hashlib.sha256()
+        count = 0
+        result = connection.exec_driver_sql(f"SELECT row_hash FROM {REFRESH_TABLE} ORDER BY seq")
+        while batch := result.fetchmany(HASH_BATCH_SIZE):
+            digest.update(np.array([row_hash for row_hash, in batch], dtype=np.int64).tobytes())
+            count += len(batch)
+        return digest.hexdigest(), count
+
+    def apply(self) -> ContractChanges:
+        """Write what was collected to symtoken"""
+        if self.changes is not None:
+            return self.changes
+
+        if not self.cleared:
+            # Loads on top of the existing table: insert them as the broker asked
+            if self.loads:
+                connection = self._staging()
+                with connection.begin():
+                    for load_number, key_columns in enumerate(self.loads):
+                        insert_symtoken_rows(connection, self._load_frame(connection, load_number), key_columns)
+            set_contract_source(self.broker, None, None, None)
+            self.changes = ContractChanges(reloaded=True)
+            return self.changes
+
+        start_time = time.perf_counter()
+        source = get_contract_source(self.broker)
+        connection = self._staging()
+        with connection.begin():
+            new_hash, count = self._contract_hash(connection)
+            if source and source['contract_hash'] == new_hash and source['total_symbols'] == count \
+                    and connection.exec_driver_sql(f"SELECT COUNT(*) FROM {SYMTOKEN_TABLE}").scalar() == count:
+                changes = ContractChanges(unchanged=True)
+            else:
+                changes = self._apply_diff(connection, count)
+
+        if self.downloaded and not self.failed:
+            set_contract_source(self.broker, self.source_hash, new_hash, count)
+        else:
+            logger.warning(f"Master contract download for {self.broker} did not complete, it will be processed again")
+            set_contract_source(self.broker, None, None, None)
+        self.changes = changes
+        logger.info(
+            f"Master contract refresh for {self.broker}: "
+            + ("unchanged" if changes.unchanged else "reloaded" if changes.reloaded else
+               f"{len(changes.deleted_ids)} deleted, {len(changes.inserted)} inserted")
+            + f" in {time.perf_counter() - start_time:.2f}s")
+        return changes
+
+    def _hash_current(self, connection):
+        """Hash symtoken's rows into CURRENT_HASHES_TABLE, a batch at a time"""
+        dialect = connection.dialect
+        columns = ', '.join(SYMTOKEN_COLUMNS)
+        _create_temporary(connection, CURRENT_HASHES_TABLE, "(id BIGINT, row_hash BIGINT)")
+        insert = f"INSERT INTO {CURRENT_HASHES_TABLE} (id, row_hash) VALUES ({_placeholders(dialect, 2)})"
+        result = connection.exec_driver_sql(f"SELECT id, {columns} FROM {SYMTOKEN_TABLE}")
+        cursor = connection.connection.cursor()
+        try:
+            while batch := result.fetchmany(HASH_BATCH_SIZE):
+                current = pd.DataFrame(batch, columns=['id', *SYMTOKEN_COLUMNS])
+                ids = current.pop('id')
+                hashes = _row_hashes(normalize_contract(current)).to_numpy().view(np.int64)
+                cursor.executemany(insert, list(zip(ids.tolist(), hashes.tolist())))
+        finally:
+            cursor.close()
+
+    def _apply_diff(self, connection, count: int) -> ContractChanges:
+        columns = ', '.join(SYMTOKEN_COLUMNS)
+        existing = connection.exec_driver_sql(f"SELECT COUNT(*) FROM {SYMTOKEN_TABLE}").scalar()
+
+        deleted_ids, inserted_count = [], count
+        if existing:
+            # Rows match by content hash, made unique by their occurrence among identical rows
+            self._hash_current(connection)
+            for table, source, order in ((REFRESH_KEYS_TABLE, REFRESH_TABLE, 'seq'),
+                                         (CURRENT_KEYS_TABLE, CURRENT_HASHES_TABLE, 'id')):
+                _create_temporary(connection, table,
+                                  f"AS SELECT {order}, row_hash, ROW_NUMBER() OVER "
+                                  f"(PARTITION BY row_hash ORDER BY {order}) AS occurrence FROM {source}")
+                connection.exec_driver_sql(f"CREATE INDEX {table}_key ON {table} (row_hash, occurrence)")
+
+            deleted_ids = [row_id for row_id, in connection.exec_driver_sql(
+                f"SELECT id FROM {CURRENT_KEYS_TABLE} c WHERE NOT EXISTS (SELECT 1 FROM {REFRESH_KEYS_TABLE} n "
+                f"WHERE n.row_hash = c.row_hash AND n.occurrence = c.occurrence) ORDER BY id")]
+            _create_temporary(connection, INSERTED_TABLE,
+                              f"AS SELECT seq FROM {REFRESH_KEYS_TABLE} n WHERE NOT EXISTS (SELECT 1 FROM {CURRENT_KEYS_TABLE} c "
+                              f"WHERE c.row_hash = n.row_hash AND c.occurrence = n.occurrence)")
+            inserted_count = connection.exec_driver_sql(f"SELECT COUNT(*) FROM {INSERTED_TABLE}").scalar()
+
+        if len(deleted_ids) + inserted_count > count * FULL_RELOAD_FRACTION:
+            connection.exec_driver_sql(f"DELETE FROM {SYMTOKEN_TABLE}")
+            with load_pragmas(connection):
+                copy_into_symtoken(connection, f"SELECT {columns} FROM {REFRESH_TABLE} ORDER BY seq", count, 0)
+            return ContractChanges(reloaded=True)
+
+        cursor = connection.connection.cursor()
+        try:
+            delete = f"DELETE FROM {SYMTOKEN_TABLE} WHERE id = {_placeholders(connection.dialect, 1)}"
+            for start in range(0, len(deleted_ids), DELETE_CHUNK_SIZE):
+                cursor.executemany(delete, [(row_id,) for row_id in deleted_ids[start:start + DELETE_CHUNK_SIZE]])
+        finally:
+            cursor.close()
+
+        inserted_rows = []
+        if inserted_count:
+            last_id = connection.exec_driver_sql(f"SELECT MAX(id) FROM {SYMTOKEN_TABLE}").scalar() or 0
+            copy_into_symtoken(
+                connection, f"SELECT {columns} FROM {REFRESH_TABLE} "
+                            f"WHERE seq IN (SELECT seq FROM {INSERTED_TABLE}) ORDER BY seq", inserted_count)
+            inserted_rows = connection.exec_driver_sql(
+                f"SELECT {columns}, id FROM {SYMTOKEN_TABLE} WHERE id > {int(last_id)} ORDER BY id").fetchall()
+        return ContractChanges(deleted_ids=deleted_ids, inserted=[tuple(row) for row in inserted_rows])
+
+
+@contextmanager
+def master_contract_refresh(broker: str, engine=None):
+    """
+    Run a broker's master contract download as an incremental refresh
+
+    Args:
+        broker: Broker whose contract is downloaded
+        engine: Engine of the symtoken database (default: database.symbol's)
+
+    Yields:
+        MasterContractRefresh: Its changes are set once the block exits
+    """
+    if engine is None:
+        from database.symbol import engine
+
+    refresh = MasterContractRefresh(broker, engine)
+    _local.refresh = refresh
+    try:
+        try:
+            yield refresh
+        finally:
+            _local.refresh = None
+        refresh.apply()
+    finally:
+        refresh.close()
+
+
+def source_unchanged(*paths: str) -> bool:
+    """
+    Check a broker's downloaded instrument files against the last import
+
+    Brokers call this between downloading and processing; True means the
+    files hash the same as the contract already in symtoken, so processing
+    can be skipped. Always False outside a refresh.
+
+    Args:
+        paths: The downloaded files
+
+    Returns:
+        bool: True if the master contract is unchanged
+    """
+    refresh = current_refresh()
+    if refresh is None:
+        return False
+    try:
+        return refresh.check_source(paths)
+    except Exception as e:
+        logger.warning(f"Could not hash master contract files: {e}")
+        return False
+
+
+def contract_downloaded():
+    """
+    Mark the running refresh's download as complete
+
+    Brokers call this once the whole master contract is loaded; until then
+    the contract's hashes aren't recorded, so a failed download isn't
+    skipped as unchanged at the next login. Does nothing outside a refresh.
+    """
+    refresh = current_refresh()
+    if refresh is not None:
+        refresh.downloaded = True
@@ -1,5 +1,5 @@
 import os
-from sqlalchemy import create_engine, Column, String, DateTime, Boolean, text
+from sqlalchemy import create_engine, Column, String, DateTime, Boolean, Integer, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from datetime import datetime
@@ -35,6 +35,16 @@ class MasterContractStatus(Base):
     total_symbols = Column(String, default='0')
     is_ready = Column(Boolean, default=False)
 
+class MasterContractSource(Base):
+    """Content hashes of the master contract currently in symtoken (at most one row)"""
+    __tablename__ = 'master_contract_source'
+    
+    broker = Column(String, primary_key=True)
+    source_hash = Column(String)  # downloaded instrument files, when the broker reports them
+    contract_hash = Column(String)  # processed rows
+    total_symbols = Column(Integer)
+    updated_at = Column(DateTime, default=datetime.now)
+
 # Create table if it doesn't exist
 Base.metadata.create_all(bind=engine)
 
@@ -152,5 +162,42 @@ def check_if_ready(broker):
     except Exception as e:
         logger.error(f"Error checking if ready for {broker}: {str(e)}")
         return False
+    finally:
+        session.close()
+
+def get_contract_source(broker):
+    """Get the hashes of the broker's master contract if it is the one in symtoken"""
+    session = SessionLocal()
+    try:
+        source = session.query(MasterContractSource).filter_by(broker=broker).first()
+        if source:
+            return {
+                'source_hash': source.source_hash,
+                'contract_hash': source.contract_hash,
+                'total_symbols': source.total_symbols
+            }
+        return None
+    except Exception as e:
+        logger.error(f"Error getting contract source for {broker}: {str(e)}")
+        return None
+    finally:
+        session.close()
+
+def set_contract_source(broker, source_hash, contract_hash, total_symbols):
+    """Record the hashes of the master contract just imported, replacing any other broker's"""
+    session = SessionLocal()
+    try:
+        session.query(MasterContractSource).delete()
+        session.add(MasterContractSource(
+            broker=broker,
+            source_hash=source_hash,
+            contract_hash=contract_hash,
+            total_symbols=total_symbols,
+            updated_at=datetime.now()
+        ))
+        session.commit()
+    except Exception as e:
+        logger.error(f"Error setting contract source for {broker}: {str(e)}")
+        session.rollback()
     finally:
         session.close()
\ No newline at end of file
@@ -1,9 +1,11 @@
 # database/settings_db.py
 
-from sqlalchemy import create_engine, Column, Integer, String, Boolean, MetaData, Text
+from sqlalchemy import create_engine, Column, Integer, String, Boolean, MetaData, Text, select
 from sqlalchemy.orm import scoped_session, sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 import os
+import threading
+import time
 from utils.logging import get_logger
 from cryptography.fernet import Fernet
 import base64
@@ -44,6 +46,74 @@ class Settings(Base):
     security_api_ban_duration = Column(Integer, default=48)  # Ban duration in hours
     security_repeat_offender_limit = Column(Integer, default=3)  # Bans before permanent ban
 
+class SettingsVersion(Base):
+    """Counter bumped by every settings write, so other workers know to drop their cached settings"""
+    __tablename__ = 'settings_version'
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+# Settings are read on every order, so each process caches the settings row.
+# Writes through this module update the writing process's cache at once;
+# other processes notice the bumped version within this many seconds.
+SETTINGS_CACHE_CHECK_INTERVAL = float(os.getenv('SETTINGS_CACHE_CHECK_INTERVAL', '1'))
+
+_NOT_LOADED = object()
+_cache_lock = threading.Lock()
+_cached_settings = _NOT_LOADED  # Column values of the settings row, or None if there is none
+_cached_version = None
+_checked_at = 0.0
+
+def _read_version(connection):
+    version = connection.execute(select(SettingsVersion.version).where(SettingsVersion.id == 1)).scalar()
+    return version or 0
+
+def _get_settings():
+    """
+    Get the settings row's column values from the process cache
+
+    The version is checked at most every SETTINGS_CACHE_CHECK_INTERVAL seconds
+    and the row re-read only when it changed. Reads use a fresh connection so
+    they never see a stale snapshot.
+
+    Returns:
+        dict: Column values, or None if there is no settings row yet
+    """
+    global _cached_settings, _cached_version, _checked_at
+
+    now = time.monotonic()
+    if _cached_settings is not _NOT_LOADED and now - _checked_at < SETTINGS_CACHE_CHECK_INTERVAL:
+        return _cached_settings
+
+    with _cache_lock:
+        if _cached_settings is not _NOT_LOADED and now - _checked_at < SETTINGS_CACHE_CHECK_INTERVAL:
+            return _cached_settings
+
+        with engine.connect() as connection:
+            version = _read_version(connection)
+            if _cached_settings is _NOT_LOADED or version != _cached_version:
+                row = connection.execute(select(Settings.__table__).order_by(Settings.id).limit(1)).mappings().first()
+                _cached_settings = dict(row) if row else None
+                _cached_version = version
+        _checked_at = now
+        return _cached_settings
+
+def invalidate_settings_cache():
+    """Drop this process's cached settings so the next read goes to the database"""
+    global _cached_settings
+    with _cache_lock:
+        _cached_settings = _NOT_LOADED
+
+def _commit_settings():
+    """Commit a settings write, bumping the version so every process reloads the settings"""
+    updated = db_session.query(SettingsVersion).filter_by(id=1).update(
+        {SettingsVersion.version: SettingsVersion.version + 1}, synchronize_session=False)
+    if not updated:
+        db_session.add(SettingsVersion(id=1, version=1))
+    try:
+        db_session.commit()
+    finally:
+        invalidate_settings_cache()
+
 def init_db():
     """Initialize the settings database"""
     logger.info("Initializing Settings DB")
@@ -56,16 +126,17 @@ def init_db():
         logger.info("Creating default settings (Live Mode)")
         default_settings = Settings(analyze_mode=False)
         db_session.add(default_settings)
-        db_session.commit()
+        _commit_settings()
 
 def get_analyze_mode():
     """Get current analyze mode setting"""
-    settings = Settings.query.first()
-    if not settings:
-        settings = Settings(analyze_mode=False)  # Default to Live Mode
-        db_session.add(settings)
-        db_session.commit()
-    return settings.analyze_mode
+    settings = _get_settings()
+    if settings is None:
+        if not Settings.query.first():
+            db_session.add(Settings(analyze_mode=False))  # Default to Live Mode
+            _commit_settings()
+        settings = _get_settings()
+    return settings['analyze_mode']
 
 def set_analyze_mode(mode: bool):
     """Set analyze mode setting"""
@@ -75,7 +146,7 @@ def set_analyze_mode(mode: bool):
         db_session.add(settings)
     else:
         settings.analyze_mode = mode
-    db_session.commit()
+    _commit_settings()
 
 def _get_encryption_key():
     """Get or create encryption key for SMTP password"""
@@ -105,18 +176,18 @@ def _decrypt_password(encrypted_password: str) -> str:
 
 def get_smtp_settings():
     """Get SMTP configuration"""
-    settings = Settings.query.first()
+    settings = _get_settings()
     if not settings:
         return None
     
     return {
-        'smtp_server': settings.smtp_server,
-        'smtp_port': settings.smtp_port,
-        'smtp_username': settings.smtp_username,
-        'smtp_password': _decrypt_password(settings.smtp_password_encrypted) if settings.smtp_password_encrypted else None,
-        'smtp_use_tls': settings.smtp_use_tls,
-        'smtp_from_email': settings.smtp_from_email,
-        'smtp_helo_hostname': settings.smtp_helo_hostname
+        'smtp_server': settings['smtp_server'],
+        'smtp_port': settings['smtp_port'],
+        'smtp_username': settings['smtp_username'],
+        'smtp_password': _decrypt_password(settings['smtp_password_encrypted']) if settings['smtp_password_encrypted'] else None,
+        'smtp_use_tls': settings['smtp_use_tls'],
+        'smtp_from_email': settings['smtp_from_email'],
+        'smtp_helo_hostname': settings['smtp_helo_hostname']
     }
 
 def set_smtp_settings(smtp_server=None, smtp_port=None, smtp_username=None, 
@@ -142,31 +213,32 @@ def set_smtp_settings(smtp_server=None, smtp_port=None, smtp_username=None,
     if smtp_helo_hostname is not None:
         settings.smtp_helo_hostname = smtp_helo_hostname
     
-    db_session.commit()
+    _commit_settings()
     logger.info("SMTP settings updated successfully")
 
 def get_security_settings():
     """Get security configuration"""
-    settings = Settings.query.first()
-    if not settings:
-        # Create with defaults
-        settings = Settings(
-            analyze_mode=False,
-            security_404_threshold=20,
-            security_404_ban_duration=24,
-            security_api_threshold=10,
-            security_api_ban_duration=48,
-            security_repeat_offender_limit=3
-        )
-        db_session.add(settings)
-        db_session.commit()
+    settings = _get_settings()
+    if settings is None:
+        if not Settings.query.first():
+            # Create with defaults
+            db_session.add(Settings(
+                analyze_mode=False,
+                security_404_threshold=20,
+                security_404_ban_duration=24,
+                security_api_threshold=10,
+                security_api_ban_duration=48,
+                security_repeat_offender_limit=3
+            ))
+            _commit_settings()
+        settings = _get_settings()
 
     return {
-        '404_threshold': settings.security_404_threshold or 20,
-        '404_ban_duration': settings.security_404_ban_duration or 24,
-        'api_threshold': settings.security_api_threshold or 10,
-        'api_ban_duration': settings.security_api_ban_duration or 48,
-        'repeat_offender_limit': settings.security_repeat_offender_limit or 3
+        '404_threshold': settings['security_404_threshold'] or 20,
+        '404_ban_duration': settings['security_404_ban_duration'] or 24,
+        'api_threshold': settings['security_api_threshold'] or 10,
+        'api_ban_duration': settings['security_api_ban_duration'] or 48,
+        'repeat_offender_limit': settings['security_repeat_offender_limit'] or 3
     }
 
 def set_security_settings(threshold_404=None, ban_duration_404=None,
@@ -189,5 +261,5 @@ def set_security_settings(threshold_404=None, ban_duration_404=None,
     if repeat_offender_limit is not None:
         settings.security_repeat_offender_limit = repeat_offender_limit
 
-    db_session.commit()
+    _commit_settings()
     logger.info("Security settings updated successfully")
@@ -45,13 +45,25 @@ def enhanced_search_symbols(query: str, exchange: str = None) -> List[SymToken]:
     Enhanced search function that searches across multiple fields
     and supports partial matching with multiple terms
     
+    Served from the in-memory symbol cache (ranked exact > prefix > substring)
+    when it is loaded, otherwise from the database.
+    
     Args:
         query (str): Search query string
         exchange (str, optional): Exchange to filter by
         
     Returns:
-        List[SymToken]: List of matching SymToken objects
+        List[SymToken]: List of matching SymToken objects (SymbolData objects
+        with the same fields when served from the cache)
     """
+    try:
+        from database.token_db_enhanced import get_cache
+        cache = get_cache()
+        if cache.cache_loaded and cache.is_cache_valid():
+            return cache.search_symbols(query, exchange, 50)
+    except Exception as e:
+        logger.warning(f"Symbol cache search failed, falling back to database: {str(e)}")
+    
     try:
         # Split the query into terms and clean them
         terms = [term.strip().upper() for term in query.split() if term.strip()]
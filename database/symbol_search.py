@@ -0,0 +1,273 @@
+"""
+Search index over the in-memory symbol cache
+
+Built from a SymbolStore the first time the cache is searched. Results are
+ranked exact > prefix > substring:
+
+- symbol, brsymbol and token of every row are kept upper-cased in one
+  sorted list, so exact and prefix matches are two bisections away
+- distinct names (shared by every contract of an underlying) get the same
+  treatment with their own row lists
+- numeric terms also match strikes exactly, through a strike -> rows map
+- substring matches go through an n-gram index over blocks of the same
+  sorted keys and of the names, so only a few blocks are searched per term
+
+A query is split into terms that must all match (in any field), like
+database.symbol.enhanced_search_symbols. Candidates are generated for the
+most selective term and the other terms are checked per row, so the cost
+follows the result size rather than the master contract size.
+"""
+
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from itertools import accumulate, islice
+from typing import Dict, Iterator, List, Optional
+
+# Sorts after every character a symbol can contain
+_KEY_END = '\U0010ffff'
+
+KEY_COLUMNS = ('symbol', 'brsymbol', 'token')
+
+# Number of consecutive sorted keys sharing one n-gram posting
+SUBSTRING_BLOCK_SIZE = 32
+
+
+class SymbolSearchIndex:
+    """Ranked term search over the rows of a SymbolStore"""
+
+    def __init__(self, store):
+        self.store = store
+        columns = store.columns
+        row_numbers = list(range(len(store)))
+
+        # Upper-cased string table; id 0 (None) becomes '' so 'in' checks need no guard
+        self.upper = [(u if (u := s.upper()) != s else s) if s else '' for s in store.strings]
+        upper = self.upper
+
+        # Key entries: (symbol | brsymbol | token, row), skipping a brsymbol equal to the symbol
+        entry_keys: List[str] = []
+        entry_rows: List[int] = []
+        symbol_ids = columns['symbol']
+        for column in KEY_COLUMNS:
+            ids = columns[column]
+            for row, string_id in zip(row_numbers, ids):
+                if string_id and (column != 'brsymbol' or string_id != symbol_ids[row]):
+                    entry_keys.append(upper[string_id])
+                    entry_rows.append(row)
+        order = sorted(range(len(entry_keys)), key=entry_keys.__getitem__)
+        self.keys = [entry_keys[i] for i in order]
+        self.key_rows = array('I', [entry_rows[i] for i in order])
+        # Substring matches use the same keys, tokens included (as the ilike search does)
+        self.key_substrings = SubstringIndex(self.keys)
+
+        # Names: sorted distinct names, each with its rows
+        rows_by_name: Dict[int, array] = defaultdict(lambda: array('I'))
+        for row, string_id in zip(row_numbers, columns['name']):
+            if string_id:
+                rows_by_name[string_id].append(row)
+        names = sorted(rows_by_name, key=upper.__getitem__)
+        self.names = [upper[string_id] for string_id in names]
+        self.name_rows = [rows_by_name[string_id] for string_id in names]
+        # Cumulative row counts, to size a range of names in O(1)
+        self.name_row_counts = array('I', accumulate((len(rows) for rows in self.name_rows), initial=0))
+        self.name_substrings = SubstringIndex(self.names)
+
+        self.strike_rows: Dict[float, List[int]] = defaultdict(list)
+        for row, strike in zip(row_numbers, columns['strike']):
+            if strike == strike:  # not NaN
+                self.strike_rows[strike].append(row)
+
+        self.exchange_ids = {store.strings[string_id]: string_id for string_id in set(columns['exchange'])}
+
+    def search(self, query: str, exchange: Optional[str] = None, limit: int = 50) -> List[int]:
+        """
+        Search the store
+
+        Args:
+            query: Space separated terms that must all match
+            exchange: Optional exchange filter
+            limit: Maximum number of rows returned
+
+        Returns:
+            list: Matching row numbers, best first
+        """
+        terms = [term.upper() for term in query.split()]
+        exchange_id = None
+        if exchange:
+            exchange_id = self.exchange_ids.get(exchange)
+            if exchange_id is None:
+                return []
+        exchange_ids = self.store.columns['exchange']
+
+        if not terms:
+            rows = range(len(self.store))
+            if exchange_id is not None:
+                rows = (row for row in rows if exchange_ids[row] == exchange_id)
+            return list(islice(rows, limit))
+
+        numbers = {term: _as_number(term) for term in terms}
+        results: List[int] = []
+        seen = set()
+
+        def collect(candidates: Iterator[int], checks: List[str]) -> bool:
+            for row in candidates:
+                if row in seen:
+                    continue
+                seen.add(row)
+                if exchange_id is not None and exchange_ids[row] != exchange_id:
+                    continue
+                if all(self._matches(row, term, numbers[term]) for term in checks):
+                    results.append(row)
+                    if len(results) >= limit:
+                        return True
+            return False
+
+        # Multi-term queries usually spell out a symbol ("NIFTY 28OCT25 25000 CE"):
+        # rows whose key starts with the joined terms come first
+        if len(terms) > 1:
+            for count in range(len(terms), 1, -1):
+                lo, hi = _prefix_range(self.keys, ''.join(terms[:count]))
+                if hi > lo:
+                    if collect(iter(self.key_rows[lo:hi]), terms[count:]):
+                        return results
+                    break
+
+        anchor = self._pick_anchor(terms, numbers)
+        others = [term for term in terms if term is not anchor]
+        collect(self._candidates(anchor, numbers[anchor]), others)
+        return results
+
+    def _pick_anchor(self, terms: List[str], numbers: Dict[str, Optional[float]]) -> str:
+        """Pick the term with the fewest exact/prefix candidates, or the longest if none has any"""
+        best, best_estimate = None, None
+        for term in terms:
+            estimate = self._estimate(term, numbers[term])
+            if estimate and (best_estimate is None or estimate < best_estimate):
+                best, best_estimate = term, estimate
+        return best if best is not None else max(terms, key=len)
+
+    def _estimate(self, term: str, number: Optional[float]) -> int:
+        lo, hi = _prefix_range(self.keys, term)
+        name_lo, name_hi = _prefix_range(self.names, term)
+        estimate = hi - lo + self.name_row_counts[name_hi] - self.name_row_counts[name_lo]
+        if number is not None:
+            estimate += len(self.strike_rows.get(number, ()))
+        return estimate
+
+    def _candidates(self, term: str, number: Optional[float]) -> Iterator[int]:
+        """Every row matching term, exact matches first, then prefix, then substring"""
+        keys, names = self.keys, self.names
+        lo, hi = _prefix_range(keys, term)
+        exact_hi = bisect_right(keys, term, lo, hi)
+        name_lo, name_hi = _prefix_range(names, term)
+        name_exact_hi = bisect_right(names, term, name_lo, name_hi)
+
+        # Exact
+        yield from self.key_rows[lo:exact_hi]
+        if number is not None:
+            yield from self.strike_rows.get(number, ())
+        for i in range(name_lo, name_exact_hi):
+            yield from self.name_rows[i]
+
+        # Prefix
+        yield from self.key_rows[exact_hi:hi]
+        for i in range(name_exact_hi, name_hi):
+            yield from self.name_rows[i]
+
+        # Substring
+        for i in self.key_substrings.find(term):
+            yield self.key_rows[i]
+        for i in self.name_substrings.find(term):
+            yield from self.name_rows[i]
+
+    def _matches(self, row: int, term: str, number: Optional[float]) -> bool:
+        upper = self.upper
+        columns = self.store.columns
+        return (term in upper[columns['symbol'][row]]
+                or term in upper[columns['brsymbol'][row]]
+                or term in upper[columns['token'][row]]
+                or term in upper[columns['name'][row]]
+                or (number is not None and columns['strike'][row] == number))
+
+
+def _as_number(term: str) -> Optional[float]:
+    try:
+        return float(term)
+    except ValueError:
+        return None
+
+
+def _prefix_range(keys: List[str], term: str):
+    """Index range of the sorted keys starting with term"""
+    return bisect_left(keys, term), bisect_left(keys, term + _KEY_END)
+
+
+class SubstringIndex:
+    """
+    Finds the sorted keys containing a term
+
+    Keys are joined in blocks of SUBSTRING_BLOCK_SIZE, each key followed by
+    a newline, and every 4-gram (of the UTF-8 bytes, read as an integer)
+    maps to the blocks containing it. Sorted keys share most 4-grams with
+    their neighbours, so the postings stay small. A term only searches the
+    blocks holding its two rarest 4-grams; a 3 byte term, the blocks
+    holding any 4-gram it starts. Shorter terms search every block.
+    """
+
+    def __init__(self, keys: List[str]):
+        self.texts = [''.join(key + '\n' for key in keys[start:start + SUBSTRING_BLOCK_SIZE])
+                      for start in range(0, len(keys), SUBSTRING_BLOCK_SIZE)]
+        self.blocks: Dict[int, array] = defaultdict(lambda: array('I'))
+        for block, text in enumerate(self.texts):
+            for gram in _grams(text):
+                self.blocks[gram].append(block)
+        # 4-grams by their first 3 bytes
+        self.grams_by_head: Dict[int, List[int]] = defaultdict(list)
+        for gram in self.blocks:
+            self.grams_by_head[_head(gram)].append(gram)
+
+    def find(self, term: str) -> Iterator[int]:
+        """Indexes of the keys containing term, in sorted key order"""
+        texts = self.texts
+        data = term.encode('utf-8')
+        if len(data) >= 4:
+            postings = sorted((self.blocks.get(gram, ()) for gram in _grams(term)), key=len)
+            if not postings[0]:
+                return
+            candidates = sorted(set(postings[0]).intersection(*postings[1:2]))
+        elif len(data) == 3:
+            grams = self.grams_by_head.get(int.from_bytes(data, 'little'), ())
+            candidates = sorted(set().union(*(self.blocks[gram] for gram in grams)))
+        else:
+            candidates = range(len(texts))
+
+        for block in candidates:
+            text = texts[block]
+            position = text.find(term)
+            if position == -1:
+                continue
+            line = block * SUBSTRING_BLOCK_SIZE + text.count('\n', 0, position)
+            while position != -1:
+                yield line
+                end = text.find('\n', position) + 1
+                position = text.find(term, end)
+                line += 1 + (text.count('\n', end, position) if position != -1 else 0)
+
+
+def _grams(text: str) -> set:
+    """Every 4-byte window of the UTF-8 encoded text, as integers"""
+    data = text.encode('utf-8')
+    grams = set()
+    for offset in range(4):
+        end = offset + (len(data) - offset) // 4 * 4
+        if end > offset:
+            grams.update(memoryview(data)[offset:end].cast('I'))
+    return grams
+
+
+def _head(gram: int) -> int:
+    """First 3 bytes of a 4-gram from _grams, as a little-endian integer"""
+    data = gram.to_bytes(4, sys.byteorder)
+    return int.from_bytes(data[:3], 'little')
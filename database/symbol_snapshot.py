@@ -0,0 +1,198 @@
+"""
+On-disk snapshot of the in-memory symbol cache
+
+A snapshot is one file per broker holding the SymbolStore of a master
+contract: a JSON header, the string table as a NUL-separated UTF-8 blob,
+and every column as a raw typed array. Readers map the file read-only and
+use the column arrays in place, so worker processes loading the same
+snapshot share those pages instead of each holding a private copy.
+
+A snapshot is only used when it was written for the same broker and the
+same master contract download (MasterContractStatus.last_updated); any
+other snapshot is stale and the cache is rebuilt from the database.
+"""
+
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from typing import Optional
+
+from utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+SNAPSHOT_MAGIC = b'OASYMSNP'
+SNAPSHOT_VERSION = 2
+SYMBOL_CACHE_SNAPSHOT_DIR = os.getenv('SYMBOL_CACHE_SNAPSHOT_DIR', 'db')
+
+# Magic, then the length of the JSON header that follows
+_PREFIX = struct.Struct('<8sI')
+_ALIGNMENT = 8
+
+
+def snapshot_path(broker: str) -> str:
+    """Get the snapshot file of a broker"""
+    return os.path.join(SYMBOL_CACHE_SNAPSHOT_DIR, f"symbols-{broker}.snapshot")
+
+
+def get_contract_timestamp(broker: str) -> Optional[str]:
+    """
+    Get the version of the broker's current master contract
+
+    Returns:
+        str: ISO timestamp of the last successful download, or None while a
+        download is pending or failed
+    """
+    from database.master_contract_status_db import SessionLocal, MasterContractStatus
+
+    session = SessionLocal()
+    try:
+        status = session.query(MasterContractStatus).filter_by(broker=broker).first()
+        if not status or status.status != 'success' or not status.last_updated:
+            return None
+        return status.last_updated.isoformat()
+    finally:
+        session.close()
+
+
+def get_ready_broker() -> Optional[str]:
+    """Get the broker with the most recent successful master contract download"""
+    from database.master_contract_status_db import SessionLocal, MasterContractStatus
+
+    session = SessionLocal()
+    try:
+        status = session.query(MasterContractStatus).filter_by(status='success').order_by(
+            MasterContractStatus.last_updated.desc()).first()
+        return status.broker if status else None
+    finally:
+        session.close()
+
+
+def write_snapshot(store, broker: str, contract_timestamp: str, path: Optional[str] = None) -> bool:
+    """
+    Write a sealed SymbolStore to the broker's snapshot file
+
+    The file is written under a temporary name and renamed into place, so
+    processes that already mapped the previous snapshot keep a valid view.
+
+    Args:
+        store: The SymbolStore to persist
+        broker: Broker the symbols belong to
+        contract_timestamp: Version of the master contract, from get_contract_timestamp
+        path: Snapshot file (defaults to snapshot_path(broker))
+
+    Returns:
+        bool: True if the snapshot was written
+    """
+    path = path or snapshot_path(broker)
+    strings = store.strings[1:]
+    if any('\0' in s for s in strings):
+        logger.warning(f"Not writing symbol snapshot for {broker}: a symbol contains a NUL character")
+        return False
+
+    blocks = [('strings', 'B', '\0'.join(strings).encode('utf-8'))]
+    for column, values in store.columns.items():
+        blocks.append((column, values.typecode if hasattr(values, 'typecode') else values.format,
+                       bytes(values)))
+
+    header = {
+        'version': SNAPSHOT_VERSION,
+        'broker': broker,
+        'contract_timestamp': contract_timestamp,
+        'rows': len(store),
+        'string_count': len(strings),
+        'byteorder': sys.byteorder,
+        'sections': {},
+    }
+    # Offsets are relative to the end of the header, which is padded to the alignment
+    offset = 0
+    for name, typecode, data in blocks:
+        header['sections'][name] = [offset, len(data), typecode]
+        offset += _padded(len(data))
+    header_bytes = json.dumps(header).encode('utf-8')
+    header_bytes += b' ' * (_padded(_PREFIX.size + len(header_bytes)) - _PREFIX.size - len(header_bytes))
+
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.symbols-', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(_PREFIX.pack(SNAPSHOT_MAGIC, len(header_bytes)))
+            f.write(header_bytes)
+            for name, typecode, data in blocks:
+                f.write(data)
+                f.write(b'\0' * (_padded(len(data)) - len(data)))
+        os.replace(temp_path, path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+    logger.info(f"Wrote symbol snapshot for {broker} ({len(store)} symbols) to {path}")
+    return True
+
+
+def read_snapshot(broker: str, contract_timestamp: str, path: Optional[str] = None):
+    """
+    Map the broker's snapshot file if it matches the current master contract
+
+    Args:
+        broker: Broker whose symbols are needed
+        contract_timestamp: Version of the current master contract
+        path: Snapshot file (defaults to snapshot_path(broker))
+
+    Returns:
+        SymbolStore: A read-only store backed by the mapped file, or None if
+        the snapshot is missing, stale or unreadable
+    """
+    from database.token_db_enhanced import SymbolStore
+
+    path = path or snapshot_path(broker)
+    if not os.path.exists(path):
+        return None
+
+    with open(path, 'rb') as f:
+        mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    magic, header_length = _PREFIX.unpack_from(mapping, 0)
+    if magic != SNAPSHOT_MAGIC:
+        logger.warning(f"Ignoring symbol snapshot {path}: not a snapshot file")
+        mapping.close()
+        return None
+
+    header = json.loads(bytes(mapping[_PREFIX.size:_PREFIX.size + header_length]))
+    if (header.get('version') != SNAPSHOT_VERSION or header.get('broker') != broker
+            or header.get('contract_timestamp') != contract_timestamp
+            or header.get('byteorder') != sys.byteorder):
+        logger.info(f"Symbol snapshot {path} is stale, rebuilding from the database")
+        mapping.close()
+        return None
+
+    base = _PREFIX.size + header_length
+    view = memoryview(mapping)
+    sections = {}
+    for name, (offset, length, typecode) in header['sections'].items():
+        sections[name] = view[base + offset:base + offset + length].cast(typecode)
+
+    blob = sections.pop('strings')
+    strings = [None]
+    if header['string_count']:
+        strings.extend(str(blob, 'utf-8').split('\0'))
+    if len(strings) != header['string_count'] + 1:
+        logger.warning(f"Ignoring symbol snapshot {path}: corrupt string table")
+        # The mapping can only be closed once no views of it remain
+        blob.release()
+        for section in sections.values():
+            section.release()
+        view.release()
+        mapping.close()
+        return None
+
+    return SymbolStore.from_columns(strings, sections, mapping)
+
+
+def _padded(length: int) -> int:
+    return (length + _ALIGNMENT - 1) // _ALIGNMENT * _ALIGNMENT
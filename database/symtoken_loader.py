@@ -0,0 +1,221 @@
+"""
+Bulk loader for the symtoken master contract table
+
+Master contract downloads insert 100k+ instruments right after clearing the
+table. Going through the ORM with every index in place costs a Python
+object per row plus an index update per row for each of the symtoken
+indexes. This loader instead:
+
+- writes the rows into a temporary staging table with chunked executemany
+- drops rows whose token (or key columns) already exist in symtoken
+- drops the symtoken indexes when the load is at least as large as the
+  table, copies the staging table over with one INSERT ... SELECT, and
+  rebuilds the indexes
+- enlarges SQLite's page caches for the load
+
+All of it runs in the caller's transaction, so a failed load leaves the
+table as it was once the caller rolls back.
+"""
+
+import os
+import time
+from contextlib import contextmanager
+from typing import Optional, Sequence
+
+import pandas as pd
+from sqlalchemy import inspect
+
+from utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+SYMTOKEN_TABLE = 'symtoken'
+STAGING_TABLE = 'symtoken_staging'
+# Hashes of the last imported contract (database.master_contract_status_db)
+CONTRACT_SOURCE_TABLE = 'master_contract_source'
+SYMTOKEN_COLUMNS = ('symbol', 'brsymbol', 'name', 'exchange', 'brexchange', 'token',
+                    'expiry', 'strike', 'lotsize', 'instrumenttype', 'tick_size')
+
+# Rows per executemany call
+CHUNK_SIZE = 10000
+
+# SQLite page caches for the load, for symtoken and the staging table each,
+# so index builds sort in memory (256MB by default; lower it on small-memory
+# hosts at some cost in load time). Restored afterwards. (temp_store can't
+# be changed inside a transaction, so it is left alone.)
+LOAD_CACHE_KB = int(os.getenv('SYMTOKEN_LOAD_CACHE_MB', '256')) * 1024
+SQLITE_LOAD_PRAGMAS = {'main.cache_size': -LOAD_CACHE_KB, 'temp.cache_size': -LOAD_CACHE_KB}
+
+
+def _placeholders(dialect, count: int) -> str:
+    if dialect.paramstyle == 'qmark':
+        return ', '.join('?' * count)
+    if dialect.paramstyle == 'numeric':
+        return ', '.join(f':{i + 1}' for i in range(count))
+    return ', '.join(['%s'] * count)
+
+
+def _rows(df: pd.DataFrame, start: int, stop: int):
+    """Rows start:stop as tuples of Python values, NaN as None"""
+    chunk = df.iloc[start:stop].astype(object)
+    return list(chunk.where(chunk.notna(), None).itertuples(index=False, name=None))
+
+
+def _set_pragmas(connection, pragmas: dict) -> dict:
+    """Apply SQLite pragmas, returning the previous values"""
+    previous = {}
+    for pragma, value in pragmas.items():
+        previous[pragma] = connection.exec_driver_sql(f"PRAGMA {pragma}").scalar()
+        connection.exec_driver_sql(f"PRAGMA {pragma} = {int(value)}")
+    return previous
+
+
+@contextmanager
+def load_pragmas(connection):
+    """SQLITE_LOAD_PRAGMAS for the duration of a load (nothing on other databases)"""
+    previous = _set_pragmas(connection, SQLITE_LOAD_PRAGMAS) if connection.dialect.name == 'sqlite' else {}
+    try:
+        yield
+    finally:
+        if previous:
+            _set_pragmas(connection, previous)
+
+
+def _forget_contract_source(connection):
+    """
+    Forget the hashes of the last imported master contract once symtoken is
+    changed outside a refresh. Done in the caller's transaction: on SQLite a
+    second connection would wait on the caller's write lock.
+    """
+    if inspect(connection).has_table(CONTRACT_SOURCE_TABLE):
+        connection.exec_driver_sql(f"DELETE FROM {CONTRACT_SOURCE_TABLE}")
+
+
+def clear_symtoken(connection):
+    """
+    Delete every symtoken row, ahead of loading a new master contract
+
+    During a master contract refresh (see database.master_contract_refresh)
+    nothing is deleted: the rows loaded afterwards are collected and only
+    the difference is applied once the download completes.
+
+    Args:
+        connection: SQLAlchemy connection in the transaction to delete in; the caller commits
+    """
+    from database.master_contract_refresh import current_refresh
+
+    refresh = current_refresh()
+    if refresh is not None:
+        refresh.clear()
+        return
+
+    connection.exec_driver_sql(f"DELETE FROM {SYMTOKEN_TABLE}")
+    _forget_contract_source(connection)
+
+
+def bulk_load_symtoken(connection, df: pd.DataFrame, key_columns: Optional[Sequence[str]] = ('token',)) -> int:
+    """
+    Insert master contract rows into symtoken
+
+    During a master contract refresh the rows are collected instead and
+    applied as a diff once the download completes.
+
+    Args:
+        connection: SQLAlchemy connection in the transaction to load in
+            (e.g., db_session.connection()); the caller commits
+        df: Rows with the symtoken columns; missing columns are loaded as NULL
+        key_columns: Skip rows whose values in these columns already exist
+            in symtoken, or None to insert every row
+
+    Returns:
+        int: Number of rows inserted (or collected)
+    """
+    from database.master_contract_refresh import current_refresh
+
+    refresh = current_refresh()
+    if refresh is not None:
+        return refresh.collect(df, key_columns)
+
+    inserted = insert_symtoken_rows(connection, df, key_columns)
+    _forget_contract_source(connection)
+    return inserted
+
+
+def insert_symtoken_rows(connection, df: pd.DataFrame, key_columns: Optional[Sequence[str]] = ('token',)) -> int:
+    """Insert rows into symtoken through the staging table (see bulk_load_symtoken)"""
+    if df.empty:
+        return 0
+
+    start_time = time.perf_counter()
+    dialect = connection.dialect
+    quote = dialect.identifier_preparer.quote
+    columns = ', '.join(quote(column) for column in SYMTOKEN_COLUMNS)
+    df = df.reindex(columns=list(SYMTOKEN_COLUMNS))
+
+    with load_pragmas(connection):
+        # Staging table with the symtoken columns and no indexes
+        connection.exec_driver_sql(f"DROP TABLE IF EXISTS {STAGING_TABLE}")
+        connection.exec_driver_sql(
+            f"CREATE TEMPORARY TABLE {STAGING_TABLE} AS SELECT {columns} FROM {SYMTOKEN_TABLE} WHERE 1 = 0")
+
+        insert = f"INSERT INTO {STAGING_TABLE} ({columns}) VALUES ({_placeholders(dialect, len(SYMTOKEN_COLUMNS))})"
+        cursor = connection.connection.cursor()
+        try:
+            for chunk_start in range(0, len(df), CHUNK_SIZE):
+                cursor.executemany(insert, _rows(df, chunk_start, chunk_start + CHUNK_SIZE))
+        finally:
+            cursor.close()
+
+        existing = connection.exec_driver_sql(f"SELECT COUNT(*) FROM {SYMTOKEN_TABLE}").scalar()
+        if existing and key_columns:
+            # Uses the symtoken indexes, which are still in place here
+            matches = ' AND '.join(f"t.{quote(column)} = {STAGING_TABLE}.{quote(column)}" for column in key_columns)
+            connection.exec_driver_sql(
+                f"DELETE FROM {STAGING_TABLE} WHERE EXISTS "
+                f"(SELECT 1 FROM {SYMTOKEN_TABLE} t WHERE {matches})")
+
+        inserted = copy_into_symtoken(connection, f"SELECT {columns} FROM {STAGING_TABLE}", len(df), existing)
+        connection.exec_driver_sql(f"DROP TABLE {STAGING_TABLE}")
+
+    elapsed = time.perf_counter() - start_time
+    logger.info(
+        f"Loaded {inserted} of {len(df)} symbols into {SYMTOKEN_TABLE} in {elapsed:.2f}s "
+        f"({inserted / elapsed if elapsed else 0:,.0f} rows/sec)")
+    return inserted
+
+
+def copy_into_symtoken(connection, select: str, count: int, existing: Optional[int] = None) -> int:
+    """
+    Insert the rows of a SELECT of the symtoken columns into symtoken
+
+    Args:
+        connection: SQLAlchemy connection in the transaction to insert in
+        select: SELECT statement yielding SYMTOKEN_COLUMNS, in order
+        count: Number of rows it yields at most
+        existing: Number of rows in symtoken, if already counted
+
+    Returns:
+        int: Number of rows inserted
+    """
+    quote = connection.dialect.identifier_preparer.quote
+    columns = ', '.join(quote(column) for column in SYMTOKEN_COLUMNS)
+    if existing is None:
+        existing = connection.exec_driver_sql(f"SELECT COUNT(*) FROM {SYMTOKEN_TABLE}").scalar()
+
+    # Building an index once is cheaper than maintaining it row by row,
+    # unless the table already holds more rows than this load adds
+    indexes = []
+    if count >= existing:
+        indexes = [index for index in inspect(connection).get_indexes(SYMTOKEN_TABLE)
+                   if index['name'] and all(index['column_names'])]
+        for index in indexes:
+            connection.exec_driver_sql(f"DROP INDEX {quote(index['name'])}")
+
+    inserted = connection.exec_driver_sql(f"INSERT INTO {SYMTOKEN_TABLE} ({columns}) {select}").rowcount
+
+    for index in indexes:
+        unique = 'UNIQUE ' if index.get('unique') else ''
+        index_columns = ', '.join(quote(column) for column in index['column_names'])
+        connection.exec_driver_sql(
+            f"CREATE {unique}INDEX {quote(index['name'])} ON {SYMTOKEN_TABLE} ({index_columns})")
+    return inserted
@@ -5,6 +5,10 @@ Optimized for zero-config deployment with configurable session reset time (SESSI
 
 from typing import Dict, List, Optional, Tuple, Any
 from datetime import datetime, timedelta
+from array import array
+import math
+import sys
+import threading
 import time
 from dataclasses import dataclass, field
 from collections import defaultdict
@@ -44,9 +48,21 @@ class CacheStats:
             'memory_usage_mb': f"{self.memory_usage_mb:.2f}"
         }
 
-@dataclass
+# Columns of the master contract held in memory, in SymToken order with the row id last
+SYMBOL_COLUMNS = (
+    'symbol', 'brsymbol', 'name', 'exchange', 'brexchange', 'token',
+    'expiry', 'strike', 'lotsize', 'instrumenttype', 'tick_size', 'id'
+)
+FLOAT_COLUMNS = ('strike', 'tick_size')
+INT_COLUMNS = ('lotsize', 'id')
+STRING_COLUMNS = tuple(c for c in SYMBOL_COLUMNS if c not in FLOAT_COLUMNS + INT_COLUMNS)
+
+# Stored in integer columns in place of None
+MISSING_INT = -1
+
+@dataclass(slots=True)
 class SymbolData:
-    """Lightweight symbol data structure for in-memory storage"""
+    """Lightweight symbol data structure returned by cache lookups"""
     symbol: str
     brsymbol: str
     name: str
@@ -58,11 +74,205 @@ class SymbolData:
     lotsize: Optional[int] = None
     instrumenttype: Optional[str] = None
     tick_size: Optional[float] = None
+    id: Optional[int] = None
+
+class _StringIds(dict):
+    """Maps strings to their id in a string table, appending unseen strings to it"""
+    
+    def __init__(self, strings: List[Optional[str]]):
+        super().__init__({None: 0})
+        self.strings = strings
+    
+    def __missing__(self, value: str) -> int:
+        string_id = self[value] = len(self.strings)
+        self.strings.append(value)
+        return string_id
+
+class SymbolStore:
+    """
+    Column-oriented storage for the master contract
+    
+    Every distinct string is kept once in a shared string table and string
+    columns are arrays of 32-bit ids into it; numbers live in typed arrays.
+    A symbol is identified by its row number, which is what the cache
+    indexes store, so no per-symbol Python object exists at rest.
+    
+    A store loaded from a snapshot has its columns mapped from the file
+    (see database.symbol_snapshot) and is read-only.
+    """
+    
+    def __init__(self):
+        # Id 0 stands for None
+        self.strings: List[Optional[str]] = [None]
+        self.columns: Dict[str, Any] = {}
+        for column in STRING_COLUMNS:
+            self.columns[column] = array('I')
+        for column in FLOAT_COLUMNS:
+            self.columns[column] = array('d')
+        for column in INT_COLUMNS:
+            self.columns[column] = array('q')
+        self._string_ids = _StringIds(self.strings)
+        # Memory-mapped snapshot backing the columns, if any
+        self.mapping = None
+    
+    @classmethod
+    def from_columns(cls, strings: List[Optional[str]], columns: Dict[str, Any], mapping=None) -> 'SymbolStore':
+        """Create a read-only store over existing columns (typed arrays or memoryviews)"""
+        store = cls()
+        store.strings = strings
+        store.columns = {column: columns[column] for column in SYMBOL_COLUMNS}
+        store._string_ids = None
+        store.mapping = mapping
+        return store
+    
+    def __len__(self) -> int:
+        return len(self.columns['token'])
+    
+    def intern(self, value: Optional[str]) -> int:
+        """Get the string table id of a value, adding it if new"""
+        return self._string_ids[value]
+    
+    def append(self, values: tuple) -> int:
+        """Append a row given in SYMBOL_COLUMNS order (id may be left out) and return its row number"""
+        (symbol, brsymbol, name, exchange, brexchange, token,
+         expiry, strike, lotsize, instrumenttype, tick_size, *row_id) = values
+        intern = self._string_ids.__getitem__
+        columns = self.columns
+        row = len(columns['token'])
+        
+        columns['symbol'].append(intern(symbol))
+        columns['brsymbol'].append(intern(brsymbol))
+        columns['name'].append(intern(name))
+        columns['exchange'].append(intern(exchange))
+        columns['brexchange'].append(intern(brexchange))
+        columns['token'].append(intern(token))
+        columns['expiry'].append(intern(expiry))
+        columns['strike'].append(math.nan if strike is None else strike)
+        columns['lotsize'].append(MISSING_INT if lotsize is None else lotsize)
+        columns['instrumenttype'].append(intern(instrumenttype))
+        columns['tick_size'].append(math.nan if tick_size is None else tick_size)
+        columns['id'].append(row_id[0] if row_id and row_id[0] is not None else MISSING_INT)
+        return row
+    
+    def seal(self):
+        """Drop the build-time string lookup once all rows are appended; the store is read-only after"""
+        self._string_ids = None
+    
+    def with_changes(self, deleted_ids, rows) -> 'SymbolStore':
+        """
+        Build a new sealed store from this one with rows removed and added
+        
+        Args:
+            deleted_ids: Database ids of the rows to remove
+            rows: Rows to add, in SYMBOL_COLUMNS order
+        
+        Returns:
+            SymbolStore: The new store; this one is left unchanged
+        """
+        deleted_ids = set(deleted_ids)
+        kept = [row for row, row_id in enumerate(self.columns['id']) if row_id not in deleted_ids]
+        
+        store = SymbolStore()
+        store.strings = list(self.strings)
+        store._string_ids = _StringIds(store.strings)
+        store._string_ids.update((string, string_id) for string_id, string in enumerate(store.strings))
+        for column, values in self.columns.items():
+            store.columns[column] = array(store.columns[column].typecode, map(values.__getitem__, kept))
+        for values in rows:
+            store.append(values)
+        store.seal()
+        return store
+    
+    def get(self, column: str, row: int) -> Any:
+        """Get one value of a row"""
+        value = self.columns[column][row]
+        if column in FLOAT_COLUMNS:
+            return None if math.isnan(value) else value
+        if column in INT_COLUMNS:
+            return None if value == MISSING_INT else value
+        return self.strings[value]
+    
+    def get_string(self, column: str, row: int) -> Optional[str]:
+        """Get one value of a string column - the fast path for lookups"""
+        return self.strings[self.columns[column][row]]
+    
+    def row(self, row: int) -> SymbolData:
+        """Materialize a row as SymbolData"""
+        return SymbolData(*(self.get(column, row) for column in SYMBOL_COLUMNS))
+    
+    def nbytes(self) -> int:
+        """Measured size in bytes of the string table and columns held privately by this process"""
+        size = sys.getsizeof(self.strings) + sum(sys.getsizeof(s) for s in self.strings[1:])
+        size += sum(sys.getsizeof(column) for column in self.columns.values())
+        return size
+    
+    def mapped_bytes(self) -> int:
+        """Size in bytes of the snapshot file the columns are mapped from"""
+        return len(self.mapping) if self.mapping is not None else 0
+
+class SymbolIndexes:
+    """
+    A sealed store together with its lookup indexes
+    
+    Never modified once built: the cache swaps in a new instance on every
+    load, so a lookup that reads the cache's indexes once always resolves
+    row numbers against the store they were built from.
+    """
+    
+    __slots__ = ('store', 'by_symbol_exchange', 'by_token_exchange', 'by_brsymbol_exchange', 'by_token')
+    
+    def __init__(self, store: SymbolStore):
+        self.store = store
+        # Indexes for O(1) lookups, mapping exchange -> key -> row
+        self.by_symbol_exchange: Dict[str, Dict[str, int]] = {}
+        self.by_token_exchange: Dict[str, Dict[str, int]] = {}
+        self.by_brsymbol_exchange: Dict[str, Dict[str, int]] = {}
+        # Maps token -> row across exchanges
+        self.by_token: Dict[str, int] = {}
+        if len(store):
+            self._build()
+    
+    def _build(self):
+        """Build the lookup indexes from the store's columns"""
+        store = self.store
+        string_at = store.strings.__getitem__
+        columns = store.columns
+        
+        # One int object per row number, shared by every index
+        row_numbers = list(range(len(store)))
+        
+        # Group row numbers by exchange, then build each exchange's dicts in one pass
+        rows_by_exchange: Dict[int, List[int]] = defaultdict(list)
+        for row, exchange_id in zip(row_numbers, columns['exchange']):
+            rows_by_exchange[exchange_id].append(row)
+        
+        for exchange_id, rows in rows_by_exchange.items():
+            exchange = string_at(exchange_id)
+            for index, column in ((self.by_symbol_exchange, 'symbol'),
+                                  (self.by_token_exchange, 'token'),
+                                  (self.by_brsymbol_exchange, 'brsymbol')):
+                ids = columns[column]
+                index[exchange] = dict(zip(map(string_at, map(ids.__getitem__, rows)), rows))
+        
+        self.by_token = dict(zip(map(string_at, columns['token']), row_numbers))
+    
+    def nbytes(self) -> int:
+        """Measured size in bytes of the store and indexes"""
+        size = self.store.nbytes() + sys.getsizeof(self.by_token)
+        for index in (self.by_symbol_exchange, self.by_token_exchange, self.by_brsymbol_exchange):
+            size += sys.getsizeof(index) + sum(sys.getsizeof(rows) for rows in index.values())
+        # Row numbers above the small-int cache are one int object each, shared by the indexes
+        size += max(0, len(self.store) - 257) * sys.getsizeof(2 ** 20)
+        return size
 
 class BrokerSymbolCache:
     """
     High-performance in-memory cache for broker symbols
     Designed to handle 100,000+ symbols with minimal memory footprint
+    
+    The symbols are held in one SymbolIndexes that is replaced, never
+    modified, so lookups stay consistent while a refresh runs in another
+    thread.
     """
     
     def __init__(self):
@@ -70,14 +280,13 @@ class BrokerSymbolCache:
         self.active_broker: Optional[str] = None
         self.cache_loaded: bool = False
         
-        # Primary storage - all symbols in memory
-        self.symbols: Dict[str, SymbolData] = {}
-        
-        # Multi-index maps for O(1) lookups
-        self.by_symbol_exchange: Dict[Tuple[str, str], SymbolData] = {}
-        self.by_token_exchange: Dict[Tuple[str, str], SymbolData] = {}
-        self.by_brsymbol_exchange: Dict[Tuple[str, str], SymbolData] = {}
-        self.by_token: Dict[str, SymbolData] = {}
+        # Primary storage - all symbols in memory, one row each, and their indexes
+        self.indexes = SymbolIndexes(SymbolStore())
+        # 'database', 'snapshot' or 'incremental'
+        self.source: Optional[str] = None
+        # Indexes derived from the store (search, derivatives), built on first use
+        self._derived_indexes: Dict[str, Any] = {}
+        self._derived_lock = threading.Lock()
         
         # Cache statistics
         self.stats = CacheStats()
@@ -88,6 +297,11 @@ class BrokerSymbolCache:
         
         logger.info("BrokerSymbolCache initialized")
     
+    @property
+    def store(self) -> SymbolStore:
+        """The store of the active symbols"""
+        return self.indexes.store
+    
     def load_all_symbols(self, broker: str) -> bool:
         """
         Load all symbols for the active broker into memory
@@ -96,73 +310,112 @@ class BrokerSymbolCache:
         try:
             from database.symbol import SymToken
             
-            start_time = time.time()
             logger.info(f"Loading all symbols for broker: {broker}")
             
-            # Clear existing cache
-            self.clear_cache()
-            
-            # Query all symbols from database
-            symbols = SymToken.query.all()
-            
-            if not symbols:
-                logger.warning(f"No symbols found in database for broker: {broker}")
-                return False
-            
-            # Build in-memory structures
-            for sym in symbols:
-                # Create lightweight data object
-                symbol_data = SymbolData(
-                    symbol=sym.symbol,
-                    brsymbol=sym.brsymbol,
-                    name=sym.name,
-                    exchange=sym.exchange,
-                    brexchange=sym.brexchange,
-                    token=sym.token,
-                    expiry=sym.expiry,
-                    strike=sym.strike,
-                    lotsize=sym.lotsize,
-                    instrumenttype=sym.instrumenttype,
-                    tick_size=sym.tick_size
-                )
-                
-                # Store in primary dict
-                self.symbols[sym.token] = symbol_data
-                
-                # Build indexes
-                self.by_symbol_exchange[(sym.symbol, sym.exchange)] = symbol_data
-                self.by_token_exchange[(sym.token, sym.exchange)] = symbol_data
-                self.by_brsymbol_exchange[(sym.brsymbol, sym.exchange)] = symbol_data
-                self.by_token[sym.token] = symbol_data
-            
-            # Update cache metadata
-            self.active_broker = broker
-            self.cache_loaded = True
-            self.stats.total_symbols = len(symbols)
-            self.stats.cache_loads += 1
-            self.stats.last_loaded = datetime.now(pytz.timezone('Asia/Kolkata'))
+            # Query plain column tuples rather than ORM objects
+            rows = SymToken.query.with_entities(
+                *(getattr(SymToken, column) for column in SYMBOL_COLUMNS)
+            ).yield_per(10000)
             
-            # Calculate memory usage (rough estimate)
-            self.stats.memory_usage_mb = (
-                len(self.symbols) * 500  # ~500 bytes per symbol
-            ) / (1024 * 1024)
-            
-            load_time = time.time() - start_time
-            logger.info(
-                f"Successfully loaded {self.stats.total_symbols} symbols "
-                f"in {load_time:.2f} seconds. "
-                f"Memory usage: {self.stats.memory_usage_mb:.2f} MB"
-            )
-            
-            # Set session timing
-            self._set_session_timing()
-            
-            return True
+            return self.load_rows(broker, rows)
             
         except Exception as e:
             logger.error(f"Error loading symbols into cache: {e}")
             return False
     
+    def load_rows(self, broker: str, rows) -> bool:
+        """
+        Build the cache from rows given in SYMBOL_COLUMNS order
+        
+        The current symbols keep being served until the new ones are indexed.
+        
+        Args:
+            broker: Broker the rows belong to
+            rows: Iterable of tuples in SYMBOL_COLUMNS order
+        
+        Returns:
+            bool: True if at least one symbol was loaded
+        """
+        start_time = time.time()
+        
+        store = SymbolStore()
+        for values in rows:
+            store.append(values)
+        store.seal()
+        
+        return self._activate(broker, store, 'database', start_time)
+    
+    def load_store(self, broker: str, store: SymbolStore, source: str = 'snapshot') -> bool:
+        """
+        Serve the cache from an already built store, such as a mapped snapshot
+        
+        Args:
+            broker: Broker the symbols belong to
+            store: A sealed SymbolStore
+            source: Where the store came from, for monitoring
+        
+        Returns:
+            bool: True if at least one symbol was loaded
+        """
+        start_time = time.time()
+        return self._activate(broker, store, source, start_time)
+    
+    def apply_changes(self, broker: str, deleted_ids: List[int], rows: List[tuple]) -> bool:
+        """
+        Apply a master contract diff to the loaded cache instead of reloading it
+        
+        Args:
+            broker: Broker the changes belong to
+            deleted_ids: Database ids of the removed symbols
+            rows: Inserted symbols in SYMBOL_COLUMNS order, with their ids
+        
+        Returns:
+            bool: False if the cache isn't loaded for this broker
+        """
+        if not self.cache_loaded or self.active_broker != broker:
+            return False
+        
+        start_time = time.time()
+        store = self.indexes.store.with_changes(deleted_ids, rows)
+        return self._activate(broker, store, 'incremental', start_time)
+    
+    def _activate(self, broker: str, store: SymbolStore, source: str, start_time: float) -> bool:
+        """Index a sealed store and make it the active cache"""
+        if not len(store):
+            logger.warning(f"No symbols found in database for broker: {broker}")
+            self.clear_cache()
+            return False
+        
+        indexes = SymbolIndexes(store)
+        
+        # Swap the new symbols in with a single assignment
+        self.indexes = indexes
+        
+        # Update cache metadata
+        self.active_broker = broker
+        self.source = source
+        self.cache_loaded = True
+        self.stats.total_symbols = len(store)
+        self.stats.cache_loads += 1
+        self.stats.last_loaded = datetime.now(pytz.timezone('Asia/Kolkata'))
+        self.stats.memory_usage_mb = indexes.nbytes() / (1024 * 1024)
+        
+        load_time = time.time() - start_time
+        logger.info(
+            f"Successfully loaded {self.stats.total_symbols} symbols from {source} "
+            f"in {load_time:.2f} seconds. "
+            f"Memory usage: {self.stats.memory_usage_mb:.2f} MB"
+        )
+        
+        # Set session timing
+        self._set_session_timing()
+        
+        return True
+    
+    def measure_memory(self) -> int:
+        """Measured size in bytes of the store and indexes"""
+        return self.indexes.nbytes()
+    
     def _set_session_timing(self):
         """Set session start and next reset time from SESSION_EXPIRY_TIME env variable"""
         import os
@@ -193,70 +446,67 @@ class BrokerSymbolCache:
         now_ist = datetime.now(pytz.timezone('Asia/Kolkata'))
         return now_ist < self.next_reset_time
     
-    def get_token(self, symbol: str, exchange: str) -> Optional[str]:
-        """Get token for symbol and exchange - O(1) lookup"""
-        self.stats.hits += 1
-        key = (symbol, exchange)
-        if key in self.by_symbol_exchange:
-            return self.by_symbol_exchange[key].token
-        
-        self.stats.hits -= 1
+    def _find(self, index: Dict[str, Dict[str, int]], key: str, exchange: str) -> Optional[int]:
+        """Find the row of key on exchange in an index, counting the hit or miss"""
+        rows = index.get(exchange)
+        if rows is not None:
+            row = rows.get(key)
+            if row is not None:
+                self.stats.hits += 1
+                return row
         self.stats.misses += 1
         return None
     
+    def get_token(self, symbol: str, exchange: str) -> Optional[str]:
+        """Get token for symbol and exchange - O(1) lookup"""
+        indexes = self.indexes
+        row = self._find(indexes.by_symbol_exchange, symbol, exchange)
+        return None if row is None else indexes.store.get_string('token', row)
+    
     def get_symbol(self, token: str, exchange: str) -> Optional[str]:
         """Get symbol for token and exchange - O(1) lookup"""
-        self.stats.hits += 1
-        key = (token, exchange)
-        if key in self.by_token_exchange:
-            return self.by_token_exchange[key].symbol
-        
-        self.stats.hits -= 1
-        self.stats.misses += 1
-        return None
+        indexes = self.indexes
+        row = self._find(indexes.by_token_exchange, token, exchange)
+        return None if row is None else indexes.store.get_string('symbol', row)
     
     def get_br_symbol(self, symbol: str, exchange: str) -> Optional[str]:
         """Get broker symbol for symbol and exchange - O(1) lookup"""
-        self.stats.hits += 1
-        key = (symbol, exchange)
-        if key in self.by_symbol_exchange:
-            return self.by_symbol_exchange[key].brsymbol
-        
-        self.stats.hits -= 1
-        self.stats.misses += 1
-        return None
+        indexes = self.indexes
+        row = self._find(indexes.by_symbol_exchange, symbol, exchange)
+        return None if row is None else indexes.store.get_string('brsymbol', row)
     
     def get_oa_symbol(self, brsymbol: str, exchange: str) -> Optional[str]:
         """Get OpenAlgo symbol for broker symbol and exchange - O(1) lookup"""
-        self.stats.hits += 1
-        key = (brsymbol, exchange)
-        if key in self.by_brsymbol_exchange:
-            return self.by_brsymbol_exchange[key].symbol
-        
-        self.stats.hits -= 1
-        self.stats.misses += 1
-        return None
+        indexes = self.indexes
+        row = self._find(indexes.by_brsymbol_exchange, brsymbol, exchange)
+        return None if row is None else indexes.store.get_string('symbol', row)
     
     def get_brexchange(self, symbol: str, exchange: str) -> Optional[str]:
         """Get broker exchange for symbol and exchange - O(1) lookup"""
-        self.stats.hits += 1
-        key = (symbol, exchange)
-        if key in self.by_symbol_exchange:
-            return self.by_symbol_exchange[key].brexchange
-        
-        self.stats.hits -= 1
-        self.stats.misses += 1
-        return None
+        indexes = self.indexes
+        row = self._find(indexes.by_symbol_exchange, symbol, exchange)
+        return None if row is None else indexes.store.get_string('brexchange', row)
+    
+    def has_symbol(self, symbol: str, exchange: str) -> bool:
+        """Check whether symbol is listed on exchange - O(1) lookup"""
+        return self._find(self.indexes.by_symbol_exchange, symbol, exchange) is not None
+    
+    def get_symbol_info(self, symbol: str, exchange: str) -> Optional[SymbolData]:
+        """Get complete symbol data by symbol and exchange - O(1) lookup"""
+        indexes = self.indexes
+        row = self._find(indexes.by_symbol_exchange, symbol, exchange)
+        return None if row is None else indexes.store.row(row)
     
     def get_symbol_data(self, token: str) -> Optional[SymbolData]:
         """Get complete symbol data by token - O(1) lookup"""
-        self.stats.hits += 1
-        if token in self.by_token:
-            return self.by_token[token]
+        indexes = self.indexes
+        row = indexes.by_token.get(token)
+        if row is None:
+            self.stats.misses += 1
+            return None
         
-        self.stats.hits -= 1
-        self.stats.misses += 1
-        return None
+        self.stats.hits += 1
+        return indexes.store.row(row)
     
     def get_tokens_bulk(self, symbol_exchange_pairs: List[Tuple[str, str]]) -> List[Optional[str]]:
         """
@@ -264,16 +514,12 @@ class BrokerSymbolCache:
         Optimized for performance with single pass
         """
         self.stats.bulk_queries += 1
+        indexes = self.indexes
         results = []
         
         for symbol, exchange in symbol_exchange_pairs:
-            key = (symbol, exchange)
-            if key in self.by_symbol_exchange:
-                results.append(self.by_symbol_exchange[key].token)
-                self.stats.hits += 1
-            else:
-                results.append(None)
-                self.stats.misses += 1
+            row = self._find(indexes.by_symbol_exchange, symbol, exchange)
+            results.append(None if row is None else indexes.store.get_string('token', row))
         
         return results
     
@@ -282,52 +528,61 @@ class BrokerSymbolCache:
         Bulk retrieve symbols for multiple token-exchange pairs
         """
         self.stats.bulk_queries += 1
+        indexes = self.indexes
         results = []
         
         for token, exchange in token_exchange_pairs:
-            key = (token, exchange)
-            if key in self.by_token_exchange:
-                results.append(self.by_token_exchange[key].symbol)
-                self.stats.hits += 1
-            else:
-                results.append(None)
-                self.stats.misses += 1
+            row = self._find(indexes.by_token_exchange, token, exchange)
+            results.append(None if row is None else indexes.store.get_string('symbol', row))
         
         return results
     
+    def _get_derived_index(self, name: str, build):
+        """Get an index derived from the loaded store, building it on first use"""
+        store = self.indexes.store
+        index = self._derived_indexes.get(name)
+        if index is not None and index.store is store:
+            return index
+        
+        with self._derived_lock:
+            index = self._derived_indexes.get(name)
+            if index is None or index.store is not store:
+                start_time = time.time()
+                index = build(store)
+                self._derived_indexes[name] = index
+                logger.info(f"Built symbol {name} index in {time.time() - start_time:.2f} seconds")
+            return index
+    
+    def get_search_index(self):
+        """
+        Get the search index of the loaded symbols
+        
+        Built by load_cache_for_broker after every load; only a cache warm
+        started from a snapshot builds it here, on first use.
+        """
+        from database.symbol_search import SymbolSearchIndex
+        return self._get_derived_index('search', SymbolSearchIndex)
+    
+    def get_derivatives_index(self):
+        """Get the futures and option chains of the loaded symbols, building them on first use"""
+        from database.derivatives_index import DerivativesIndex
+        return self._get_derived_index('derivatives', DerivativesIndex)
+    
     def search_symbols(self, query: str, exchange: Optional[str] = None, limit: int = 50) -> List[SymbolData]:
         """
-        Search symbols by partial match
-        Returns list of matching SymbolData objects
+        Search symbols by symbol, broker symbol, name, token or strike
+        Returns list of matching SymbolData objects ranked exact > prefix > substring
         """
-        query = query.upper()
-        matches = []
-        
-        for symbol_data in self.symbols.values():
-            # Skip if exchange filter doesn't match
-            if exchange and symbol_data.exchange != exchange:
-                continue
-            
-            # Check for match in symbol, brsymbol, or name
-            if (query in symbol_data.symbol.upper() or 
-                query in symbol_data.brsymbol.upper() or 
-                (symbol_data.name and query in symbol_data.name.upper())):
-                matches.append(symbol_data)
-                
-                if len(matches) >= limit:
-                    break
-        
-        return matches
+        search_index = self.get_search_index()
+        return [search_index.store.row(row) for row in search_index.search(query, exchange, limit)]
     
     def clear_cache(self):
         """Clear all cached data"""
-        self.symbols.clear()
-        self.by_symbol_exchange.clear()
-        self.by_token_exchange.clear()
-        self.by_brsymbol_exchange.clear()
-        self.by_token.clear()
+        self.indexes = SymbolIndexes(SymbolStore())
         self.cache_loaded = False
         self.active_broker = None
+        self.source = None
+        self._derived_indexes = {}
         logger.info("Cache cleared")
     
     def get_cache_info(self) -> dict:
@@ -336,6 +591,9 @@ class BrokerSymbolCache:
             'active_broker': self.active_broker,
             'cache_loaded': self.cache_loaded,
             'total_symbols': self.stats.total_symbols,
+            'memory_bytes': self.measure_memory() if self.cache_loaded else 0,
+            'mapped_bytes': self.indexes.store.mapped_bytes(),
+            'source': self.source,
             'cache_valid': self.is_cache_valid(),
             'session_start': self.session_start.isoformat() if self.session_start else None,
             'next_reset': self.next_reset_time.isoformat() if self.next_reset_time else None,
@@ -350,8 +608,34 @@ def get_cache() -> BrokerSymbolCache:
     global _cache_instance
     if _cache_instance is None:
         _cache_instance = BrokerSymbolCache()
+        _warm_start(_cache_instance)
     return _cache_instance
 
+def _warm_start(cache: BrokerSymbolCache):
+    """Load the current master contract from its snapshot when a process first uses the cache"""
+    try:
+        from database.symbol_snapshot import get_ready_broker
+        broker = get_ready_broker()
+        if broker:
+            _load_snapshot(cache, broker)
+    except Exception as e:
+        logger.debug(f"Symbol cache warm start skipped: {e}")
+
+def _load_snapshot(cache: BrokerSymbolCache, broker: str, contract_timestamp: Optional[str] = None) -> bool:
+    """Serve the cache from the broker's snapshot if it matches the current master contract"""
+    from database.symbol_snapshot import get_contract_timestamp, read_snapshot
+    
+    contract_timestamp = contract_timestamp or get_contract_timestamp(broker)
+    if not contract_timestamp:
+        return False
+    
+    try:
+        store = read_snapshot(broker, contract_timestamp)
+    except Exception as e:
+        logger.warning(f"Could not read symbol snapshot for {broker}: {e}")
+        return False
+    return store is not None and cache.load_store(broker, store)
+
 # Public API - Drop-in replacement for existing token_db functions
 def get_token(symbol: str, exchange: str) -> Optional[str]:
     """
@@ -426,7 +710,45 @@ def get_brexchange(symbol: str, exchange: str) -> Optional[str]:
     cache.stats.db_queries += 1
     return get_brexchange_dbquery(symbol, exchange)
 
+def get_symbol_info(symbol: str, exchange: str):
+    """
+    Get the complete master contract row of a symbol
+    
+    The loaded cache holds every row, so a miss there is final; the database
+    is only queried while the cache is not loaded.
+    
+    Returns:
+        SymbolData, or the SymToken row when served from the database; None if not found
+    """
+    cache = get_cache()
+    
+    if cache.cache_loaded and cache.is_cache_valid():
+        return cache.get_symbol_info(symbol, exchange)
+    
+    cache.stats.db_queries += 1
+    return get_symbol_info_dbquery(symbol, exchange)
+
+def symbol_exists(symbol: str, exchange: str) -> bool:
+    """Check whether a symbol is listed on an exchange"""
+    cache = get_cache()
+    
+    if cache.cache_loaded and cache.is_cache_valid():
+        return cache.has_symbol(symbol, exchange)
+    
+    cache.stats.db_queries += 1
+    return get_symbol_info_dbquery(symbol, exchange) is not None
+
 # Database fallback functions (imported from original token_db)
+def get_symbol_info_dbquery(symbol: str, exchange: str):
+    """Query database for the SymToken row of a symbol and exchange"""
+    try:
+        from database.symbol import SymToken
+        return SymToken.query.filter_by(symbol=symbol, exchange=exchange).first()
+    except Exception as e:
+        logger.error(f"Error while querying the database: {e}")
+        return None
+
+
 def get_token_dbquery(symbol: str, exchange: str) -> Optional[str]:
     """Query database for token by symbol and exchange"""
     try:
@@ -503,13 +825,52 @@ def get_symbol_count() -> int:
         return 0
 
 # Cache management functions
-def load_cache_for_broker(broker: str) -> bool:
+def load_cache_for_broker(broker: str, changes=None) -> bool:
     """
     Load cache for a specific broker
     Called after master contract download completes
+    
+    Uses the broker's snapshot when it matches the current master contract,
+    otherwise loads from the database and writes a new snapshot.
+    
+    Args:
+        broker: Broker whose master contract was downloaded
+        changes: ContractChanges of an incremental refresh (see
+            database.master_contract_refresh); when the cache already holds
+            this broker's symbols they are kept or patched instead of reloaded
     """
     cache = get_cache()
-    return cache.load_all_symbols(broker)
+    
+    contract_timestamp = None
+    try:
+        from database.symbol_snapshot import get_contract_timestamp
+        contract_timestamp = get_contract_timestamp(broker)
+    except Exception as e:
+        logger.warning(f"Could not read master contract version for {broker}: {e}")
+    
+    patched = False
+    if changes is not None and not changes.reloaded and cache.cache_loaded and cache.active_broker == broker:
+        if changes.unchanged:
+            logger.info(f"Master contract unchanged, keeping the {len(cache.store)} cached symbols")
+            patched = True
+        else:
+            patched = cache.apply_changes(broker, changes.deleted_ids, changes.inserted)
+    
+    if patched or not (contract_timestamp and _load_snapshot(cache, broker, contract_timestamp)):
+        if not patched and not cache.load_all_symbols(broker):
+            return False
+        
+        if contract_timestamp:
+            try:
+                from database.symbol_snapshot import write_snapshot
+                write_snapshot(cache.store, broker, contract_timestamp)
+            except Exception as e:
+                logger.warning(f"Could not write symbol snapshot for {broker}: {e}")
+    
+    # Search, expiry and option chain requests then never wait for the build
+    cache.get_search_index()
+    cache.get_derivatives_index()
+    return True
 
 def clear_cache():
     """Clear the cache - useful for manual refresh"""
@@ -550,6 +911,40 @@ def get_symbols_bulk(token_exchange_pairs: List[Tuple[str, str]]) -> List[Option
         results.append(get_symbol_dbquery(token, exchange))
     return results
 
+def get_derivatives_index(underlying: str, exchange: str):
+    """
+    Get the futures and option chains of an underlying
+    
+    Args:
+        underlying: Underlying symbol (e.g., NIFTY)
+        exchange: F&O exchange (e.g., NFO)
+    
+    Returns:
+        DerivativesIndex: The index of the loaded cache, or one built from the
+        database rows of this underlying when the cache is not loaded
+    """
+    cache = get_cache()
+    
+    if cache.cache_loaded and cache.is_cache_valid():
+        return cache.get_derivatives_index()
+    
+    from database.symbol import SymToken
+    from database.derivatives_index import DerivativesIndex
+    
+    cache.stats.db_queries += 1
+    store = SymbolStore()
+    rows = SymToken.query.with_entities(
+        *(getattr(SymToken, column) for column in SYMBOL_COLUMNS)
+    ).filter(
+        SymToken.symbol.like(f'{underlying}%'),
+        SymToken.exchange == exchange,
+        SymToken.expiry.isnot(None)
+    ).all()
+    for values in rows:
+        store.append(values)
+    store.seal()
+    return DerivativesIndex(store)
+
 # Search functionality
 def search_symbols(query: str, exchange: Optional[str] = None, limit: int = 50) -> List[dict]:
     """
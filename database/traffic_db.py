@@ -3,8 +3,11 @@ from sqlalchemy.orm import scoped_session, sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.sql import func
 import os
+import heapq
 import logging
-from datetime import datetime, timedelta
+import threading
+import time
+from datetime import datetime, timedelta, timezone
 import json
 from database.settings_db import get_security_settings
 
@@ -20,6 +23,10 @@ logs_engine = create_engine(
     pool_timeout=10
 )
 
+# Seconds a worker trusts its in-memory ban list before re-reading it,
+# to pick up bans and unbans made by other workers
+IP_BAN_SYNC_INTERVAL = float(os.getenv('IP_BAN_SYNC_INTERVAL', '5'))
+
 logs_session = scoped_session(sessionmaker(autocommit=False, autoflush=False, bind=logs_engine))
 LogBase = declarative_base()
 LogBase.query = logs_session.query_property()
@@ -108,31 +115,8 @@ class IPBan(LogBase):
 
     @staticmethod
     def is_ip_banned(ip_address):
-        """Check if an IP is currently banned"""
-        try:
-            ban = IPBan.query.filter_by(ip_address=ip_address).first()
-            if not ban:
-                return False
-
-            # Check permanent ban
-            if ban.is_permanent:
-                return True
-
-            # Check temporary ban expiry
-            if ban.expires_at:
-                if datetime.utcnow() < ban.expires_at.replace(tzinfo=None):
-                    return True
-                else:
-                    # Ban expired, remove it
-                    logs_session.delete(ban)
-                    logs_session.commit()
-                    return False
-
-            return False
-        except Exception as e:
-            logger.error(f"Error checking IP ban status: {e}")
-            logs_session.rollback()
-            return False
+        """Check if an IP is currently banned (served from memory)"""
+        return _ban_table.is_banned(ip_address)
 
     @staticmethod
     def ban_ip(ip_address, reason, duration_hours=24, permanent=False, created_by='system'):
@@ -149,6 +133,12 @@ class IPBan(LogBase):
 
             existing_ban = IPBan.query.filter_by(ip_address=ip_address).first()
 
+            if existing_ban and _ban_expired(existing_ban):
+                # An expired ban counts as no ban: start over as a first offense
+                logs_session.delete(existing_ban)
+                logs_session.flush()
+                existing_ban = None
+
             if existing_ban:
                 # Increment ban count for repeat offender
                 existing_ban.ban_count += 1
@@ -173,8 +163,10 @@ class IPBan(LogBase):
                     created_by=created_by
                 )
                 logs_session.add(ban)
+                existing_ban = ban
 
             logs_session.commit()
+            _ban_table.add(ip_address, None if existing_ban.is_permanent else existing_ban.expires_at)
             logger.info(f"IP {ip_address} banned: {reason}")
             return True
         except Exception as e:
@@ -190,6 +182,7 @@ class IPBan(LogBase):
             if ban:
                 logs_session.delete(ban)
                 logs_session.commit()
+                _ban_table.remove(ip_address)
                 logger.info(f"IP {ip_address} unbanned")
                 return True
             return False
@@ -219,6 +212,107 @@ class IPBan(LogBase):
             logger.error(f"Error getting IP bans: {e}")
             return []
 
+
+def _utc_timestamp(value):
+    """Epoch seconds of a ban expiry (naive datetimes are UTC)"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def _ban_expired(ban):
+    """Whether a temporary ban has run out"""
+    return not ban.is_permanent and ban.expires_at is not None and \
+        _utc_timestamp(ban.expires_at) <= time.time()
+
+
+class IPBanTable:
+    """
+    In-memory copy of the ip_bans table, checked on every request
+
+    Banned IPs are a set; temporary bans also sit in a heap ordered by
+    expiry, so expired ones are dropped by looking at the heap's head rather
+    than the whole set. ban_ip/unban_ip update the table of their worker at
+    once, and it is re-read from the database every IP_BAN_SYNC_INTERVAL
+    seconds for changes made by other workers. Expired rows stay in the
+    database until get_all_bans or a new ban removes them.
+    """
+
+    def __init__(self, sync_interval=IP_BAN_SYNC_INTERVAL):
+        self.sync_interval = sync_interval
+        self._lock = threading.Lock()
+        self._banned = set()
+        self._expires = {}  # IP -> expiry timestamp of its temporary ban
+        self._heap = []  # (expiry timestamp, IP), may hold superseded entries
+        self._synced_at = None
+
+    def is_banned(self, ip_address):
+        if self._synced_at is None or time.monotonic() - self._synced_at >= self.sync_interval:
+            self.sync()
+        if self._heap and self._heap[0][0] <= time.time():
+            self._expire()
+        return ip_address in self._banned
+
+    def add(self, ip_address, expires_at=None):
+        """Ban an IP, until expires_at (a datetime) or permanently"""
+        with self._lock:
+            self._add(ip_address, None if expires_at is None else _utc_timestamp(expires_at))
+
+    def remove(self, ip_address):
+        with self._lock:
+            self._banned.discard(ip_address)
+            self._expires.pop(ip_address, None)
+
+    def sync(self):
+        """Replace the table with the bans in the database"""
+        with self._lock:
+            # Another thread may have synced while this one waited
+            if self._synced_at is not None and time.monotonic() - self._synced_at < self.sync_interval:
+                return
+            self._synced_at = time.monotonic()
+            try:
+                with logs_engine.connect() as connection:
+                    rows = connection.execute(IPBan.__table__.select().with_only_columns(
+                        IPBan.ip_address, IPBan.expires_at, IPBan.is_permanent)).fetchall()
+            except Exception as e:
+                # Keep serving the current list, retry after the interval
+                logger.error(f"Error loading IP bans: {e}")
+                return
+
+            self._banned = set()
+            self._expires = {}
+            self._heap = []
+            for ip_address, expires_at, is_permanent in rows:
+                if not is_permanent and expires_at is None:
+                    continue
+                self._add(ip_address, None if is_permanent else _utc_timestamp(expires_at))
+
+    def invalidate(self):
+        """Re-read the bans from the database on the next check"""
+        self._synced_at = None
+
+    def _add(self, ip_address, expires):
+        self._banned.add(ip_address)
+        if expires is None:
+            self._expires.pop(ip_address, None)
+        else:
+            self._expires[ip_address] = expires
+            heapq.heappush(self._heap, (expires, ip_address))
+
+    def _expire(self):
+        with self._lock:
+            now = time.time()
+            while self._heap and self._heap[0][0] <= now:
+                expires, ip_address = heapq.heappop(self._heap)
+                # Skip entries superseded by a later ban or an unban
+                if self._expires.get(ip_address) == expires:
+                    del self._expires[ip_address]
+                    self._banned.discard(ip_address)
+
+
+_ban_table = IPBanTable()
+
+
 class Error404Tracker(LogBase):
     """Track 404 errors per IP for bot detection"""
     __tablename__ = 'error_404_tracker'
@@ -1,7 +1,8 @@
 # database/tv_search.py
 
-from database.symbol import SymToken
+from database.token_db_enhanced import get_symbol_info
 
 
 def search_symbols(symbol,exchange):
-    return SymToken.query.filter(SymToken.symbol == symbol,SymToken.exchange == exchange).all()
+    result = get_symbol_info(symbol, exchange)
+    return [result] if result is not None else []
@@ -28,6 +28,7 @@ from .ticker import api as ticker_ns
 from .symbol import api as symbol_ns
 from .search import api as search_ns
 from .expiry import api as expiry_ns
+from .option_chain import api as option_chain_ns
 from .analyzer import api as analyzer_ns
 from .ping import api as ping_ns
 from .telegram_bot import api as telegram_ns
@@ -56,6 +57,7 @@ api.add_namespace(ticker_ns, path='/ticker')
 api.add_namespace(symbol_ns, path='/symbol')
 api.add_namespace(search_ns, path='/search')
 api.add_namespace(expiry_ns, path='/expiry')
+api.add_namespace(option_chain_ns, path='/optionchain')
 api.add_namespace(analyzer_ns, path='/analyzer')
 api.add_namespace(ping_ns, path='/ping')
 api.add_namespace(telegram_ns, path='/telegram')
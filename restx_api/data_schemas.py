@@ -57,3 +57,10 @@ class ExpirySchema(Schema):
     symbol = fields.Str(required=True)      # Underlying symbol (e.g., NIFTY, BANKNIFTY)
     exchange = fields.Str(required=True, validate=validate.OneOf(["NFO", "BFO", "MCX", "CDS"]))    # Exchange (e.g., NFO, BFO, MCX, CDS)
     instrumenttype = fields.Str(required=True, validate=validate.OneOf(["futures", "options"]))  # futures or options
+
+class OptionChainSchema(Schema):
+    apikey = fields.Str(required=True)      # API Key for authentication
+    underlying = fields.Str(required=True)  # Underlying symbol (e.g., NIFTY, BANKNIFTY)
+    exchange = fields.Str(required=True, validate=validate.OneOf(["NFO", "BFO", "MCX", "CDS"]))    # Exchange (e.g., NFO, BFO, MCX, CDS)
+    expiry_date = fields.Str(required=True)  # Expiry as returned by the expiry API (e.g., 28-OCT-25)
+    strike_count = fields.Int(missing=10, validate=validate.Range(min=1, max=50, error="Strike count must be between 1 and 50."))  # Strikes on each side of ATM
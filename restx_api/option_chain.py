@@ -0,0 +1,51 @@
+from flask_restx import Namespace, Resource
+from flask import request, jsonify, make_response
+from marshmallow import ValidationError
+from limiter import limiter
+import os
+
+from .data_schemas import OptionChainSchema
+from services.option_chain_service import get_option_chain
+from utils.logging import get_logger
+
+API_RATE_LIMIT = os.getenv("API_RATE_LIMIT", "10 per second")
+api = Namespace('optionchain', description='Option Chain API for F&O instruments')
+
+# Initialize logger
+logger = get_logger(__name__)
+
+# Initialize schema
+option_chain_schema = OptionChainSchema()
+
+@api.route('/', strict_slashes=False)
+class OptionChain(Resource):
+    @limiter.limit(API_RATE_LIMIT)
+    def post(self):
+        """Get the option chain around ATM for an expiry, with quotes for every strike"""
+        try:
+            # Validate request data
+            option_chain_data = option_chain_schema.load(request.json)
+
+            # Call the service function to get the option chain
+            success, response_data, status_code = get_option_chain(
+                underlying=option_chain_data['underlying'],
+                exchange=option_chain_data['exchange'],
+                expiry_date=option_chain_data['expiry_date'],
+                strike_count=option_chain_data['strike_count'],
+                api_key=option_chain_data['apikey']
+            )
+
+            return make_response(jsonify(response_data), status_code)
+
+        except ValidationError as err:
+            return make_response(jsonify({
+                'status': 'error',
+                'message': err.messages
+            }), 400)
+
+        except Exception as e:
+            logger.exception(f"Unexpected error in option chain endpoint: {e}")
+            return make_response(jsonify({
+                'status': 'error',
+                'message': 'An unexpected error occurred'
+            }), 500)
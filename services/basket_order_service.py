@@ -1,3 +1,4 @@
+import contextvars
 import importlib
 import traceback
 import copy
@@ -288,7 +289,8 @@ def process_basket_order_with_auth(
     results = []
     total_orders = len(sorted_orders)
     
-    # Process BUY orders first
+    # Process BUY orders first. Workers run in a copy of the request's context,
+    # so its broker calls are timed (utils.latency_monitor)
     with ThreadPoolExecutor(max_workers=10) as executor:
         # Process all BUY orders first
         buy_futures = []
@@ -297,6 +299,7 @@ def process_basket_order_with_auth(
             order_with_auth = {**order, 'apikey': api_key, 'strategy': basket_data['strategy']}
             buy_futures.append(
                 executor.submit(
+                    contextvars.copy_context().run,
                     place_single_order,
                     order_with_auth,
                     broker_module,
@@ -319,6 +322,7 @@ def process_basket_order_with_auth(
             order_with_auth = {**order, 'apikey': api_key, 'strategy': basket_data['strategy']}
             sell_futures.append(
                 executor.submit(
+                    contextvars.copy_context().run,
                     place_single_order,
                     order_with_auth,
                     broker_module,
@@ -0,0 +1,211 @@
+import contextvars
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Tuple, Dict, Any, Optional, List
+
+from database.auth_db import get_auth_token_broker
+from database.token_db_enhanced import get_derivatives_index, symbol_exists
+from services.quotes_service import import_broker_module, create_data_handler
+from utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Exchanges holding the spot quote of an F&O exchange's underlyings, in lookup order.
+# Underlyings without one (MCX, CDS) use their nearest future instead.
+SPOT_EXCHANGES = {
+    'NFO': ('NSE_INDEX', 'NSE'),
+    'BFO': ('BSE_INDEX', 'BSE'),
+}
+
+# Quotes of one chain are fetched concurrently, shared by all requests
+OPTION_CHAIN_QUOTE_WORKERS = int(os.getenv('OPTION_CHAIN_QUOTE_WORKERS', '10'))
+quote_executor = ThreadPoolExecutor(max_workers=OPTION_CHAIN_QUOTE_WORKERS, thread_name_prefix="option_chain_quotes")
+
+# Broker quote calls one request may make, the underlying's included; wider
+# chains are narrowed around ATM to fit
+OPTION_CHAIN_MAX_QUOTES = max(3, int(os.getenv('OPTION_CHAIN_MAX_QUOTES', '50')))
+
+def _underlying_quote_symbol(index, underlying: str, exchange: str, expiry: str) -> Optional[Tuple[str, str]]:
+    """Symbol and exchange quoted for the underlying's price: the spot, else the nearest future"""
+    for spot_exchange in SPOT_EXCHANGES.get(exchange, ()):
+        if symbol_exists(underlying, spot_exchange):
+            return underlying, spot_exchange
+    row = index.nearest_future(underlying, exchange, expiry)
+    if row is not None:
+        return index.store.get_string('symbol', row), exchange
+    return None
+
+def _chain_legs(chain, store, strikes: range) -> List[Tuple[int, str, str]]:
+    """(strike index, 'ce' | 'pe', symbol) of every listed leg of the strikes"""
+    legs = []
+    for i in strikes:
+        for option_type, rows in (('ce', chain.ce_rows), ('pe', chain.pe_rows)):
+            if rows[i] >= 0:
+                legs.append((i, option_type, store.get_string('symbol', rows[i])))
+    return legs
+
+def _fetch_quote(data_handler: Any, symbol: str, exchange: str) -> Optional[Dict[str, Any]]:
+    try:
+        return data_handler.get_quotes(symbol, exchange)
+    except Exception as e:
+        logger.error(f"Error fetching option chain quote for {symbol}: {e}")
+        return None
+
+def get_option_chain_with_auth(
+    auth_token: str,
+    feed_token: Optional[str],
+    broker: str,
+    underlying: str,
+    exchange: str,
+    expiry_date: str,
+    strike_count: int
+) -> Tuple[bool, Dict[str, Any], int]:
+    """
+    Get the option chain around ATM for one expiry using provided auth tokens.
+
+    Args:
+        auth_token: Authentication token for the broker API
+        feed_token: Feed token for market data (if required by broker)
+        broker: Name of the broker
+        underlying: Underlying symbol (e.g., NIFTY)
+        exchange: F&O exchange (NFO, BFO, MCX, CDS)
+        expiry_date: Expiry as returned by the expiry API (e.g., 28-OCT-25)
+        strike_count: Number of strikes on each side of ATM
+
+    Returns:
+        Tuple containing:
+        - Success status (bool)
+        - Response data (dict)
+        - HTTP status code (int)
+    """
+    underlying = underlying.strip().upper()
+    exchange = exchange.strip().upper()
+
+    index = get_derivatives_index(underlying, exchange)
+    chain = index.get_chain(underlying, exchange, expiry_date)
+    if chain is None or not len(chain):
+        return False, {
+            'status': 'error',
+            'message': f'No options found for {underlying} expiring {expiry_date} in {exchange}'
+        }, 404
+
+    spot = _underlying_quote_symbol(index, underlying, exchange, chain.expiry)
+    if spot is None:
+        return False, {
+            'status': 'error',
+            'message': f'No spot or futures contract found to price {underlying}'
+        }, 404
+
+    broker_module = import_broker_module(broker)
+    if broker_module is None:
+        return False, {
+            'status': 'error',
+            'message': 'Broker-specific module not found'
+        }, 404
+
+    try:
+        data_handler = create_data_handler(broker_module, auth_token, feed_token)
+        spot_quote = data_handler.get_quotes(*spot)
+        if not spot_quote or spot_quote.get('ltp') is None:
+            return False, {
+                'status': 'error',
+                'message': f'Failed to fetch quote for {spot[0]}'
+            }, 500
+        underlying_ltp = float(spot_quote['ltp'])
+
+        atm_index = chain.atm_index(underlying_ltp)
+        store = index.store
+        count = strike_count
+        strikes = chain.window(atm_index, count)
+        legs = _chain_legs(chain, store, strikes)
+        while len(legs) > OPTION_CHAIN_MAX_QUOTES - 1 and count > 0:
+            count -= 1
+            strikes = chain.window(atm_index, count)
+            legs = _chain_legs(chain, store, strikes)
+        if count < strike_count:
+            logger.info(f"Option chain for {underlying} narrowed to {count} strikes on each side of ATM "
+                        f"(OPTION_CHAIN_MAX_QUOTES={OPTION_CHAIN_MAX_QUOTES})")
+
+        # One round of concurrent quote calls instead of one REST call per strike,
+        # each in a copy of the request's context so its broker calls are timed
+        futures = [quote_executor.submit(contextvars.copy_context().run, _fetch_quote, data_handler, symbol, exchange)
+                   for _, _, symbol in legs]
+        quotes = [future.result() for future in futures]
+
+        chain_data = {i: {'strike': chain.strikes[i], 'ce': None, 'pe': None} for i in strikes}
+        for (i, option_type, symbol), quote in zip(legs, quotes):
+            row = chain.ce_rows[i] if option_type == 'ce' else chain.pe_rows[i]
+            chain_data[i][option_type] = {
+                'symbol': symbol,
+                'lotsize': store.get('lotsize', row),
+                'quote': quote
+            }
+
+        return True, {
+            'status': 'success',
+            'underlying': underlying,
+            'underlying_ltp': underlying_ltp,
+            'expiry_date': chain.expiry,
+            'atm_strike': chain.strikes[atm_index],
+            'strike_count': count,
+            'chain': list(chain_data.values())
+        }, 200
+    except Exception as e:
+        logger.exception(f"Error in get_option_chain: {e}")
+        return False, {
+            'status': 'error',
+            'message': str(e)
+        }, 500
+
+def get_option_chain(
+    underlying: str,
+    exchange: str,
+    expiry_date: str,
+    strike_count: int = 10,
+    api_key: Optional[str] = None,
+    auth_token: Optional[str] = None,
+    feed_token: Optional[str] = None,
+    broker: Optional[str] = None
+) -> Tuple[bool, Dict[str, Any], int]:
+    """
+    Get the option chain around ATM for one expiry, with quotes.
+    Supports both API-based authentication and direct internal calls.
+
+    Args:
+        underlying: Underlying symbol (e.g., NIFTY)
+        exchange: F&O exchange (NFO, BFO, MCX, CDS)
+        expiry_date: Expiry as returned by the expiry API (e.g., 28-OCT-25)
+        strike_count: Number of strikes on each side of ATM
+        api_key: OpenAlgo API key (for API-based calls)
+        auth_token: Direct broker authentication token (for internal calls)
+        feed_token: Direct broker feed token (for internal calls)
+        broker: Direct broker name (for internal calls)
+
+    Returns:
+        Tuple containing:
+        - Success status (bool)
+        - Response data (dict)
+        - HTTP status code (int)
+    """
+    # Case 1: API-based authentication
+    if api_key and not (auth_token and broker):
+        AUTH_TOKEN, FEED_TOKEN, broker_name = get_auth_token_broker(api_key, include_feed_token=True)
+        if AUTH_TOKEN is None:
+            return False, {
+                'status': 'error',
+                'message': 'Invalid openalgo apikey'
+            }, 403
+        return get_option_chain_with_auth(AUTH_TOKEN, FEED_TOKEN, broker_name, underlying, exchange,
+                                          expiry_date, strike_count)
+
+    # Case 2: Direct internal call with auth_token and broker
+    elif auth_token and broker:
+        return get_option_chain_with_auth(auth_token, feed_token, broker, underlying, exchange,
+                                          expiry_date, strike_count)
+
+    # Case 3: Invalid parameters
+    else:
+        return False, {
+            'status': 'error',
+            'message': 'Either api_key or both auth_token and broker must be provided'
+        }, 400
@@ -25,6 +25,27 @@ def import_broker_module(broker_name: str) -> Optional[Any]:
         logger.error(f"Error importing broker module '{module_path}': {error}")
         return None
 
+def create_data_handler(broker_module: Any, auth_token: str, feed_token: Optional[str]) -> Any:
+    """
+    Initialize the broker's data handler based on the broker's requirements.
+    
+    Args:
+        broker_module: The broker's data module, from import_broker_module
+        auth_token: Authentication token for the broker API
+        feed_token: Feed token for market data (if required by broker)
+        
+    Returns:
+        The broker's BrokerData instance
+    """
+    if hasattr(broker_module.BrokerData.__init__, '__code__'):
+        # Check number of parameters the broker's __init__ accepts
+        param_count = broker_module.BrokerData.__init__.__code__.co_argcount
+        if param_count > 2:  # More than self and auth_token
+            return broker_module.BrokerData(auth_token, feed_token)
+        return broker_module.BrokerData(auth_token)
+    # Fallback to just auth token if we can't inspect
+    return broker_module.BrokerData(auth_token)
+
 def get_quotes_with_auth(auth_token: str, feed_token: Optional[str], broker: str, symbol: str, exchange: str) -> Tuple[bool, Dict[str, Any], int]:
     """
     Get real-time quotes for a symbol using provided auth tokens.
@@ -50,18 +71,7 @@ def get_quotes_with_auth(auth_token: str, feed_token: Optional[str], broker: str
         }, 404
 
     try:
-        # Initialize broker's data handler based on broker's requirements
-        if hasattr(broker_module.BrokerData.__init__, '__code__'):
-            # Check number of parameters the broker's __init__ accepts
-            param_count = broker_module.BrokerData.__init__.__code__.co_argcount
-            if param_count > 2:  # More than self and auth_token
-                data_handler = broker_module.BrokerData(auth_token, feed_token)
-            else:
-                data_handler = broker_module.BrokerData(auth_token)
-        else:
-            # Fallback to just auth token if we can't inspect
-            data_handler = broker_module.BrokerData(auth_token)
-            
+        data_handler = create_data_handler(broker_module, auth_token, feed_token)
         quotes = data_handler.get_quotes(symbol, exchange)
         
         if quotes is None:
@@ -1,3 +1,4 @@
+import contextvars
 import importlib
 import traceback
 import copy
@@ -305,7 +306,8 @@ def split_order_with_auth(
     # Process orders concurrently
     results = []
     
-    # Create a ThreadPoolExecutor for concurrent order placement
+    # Create a ThreadPoolExecutor for concurrent order placement. Orders run in
+    # a copy of the request's context, so their broker calls are timed
     with ThreadPoolExecutor(max_workers=10) as order_executor:
         # Prepare orders for concurrent execution
         futures = []
@@ -316,6 +318,7 @@ def split_order_with_auth(
             order_data['quantity'] = str(split_size)
             futures.append(
                 order_executor.submit(
+                    contextvars.copy_context().run,
                     place_single_order,
                     order_data,
                     broker_module,
@@ -331,6 +334,7 @@ def split_order_with_auth(
             order_data['quantity'] = str(remaining_qty)
             futures.append(
                 order_executor.submit(
+                    contextvars.copy_context().run,
                     place_single_order,
                     order_data,
                     broker_module,
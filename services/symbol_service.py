@@ -2,7 +2,7 @@ import traceback
 from typing import Tuple, Dict, Any, Optional
 
 from database.auth_db import get_auth_token_broker
-from database.symbol import SymToken, db_session
+from database.token_db_enhanced import get_symbol_info as lookup_symbol_info
 from sqlalchemy.orm.exc import NoResultFound
 from utils.logging import get_logger
 
@@ -31,11 +31,8 @@ def get_symbol_info_with_auth(
         - HTTP status code (int)
     """
     try:
-        # Query the database for the symbol
-        result = db_session.query(SymToken).filter(
-            SymToken.symbol == symbol,
-            SymToken.exchange == exchange
-        ).first()
+        # Look up the symbol in the symbol cache (database while it is not loaded)
+        result = lookup_symbol_info(symbol, exchange)
         
         if result is None:
             error_response = {
@@ -44,7 +41,7 @@ def get_symbol_info_with_auth(
             }
             return False, error_response, 404
         
-        # Transform the SymToken object to a dictionary
+        # Transform the SymbolData / SymToken object to a dictionary
         symbol_info = {
             'id': result.id,
             'symbol': result.symbol,
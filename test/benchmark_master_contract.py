@@ -0,0 +1,329 @@
+"""
+Master Contract Processing Benchmark
+
+Runs each broker's master contract processor offline against recorded
+instrument files and reports the wall time and peak traced memory
+(tracemalloc, which includes numpy/pandas buffers). With --baseline the
+same files also go through the processors as of a git revision, for a
+before/after comparison and a check that both produce the same rows.
+
+Samples are the files as the broker serves them, one per broker:
+    <samples>/zerodha.csv       Kite instruments dump
+    <samples>/angel.json        OpenAPIScripMaster.json
+    <samples>/shoonya/          NSE_symbols.txt, NFO_symbols.txt, ... (unzipped)
+
+Brokers without a recording are skipped. --generate writes synthetic files
+of the same shape for the missing ones, with roughly that many instruments.
+
+Usage:
+    python test/benchmark_master_contract.py --samples tmp/master_contract_samples [--generate 100000]
+        [--broker zerodha] [--repeat 3] [--baseline HEAD~1]
+"""
+
+import argparse
+import csv
+import importlib
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+import types
+from datetime import date, timedelta
+
+# Add parent directory to path
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+# The broker modules create their SymToken engine on import; nothing is written to it
+os.environ.setdefault('DATABASE_URL', 'sqlite:///:memory:')
+
+import pandas as pd
+
+# broker -> (module, sample file or directory, processors run on it in order)
+PROCESSORS = {
+    'zerodha': ('broker.zerodha.database.master_contract_db', 'zerodha.csv', ['process_zerodha_csv']),
+    'angel': ('broker.angel.database.master_contract_db', 'angel.json', ['process_angel_json']),
+    'shoonya': ('broker.shoonya.database.master_contract_db', 'shoonya', [
+        'process_shoonya_nse_data', 'process_shoonya_nfo_data', 'process_shoonya_cds_data',
+        'process_shoonya_mcx_data', 'process_shoonya_bse_data', 'process_shoonya_bfo_data',
+    ]),
+}
+
+COMPARED_COLUMNS = ['symbol', 'brsymbol', 'name', 'exchange', 'brexchange', 'token',
+                    'expiry', 'strike', 'lotsize', 'instrumenttype', 'tick_size']
+
+
+# --- Synthetic samples ---------------------------------------------------------
+
+INDEXES = [('NIFTY', 'NIFTY 50', 25000, 50, 75), ('BANKNIFTY', 'NIFTY BANK', 56000, 100, 35),
+           ('FINNIFTY', 'NIFTY FIN SERVICE', 26500, 50, 65), ('MIDCPNIFTY', 'NIFTY MID SELECT', 13000, 25, 140)]
+CURRENCIES = [('USDINR', 88.0, 0.25, 1000), ('EURINR', 103.0, 0.25, 1000)]
+COMMODITIES = [('GOLD', 120000, 1000, 1), ('SILVER', 145000, 1000, 1), ('CRUDEOIL', 5400, 50, 100)]
+
+
+def _expiries(count, start=date(2025, 10, 28), step=7):
+    return [start + timedelta(days=step * i) for i in range(count)]
+
+
+def _contracts(count, seed=7):
+    """(name, expiry, strike, option type or FUT, lotsize, segment) for an F&O-heavy master contract"""
+    rng = random.Random(seed)
+    stocks = [(f"STOCK{i:03d}", rng.choice([250, 800, 1500, 3200]), rng.choice([5, 10, 20]), 500)
+              for i in range(180)]
+    contracts = []
+    while len(contracts) < count:
+        segment = rng.choices(['index', 'stock', 'currency', 'commodity'], weights=[6, 10, 1, 1])[0]
+        if segment == 'index':
+            name, _, spot, step, lotsize = rng.choice(INDEXES)
+            expiries = _expiries(12)
+        elif segment == 'stock':
+            name, spot, step, lotsize = rng.choice(stocks)
+            expiries = _expiries(3, step=28)
+        elif segment == 'currency':
+            name, spot, step, lotsize = rng.choice(CURRENCIES)
+            expiries = _expiries(6, step=28)
+        else:
+            name, spot, step, lotsize = rng.choice(COMMODITIES)
+            expiries = _expiries(4, step=30)
+        expiry = rng.choice(expiries)
+        contracts.append((name, expiry, None, 'FUT', lotsize, segment))
+        for offset in range(-20, 21):
+            strike = spot + offset * step
+            for option_type in ('CE', 'PE'):
+                contracts.append((name, expiry, strike, option_type, lotsize, segment))
+    return contracts[:count], stocks
+
+
+def _strike_text(strike):
+    return str(int(strike)) if float(strike).is_integer() else str(strike)
+
+
+def generate_zerodha(path, count):
+    contracts, stocks = _contracts(count)
+    exchanges = {'index': 'NFO', 'stock': 'NFO', 'currency': 'CDS', 'commodity': 'MCX'}
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['instrument_token', 'exchange_token', 'tradingsymbol', 'name', 'last_price', 'expiry',
+                         'strike', 'tick_size', 'lot_size', 'instrument_type', 'segment', 'exchange'])
+        token = 100000
+        for name, index_name, *_ in INDEXES:
+            token += 1
+            writer.writerow([token, token // 256, index_name, index_name, 0, '', 0, 0, 0, 'EQ', 'INDICES', 'NSE'])
+        for name, *_ in stocks:
+            token += 1
+            writer.writerow([token, token // 256, name, name, 0, '', 0, 0.05, 1, 'EQ', 'NSE', 'NSE'])
+        for name, expiry, strike, option_type, lotsize, segment in contracts:
+            token += 1
+            exchange = exchanges[segment]
+            kite_expiry = expiry.strftime('%y%b').upper()
+            if option_type == 'FUT':
+                symbol, kite_segment = f"{name}{kite_expiry}FUT", f"{exchange}-FUT"
+            else:
+                symbol, kite_segment = f"{name}{kite_expiry}{_strike_text(strike)}{option_type}", f"{exchange}-OPT"
+            writer.writerow([token, token // 256, symbol, name, 0, expiry.isoformat(), strike or 0,
+                             0.05, lotsize, option_type, kite_segment, exchange])
+
+
+def generate_angel(path, count):
+    contracts, stocks = _contracts(count)
+    types_by_segment = {'index': ('FUTIDX', 'OPTIDX', 'NFO'), 'stock': ('FUTSTK', 'OPTSTK', 'BFO'),
+                        'currency': ('FUTCUR', 'OPTCUR', 'CDS'), 'commodity': ('FUTCOM', 'OPTFUT', 'MCX')}
+    instruments = []
+    token = 100000
+    for name, index_name, *_ in INDEXES:
+        token += 1
+        instruments.append({'token': str(token), 'symbol': index_name, 'name': name, 'expiry': '',
+                            'strike': '0.000000', 'lotsize': '1', 'instrumenttype': 'AMXIDX',
+                            'exch_seg': 'NSE', 'tick_size': '0.000000'})
+    for name, *_ in stocks:
+        token += 1
+        instruments.append({'token': str(token), 'symbol': f"{name}-EQ", 'name': name, 'expiry': '',
+                            'strike': '-1.000000', 'lotsize': '1', 'instrumenttype': '',
+                            'exch_seg': 'NSE', 'tick_size': '5.000000'})
+    for name, expiry, strike, option_type, lotsize, segment in contracts:
+        token += 1
+        future_type, option_kind, exchange = types_by_segment[segment]
+        angel_expiry = expiry.strftime('%d%b%Y').upper()
+        compact = expiry.strftime('%d%b%y').upper()
+        if option_type == 'FUT':
+            symbol, instrumenttype, raw_strike = f"{name}{compact}FUT", future_type, -1.0
+        else:
+            symbol, instrumenttype = f"{name}{compact}{_strike_text(strike)}{option_type}", option_kind
+            # Currency option strikes are published in 1e-7 units, the rest in paise
+            raw_strike = strike * (10000000 if segment == 'currency' else 100)
+        instruments.append({'token': str(token), 'symbol': symbol, 'name': name, 'expiry': angel_expiry,
+                            'strike': f"{raw_strike:.6f}", 'lotsize': str(lotsize),
+                            'instrumenttype': instrumenttype, 'exch_seg': exchange, 'tick_size': '5.000000'})
+    with open(path, 'w') as f:
+        json.dump(instruments, f)
+
+
+def generate_shoonya(directory, count):
+    contracts, stocks = _contracts(count)
+    os.makedirs(directory, exist_ok=True)
+    files = {
+        'NSE': ['Exchange', 'Token', 'LotSize', 'Symbol', 'TradingSymbol', 'Instrument', 'TickSize'],
+        'BSE': ['Exchange', 'Token', 'LotSize', 'Symbol', 'TradingSymbol', 'Instrument', 'TickSize'],
+        'NFO': ['Exchange', 'Token', 'LotSize', 'Symbol', 'TradingSymbol', 'Expiry', 'Instrument',
+                'OptionType', 'StrikePrice', 'TickSize'],
+        'BFO': ['Exchange', 'Token', 'LotSize', 'Symbol', 'TradingSymbol', 'Expiry', 'Instrument',
+                'OptionType', 'StrikePrice', 'TickSize'],
+        'CDS': ['Exchange', 'Token', 'LotSize', 'Precision', 'Multiplier', 'Symbol', 'TradingSymbol', 'Expiry',
+                'Instrument', 'OptionType', 'StrikePrice', 'TickSize'],
+        'MCX': ['Exchange', 'Token', 'LotSize', 'GNGD', 'Symbol', 'TradingSymbol', 'Expiry', 'Instrument',
+                'OptionType', 'StrikePrice', 'TickSize'],
+    }
+    rows = {exchange: [] for exchange in files}
+    token = 1000
+
+    for name, index_name, *_ in INDEXES:
+        token += 1
+        rows['NSE'].append(['NSE', token, 1, index_name, index_name, 'INDEX', 0.05])
+    for i, (name, *_) in enumerate(stocks):
+        token += 1
+        series = 'BE' if i % 20 == 0 else 'EQ'
+        rows['NSE'].append(['NSE', token, 1, name, f"{name}-{series}", series, 0.05])
+        rows['BSE'].append(['BSE', 500000 + i, 1, name, name, 'A', 0.05])
+
+    for name, expiry, strike, option_type, lotsize, segment in contracts:
+        token += 1
+        shoonya_expiry = expiry.strftime('%d-%b-%Y').upper()
+        month = expiry.strftime('%b%y').upper()
+        suffix = 'F' if option_type == 'FUT' else option_type[0]
+        optiontype = 'XX' if option_type == 'FUT' else option_type
+        strike_price = '' if strike is None else strike
+        if segment == 'index':
+            instrument = 'FUTIDX' if option_type == 'FUT' else 'OPTIDX'
+            rows['NFO'].append(['NFO', token, lotsize, name, f"{name}{expiry.strftime('%d%b%y').upper()}{suffix}"
+                                f"{_strike_text(strike) if strike else ''}", shoonya_expiry, instrument,
+                                optiontype, strike_price, 0.05])
+        elif segment == 'stock':
+            # BFO stock contracts carry their type at the end of the trading symbol
+            rows['BFO'].append(['BFO', token, lotsize, name,
+                                f"{name}{month}{_strike_text(strike) if strike else ''}{option_type}",
+                                shoonya_expiry, 'FUTSTK' if option_type == 'FUT' else 'OPTSTK',
+                                optiontype, strike_price, 0.05])
+        elif segment == 'currency':
+            rows['CDS'].append(['CDS', token, lotsize, 4, 1000, name, f"{name}{month}{suffix}{strike or ''}",
+                                shoonya_expiry, 'FUTCUR' if option_type == 'FUT' else 'OPTCUR',
+                                optiontype, strike_price, 0.0025])
+        else:
+            rows['MCX'].append(['MCX', token, lotsize, 1, name, f"{name}{month}{suffix}{strike or ''}",
+                                shoonya_expiry, 'FUTCOM' if option_type == 'FUT' else 'OPTFUT',
+                                optiontype, strike_price, 1.0])
+
+    for exchange, header in files.items():
+        with open(os.path.join(directory, f"{exchange}_symbols.txt"), 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(header)
+            writer.writerows(rows[exchange])
+
+
+GENERATORS = {'zerodha': generate_zerodha, 'angel': generate_angel, 'shoonya': generate_shoonya}
+
+
+# --- Benchmark -----------------------------------------------------------------
+
+def load_module(module_name, revision=None):
+    """The broker module as checked out, or its source at a git revision"""
+    if revision is None:
+        return importlib.import_module(module_name)
+    path = module_name.replace('.', '/') + '.py'
+    source = subprocess.run(['git', 'show', f"{revision}:{path}"], cwd=ROOT, check=True,
+                            capture_output=True, text=True).stdout
+    module = types.ModuleType(f"{module_name}@{revision}")
+    module.__file__ = os.path.join(ROOT, path)
+    exec(compile(source, module.__file__, 'exec'), module.__dict__)
+    return module
+
+
+def run(processor, sample, repeat):
+    """Best wall time over repeat runs, peak traced memory of one more run, and its output"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        processor(sample)
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    result = processor(sample)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak, result
+
+
+def _normalized(df):
+    df = df.reset_index(drop=True)
+    columns = {}
+    for column in COMPARED_COLUMNS:
+        if column not in df:
+            continue
+        values = df[column]
+        if column in ('strike', 'lotsize', 'tick_size'):
+            values = pd.to_numeric(values, errors='coerce').astype(float)
+        else:
+            values = values.astype(object).where(values.notna(), None).map(
+                lambda value: None if value is None else str(value))
+        columns[column] = values
+    return pd.DataFrame(columns)
+
+
+def compare(current, baseline):
+    """Number of rows that differ between two processor outputs, with the first one"""
+    current, baseline = _normalized(current), _normalized(baseline)
+    if current.shape != baseline.shape or list(current.columns) != list(baseline.columns):
+        return -1, f"shape {current.shape} vs {baseline.shape}"
+    differs = pd.Series(False, index=current.index)
+    for column in current.columns:
+        a, b = current[column], baseline[column]
+        differs |= ~((a == b) | (a.isna() & b.isna()))
+    if not differs.any():
+        return 0, None
+    row = differs.idxmax()
+    return int(differs.sum()), f"{current.loc[row].to_dict()} vs {baseline.loc[row].to_dict()}"
+
+
+def main(samples, brokers, repeat, baseline, generate):
+    print(f"{'broker':<9} {'processor':<28} {'rows':>8} {'time s':>8} {'peak MB':>8}", end='')
+    print(f" {'base s':>8} {'base MB':>8} {'speedup':>8}  diff" if baseline else '')
+
+    for broker in brokers:
+        module_name, sample_name, processors = PROCESSORS[broker]
+        sample = os.path.join(samples, sample_name)
+        if not os.path.exists(sample):
+            if not generate:
+                print(f"{broker:<9} no sample at {sample}, skipped")
+                continue
+            os.makedirs(samples, exist_ok=True)
+            GENERATORS[broker](sample, generate)
+
+        module = load_module(module_name)
+        base_module = load_module(module_name, baseline) if baseline else None
+
+        for name in processors:
+            seconds, peak, result = run(getattr(module, name), sample, repeat)
+            line = f"{broker:<9} {name:<28} {len(result):>8} {seconds:>8.3f} {peak / 1e6:>8.1f}"
+            if base_module is not None:
+                base_seconds, base_peak, base_result = run(getattr(base_module, name), sample, repeat)
+                differing, example = compare(result, base_result)
+                status = 'same' if differing == 0 else f"{differing} rows differ, e.g. {example}"
+                line += f" {base_seconds:>8.3f} {base_peak / 1e6:>8.1f} {base_seconds / seconds:>7.1f}x  {status}"
+            print(line)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark broker master contract processing")
+    parser.add_argument("--samples", default=os.path.join(ROOT, 'tmp', 'master_contract_samples'),
+                        help="Directory of recorded instrument files")
+    parser.add_argument("--broker", action='append', choices=sorted(PROCESSORS),
+                        help="Broker to run (repeatable, default: all)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--baseline", help="Git revision to compare against, e.g. HEAD~1")
+    parser.add_argument("--generate", type=int, default=0,
+                        help="Write synthetic samples of about this many instruments for brokers without one")
+    args = parser.parse_args()
+
+    main(args.samples, args.broker or sorted(PROCESSORS), args.repeat, args.baseline, args.generate)
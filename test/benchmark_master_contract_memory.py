@@ -0,0 +1,206 @@
+"""
+Master Contract Download Memory Benchmark
+
+Runs a master contract download offline, from a synthetic instrument file
+(see benchmark_master_contract), into a SQLite symtoken table, in each of
+the ways below, each in its own process, and reports the peak memory the
+download added to the process (peak RSS over the RSS after imports and a
+warm-up, Linux only):
+
+    in-memory     the response body held in memory, parsed whole from a
+                  string (Zerodha) or with pd.read_json (Angel), processed
+                  and loaded in one piece, into an empty table
+    streaming     the body written to disk block by block, then parsed,
+                  processed and loaded MASTER_CONTRACT_CHUNK_ROWS rows at a
+                  time, into an empty table
+    refresh       streamed as above inside master_contract_refresh, as a
+                  login runs it, into an empty table
+    refresh-diff  the same, into a table prefilled (in another process)
+                  with the contract minus 2% of its rows and with 2% of
+                  them changed, so the refresh applies a diff
+
+All must leave the same rows in symtoken. Every peak should stay flat as
+--rows grows.
+
+Usage:
+    python test/benchmark_master_contract_memory.py [--rows 100000 400000] [--broker zerodha]
+        [--chunk-rows 50000] [--load-cache-mb 256]
+"""
+
+import argparse
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+# Add parent directory to path
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+MODES = ('in-memory', 'streaming', 'refresh', 'refresh-diff')
+SAMPLES = {'zerodha': 'zerodha.csv', 'angel': 'angel.json'}
+
+
+def _status(field) -> int:
+    """A memory figure of this process from /proc/self/status, in bytes"""
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith(f"{field}:"):
+                return int(line.split()[1]) * 1024
+    raise KeyError(field)
+
+
+def _reset_peak_rss():
+    """Reset the peak RSS (VmHWM) to the current RSS"""
+    with open('/proc/self/clear_refs', 'w') as f:
+        f.write('5')
+
+
+def child(mode, broker, sample, workdir):
+    """Run one download in this process and print its peak memory and result as JSON"""
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'openalgo.db')}"
+
+    import pandas as pd
+    from sqlalchemy import create_engine
+    from test_symtoken_loader import Base
+    from database.master_contract_status_db import MasterContractSource
+    from database.symtoken_loader import SYMTOKEN_COLUMNS, bulk_load_symtoken, clear_symtoken
+    from database.master_contract_refresh import (
+        contract_downloaded, contract_hash, master_contract_refresh, normalize_contract)
+    from utils.master_contract import DOWNLOAD_BLOCK_SIZE, iter_json_records
+    import broker.zerodha.database.master_contract_db as zerodha
+    import broker.angel.database.master_contract_db as angel
+
+    engine = create_engine(os.environ['DATABASE_URL'])
+    Base.metadata.create_all(engine)
+    MasterContractSource.__table__.create(engine, checkfirst=True)
+    output_path = os.path.join(workdir, SAMPLES[broker])
+
+    def load(df):
+        with engine.begin() as connection:
+            bulk_load_symtoken(connection, df)
+
+    def stream():
+        with open(sample, 'rb') as source, open(output_path, 'wb') as target:
+            shutil.copyfileobj(source, target, DOWNLOAD_BLOCK_SIZE)
+        chunks = zerodha.iter_zerodha_csv(output_path) if broker == 'zerodha' else angel.iter_angel_json(output_path)
+        for token_df in chunks:
+            load(token_df)
+
+    if mode == 'prefill':
+        # The previous contract for refresh-diff: 2% of the rows gone, 2% changed
+        stream()
+        with engine.begin() as connection:
+            connection.exec_driver_sql("DELETE FROM symtoken WHERE id % 50 = 0")
+            connection.exec_driver_sql("UPDATE symtoken SET lotsize = lotsize + 1 WHERE id % 50 = 1")
+        print(json.dumps({}))
+        return
+
+    # Warm up on a few instruments first so lazily imported code and
+    # allocator arenas aren't counted as the download's memory
+    warmup_engine = create_engine('sqlite://')
+    Base.metadata.create_all(warmup_engine)
+    with warmup_engine.begin() as connection:
+        if broker == 'zerodha':
+            bulk_load_symtoken(connection, zerodha.process_zerodha_frame(
+                pd.read_csv(sample, nrows=100, dtype=zerodha.ZERODHA_CSV_DTYPES)))
+        else:
+            records = next(iter_json_records(sample, 100))
+            bulk_load_symtoken(connection, angel.process_angel_frame(pd.read_json(io.StringIO(json.dumps(records)))))
+            bulk_load_symtoken(connection, angel.process_angel_frame(pd.DataFrame.from_records(records)))
+    warmup_engine.dispose()
+
+    _reset_peak_rss()
+    baseline = _status('VmRSS')
+
+    if mode == 'in-memory':
+        # The previous download: the whole response body in memory
+        with open(sample, 'rb') as f:
+            body = f.read()
+        if broker == 'zerodha':
+            df = pd.read_csv(io.StringIO(body.decode()))
+            df.to_csv(output_path, index=False)
+            del df
+            token_df = zerodha.process_zerodha_csv(output_path)
+        else:
+            with open(output_path, 'wb') as f:
+                f.write(body)
+            token_df = angel.process_angel_json(output_path)
+        del body
+        load(token_df)
+        del token_df
+    elif mode == 'streaming':
+        # Streamed to disk as it arrives, then loaded a chunk at a time
+        stream()
+    else:
+        # As a login runs the broker's download
+        with master_contract_refresh(broker, engine) as refresh:
+            with engine.begin() as connection:
+                clear_symtoken(connection)
+            stream()
+            contract_downloaded()
+        assert refresh.changes.reloaded == (mode == 'refresh')
+
+    peak = _status('VmHWM') - baseline
+
+    # Rows in a fixed order: a diff leaves them in a different id order
+    columns = ', '.join(SYMTOKEN_COLUMNS)
+    with engine.connect() as connection:
+        rows = connection.exec_driver_sql(f"SELECT {columns} FROM symtoken ORDER BY {columns}").fetchall()
+    result = contract_hash(normalize_contract(pd.DataFrame(rows, columns=list(SYMTOKEN_COLUMNS))))
+    print(json.dumps({'peak': peak, 'rows': len(rows), 'hash': result}))
+
+
+def measure(mode, broker, sample, chunk_rows, load_cache_mb):
+    workdir = tempfile.mkdtemp()
+    env = dict(os.environ, MASTER_CONTRACT_CHUNK_ROWS=str(chunk_rows), SYMTOKEN_LOAD_CACHE_MB=str(load_cache_mb))
+    try:
+        for run in (('prefill', mode) if mode == 'refresh-diff' else (mode,)):
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), '--child', run, broker, sample, workdir],
+                env=env, check=True, capture_output=True, text=True).stdout
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main(row_counts, brokers, chunk_rows, load_cache_mb):
+    from benchmark_master_contract import GENERATORS
+
+    samples = tempfile.mkdtemp()
+    print(f"{'broker':<9} {'instruments':>11} {'file MB':>8} "
+          + ' '.join(f"{mode + ' MB':>15}" for mode in MODES) + "  result")
+    try:
+        for broker in brokers:
+            for count in row_counts:
+                sample = os.path.join(samples, f"{count}-{SAMPLES[broker]}")
+                GENERATORS[broker](sample, count)
+                results = {mode: measure(mode, broker, sample, chunk_rows, load_cache_mb) for mode in MODES}
+                full = results['in-memory']
+                different = [f"{mode} ({result['rows']} rows)" for mode, result in results.items()
+                             if (result['rows'], result['hash']) != (full['rows'], full['hash'])]
+                same = f"DIFFERENT: {', '.join(different)}" if different else 'same'
+                print(f"{broker:<9} {full['rows']:>11} {os.path.getsize(sample) / 1e6:>8.1f} "
+                      + ' '.join(f"{results[mode]['peak'] / 1e6:>15.1f}" for mode in MODES) + f"  {same}")
+    finally:
+        shutil.rmtree(samples, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == '--child':
+        child(*sys.argv[2:6])
+        sys.exit(0)
+
+    parser = argparse.ArgumentParser(description="Benchmark master contract download memory")
+    parser.add_argument("--rows", type=int, nargs='+', default=[100000, 400000],
+                        help="Synthetic master contract sizes to run")
+    parser.add_argument("--broker", action='append', choices=sorted(SAMPLES),
+                        help="Broker to run (repeatable, default: all)")
+    parser.add_argument("--chunk-rows", type=int, default=50000)
+    parser.add_argument("--load-cache-mb", type=int, default=256, help="SQLite page cache while loading")
+    args = parser.parse_args()
+
+    main(args.rows, args.broker or sorted(SAMPLES), args.chunk_rows, args.load_cache_mb)
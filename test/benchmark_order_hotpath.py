@@ -0,0 +1,245 @@
+"""
+Order Hot-Path Benchmark
+
+Posts orders to /api/v1/placeorder through the Flask test client, in
+process, so each one runs restx_api/place_order.py and
+services.place_order_service.place_order end to end. The broker is a mock
+broker.<name>.api.order_api module that answers after a fixed latency.
+Every database is a fresh SQLite file in a temporary directory.
+
+Reports p50/p99 of the time each request spends in each stage:
+
+    validation      mandatory field checks and OrderSchema.load
+    auth            API key verification and auth token lookup
+    analyze_mode    the analyze mode check
+    deepcopy        copies of the order data
+    broker_module   looking up the broker's order_api module
+    broker_call     the broker's place_order_api (the mock's fixed latency)
+    log_submit      handing the order log to the executor
+    socket_emit     the order_event Socket.IO emit
+    telegram_alert  the Telegram alert hand-off
+    other           the rest: Flask, flask-restx, rate limiter, JSON
+    overhead        everything but broker_call
+    total           the whole request
+
+Exits with status 1 when the p99 overhead exceeds --max-overhead-ms or a
+stage's p99 exceeds its --budget, so it can gate regressions.
+
+Usage:
+    python test/benchmark_order_hotpath.py [--orders 2000] [--warmup 200] [--broker-latency-ms 5]
+        [--max-overhead-ms 10] [--budget auth=1 --budget deepcopy=0.1] [--latency-monitor]
+"""
+
+import argparse
+import copy
+import os
+import sys
+import tempfile
+import time
+import types
+from collections import defaultdict
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+BROKER = 'benchmark'
+STAGES = ('validation', 'auth', 'analyze_mode', 'deepcopy', 'broker_module', 'broker_call',
+          'log_submit', 'socket_emit', 'telegram_alert')
+REPORTED = STAGES + ('other', 'overhead', 'total')
+
+API_KEY = 'benchmark-' + 'a' * 54
+ORDER = {
+    'apikey': API_KEY,
+    'strategy': 'Benchmark',
+    'symbol': 'SBIN',
+    'exchange': 'NSE',
+    'action': 'BUY',
+    'product': 'MIS',
+    'pricetype': 'MARKET',
+    'quantity': '1',
+}
+
+
+class StageTimer:
+    """Adds up the time a request spends in each stage"""
+
+    def __init__(self):
+        self.current = defaultdict(float)
+        self.samples = defaultdict(list)
+
+    def wrap(self, stage, func):
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.current[stage] += time.perf_counter() - start
+        return timed
+
+    def record(self, total):
+        """Close the current request, taking total seconds as its duration"""
+        times = {stage: self.current.get(stage, 0.0) for stage in STAGES}
+        times['total'] = total
+        times['overhead'] = total - times['broker_call']
+        times['other'] = total - sum(times[stage] for stage in STAGES)
+        for stage, seconds in times.items():
+            self.samples[stage].append(seconds * 1000)
+        self.current.clear()
+
+    def discard(self):
+        self.current.clear()
+
+
+class Proxy:
+    """Delegates to target, except for the given attributes"""
+
+    def __init__(self, target, **overrides):
+        self._target = target
+        self.__dict__.update(overrides)
+
+    def __getattr__(self, name):
+        return getattr(self._target, name)
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def mock_broker_module(latency_ms):
+    """A broker.<name>.api.order_api module whose orders succeed after latency_ms"""
+    module = types.ModuleType(f'broker.{BROKER}.api.order_api')
+    response = types.SimpleNamespace(status=200)
+    counter = iter(range(10 ** 9))
+
+    def place_order_api(data, auth):
+        time.sleep(latency_ms / 1000)
+        order_id = f"BM{next(counter):010d}"
+        return response, {'status': 'success', 'data': {'order_id': order_id}}, order_id
+
+    module.place_order_api = place_order_api
+    return module
+
+
+def setup(workdir, latency_ms, timer, latency_monitor):
+    """Build the app against fresh databases and instrument the order path"""
+    for name, filename in (('DATABASE_URL', 'openalgo.db'), ('LATENCY_DATABASE_URL', 'latency.db'),
+                           ('LOGS_DATABASE_URL', 'logs.db'), ('SANDBOX_DATABASE_URL', 'sandbox.db')):
+        os.environ[name] = f"sqlite:///{os.path.join(workdir, filename)}"
+    # Keep the rate limiter in the path without letting it reject orders
+    os.environ['ORDER_RATE_LIMIT'] = '1000000 per second'
+
+    from flask import Flask
+    from database import apilog_db, auth_db, settings_db
+    from extensions import socketio
+    from limiter import limiter
+    from restx_api import api_v1_bp
+    import services.place_order_service as service
+
+    auth_db.init_db()
+    apilog_db.init_db()
+    settings_db.init_db()
+    settings_db.set_analyze_mode(False)
+    auth_db.upsert_api_key('benchmark', API_KEY)
+    auth_db.upsert_auth('benchmark', 'benchmark-token', BROKER)
+
+    broker_module = mock_broker_module(latency_ms)
+    broker_module.place_order_api = timer.wrap('broker_call', broker_module.place_order_api)
+    sys.modules[broker_module.__name__] = broker_module
+
+    service.validate_order_data = timer.wrap('validation', service.validate_order_data)
+    service.get_auth_token_broker = timer.wrap('auth', service.get_auth_token_broker)
+    service.get_analyze_mode = timer.wrap('analyze_mode', service.get_analyze_mode)
+    service.copy = Proxy(copy, deepcopy=timer.wrap('deepcopy', copy.deepcopy))
+    service.import_broker_module = timer.wrap('broker_module', service.import_broker_module)
+    service.executor = Proxy(service.executor, submit=timer.wrap('log_submit', service.executor.submit))
+    service.socketio = Proxy(service.socketio, emit=timer.wrap('socket_emit', service.socketio.emit))
+    service.telegram_alert_service = Proxy(
+        service.telegram_alert_service,
+        send_order_alert=timer.wrap('telegram_alert', service.telegram_alert_service.send_order_alert))
+
+    app = Flask(__name__)
+    app.secret_key = 'benchmark'
+    limiter.init_app(app)
+    socketio.init_app(app)
+    app.register_blueprint(api_v1_bp)
+
+    if latency_monitor:
+        from database.latency_db import init_latency_db
+        from restx_api.place_order import PlaceOrder
+        from utils.latency_monitor import wrap_resource_methods
+        init_latency_db()
+        wrap_resource_methods(PlaceOrder, 'PLACE')
+
+    return app
+
+
+def run(app, timer, orders, warmup):
+    client = app.test_client()
+    for i in range(warmup + orders):
+        start = time.perf_counter()
+        response = client.post('/api/v1/placeorder', json=ORDER)
+        total = time.perf_counter() - start
+        if response.status_code != 200:
+            raise RuntimeError(f"Order failed ({response.status_code}): {response.get_json()}")
+        if i < warmup:
+            timer.discard()
+        else:
+            timer.record(total)
+
+
+def main(orders, warmup, latency_ms, max_overhead_ms, budgets, latency_monitor):
+    timer = StageTimer()
+    with tempfile.TemporaryDirectory() as workdir:
+        app = setup(workdir, latency_ms, timer, latency_monitor)
+        run(app, timer, orders, warmup)
+
+        from database.apilog_db import executor
+        executor.shutdown(wait=True)
+
+    budgets = dict(budgets, overhead=max_overhead_ms)
+    print(f"\n{orders} orders, broker latency {latency_ms:g} ms"
+          f"{', latency monitor on' if latency_monitor else ''}\n")
+    print(f"{'stage':<15} {'p50 ms':>9} {'p99 ms':>9} {'budget':>8}")
+    failures = []
+    for stage in REPORTED:
+        p50 = percentile(timer.samples[stage], 0.50)
+        p99 = percentile(timer.samples[stage], 0.99)
+        budget = budgets.get(stage)
+        mark = ''
+        if budget is not None:
+            mark = f"{budget:>8g}"
+            if p99 > budget:
+                failures.append(f"{stage} p99 {p99:.3f} ms > {budget:g} ms")
+                mark += '  OVER'
+        print(f"{stage:<15} {p50:>9.3f} {p99:>9.3f} {mark}")
+
+    if failures:
+        print("\nFAILED: " + '; '.join(failures))
+        return 1
+    print("\nWithin budget")
+    return 0
+
+
+def parse_budget(value):
+    stage, _, ms = value.partition('=')
+    if stage not in REPORTED or not ms:
+        raise argparse.ArgumentTypeError(f"expected STAGE=MS with STAGE one of {', '.join(REPORTED)}")
+    return stage, float(ms)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark OpenAlgo's overhead on /api/v1/placeorder")
+    parser.add_argument("--orders", type=int, default=2000, help="Orders measured")
+    parser.add_argument("--warmup", type=int, default=200, help="Orders run first and not measured")
+    parser.add_argument("--broker-latency-ms", type=float, default=5, help="Mock broker response time")
+    parser.add_argument("--max-overhead-ms", type=float, default=10,
+                        help="Fail when the p99 overhead (total minus broker call) exceeds this")
+    parser.add_argument("--budget", type=parse_budget, action='append', default=[], metavar='STAGE=MS',
+                        help="Fail when the stage's p99 exceeds MS (repeatable)")
+    parser.add_argument("--latency-monitor", action='store_true',
+                        help="Wrap the endpoint with utils.latency_monitor as the app does")
+    args = parser.parse_args()
+
+    sys.exit(main(args.orders, args.warmup, args.broker_latency_ms, args.max_overhead_ms,
+                  args.budget, args.latency_monitor))
@@ -0,0 +1,144 @@
+"""
+WebSocket Proxy Fan-out Benchmark
+
+Measures the proxy-side CPU cost of delivering one market data tick to N
+subscribers over real localhost websocket connections. Subscribers run on a
+separate thread, so the reported thread CPU time covers only the proxy side.
+Compares:
+
+- per_client: build and json.dumps a new envelope for every recipient and
+  await each send in turn (the previous zmq_listener behaviour)
+- broadcast:  build and encode the envelope once and write the same frame to
+  every connection with websockets.broadcast
+- queued:     build and encode the envelope once and put the frame on each
+  client's ConflatingSendQueue, drained by per-client writer tasks
+  (WebSocketProxy.broadcast_message)
+
+Usage:
+    python test/benchmark_proxy_fanout.py [--ticks 500] [--subscribers 1,10,30,100]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+
+import websockets
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from websocket_proxy.client_queue import ConflatingSendQueue
+
+SAMPLE_QUOTE = {
+    "symbol": "RELIANCE", "exchange": "NSE", "ltp": 2950.55, "open": 2931.0,
+    "high": 2960.0, "low": 2925.15, "close": 2928.4, "volume": 4521873,
+    "last_trade_quantity": 12, "average_price": 2944.21, "total_buy_quantity": 381245,
+    "total_sell_quantity": 402118, "timestamp": 1727161822000
+}
+
+
+def build_envelope(broker):
+    return {
+        "type": "market_data",
+        "symbol": "RELIANCE",
+        "exchange": "NSE",
+        "mode": 2,
+        "broker": broker,
+        "data": SAMPLE_QUOTE
+    }
+
+
+async def fan_out_per_client(connections):
+    for websocket in connections:
+        await websocket.send(json.dumps(build_envelope("angel")))
+
+
+async def fan_out_broadcast(connections):
+    websockets.broadcast(connections, json.dumps(build_envelope("angel")))
+
+
+async def fan_out_queued(connections):
+    frame = json.dumps(build_envelope("angel"))
+    for websocket in connections:
+        websocket.send_queue.put(frame, ("NSE", "RELIANCE", 2))
+    # Include the writers' send work in the measurement
+    while any(websocket.send_queue.qsize() for websocket in connections):
+        await asyncio.sleep(0)
+
+
+async def queue_writer(websocket):
+    while True:
+        await websocket.send(await websocket.send_queue.get())
+
+
+async def drain(client):
+    try:
+        async for _ in client:
+            pass
+    except websockets.exceptions.ConnectionClosed:
+        pass
+
+
+def run_subscribers(port, subscribers):
+    """Connect and drain subscribers on their own thread and event loop"""
+    async def subscribe_all():
+        clients = [await websockets.connect(f"ws://127.0.0.1:{port}") for _ in range(subscribers)]
+        await asyncio.gather(*(drain(client) for client in clients))
+
+    asyncio.run(subscribe_all())
+
+
+async def run_case(subscribers, ticks, fan_out):
+    server_connections = []
+    ready = asyncio.Event()
+
+    async def handler(websocket):
+        websocket.send_queue = ConflatingSendQueue()
+        writer = asyncio.create_task(queue_writer(websocket))
+        server_connections.append(websocket)
+        if len(server_connections) == subscribers:
+            ready.set()
+        await websocket.wait_closed()
+        writer.cancel()
+
+    async with websockets.serve(handler, "127.0.0.1", 0) as server:
+        port = server.sockets[0].getsockname()[1]
+        subscriber_thread = threading.Thread(target=run_subscribers, args=(port, subscribers))
+        subscriber_thread.start()
+        await ready.wait()
+
+        cpu_total = 0.0
+        for _ in range(ticks):
+            start = time.thread_time()
+            await fan_out(server_connections)
+            cpu_total += time.thread_time() - start
+            # Let the socket buffers drain so every variant sees the same state
+            await asyncio.sleep(0.001)
+
+        for websocket in server_connections:
+            await websocket.close()
+        subscriber_thread.join()
+
+    return cpu_total / ticks * 1e6
+
+
+async def main(subscriber_counts, ticks):
+    print(f"{'subscribers':>12} {'per_client us/tick':>20} {'broadcast us/tick':>20} {'queued us/tick':>16}")
+    for subscribers in subscriber_counts:
+        per_client = await run_case(subscribers, ticks, fan_out_per_client)
+        broadcast = await run_case(subscribers, ticks, fan_out_broadcast)
+        queued = await run_case(subscribers, ticks, fan_out_queued)
+        print(f"{subscribers:>12} {per_client:>20.1f} {broadcast:>20.1f} {queued:>16.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark WebSocket proxy tick fan-out")
+    parser.add_argument("--ticks", type=int, default=500)
+    parser.add_argument("--subscribers", default="1,10,30,100")
+    args = parser.parse_args()
+
+    asyncio.run(main([int(n) for n in args.subscribers.split(",")], args.ticks))
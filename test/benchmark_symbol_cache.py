@@ -0,0 +1,133 @@
+"""
+Symbol Cache Memory Benchmark
+
+Builds BrokerSymbolCache from a synthetic F&O-heavy master contract and
+compares it with the previous layout (one SymbolData object per row and
+five dicts with tuple keys). Each layout is built in a fresh process so
+the reported RSS growth is not polluted by the other one.
+
+Rows are generated on the fly with fresh string objects, as rows coming
+from the database driver are, so only what the cache keeps is measured.
+
+Usage:
+    python test/benchmark_symbol_cache.py [--rows 150000] [--layout both|legacy|columnar]
+"""
+
+import argparse
+import gc
+import os
+import subprocess
+import sys
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+import psutil
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+UNDERLYINGS = ["NIFTY", "BANKNIFTY", "FINNIFTY", "MIDCPNIFTY", "SENSEX", "CRUDEOIL", "GOLD"]
+EXPIRIES = ["28-OCT-25", "04-NOV-25", "11-NOV-25", "25-NOV-25", "30-DEC-25", "26-MAR-26"]
+
+
+def generate_rows(count):
+    """Yield master contract rows in SYMBOL_COLUMNS order"""
+    for i in range(count):
+        name = UNDERLYINGS[i % len(UNDERLYINGS)]
+        expiry = EXPIRIES[(i // 7) % len(EXPIRIES)]
+        strike = 10000 + (i // 42) * 50
+        option_type = "CE" if i % 2 else "PE"
+        compact_expiry = expiry.replace("-", "")
+        exchange = "MCX" if name in ("CRUDEOIL", "GOLD") else ("BFO" if name == "SENSEX" else "NFO")
+        yield (
+            f"{name}{compact_expiry}{strike}{option_type}",
+            f"{name}{compact_expiry[:5]}{strike}{option_type}",
+            "".join(name),
+            "".join(exchange),
+            "".join(exchange),
+            str(35000 + i),
+            "".join(expiry),
+            float(strike),
+            75,
+            "".join(option_type),
+            0.05,
+        )
+
+
+@dataclass
+class LegacySymbolData:
+    symbol: str
+    brsymbol: str
+    name: str
+    exchange: str
+    brexchange: str
+    token: str
+    expiry: Optional[str] = None
+    strike: Optional[float] = None
+    lotsize: Optional[int] = None
+    instrumenttype: Optional[str] = None
+    tick_size: Optional[float] = None
+
+
+def build_legacy(rows):
+    """The layout BrokerSymbolCache used before the columnar store"""
+    symbols, by_symbol_exchange, by_token_exchange, by_brsymbol_exchange, by_token = {}, {}, {}, {}, {}
+    for row in rows:
+        symbol_data = LegacySymbolData(*row)
+        symbols[symbol_data.token] = symbol_data
+        by_symbol_exchange[(symbol_data.symbol, symbol_data.exchange)] = symbol_data
+        by_token_exchange[(symbol_data.token, symbol_data.exchange)] = symbol_data
+        by_brsymbol_exchange[(symbol_data.brsymbol, symbol_data.exchange)] = symbol_data
+        by_token[symbol_data.token] = symbol_data
+    return symbols, by_symbol_exchange, by_token_exchange, by_brsymbol_exchange, by_token
+
+
+def run_layout(layout, count):
+    process = psutil.Process()
+    from database.token_db_enhanced import BrokerSymbolCache
+    gc.collect()
+    rss_before = process.memory_info().rss
+
+    start = time.perf_counter()
+    if layout == "legacy":
+        cache = build_legacy(generate_rows(count))
+        lookup = lambda symbol, exchange: cache[1][(symbol, exchange)].token
+        reported = f"{count * 500 / (1024 * 1024):.1f} (estimated)"
+    else:
+        cache = BrokerSymbolCache()
+        cache.load_rows("benchmark", generate_rows(count))
+        lookup = cache.get_token
+        reported = f"{cache.get_cache_info()['memory_bytes'] / (1024 * 1024):.1f} (measured)"
+    load_time = time.perf_counter() - start
+
+    gc.collect()
+    rss_growth = (process.memory_info().rss - rss_before) / (1024 * 1024)
+
+    keys = [(row[0], row[3]) for row in generate_rows(min(count, 10000))]
+    start = time.perf_counter()
+    for symbol, exchange in keys:
+        lookup(symbol, exchange)
+    lookup_ns = (time.perf_counter() - start) / len(keys) * 1e9
+
+    print(f"{layout:>9} {load_time:>9.2f} {rss_growth:>12.1f} {lookup_ns:>11.0f}   {reported}")
+
+
+def main(count, layout):
+    if layout != "both":
+        run_layout(layout, count)
+        return
+
+    print(f"{count} symbols")
+    print(f"{'layout':>9} {'load s':>9} {'RSS +MB':>12} {'lookup ns':>11}   reported MB")
+    for name in ("legacy", "columnar"):
+        subprocess.run([sys.executable, __file__, "--rows", str(count), "--layout", name], check=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark symbol cache memory and load time")
+    parser.add_argument("--rows", type=int, default=150000)
+    parser.add_argument("--layout", choices=["both", "legacy", "columnar"], default="both")
+    args = parser.parse_args()
+
+    main(args.rows, args.layout)
@@ -0,0 +1,96 @@
+"""
+Symbol Search Benchmark
+
+Loads BrokerSymbolCache with a synthetic F&O-heavy master contract plus a
+few equities, then times typical search-page / /api/v1/search queries
+through the search index and through the previous full scan (substring
+checks over every symbol). Reports the index build time and p50/p99 per
+query.
+
+Usage:
+    python test/benchmark_symbol_search.py [--rows 150000] [--repeat 200]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmark_symbol_cache import generate_rows
+from database.token_db_enhanced import BrokerSymbolCache
+
+EQUITIES = [
+    ("SBIN", "SBIN-EQ", "STATE BANK OF INDIA", "NSE", "NSE", "3045", None, None, 1, "EQ", 0.05),
+    ("SBICARD", "SBICARD-EQ", "SBI CARDS AND PAYMENT", "NSE", "NSE", "17971", None, None, 1, "EQ", 0.05),
+    ("RELIANCE", "RELIANCE-EQ", "RELIANCE INDUSTRIES", "NSE", "NSE", "2885", None, None, 1, "EQ", 0.1),
+    ("NIFTY", "Nifty 50", "NIFTY", "NSE_INDEX", "NSE", "99926000", None, None, 1, "INDEX", 0.05),
+]
+
+QUERIES = [
+    ("SBIN", None),
+    ("sbi", None),
+    ("RELIANCE", "NSE"),
+    ("NIFTY", None),
+    ("BANKNIFTY", "NFO"),
+    ("NIFTY 28OCT25 25000 CE", None),
+    ("NIFTY 25000", "NFO"),
+    ("25000CE", None),
+    ("STATE BANK", None),
+    ("XYZQ", None),
+]
+
+
+def legacy_search(cache, query, exchange=None, limit=50):
+    """The previous BrokerSymbolCache.search_symbols: a substring scan over every symbol"""
+    query = query.upper()
+    matches = []
+    store = cache.store
+    for row in range(len(store)):
+        data = store.row(row)
+        if exchange and data.exchange != exchange:
+            continue
+        if (query in data.symbol.upper() or query in data.brsymbol.upper()
+                or (data.name and query in data.name.upper())):
+            matches.append(data)
+            if len(matches) >= limit:
+                break
+    return matches
+
+
+def timed(function, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        samples.append((time.perf_counter() - start) * 1e6)
+    samples.sort()
+    return statistics.median(samples), samples[max(0, int(len(samples) * 0.99) - 1)], result
+
+
+def main(count, repeat):
+    cache = BrokerSymbolCache()
+    cache.load_rows("benchmark", list(generate_rows(count)) + EQUITIES)
+
+    start = time.perf_counter()
+    cache.get_search_index()
+    print(f"{count + len(EQUITIES)} symbols, search index built in {time.perf_counter() - start:.2f}s\n")
+
+    print(f"{'query':<26} {'exchange':<9} {'hits':>5} {'p50 us':>9} {'p99 us':>9} {'scan p50 us':>12}")
+    for query, exchange in QUERIES:
+        p50, p99, result = timed(lambda: cache.search_symbols(query, exchange), repeat)
+        scan_p50, _, _ = timed(lambda: legacy_search(cache, query.split()[0], exchange), max(1, repeat // 20))
+        top = result[0].symbol if result else "-"
+        print(f"{query:<26} {exchange or '-':<9} {len(result):>5} {p50:>9.1f} {p99:>9.1f} {scan_p50:>12.0f}   {top}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark symbol search")
+    parser.add_argument("--rows", type=int, default=150000)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    main(args.rows, args.repeat)
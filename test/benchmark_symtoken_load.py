@@ -0,0 +1,76 @@
+"""
+Symtoken Bulk Load Benchmark
+
+Loads a synthetic F&O-heavy master contract into a fresh SQLite symtoken
+table (with the indexes of database/symbol.py) through the previous
+copy_from_dataframe path (existing-token set plus ORM bulk_insert_mappings
+with every index in place) and through database.symtoken_loader, and
+reports the time and rows/sec of each.
+
+Usage:
+    python test/benchmark_symtoken_load.py [--rows 150000]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from benchmark_symbol_cache import generate_rows
+from test_symtoken_loader import Base, SymToken
+from database.symtoken_loader import SYMTOKEN_COLUMNS, bulk_load_symtoken
+
+
+def legacy_copy(session, df):
+    """The previous broker copy_from_dataframe"""
+    data_dict = df.to_dict(orient='records')
+    existing_tokens = {result.token for result in session.query(SymToken.token).all()}
+    filtered_data_dict = [row for row in data_dict if row['token'] not in existing_tokens]
+    session.bulk_insert_mappings(SymToken, filtered_data_dict)
+    session.commit()
+
+
+def loader_copy(session, df):
+    bulk_load_symtoken(session.connection(), df)
+    session.commit()
+
+
+def timed_load(copy, df):
+    path = os.path.join(tempfile.mkdtemp(), 'symtoken.db')
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+
+    start = time.perf_counter()
+    copy(session, df)
+    elapsed = time.perf_counter() - start
+
+    assert session.query(SymToken).count() == len(df)
+    session.close()
+    engine.dispose()
+    return elapsed
+
+
+def main(count):
+    df = pd.DataFrame(list(generate_rows(count)), columns=list(SYMTOKEN_COLUMNS))
+    print(f"{count} rows into an empty symtoken table\n")
+    print(f"{'path':<22} {'seconds':>8} {'rows/sec':>10}")
+    for label, copy in (("bulk_insert_mappings", legacy_copy), ("symtoken_loader", loader_copy)):
+        elapsed = timed_load(copy, df)
+        print(f"{label:<22} {elapsed:>8.2f} {count / elapsed:>10,.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark loading symtoken")
+    parser.add_argument("--rows", type=int, default=150000)
+    args = parser.parse_args()
+
+    main(args.rows)
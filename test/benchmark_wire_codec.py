@@ -0,0 +1,79 @@
+"""
+Market Data Wire Codec Benchmark
+
+Compares JSON and MessagePack for the payloads the WebSocket proxy moves on
+every tick: bytes per tick and encode+decode time for LTP, QUOTE and DEPTH
+(5 and 20 levels) messages, using the same websocket_proxy.codec functions
+as the adapter -> proxy ZeroMQ bus and the proxy -> client websocket.
+
+Usage:
+    python test/benchmark_wire_codec.py [--iterations 20000]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import msgpack
+
+from websocket_proxy.codec import ENCODING_JSON, ENCODING_MSGPACK, encode_message
+
+
+def depth_levels(count, base_price, side):
+    step = -0.05 if side == "buy" else 0.05
+    return [
+        {"price": round(base_price + step * i, 2), "quantity": 100 * (i + 1), "orders": i + 3}
+        for i in range(count)
+    ]
+
+
+def sample_payloads():
+    ltp = {"symbol": "RELIANCE", "exchange": "NSE", "mode": 1, "ltp": 2950.55,
+           "ltt": 1727161822, "timestamp": 1727161822000}
+    quote = {**ltp, "mode": 2, "open": 2931.0, "high": 2960.0, "low": 2925.15,
+             "close": 2928.4, "volume": 4521873, "last_quantity": 12,
+             "average_price": 2944.21, "total_buy_quantity": 381245,
+             "total_sell_quantity": 402118}
+    depth_5 = {**quote, "mode": 3, "depth": {
+        "buy": depth_levels(5, 2950.50, "buy"), "sell": depth_levels(5, 2950.60, "sell")}}
+    depth_20 = {**quote, "mode": 3, "depth": {
+        "buy": depth_levels(20, 2950.50, "buy"), "sell": depth_levels(20, 2950.60, "sell")}}
+
+    return {"LTP": ltp, "QUOTE": quote, "DEPTH_5": depth_5, "DEPTH_20": depth_20}
+
+
+def envelope(data):
+    return {"type": "market_data", "symbol": data["symbol"], "exchange": data["exchange"],
+            "mode": data["mode"], "broker": "angel", "data": data}
+
+
+def time_round_trip(message, encoding, iterations):
+    decode = json.loads if encoding == ENCODING_JSON else msgpack.unpackb
+    start = time.perf_counter()
+    for _ in range(iterations):
+        decode(encode_message(message, encoding))
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main(iterations):
+    print(f"{'payload':>10} {'json bytes':>11} {'msgpack bytes':>14} {'json us':>9} {'msgpack us':>11}")
+    for name, data in sample_payloads().items():
+        message = envelope(data)
+        json_bytes = len(encode_message(message, ENCODING_JSON).encode("utf-8"))
+        msgpack_bytes = len(encode_message(message, ENCODING_MSGPACK))
+        json_us = time_round_trip(message, ENCODING_JSON, iterations)
+        msgpack_us = time_round_trip(message, ENCODING_MSGPACK, iterations)
+        print(f"{name:>10} {json_bytes:>11} {msgpack_bytes:>14} {json_us:>9.2f} {msgpack_us:>11.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark market data wire codecs")
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    main(args.iterations)
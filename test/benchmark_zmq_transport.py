@@ -0,0 +1,103 @@
+"""
+ZeroMQ Market Data Transport Benchmark
+
+Measures the adapter -> proxy hop for each market data bus transport: a
+PUB socket connects to a bound SUB socket, as BaseBrokerWebSocketAdapter
+and WebSocketProxy do, and one QUOTE tick is sent and received at a time.
+Reports the mean and p99 one-way latency and the throughput of a burst.
+
+Usage:
+    python test/benchmark_zmq_transport.py [--ticks 20000]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+import zmq
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from websocket_proxy.codec import encode_bus_payload
+
+TOPIC = b"NSE|RELIANCE|QUOTE|angel"
+SAMPLE_QUOTE = {
+    "symbol": "RELIANCE", "exchange": "NSE", "mode": 2, "ltp": 2950.55, "open": 2931.0,
+    "high": 2960.0, "low": 2925.15, "close": 2928.4, "volume": 4521873,
+    "last_quantity": 12, "average_price": 2944.21, "total_buy_quantity": 381245,
+    "total_sell_quantity": 402118, "timestamp": 1727161822000
+}
+
+
+def endpoints():
+    result = {"inproc": "inproc://benchmark-market-data"}
+    if zmq.has("ipc"):
+        result["ipc"] = f"ipc://{os.path.join(tempfile.gettempdir(), 'openalgo-benchmark.ipc')}"
+    result["tcp"] = "tcp://127.0.0.1:5590"
+    return result
+
+
+def run_case(context, endpoint, ticks):
+    sub = context.socket(zmq.SUB)
+    sub.setsockopt(zmq.RCVHWM, 0)
+    sub.bind(endpoint)
+    sub.setsockopt(zmq.SUBSCRIBE, b"NSE|RELIANCE|QUOTE|")
+    pub = context.socket(zmq.PUB)
+    pub.setsockopt(zmq.SNDHWM, 0)
+    pub.connect(endpoint)
+    payload = encode_bus_payload(SAMPLE_QUOTE)
+
+    # Wait for the subscription to reach the publisher
+    while True:
+        pub.send_multipart([TOPIC, payload])
+        if sub.poll(10):
+            sub.recv_multipart()
+            break
+    while sub.poll(0):
+        sub.recv_multipart()
+
+    latencies = []
+    for _ in range(ticks):
+        start = time.perf_counter()
+        pub.send_multipart([TOPIC, payload])
+        sub.recv_multipart()
+        latencies.append((time.perf_counter() - start) * 1e6)
+
+    # Throughput: publisher thread bursts while this thread receives
+    def publish_burst():
+        for _ in range(ticks):
+            pub.send_multipart([TOPIC, payload])
+
+    start = time.perf_counter()
+    publisher = threading.Thread(target=publish_burst)
+    publisher.start()
+    for _ in range(ticks):
+        sub.recv_multipart()
+    elapsed = time.perf_counter() - start
+    publisher.join()
+
+    pub.close(linger=0)
+    sub.close(linger=0)
+    latencies.sort()
+    return statistics.mean(latencies), latencies[int(len(latencies) * 0.99) - 1], ticks / elapsed
+
+
+def main(ticks):
+    context = zmq.Context.instance()
+    print(f"{'transport':>10} {'mean us':>9} {'p99 us':>9} {'ticks/s':>12}")
+    for name, endpoint in endpoints().items():
+        mean, p99, rate = run_case(context, endpoint, ticks)
+        print(f"{name:>10} {mean:>9.1f} {p99:>9.1f} {rate:>12.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark market data bus transports")
+    parser.add_argument("--ticks", type=int, default=20000)
+    args = parser.parse_args()
+
+    main(args.ticks)
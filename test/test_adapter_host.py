@@ -0,0 +1,103 @@
+"""
+Test suite for the sharded WebSocket proxy adapter host
+
+Tests:
+- One broker adapter per user shared by several workers
+- Adapter subscribe/unsubscribe only on the first and last worker reference
+- Detaching workers and disconnecting the adapter
+"""
+
+import sys
+import os
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from websocket_proxy import adapter_host
+
+
+class FakeAdapter:
+    def __init__(self):
+        self.calls = []
+
+    def initialize(self, broker_name, user_id):
+        self.calls.append(("initialize", broker_name, user_id))
+
+    def connect(self):
+        return {"success": True}
+
+    def subscribe(self, symbol, exchange, mode=2, depth_level=5):
+        self.calls.append(("subscribe", symbol, exchange, mode))
+        return {"status": "success", "actual_depth": depth_level}
+
+    def unsubscribe(self, symbol, exchange, mode=2):
+        self.calls.append(("unsubscribe", symbol, exchange, mode))
+        return {"status": "success"}
+
+    def disconnect(self):
+        self.calls.append(("disconnect",))
+
+
+def make_host():
+    created = []
+
+    def create(broker_name):
+        created.append(FakeAdapter())
+        return created[-1]
+
+    adapter_host.create_broker_adapter = create
+    return adapter_host.AdapterHost("tcp://127.0.0.1:0"), created
+
+
+def close_host(host):
+    host.socket.close()
+    host.context.term()
+
+
+def test_shared_subscription_across_workers():
+    """Test that workers share one adapter and one upstream subscription"""
+    host, created = make_host()
+    try:
+        for worker in ("w1", "w2"):
+            assert host.handle_request({"op": "attach", "user_id": "u1", "broker": "angel", "worker": worker})["success"]
+        assert len(created) == 1, "Both workers should share the user's adapter"
+
+        call = ["SBIN", "NSE", 3, 20]
+        for worker in ("w1", "w2"):
+            reply = host.handle_request({"op": "subscribe", "user_id": "u1", "worker": worker, "calls": [call]})
+            assert reply["responses"][0]["actual_depth"] == 20
+
+        host.handle_request({"op": "unsubscribe", "user_id": "u1", "worker": "w1", "calls": [["SBIN", "NSE", 3]]})
+        host.handle_request({"op": "unsubscribe", "user_id": "u1", "worker": "w2", "calls": [["SBIN", "NSE", 3]]})
+
+        adapter_calls = [c for c in created[0].calls if c[0] in ("subscribe", "unsubscribe")]
+        assert adapter_calls == [("subscribe", "SBIN", "NSE", 3), ("unsubscribe", "SBIN", "NSE", 3)]
+        print("✅ PASSED: Shared subscription across workers")
+    finally:
+        close_host(host)
+
+
+def test_detach_disconnects_after_last_worker():
+    """Test that the adapter is disconnected only when the last worker detaches"""
+    host, created = make_host()
+    try:
+        for worker in ("w1", "w2"):
+            host.handle_request({"op": "attach", "user_id": "u1", "broker": "angel", "worker": worker})
+            host.handle_request({"op": "subscribe", "user_id": "u1", "worker": worker, "calls": [["TCS", "NSE", 1, 5]]})
+
+        host.handle_request({"op": "detach", "user_id": "u1", "worker": "w1"})
+        assert ("disconnect",) not in created[0].calls
+        assert ("unsubscribe", "TCS", "NSE", 1) not in created[0].calls, "w2 still holds TCS"
+
+        host.handle_request({"op": "detach", "user_id": "u1", "worker": "w2"})
+        assert created[0].calls[-2:] == [("unsubscribe", "TCS", "NSE", 1), ("disconnect",)]
+        assert "u1" not in host.adapters
+        print("✅ PASSED: Detach disconnects after last worker")
+    finally:
+        close_host(host)
+
+
+if __name__ == '__main__':
+    test_shared_subscription_across_workers()
+    test_detach_disconnects_after_last_worker()
+    print("\nAll adapter host tests passed")
@@ -0,0 +1,167 @@
+"""
+Test suite for the API key verification cache in database.auth_db
+
+Tests:
+- Only the first verification of a key runs Argon2
+- Invalid keys are negative-cached
+- Regenerating a key invalidates the cached old key
+- Decrypted auth contexts are cached until login, logout or revoke
+"""
+
+import sys
+import os
+import uuid
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import auth_db
+
+
+class CountingHasher:
+    """Wraps the Argon2 hasher and counts verify() calls"""
+
+    def __init__(self, hasher):
+        self.hasher = hasher
+        self.verifications = 0
+
+    def hash(self, password):
+        return self.hasher.hash(password)
+
+    def verify(self, hash, password):
+        self.verifications += 1
+        return self.hasher.verify(hash, password)
+
+
+def _with_test_user(test):
+    def run():
+        auth_db.init_db()
+        user_id = f"cache-test-{uuid.uuid4().hex[:8]}"
+        original_hasher = auth_db.ph
+        auth_db.ph = CountingHasher(original_hasher)
+        auth_db.verified_api_key_cache.clear()
+        auth_db.invalid_api_key_cache.clear()
+        try:
+            test(user_id, auth_db.ph)
+        finally:
+            auth_db.ph = original_hasher
+            auth_db.ApiKeys.query.filter_by(user_id=user_id).delete()
+            auth_db.Auth.query.filter_by(name=user_id).delete()
+            auth_db.auth_context_cache.pop(user_id, None)
+            auth_db.db_session.commit()
+            auth_db.verified_api_key_cache.clear()
+            auth_db.invalid_api_key_cache.clear()
+    run.__name__ = test.__name__
+    run.__doc__ = test.__doc__
+    return run
+
+
+@_with_test_user
+def test_verified_key_is_cached(user_id, hasher):
+    """Test that repeated verifications of a valid key skip Argon2"""
+    api_key = uuid.uuid4().hex
+    auth_db.upsert_api_key(user_id, api_key)
+
+    assert auth_db.verify_api_key(api_key) == user_id
+    first = hasher.verifications
+    assert first >= 1
+
+    for _ in range(5):
+        assert auth_db.verify_api_key(api_key) == user_id
+    assert hasher.verifications == first
+
+    # The plaintext key is never used as a cache key
+    assert api_key not in auth_db.verified_api_key_cache
+    print("✅ PASSED: Verified key is cached")
+
+
+@_with_test_user
+def test_invalid_key_is_negative_cached(user_id, hasher):
+    """Test that an invalid key only pays Argon2 once"""
+    auth_db.upsert_api_key(user_id, uuid.uuid4().hex)
+    bad_key = uuid.uuid4().hex
+
+    assert auth_db.verify_api_key(bad_key) is None
+    first = hasher.verifications
+
+    for _ in range(5):
+        assert auth_db.verify_api_key(bad_key) is None
+    assert hasher.verifications == first
+    print("✅ PASSED: Invalid key is negative-cached")
+
+
+@_with_test_user
+def test_regenerated_key_invalidates_cache(user_id, hasher):
+    """Test that the old key stops working as soon as a new one is stored"""
+    old_key = uuid.uuid4().hex
+    new_key = uuid.uuid4().hex
+    auth_db.upsert_api_key(user_id, old_key)
+    assert auth_db.verify_api_key(old_key) == user_id
+
+    # A client tried the new key before it existed
+    assert auth_db.verify_api_key(new_key) is None
+
+    auth_db.upsert_api_key(user_id, new_key)
+    assert auth_db.verify_api_key(old_key) is None
+    assert auth_db.verify_api_key(new_key) == user_id
+    print("✅ PASSED: Regenerated key invalidates cache")
+
+
+@_with_test_user
+def test_stale_entry_is_rechecked(user_id, hasher):
+    """Test that a key regenerated elsewhere is caught by the periodic hash re-check"""
+    old_key = uuid.uuid4().hex
+    auth_db.upsert_api_key(user_id, old_key)
+    assert auth_db.verify_api_key(old_key) == user_id
+
+    # Simulate another process regenerating the key: the DB changes, this cache does not
+    api_key_obj = auth_db.ApiKeys.query.filter_by(user_id=user_id).first()
+    api_key_obj.api_key_hash = auth_db.ph.hash(uuid.uuid4().hex + auth_db.PEPPER)
+    auth_db.db_session.commit()
+
+    digest = auth_db._api_key_digest(old_key)
+    cached_user, api_key_hash, expires_at, checked_at = auth_db.verified_api_key_cache[digest]
+    auth_db.verified_api_key_cache[digest] = (
+        cached_user, api_key_hash, expires_at, checked_at - auth_db.API_KEY_CACHE_RECHECK
+    )
+    assert auth_db.verify_api_key(old_key) is None
+    print("✅ PASSED: Stale entry is re-checked")
+
+
+@_with_test_user
+def test_auth_context_cache(user_id, hasher):
+    """Test that get_auth_token_broker decrypts once and follows upsert_auth"""
+    api_key = uuid.uuid4().hex
+    auth_db.upsert_api_key(user_id, api_key)
+    auth_db.upsert_auth(user_id, "token-1", "angel", feed_token="feed-1")
+
+    assert auth_db.get_auth_token_broker(api_key, include_feed_token=True) == ("token-1", "feed-1", "angel")
+    assert user_id in auth_db.auth_context_cache
+
+    def fail_decrypt(token):
+        raise AssertionError("Token decrypted on a cache hit")
+
+    original_decrypt = auth_db.decrypt_token
+    auth_db.decrypt_token = fail_decrypt
+    try:
+        assert auth_db.get_auth_token_broker(api_key) == ("token-1", "angel")
+    finally:
+        auth_db.decrypt_token = original_decrypt
+
+    # A new login replaces the cached context
+    auth_db.upsert_auth(user_id, "token-2", "angel")
+    assert auth_db.get_auth_token_broker(api_key, include_feed_token=True) == ("token-2", None, "angel")
+
+    # Revoking (logout) clears it
+    auth_db.upsert_auth(user_id, "", "", revoke=True)
+    assert auth_db.get_auth_token_broker(api_key) == (None, None)
+    print("✅ PASSED: Auth context cache")
+
+
+if __name__ == '__main__':
+    test_verified_key_is_cached()
+    test_invalid_key_is_negative_cached()
+    test_regenerated_key_invalidates_cache()
+    test_stale_entry_is_rechecked()
+    test_auth_context_cache()
+    print("\nAll API key cache tests passed")
@@ -0,0 +1,74 @@
+"""
+Test suite for the WebSocket proxy per-client send queue
+
+Tests:
+- Latest-value conflation per instrument
+- Bounded size with oldest market data dropped first
+- Control messages are never conflated or dropped
+"""
+
+import sys
+import os
+import asyncio
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from websocket_proxy.client_queue import ConflatingSendQueue
+
+
+def drain(queue):
+    """Collect everything currently queued"""
+    async def collect():
+        frames = []
+        while queue.qsize():
+            frames.append(await queue.get())
+        return frames
+    return asyncio.run(collect())
+
+
+def test_conflation_keeps_latest_tick():
+    """Test that a pending tick is replaced by a newer one for the same instrument"""
+    queue = ConflatingSendQueue(maxsize=10)
+    queue.put("sbin-1", ("NSE", "SBIN", 1))
+    queue.put("tcs-1", ("NSE", "TCS", 1))
+    queue.put("sbin-2", ("NSE", "SBIN", 1))
+    queue.put("sbin-quote", ("NSE", "SBIN", 2))
+
+    assert drain(queue) == ["sbin-2", "tcs-1", "sbin-quote"]
+    assert queue.conflated == 1
+    assert queue.dropped == 0
+    print("✅ PASSED: Conflation keeps latest tick")
+
+
+def test_bounded_queue_drops_oldest():
+    """Test that a full queue drops the oldest market data first"""
+    queue = ConflatingSendQueue(maxsize=2)
+    queue.put("a", ("NSE", "A", 1))
+    queue.put("b", ("NSE", "B", 1))
+    queue.put("c", ("NSE", "C", 1))
+
+    assert drain(queue) == ["b", "c"]
+    assert queue.dropped == 1
+    assert queue.max_depth == 2
+    print("✅ PASSED: Bounded queue drops oldest")
+
+
+def test_control_messages_are_kept():
+    """Test that control messages bypass conflation and the size bound"""
+    queue = ConflatingSendQueue(maxsize=1)
+    queue.put("auth-ok")
+    queue.put("a", ("NSE", "A", 1))
+    queue.put("subscribe-ok")
+    queue.put("b", ("NSE", "B", 1))
+
+    assert drain(queue) == ["auth-ok", "subscribe-ok", "b"]
+    assert queue.dropped == 1
+    assert queue.stats()["enqueued"] == 4
+    print("✅ PASSED: Control messages are kept")
+
+
+if __name__ == '__main__':
+    test_conflation_keeps_latest_tick()
+    test_bounded_queue_drops_oldest()
+    test_control_messages_are_kept()
@@ -0,0 +1,168 @@
+"""
+Test suite for the in-memory IP ban table in database.traffic_db
+
+Tests:
+- Ban checks are served from memory without queries
+- ban_ip and unban_ip update the table at once
+- Temporary bans expire in memory
+- Bans made by another worker are picked up by the periodic sync
+- An expired ban in the database counts as a first offense again
+"""
+
+import sys
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_workdir = tempfile.mkdtemp()
+# ban_ip() reads the security settings from the main database
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_workdir, 'openalgo.db')}"
+os.environ.setdefault('LOGS_DATABASE_URL', f"sqlite:///{os.path.join(_workdir, 'logs.db')}")
+
+from sqlalchemy import event
+
+from database import settings_db, traffic_db
+from database.traffic_db import IPBan, logs_engine, logs_session
+
+settings_db.init_db()
+
+
+class QueryCounter:
+    """Counts statements run on the logs engine"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __enter__(self):
+        event.listen(logs_engine, 'before_cursor_execute', self._count)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(logs_engine, 'before_cursor_execute', self._count)
+
+    def _count(self, *args):
+        self.count += 1
+
+
+def _with_bans(test):
+    def run():
+        traffic_db.init_logs_db()
+        IPBan.query.delete()
+        logs_session.commit()
+        table = traffic_db._ban_table
+        interval = table.sync_interval
+        table.sync_interval = 60
+        table.invalidate()
+        try:
+            test()
+        finally:
+            table.sync_interval = interval
+            IPBan.query.delete()
+            logs_session.commit()
+            table.invalidate()
+    run.__name__ = test.__name__
+    run.__doc__ = test.__doc__
+    return run
+
+
+def _ban_from_other_worker(ip_address, expires_at=None):
+    """Add a ban row without going through this process's table"""
+    logs_session.add(IPBan(ip_address=ip_address, ban_reason='test', expires_at=expires_at,
+                           is_permanent=expires_at is None))
+    logs_session.commit()
+
+
+@_with_bans
+def test_checks_from_memory():
+    """Test that ban checks don't query the database"""
+    assert IPBan.ban_ip('10.0.0.1', 'test')
+    IPBan.is_ip_banned('10.0.0.1')
+
+    with QueryCounter() as queries:
+        for _ in range(100):
+            assert IPBan.is_ip_banned('10.0.0.1')
+            assert not IPBan.is_ip_banned('10.0.0.2')
+    assert queries.count == 0
+    print("✅ PASSED: Checks from memory")
+
+
+@_with_bans
+def test_ban_and_unban():
+    """Test that ban_ip and unban_ip take effect at once"""
+    assert not IPBan.is_ip_banned('10.0.0.1')
+    assert IPBan.ban_ip('10.0.0.1', 'test', permanent=True)
+    assert IPBan.is_ip_banned('10.0.0.1')
+    assert IPBan.unban_ip('10.0.0.1')
+    assert not IPBan.is_ip_banned('10.0.0.1')
+
+    # Localhost is never banned
+    assert not IPBan.ban_ip('127.0.0.1', 'test')
+    assert not IPBan.is_ip_banned('127.0.0.1')
+    print("✅ PASSED: Ban and unban")
+
+
+@_with_bans
+def test_expiry():
+    """Test that temporary bans expire without touching the database"""
+    table = traffic_db._ban_table
+    table.sync()
+    table.add('10.0.0.1', datetime.utcnow() + timedelta(seconds=0.2))
+    table.add('10.0.0.2', datetime.utcnow() + timedelta(hours=1))
+    table.add('10.0.0.3', datetime.utcnow() - timedelta(seconds=1))
+    # A permanent ban replaces an earlier temporary one
+    table.add('10.0.0.4', datetime.utcnow() - timedelta(seconds=1))
+    table.add('10.0.0.4')
+
+    assert IPBan.is_ip_banned('10.0.0.1')
+    assert not IPBan.is_ip_banned('10.0.0.3')
+
+    time.sleep(0.3)
+    with QueryCounter() as queries:
+        assert not IPBan.is_ip_banned('10.0.0.1')
+        assert IPBan.is_ip_banned('10.0.0.2')
+        assert IPBan.is_ip_banned('10.0.0.4')
+    assert queries.count == 0
+    print("✅ PASSED: Expiry")
+
+
+@_with_bans
+def test_other_worker_ban():
+    """Test that another worker's bans are picked up once the table syncs"""
+    assert not IPBan.is_ip_banned('10.0.0.1')
+
+    _ban_from_other_worker('10.0.0.1')
+    _ban_from_other_worker('10.0.0.2', datetime.utcnow() - timedelta(hours=1))
+    # Within the sync interval the in-memory list is served
+    assert not IPBan.is_ip_banned('10.0.0.1')
+
+    traffic_db._ban_table.sync_interval = 0
+    assert IPBan.is_ip_banned('10.0.0.1')
+    assert not IPBan.is_ip_banned('10.0.0.2')
+    print("✅ PASSED: Other worker ban")
+
+
+@_with_bans
+def test_expired_ban_starts_over():
+    """Test that banning an IP whose ban ran out counts as a first offense"""
+    _ban_from_other_worker('10.0.0.1', datetime.utcnow() - timedelta(hours=1))
+    IPBan.query.filter_by(ip_address='10.0.0.1').update({'ban_count': 100})
+    logs_session.commit()
+
+    assert IPBan.ban_ip('10.0.0.1', 'test', duration_hours=1)
+    ban = IPBan.query.filter_by(ip_address='10.0.0.1').one()
+    assert ban.ban_count == 1 and not ban.is_permanent
+    assert IPBan.is_ip_banned('10.0.0.1')
+    print("✅ PASSED: Expired ban starts over")
+
+
+if __name__ == '__main__':
+    test_checks_from_memory()
+    test_ban_and_unban()
+    test_expiry()
+    test_other_worker_ban()
+    test_expired_ban_starts_over()
+    print("\nAll IP ban cache tests passed")
@@ -0,0 +1,69 @@
+"""
+Test suite for the WebSocket proxy last-value cache
+
+Tests:
+- Latest value per instrument, mode and broker
+- Fallback to values published without a broker name
+- Discard and size bound
+"""
+
+import sys
+import os
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from websocket_proxy.last_value_cache import LastValueCache
+
+
+def test_latest_value_wins():
+    """Test that the cache keeps only the latest tick per instrument and mode"""
+    cache = LastValueCache()
+    cache.update("angel", "NSE", "SBIN", 1, {"ltp": 800.0})
+    cache.update("angel", "NSE", "SBIN", 1, {"ltp": 801.5})
+    cache.update("angel", "NSE", "SBIN", 2, {"ltp": 801.0, "volume": 10})
+
+    broker, data, received_at = cache.get("angel", "NSE", "SBIN", 1)
+    assert broker == "angel"
+    assert data == {"ltp": 801.5}
+    assert received_at > 0
+    assert cache.get("angel", "NSE", "SBIN", 2)[1]["volume"] == 10
+    assert cache.get("angel", "NSE", "SBIN", 3) is None
+    print("✅ PASSED: Latest value wins")
+
+
+def test_broker_resolution():
+    """Test that the client's broker is preferred over values without a broker"""
+    cache = LastValueCache()
+    cache.update("unknown", "NSE_INDEX", "NIFTY", 1, {"ltp": 24000.0})
+    assert cache.get("zerodha", "NSE_INDEX", "NIFTY", 1)[:2] == ("unknown", {"ltp": 24000.0})
+
+    cache.update("zerodha", "NSE_INDEX", "NIFTY", 1, {"ltp": 24001.0})
+    assert cache.get("zerodha", "NSE_INDEX", "NIFTY", 1)[:2] == ("zerodha", {"ltp": 24001.0})
+
+    cache.update("angel", "NSE", "TCS", 1, {"ltp": 4000.0})
+    assert cache.get("zerodha", "NSE", "TCS", 1) is None, "Another broker's value should not be served"
+    print("✅ PASSED: Broker resolution")
+
+
+def test_discard_and_bound():
+    """Test that discarded and evicted instruments are no longer served"""
+    cache = LastValueCache(maxsize=2)
+    cache.update("angel", "NSE", "SBIN", 1, {"ltp": 1.0})
+    cache.update("angel", "NSE", "TCS", 1, {"ltp": 2.0})
+    cache.discard("NSE", "SBIN", 1)
+    assert cache.get("angel", "NSE", "SBIN", 1) is None
+
+    cache.update("angel", "NSE", "INFY", 1, {"ltp": 3.0})
+    cache.update("angel", "NSE", "WIPRO", 1, {"ltp": 4.0})
+    assert len(cache) == 2
+    assert cache.get("angel", "NSE", "TCS", 1) is None, "Oldest instrument should be evicted"
+    assert cache.get("angel", "NSE", "WIPRO", 1) is not None
+    print("✅ PASSED: Discard and bound")
+
+
+if __name__ == '__main__':
+    test_latest_value_wins()
+    test_broker_resolution()
+    test_discard_and_bound()
+    print("\nAll last-value cache tests passed")
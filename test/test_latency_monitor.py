@@ -0,0 +1,185 @@
+"""
+Test suite for broker round-trip measurement in utils.latency_monitor
+
+Tests:
+- The shared client's hooks record broker calls only inside track_broker_calls
+- RTT is the broker calls' time and the rest of the request is overhead
+- A request without broker calls is all overhead
+- Calls from executor threads running in the request's context are
+  recorded, and concurrent calls count once in the RTT
+- Latency rows are written by the executor, not the request
+"""
+
+import sys
+import os
+import contextvars
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault('LATENCY_DATABASE_URL', f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'latency.db')}")
+
+import httpx
+from flask import Flask, jsonify
+
+from database import latency_db
+from database.latency_db import OrderLatency, init_latency_db, latency_session
+from utils import httpx_client
+from utils.latency_monitor import track_latency
+
+BROKER_DELAY = 0.05
+PRE_REQUEST_DELAY = 0.03
+
+
+def _broker(request):
+    time.sleep(BROKER_DELAY)
+    return httpx.Response(200, json={'status': 'success', 'orderid': '1001'})
+
+
+def _client():
+    """A client like the shared one, answered by a mock broker"""
+    return httpx.Client(transport=httpx.MockTransport(_broker), event_hooks={
+        'request': [httpx_client._on_request], 'response': [httpx_client._on_response]})
+
+
+def _app(client):
+    app = Flask(__name__)
+
+    @app.route('/api/v1/placeorder', methods=['POST'])
+    @track_latency('PLACE')
+    def place_order():
+        time.sleep(PRE_REQUEST_DELAY)
+        response = client.post('https://broker.test/orders')
+        return jsonify(response.json())
+
+    @app.route('/api/v1/basketorder', methods=['POST'])
+    @track_latency('BASKET')
+    def basket_order():
+        # As services.basket_order_service places the orders
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            futures = [executor.submit(contextvars.copy_context().run, client.post, 'https://broker.test/orders')
+                       for _ in range(3)]
+            orders = [future.result().json()['orderid'] for future in futures]
+        return jsonify({'status': 'success', 'results': orders})
+
+    @app.route('/api/v1/ping', methods=['POST'])
+    @track_latency('PING')
+    def ping():
+        time.sleep(PRE_REQUEST_DELAY)
+        return jsonify({'status': 'success', 'request_id': 'ping'})
+
+    return app
+
+
+def _wait_for_latency_rows():
+    latency_db.executor.submit(lambda: None).result()
+
+
+def _latest(order_type):
+    latency_session.remove()
+    return OrderLatency.query.filter_by(order_type=order_type).order_by(OrderLatency.id.desc()).first()
+
+
+def test_broker_calls_recorded():
+    """Test that calls are recorded only while tracking"""
+    client = _client()
+    client.get('https://broker.test/untracked')
+
+    with httpx_client.track_broker_calls() as calls:
+        client.get('https://broker.test/quotes')
+        client.post('https://broker.test/orders')
+    client.get('https://broker.test/after')
+
+    assert [(call.method, call.url) for call in calls] == \
+        [('GET', 'https://broker.test/quotes'), ('POST', 'https://broker.test/orders')]
+    assert all(call.status_code == 200 for call in calls)
+    assert all(BROKER_DELAY <= call.elapsed < BROKER_DELAY + 0.05 for call in calls)
+    assert calls[0].received_at <= calls[1].sent_at
+    assert BROKER_DELAY * 2 <= calls.elapsed
+    print("✅ PASSED: Broker calls recorded")
+
+
+def test_rtt_and_overhead():
+    """Test that RTT covers the broker call and overhead the rest"""
+    init_latency_db()
+    response = _app(_client()).test_client().post('/api/v1/placeorder', json={'symbol': 'SBIN'})
+    assert response.status_code == 200
+    _wait_for_latency_rows()
+
+    row = _latest('PLACE')
+    assert row.order_id == '1001' and row.symbol == 'SBIN' and row.status == 'SUCCESS'
+    assert BROKER_DELAY * 1000 <= row.rtt_ms < (BROKER_DELAY + 0.03) * 1000
+    assert PRE_REQUEST_DELAY * 1000 <= row.validation_latency_ms < (PRE_REQUEST_DELAY + 0.03) * 1000
+    assert PRE_REQUEST_DELAY * 1000 <= row.overhead_ms
+    assert abs(row.rtt_ms + row.overhead_ms - row.total_latency_ms) < 0.01
+    assert row.response_latency_ms <= row.overhead_ms - row.validation_latency_ms + 0.01
+    print("✅ PASSED: RTT and overhead")
+
+
+def test_no_broker_calls():
+    """Test that a request without broker calls is all overhead"""
+    init_latency_db()
+    _app(_client()).test_client().post('/api/v1/ping', json={})
+    _wait_for_latency_rows()
+
+    row = _latest('PING')
+    assert row.rtt_ms == 0
+    assert row.overhead_ms == row.total_latency_ms >= PRE_REQUEST_DELAY * 1000
+    print("✅ PASSED: No broker calls")
+
+
+def test_calls_from_worker_threads():
+    """Test that calls made from executor threads in the request's context are recorded"""
+    client = _client()
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        with httpx_client.track_broker_calls() as calls:
+            executor.submit(contextvars.copy_context().run, client.get, 'https://broker.test/quotes').result()
+            # Without the caller's context the call isn't recorded
+            executor.submit(client.get, 'https://broker.test/untracked').result()
+    assert [call.url for call in calls] == ['https://broker.test/quotes']
+
+    init_latency_db()
+    _app(_client()).test_client().post('/api/v1/basketorder', json={'strategy': 'Test'})
+    _wait_for_latency_rows()
+
+    row = _latest('BASKET')
+    # Three concurrent calls: their RTT is about one call, not three
+    assert BROKER_DELAY * 1000 <= row.rtt_ms < BROKER_DELAY * 2 * 1000
+    assert abs(row.rtt_ms + row.overhead_ms - row.total_latency_ms) < 0.01
+    print("✅ PASSED: Calls from worker threads")
+
+
+def test_logged_asynchronously():
+    """Test that the request doesn't wait for the latency row"""
+    init_latency_db()
+    original = OrderLatency.log_latency
+    written = []
+
+    def slow_log_latency(**kwargs):
+        time.sleep(0.2)
+        written.append(kwargs['order_id'])
+        return original(**kwargs)
+
+    OrderLatency.log_latency = staticmethod(slow_log_latency)
+    try:
+        start = time.perf_counter()
+        _app(_client()).test_client().post('/api/v1/placeorder', json={'symbol': 'SBIN'})
+        assert time.perf_counter() - start < 0.2
+        assert written == []
+        _wait_for_latency_rows()
+        assert written == ['1001']
+    finally:
+        OrderLatency.log_latency = original
+    print("✅ PASSED: Logged asynchronously")
+
+
+if __name__ == '__main__':
+    test_broker_calls_recorded()
+    test_rtt_and_overhead()
+    test_no_broker_calls()
+    test_calls_from_worker_threads()
+    test_logged_asynchronously()
+    print("\nAll latency monitor tests passed")
@@ -0,0 +1,135 @@
+"""
+Test suite for the vectorized master contract helpers
+
+Tests:
+- Expiry conversion to DD-MMM-YY, dropping or keeping unparseable dates
+- Compact expiries for symbols
+- Strike parsing and formatting (whole, fractional and rounded)
+- Futures and option symbol construction
+- Chunked reading of JSON and CSV instrument files
+- Streaming a download to disk, leaving no file behind on failure
+"""
+
+import sys
+import os
+import json
+import tempfile
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+import pandas as pd
+
+import utils.master_contract as master_contract
+from utils.master_contract import (
+    format_expiry, compact_expiry, parse_strike, format_strike, future_symbols, option_symbols,
+    download_to_file, iter_csv_chunks, iter_json_records
+)
+
+
+def test_format_expiry():
+    """Test expiry conversion with unparseable dates dropped or kept"""
+    expiry = pd.Series(['28-Oct-2025', '28-OCT-2025', '', None, '04-NOV-2025'])
+    formatted = format_expiry(expiry, '%d-%b-%Y')
+    assert list(formatted[[0, 1, 4]]) == ['28-OCT-25', '28-OCT-25', '04-NOV-25']
+    assert formatted[[2, 3]].isna().all()
+
+    kept = format_expiry(pd.Series(['19MAR2024', '', None]), '%d%b%Y', keep_unparsed=True)
+    assert kept[0] == '19-MAR-24' and kept[1] == '' and pd.isna(kept[2])
+    print("✅ PASSED: Expiry conversion")
+
+
+def test_compact_expiry():
+    """Test that expiries are compacted and missing ones become empty"""
+    assert list(compact_expiry(pd.Series(['28-OCT-25', None, '']))) == ['28OCT25', '', '']
+    print("✅ PASSED: Compact expiry")
+
+
+def test_strikes():
+    """Test strike parsing and formatting"""
+    strike = parse_strike(pd.Series(['25000', None, 'x', '82.25']))
+    assert list(strike) == [25000.0, -1.0, -1.0, 82.25]
+
+    assert list(format_strike(pd.Series([25000.0, 82.5, -1.0, 0.0025]))) == ['25000', '82.5', '-1', '0.0025']
+    assert list(format_strike(pd.Series([812.5, 72.129, 1330.0]), decimals=2)) == ['812.5', '72.13', '1330']
+    print("✅ PASSED: Strikes")
+
+
+def test_symbols():
+    """Test futures and option symbols"""
+    name = pd.Series(['NIFTY', 'USDINR'])
+    expiry = pd.Series(['28OCT25', '29OCT25'])
+    assert list(future_symbols(name, expiry)) == ['NIFTY28OCT25FUT', 'USDINR29OCT25FUT']
+
+    strike = format_strike(pd.Series([25000.0, 88.25]))
+    assert list(option_symbols(name, expiry, strike, pd.Series(['CE', 'PE']))) == [
+        'NIFTY28OCT2525000CE', 'USDINR29OCT2588.25PE']
+    assert list(option_symbols(name, expiry, strike, 'CE')) == ['NIFTY28OCT2525000CE', 'USDINR29OCT2588.25CE']
+    print("✅ PASSED: Symbols")
+
+
+def test_chunked_reading():
+    """Test that instrument files are read back whole, chunk by chunk"""
+    records = [{'token': str(i), 'symbol': f"SYM{i}", 'name': 'a "quoted", [name]', 'strike': i * 0.5}
+               for i in range(1000)]
+    path = os.path.join(tempfile.mkdtemp(), 'instruments.json')
+    with open(path, 'w') as f:
+        json.dump(records, f, indent=1)
+
+    # Blocks much smaller than a record exercise records spanning blocks
+    block_size = master_contract.DOWNLOAD_BLOCK_SIZE
+    master_contract.DOWNLOAD_BLOCK_SIZE = 7
+    try:
+        chunks = list(iter_json_records(path, 300))
+    finally:
+        master_contract.DOWNLOAD_BLOCK_SIZE = block_size
+    assert [len(chunk) for chunk in chunks] == [300, 300, 300, 100]
+    assert [record for chunk in chunks for record in chunk] == records
+
+    with open(path, 'w') as f:
+        f.write('[]')
+    assert list(iter_json_records(path)) == []
+
+    path = os.path.join(tempfile.mkdtemp(), 'instruments.csv')
+    pd.DataFrame(records).to_csv(path, index=False)
+    chunks = list(iter_csv_chunks(path, 400, dtype={'token': str}))
+    assert [len(chunk) for chunk in chunks] == [400, 400, 200]
+    assert list(pd.concat(chunks)['token']) == [str(i) for i in range(1000)]
+    print("✅ PASSED: Chunked reading")
+
+
+def test_download_to_file():
+    """Test that a download is streamed to its path and a failed one leaves nothing"""
+    body = b"instrument_token,tradingsymbol\n" * 50000
+
+    def handler(request):
+        if request.url.path == '/missing':
+            return httpx.Response(404)
+        assert request.headers['Authorization'] == 'token abc'
+        return httpx.Response(200, content=body)
+
+    client = httpx.Client(transport=httpx.MockTransport(handler))
+    path = os.path.join(tempfile.mkdtemp(), 'tmp', 'instruments.csv')
+    assert download_to_file('https://example.com/instruments', path, {'Authorization': 'token abc'}, client) == len(body)
+    with open(path, 'rb') as f:
+        assert f.read() == body
+
+    failed = os.path.join(os.path.dirname(path), 'missing.csv')
+    try:
+        download_to_file('https://example.com/missing', failed, client=client)
+        assert False, "expected the download to fail"
+    except httpx.HTTPStatusError:
+        pass
+    assert os.listdir(os.path.dirname(path)) == ['instruments.csv']
+    print("✅ PASSED: Download to file")
+
+
+if __name__ == '__main__':
+    test_format_expiry()
+    test_compact_expiry()
+    test_strikes()
+    test_symbols()
+    test_chunked_reading()
+    test_download_to_file()
+    print("\nAll master contract tests passed")
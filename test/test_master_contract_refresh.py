@@ -0,0 +1,230 @@
+"""
+Test suite for the incremental master contract refresh
+
+Tests:
+- A contract identical to the last import leaves symtoken untouched
+- A changed contract is applied as deletes and inserts only
+- Rows whose key was loaded by an earlier call are skipped, as the table would
+- Unchanged instrument files are detected before processing
+- A download that doesn't complete is processed again at the next login,
+  including one whose load failed while the broker carried on
+- The symbol cache applies a diff to the same result as a full reload
+- Loads outside a refresh forget the recorded hashes in their own transaction
+"""
+
+import sys
+import os
+import tempfile
+
+import pandas as pd
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine
+
+from test_symtoken_loader import Base, _frame
+from database.master_contract_status_db import MasterContractSource, get_contract_source
+from database.master_contract_refresh import (
+    contract_downloaded, contract_hash, master_contract_refresh, normalize_contract, source_unchanged)
+from database.symtoken_loader import bulk_load_symtoken, clear_symtoken
+from database.token_db_enhanced import BrokerSymbolCache, SYMBOL_COLUMNS
+
+
+def _engine():
+    path = os.path.join(tempfile.mkdtemp(), 'symtoken.db')
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    return engine
+
+
+def _download(engine, *frames, broker='testbroker', path=None, fail=False):
+    """Run a broker-style download (clear, then load each frame) as a refresh"""
+    with master_contract_refresh(broker, engine) as refresh:
+        if not (path and source_unchanged(path)):
+            with engine.begin() as connection:
+                clear_symtoken(connection)
+                for df in frames:
+                    bulk_load_symtoken(connection, df)
+            # Brokers report failures (socketio event) instead of raising
+            if not fail:
+                contract_downloaded()
+    return refresh.changes
+
+
+def _rows(engine):
+    columns = ', '.join(SYMBOL_COLUMNS)
+    with engine.connect() as connection:
+        return connection.exec_driver_sql(f"SELECT {columns} FROM symtoken ORDER BY id").fetchall()
+
+
+def test_unchanged():
+    """Test that downloading the same contract again changes nothing"""
+    engine = _engine()
+    assert _download(engine, _frame(100)).reloaded
+    before = _rows(engine)
+
+    changes = _download(engine, _frame(100))
+    assert changes.unchanged
+    assert _rows(engine) == before
+    # Hashed in SQL from the staged rows, as contract_hash() hashes a frame
+    assert get_contract_source('testbroker')['contract_hash'] == contract_hash(normalize_contract(_frame(100)))
+    print("✅ PASSED: Unchanged contract")
+
+
+def test_diff():
+    """Test that a changed contract is applied as deletes and inserts"""
+    engine = _engine()
+    _download(engine, _frame(100))
+    before = {row[-1]: row for row in _rows(engine)}
+
+    # Tokens 40000-40001 expire, 40100-40102 are listed, 40050 changes lot size
+    df = _frame(101, start=2)
+    df.loc[df['token'] == '40050', 'lotsize'] = 50
+    changes = _download(engine, df)
+
+    assert not changes.unchanged and not changes.reloaded
+    assert sorted(before[row_id][5] for row_id in changes.deleted_ids) == ['40000', '40001', '40050']
+    assert sorted(row[5] for row in changes.inserted) == ['40050', '40100', '40101', '40102']
+    assert [row[8] for row in changes.inserted if row[5] == '40050'] == [50]
+    # The refresh's temporary tables went with its connection
+    assert engine.pool.checkedout() == 0
+
+    after = _rows(engine)
+    assert len(after) == 101
+    # Unchanged rows keep their ids
+    assert all(before[row[-1]] == row for row in after if row[5] not in ('40050', '40100', '40101', '40102'))
+    print("✅ PASSED: Diff applied")
+
+
+def test_existing_keys_skipped():
+    """Test that rows with a token loaded earlier in the download are skipped"""
+    engine = _engine()
+    _download(engine, _frame(10), _frame(10, start=5))
+    assert len(_rows(engine)) == 15
+
+    changes = _download(engine, _frame(10), _frame(10, start=5))
+    assert changes.unchanged
+    print("✅ PASSED: Existing keys skipped")
+
+
+def test_source_unchanged():
+    """Test that unchanged instrument files are detected before processing"""
+    engine = _engine()
+    path = os.path.join(tempfile.mkdtemp(), 'instruments.csv')
+    with open(path, 'w') as f:
+        f.write("token,symbol\n40000,NIFTY\n")
+
+    assert not source_unchanged(path)  # outside a refresh
+
+    with master_contract_refresh('testbroker', engine):
+        assert not source_unchanged(path)
+        with engine.begin() as connection:
+            clear_symtoken(connection)
+            bulk_load_symtoken(connection, _frame(10))
+        contract_downloaded()
+
+    with master_contract_refresh('testbroker', engine) as refresh:
+        assert source_unchanged(path)
+    assert refresh.changes.unchanged
+
+    with open(path, 'a') as f:
+        f.write("40001,BANKNIFTY\n")
+    with master_contract_refresh('testbroker', engine):
+        assert not source_unchanged(path)
+    print("✅ PASSED: Source unchanged")
+
+
+def test_failed_download():
+    """Test that a download that failed part way isn't recorded as the current contract"""
+    engine = _engine()
+    path = os.path.join(tempfile.mkdtemp(), 'instruments.csv')
+    with open(path, 'w') as f:
+        f.write("token,symbol\n40000,NIFTY\n")
+
+    # The broker loads part of the contract, then reports an error
+    _download(engine, _frame(40), path=path, fail=True)
+    assert len(_rows(engine)) == 40
+
+    # Same files at the next login: processed again, not skipped
+    changes = _download(engine, _frame(100), path=path)
+    assert not changes.unchanged
+    assert len(_rows(engine)) == 100
+
+    assert _download(engine, _frame(100), path=path).unchanged
+
+    # A download that raises leaves symtoken as it was
+    try:
+        with master_contract_refresh('testbroker', engine):
+            with engine.begin() as connection:
+                clear_symtoken(connection)
+                bulk_load_symtoken(connection, _frame(10))
+            raise RuntimeError("connection reset")
+    except RuntimeError:
+        pass
+    assert len(_rows(engine)) == 100 and engine.pool.checkedout() == 0
+
+    # A load that fails to stage (here a frame with two token columns), logged
+    # by the broker which then reports success
+    with master_contract_refresh('testbroker', engine):
+        with engine.begin() as connection:
+            clear_symtoken(connection)
+            bulk_load_symtoken(connection, _frame(60))
+            try:
+                bulk_load_symtoken(connection, pd.concat([_frame(40, start=60), _frame(40)[['token']]], axis=1))
+            except Exception:
+                pass
+        contract_downloaded()
+    assert len(_rows(engine)) == 60
+    assert get_contract_source('testbroker')['contract_hash'] is None
+    assert not _download(engine, _frame(100), path=path).unchanged
+    print("✅ PASSED: Failed download")
+
+
+def test_cache_apply_changes():
+    """Test that the symbol cache applies a diff to the same result as a reload"""
+    engine = _engine()
+    _download(engine, _frame(100))
+    cache = BrokerSymbolCache()
+    cache.load_rows('testbroker', _rows(engine))
+
+    changes = _download(engine, _frame(100, start=3))
+    assert cache.apply_changes('testbroker', changes.deleted_ids, changes.inserted)
+    assert cache.source == 'incremental'
+    assert not cache.apply_changes('otherbroker', [], [])
+
+    reloaded = BrokerSymbolCache()
+    reloaded.load_rows('testbroker', _rows(engine))
+    assert len(cache.store) == len(reloaded.store) == 100
+    assert sorted(map(cache.store.row, range(100)), key=lambda s: s.id) == \
+        [reloaded.store.row(row) for row in range(100)]
+    assert cache.get_token('NIFTY28OCT2520000CE', 'NFO') is None
+    assert cache.get_token('NIFTY28OCT2520102CE', 'NFO') == '40102'
+    print("✅ PASSED: Cache applies changes")
+
+
+def test_load_outside_refresh():
+    """Test that a load outside a refresh forgets the hashes without a second connection"""
+    engine = _engine()
+    MasterContractSource.__table__.create(engine)
+    with engine.begin() as connection:
+        connection.exec_driver_sql(
+            "INSERT INTO master_contract_source (broker, contract_hash, total_symbols) VALUES ('testbroker', 'x', 10)")
+
+    with engine.begin() as connection:
+        clear_symtoken(connection)
+        assert bulk_load_symtoken(connection, _frame(10)) == 10
+        assert connection.exec_driver_sql("SELECT COUNT(*) FROM master_contract_source").scalar() == 0
+    assert len(_rows(engine)) == 10
+    print("✅ PASSED: Load outside refresh")
+
+
+if __name__ == '__main__':
+    test_unchanged()
+    test_diff()
+    test_existing_keys_skipped()
+    test_source_unchanged()
+    test_failed_download()
+    test_cache_apply_changes()
+    test_load_outside_refresh()
+    print("\nAll master contract refresh tests passed")
@@ -0,0 +1,210 @@
+"""
+Test suite for the option chain index and service
+
+Tests:
+- Chains keyed by underlying, exchange and expiry with sorted strikes
+- ATM strike and the window of strikes around it
+- Expiries sorted by date and futures lookups
+- Option chain service pricing from the spot or the nearest future, within
+  the quote call cap
+- Expiry service served from the index, with the database as fallback
+"""
+
+import sys
+import os
+import types
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.token_db_enhanced import BrokerSymbolCache
+from database.derivatives_index import MISSING_ROW
+
+
+def _option(name, expiry, strike, option_type, token, exchange="NFO", lotsize=75):
+    symbol = f"{name}{expiry.replace('-', '')}{strike}{option_type}"
+    return (symbol, symbol, name, exchange, exchange, token, expiry, float(strike), lotsize, option_type, 0.05)
+
+
+ROWS = [
+    ("NIFTY", "Nifty 50", "NIFTY", "NSE_INDEX", "NSE", "99926000", None, None, 1, "INDEX", 0.05),
+    ("NIFTY30DEC25FUT", "NIFTY30DEC25FUT", "NIFTY", "NFO", "NFO", "52001", "30-DEC-25", -1.0, 75, "FUTIDX", 0.1),
+    _option("NIFTY", "30-DEC-25", 25000, "CE", "52002"),
+    ("NIFTY28OCT25FUT", "NIFTY28OCT25FUT", "NIFTY", "NFO", "NFO", "43000", "28-OCT-25", -1.0, 75, "FUTIDX", 0.1),
+    _option("NIFTY", "28-OCT-25", 25100, "CE", "43009"),
+    _option("NIFTY", "28-OCT-25", 24900, "CE", "43001"),
+    _option("NIFTY", "28-OCT-25", 24900, "PE", "43002"),
+    _option("NIFTY", "28-OCT-25", 25000, "CE", "43005"),
+    _option("NIFTY", "28-OCT-25", 25000, "PE", "43006"),
+    _option("NIFTY", "28-OCT-25", 25050, "PE", "43008"),
+    _option("NIFTY", "28-OCT-25", 25100, "PE", "43010"),
+    _option("NIFTYNXT50", "28-OCT-25", 70000, "CE", "44001"),
+    ("GOLD05DEC25FUT", "GOLD25DECFUT", "GOLD", "MCX", "MCX", "445003", "05-DEC-25", -1.0, 1, "FUTCOM", 1.0),
+    _option("GOLD", "25-NOV-25", 120000, "CE", "445101", "MCX", 1),
+    _option("GOLD", "25-NOV-25", 121000, "CE", "445102", "MCX", 1),
+]
+
+
+def _load():
+    cache = BrokerSymbolCache()
+    assert cache.load_rows("angel", iter(ROWS))
+    return cache
+
+
+def test_chain_index():
+    """Test that chains are keyed by underlying, exchange and expiry with sorted strikes"""
+    index = _load().get_derivatives_index()
+    chain = index.get_chain("NIFTY", "NFO", "28-OCT-25")
+
+    assert list(chain.strikes) == [24900.0, 25000.0, 25050.0, 25100.0]
+    symbol = lambda row: None if row == MISSING_ROW else index.store.get_string('symbol', row)
+    assert [symbol(row) for row in chain.ce_rows] == [
+        "NIFTY28OCT2524900CE", "NIFTY28OCT2525000CE", None, "NIFTY28OCT2525100CE"]
+    assert symbol(chain.pe_rows[2]) == "NIFTY28OCT2525050PE"
+
+    # Compact expiries work too, and NIFTYNXT50 is its own underlying
+    assert index.get_chain("NIFTY", "NFO", "28oct25") is chain
+    assert list(index.get_chain("NIFTYNXT50", "NFO", "28-OCT-25").strikes) == [70000.0]
+    assert index.get_chain("NIFTY", "BFO", "28-OCT-25") is None
+    assert index.get_chain("NIFTY", "NFO", "04-NOV-25") is None
+    print("✅ PASSED: Chain index")
+
+
+def test_atm_window():
+    """Test the ATM strike and the window of strikes around it"""
+    chain = _load().get_derivatives_index().get_chain("NIFTY", "NFO", "28-OCT-25")
+
+    assert chain.strikes[chain.atm_index(25012.0)] == 25000.0
+    assert chain.strikes[chain.atm_index(25030.0)] == 25050.0
+    assert chain.strikes[chain.atm_index(10.0)] == 24900.0
+    assert chain.strikes[chain.atm_index(99999.0)] == 25100.0
+
+    assert list(chain.window(1, 1)) == [0, 1, 2]
+    assert list(chain.window(0, 2)) == [0, 1, 2]
+    assert list(chain.window(3, 10)) == [0, 1, 2, 3]
+    print("✅ PASSED: ATM window")
+
+
+def test_expiries_and_futures():
+    """Test that expiries are sorted by date and futures are found by expiry"""
+    index = _load().get_derivatives_index()
+
+    assert index.option_expiries("NIFTY", "NFO") == ["28-OCT-25", "30-DEC-25"]
+    assert index.future_expiries("NIFTY", "NFO") == ["28-OCT-25", "30-DEC-25"]
+    assert index.option_expiries("BANKNIFTY", "NFO") == []
+
+    store = index.store
+    assert store.get_string('symbol', index.nearest_future("NIFTY", "NFO", "04-NOV-25")) == "NIFTY30DEC25FUT"
+    assert store.get_string('symbol', index.nearest_future("NIFTY", "NFO")) == "NIFTY28OCT25FUT"
+    assert store.get_string('symbol', index.nearest_future("GOLD", "MCX", "25-NOV-25")) == "GOLD05DEC25FUT"
+    assert store.get_string('symbol', index.nearest_future("NIFTY", "NFO", "01-JAN-26")) == "NIFTY28OCT25FUT"
+    assert index.nearest_future("SILVER", "MCX") is None
+    print("✅ PASSED: Expiries and futures")
+
+
+def test_option_chain_service():
+    """Test the option chain service with a stub broker, priced from the spot or a future"""
+    import services.option_chain_service as service
+
+    cache = _load()
+    prices = {"NIFTY": 25012.0, "GOLD05DEC25FUT": 120400.0}
+    requested = []
+
+    class BrokerData:
+        def __init__(self, auth_token):
+            assert auth_token == "token"
+
+        def get_quotes(self, symbol, exchange):
+            requested.append((symbol, exchange))
+            if symbol == "NIFTY28OCT2525100PE":
+                raise RuntimeError("rate limited")
+            return {"ltp": prices.get(symbol, 100.0)}
+
+    originals = service.get_derivatives_index, service.symbol_exists, service.import_broker_module
+    service.get_derivatives_index = lambda underlying, exchange: cache.get_derivatives_index()
+    service.symbol_exists = cache.has_symbol
+    service.import_broker_module = lambda broker: types.SimpleNamespace(BrokerData=BrokerData)
+    max_quotes = service.OPTION_CHAIN_MAX_QUOTES
+    try:
+        success, data, status = service.get_option_chain(
+            "nifty", "NFO", "28-OCT-25", 1, auth_token="token", broker="stub")
+        assert success and status == 200
+        assert requested[0] == ("NIFTY", "NSE_INDEX")
+        assert data['atm_strike'] == 25000.0 and data['underlying_ltp'] == 25012.0
+        assert [row['strike'] for row in data['chain']] == [24900.0, 25000.0, 25050.0]
+        assert data['strike_count'] == 1
+        assert data['chain'][1]['ce'] == {"symbol": "NIFTY28OCT2525000CE", "lotsize": 75, "quote": {"ltp": 100.0}}
+        assert data['chain'][2]['ce'] is None
+
+        # A failed quote leaves the leg without one
+        success, data, status = service.get_option_chain(
+            "NIFTY", "NFO", "28OCT25", 2, auth_token="token", broker="stub")
+        assert data['chain'][-1]['pe'] == {"symbol": "NIFTY28OCT2525100PE", "lotsize": 75, "quote": None}
+
+        # Chains needing more quotes than OPTION_CHAIN_MAX_QUOTES are narrowed around ATM
+        service.OPTION_CHAIN_MAX_QUOTES = 4
+        requested.clear()
+        success, data, status = service.get_option_chain(
+            "NIFTY", "NFO", "28-OCT-25", 2, auth_token="token", broker="stub")
+        assert success and len(requested) == 3
+        assert [row['strike'] for row in data['chain']] == [25000.0]
+        assert data['strike_count'] == 0
+        service.OPTION_CHAIN_MAX_QUOTES = max_quotes
+
+        # MCX has no spot symbol: priced from the next future
+        requested.clear()
+        success, data, status = service.get_option_chain(
+            "GOLD", "MCX", "25-NOV-25", 5, auth_token="token", broker="stub")
+        assert success and requested[0] == ("GOLD05DEC25FUT", "MCX")
+        assert data['atm_strike'] == 120000.0
+
+        success, data, status = service.get_option_chain(
+            "NIFTY", "NFO", "04-NOV-25", 5, auth_token="token", broker="stub")
+        assert not success and status == 404
+
+        success, data, status = service.get_option_chain("NIFTY", "NFO", "28-OCT-25")
+        assert not success and status == 400
+    finally:
+        service.get_derivatives_index, service.symbol_exists, service.import_broker_module = originals
+        service.OPTION_CHAIN_MAX_QUOTES = max_quotes
+    print("✅ PASSED: Option chain service")
+
+
+def test_expiry_service():
+    """Test that expiry dates come from the index and the database is only a fallback"""
+    import services.expiry_service as service
+
+    cache = _load()
+    queried = []
+
+    def expiry_dates_dbquery(symbol, exchange, instrumenttype):
+        queried.append(symbol)
+        return ["31-DEC-25"] if symbol == "USDINR" else []
+
+    originals = service.get_derivatives_index, service.get_expiry_dates_dbquery
+    service.get_derivatives_index = lambda underlying, exchange: cache.get_derivatives_index()
+    service.get_expiry_dates_dbquery = expiry_dates_dbquery
+    try:
+        success, data, status = service.get_expiry_dates("nifty", "NFO", "options")
+        assert success and data['data'] == ["28-OCT-25", "30-DEC-25"]
+        success, data, status = service.get_expiry_dates("GOLD", "MCX", "futures")
+        assert data['data'] == ["05-DEC-25"]
+        assert queried == []
+
+        success, data, status = service.get_expiry_dates("USDINR", "CDS", "futures")
+        assert data['data'] == ["31-DEC-25"]
+        success, data, status = service.get_expiry_dates("BANKNIFTY", "NFO", "options")
+        assert success and data['data'] == []
+        assert queried == ["USDINR", "BANKNIFTY"]
+    finally:
+        service.get_derivatives_index, service.get_expiry_dates_dbquery = originals
+    print("✅ PASSED: Expiry service")
+
+
+if __name__ == '__main__':
+    test_chain_index()
+    test_atm_window()
+    test_expiries_and_futures()
+    test_option_chain_service()
+    test_expiry_service()
+    print("\nAll option chain tests passed")
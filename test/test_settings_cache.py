@@ -0,0 +1,130 @@
+"""
+Test suite for the settings cache in database.settings_db
+
+Tests:
+- Repeated settings reads don't query the database
+- Setters update the cached settings at once
+- A write by another worker is picked up through the version counter
+- SMTP and security settings are served from the same cache
+"""
+
+import sys
+import os
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event, text
+
+from database import settings_db
+
+
+class QueryCounter:
+    """Counts statements run on the settings engine"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __enter__(self):
+        event.listen(settings_db.engine, 'before_cursor_execute', self._count)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(settings_db.engine, 'before_cursor_execute', self._count)
+
+    def _count(self, *args):
+        self.count += 1
+
+
+def _with_settings(test):
+    def run():
+        settings_db.init_db()
+        interval = settings_db.SETTINGS_CACHE_CHECK_INTERVAL
+        original = settings_db.get_analyze_mode()
+        settings_db.SETTINGS_CACHE_CHECK_INTERVAL = 60
+        try:
+            test()
+        finally:
+            settings_db.SETTINGS_CACHE_CHECK_INTERVAL = interval
+            settings_db.set_analyze_mode(original)
+    run.__name__ = test.__name__
+    run.__doc__ = test.__doc__
+    return run
+
+
+def _write_from_other_worker(analyze_mode):
+    """Change the settings row and bump the version without going through this process's cache"""
+    with settings_db.engine.begin() as connection:
+        connection.execute(text("UPDATE settings SET analyze_mode = :mode"), {'mode': analyze_mode})
+        connection.execute(text("UPDATE settings_version SET version = version + 1 WHERE id = 1"))
+
+
+@_with_settings
+def test_cached_reads():
+    """Test that repeated reads are served without queries"""
+    settings_db.set_analyze_mode(False)
+    settings_db.get_analyze_mode()
+
+    with QueryCounter() as queries:
+        for _ in range(100):
+            assert settings_db.get_analyze_mode() is False
+    assert queries.count == 0
+    print("✅ PASSED: Cached reads")
+
+
+@_with_settings
+def test_setter_updates_cache():
+    """Test that a setter's change is visible at once"""
+    settings_db.set_analyze_mode(True)
+    assert settings_db.get_analyze_mode() is True
+    settings_db.set_analyze_mode(False)
+    assert settings_db.get_analyze_mode() is False
+    print("✅ PASSED: Setter updates cache")
+
+
+@_with_settings
+def test_other_worker_write():
+    """Test that another worker's write is picked up once the version is checked"""
+    settings_db.set_analyze_mode(False)
+    assert settings_db.get_analyze_mode() is False
+
+    _write_from_other_worker(True)
+    # Within the check interval the cached value is served
+    assert settings_db.get_analyze_mode() is False
+
+    settings_db.SETTINGS_CACHE_CHECK_INTERVAL = 0
+    assert settings_db.get_analyze_mode() is True
+
+    # An unchanged version costs one query and no reload
+    with QueryCounter() as queries:
+        assert settings_db.get_analyze_mode() is True
+    assert queries.count == 1
+    print("✅ PASSED: Other worker write")
+
+
+@_with_settings
+def test_smtp_and_security():
+    """Test that SMTP and security settings come from the cache and follow their setters"""
+    security = settings_db.get_security_settings()
+    smtp = settings_db.get_smtp_settings()
+
+    settings_db.set_security_settings(threshold_404=security['404_threshold'] + 1)
+    settings_db.set_smtp_settings(smtp_helo_hostname='cache-test.local')
+    try:
+        assert settings_db.get_security_settings()['404_threshold'] == security['404_threshold'] + 1
+        with QueryCounter() as queries:
+            assert settings_db.get_security_settings()['404_threshold'] == security['404_threshold'] + 1
+            assert settings_db.get_smtp_settings()['smtp_helo_hostname'] == 'cache-test.local'
+        assert queries.count == 0
+    finally:
+        settings_db.set_security_settings(threshold_404=security['404_threshold'])
+        settings_db.set_smtp_settings(smtp_helo_hostname=smtp['smtp_helo_hostname'] or '')
+    print("✅ PASSED: SMTP and security settings")
+
+
+if __name__ == '__main__':
+    test_cached_reads()
+    test_setter_updates_cache()
+    test_other_worker_write()
+    test_smtp_and_security()
+    print("\nAll settings cache tests passed")
@@ -0,0 +1,87 @@
+"""
+Test suite for starting the sharded WebSocket proxy from app.py
+
+The sharded proxy (WEBSOCKET_WORKERS > 1) spawns its processes, and spawn
+re-imports the parent's main module, app.py, as __mp_main__ in each of them.
+Importing app.py needs a configured .env, as running the app does; the
+import test is skipped without one.
+
+Tests:
+- Importing app.py the way a spawned process does doesn't start the proxy
+- should_start_websocket() is False in a spawned process
+"""
+
+import sys
+import os
+import multiprocessing
+import runpy
+
+import pytest
+
+# Add parent directory to path
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+
+def _import_app_as_spawned(results):
+    """Run app.py as spawn runs the parent's main module in a child"""
+    os.environ['WEBSOCKET_WORKERS'] = '2'
+    # As when app.py is the main script: the project root first (test/ has its own sandbox/)
+    sys.path.insert(0, ROOT)
+    os.chdir(ROOT)
+    # Take app.py's integrated branch even when the tests run in a container
+    os.environ['APP_MODE'] = 'integrated'
+    exists = os.path.exists
+    os.path.exists = lambda path: path != '/.dockerenv' and exists(path)
+    # The main module runs before the child finishes bootstrapping: no
+    # parent process yet, and starting processes isn't allowed
+    process = multiprocessing.current_process()
+    parent, multiprocessing.process._parent_process = multiprocessing.process._parent_process, None
+    process._inheriting = True
+    try:
+        runpy.run_path(os.path.join(ROOT, 'app.py'), run_name='__mp_main__')
+    finally:
+        del process._inheriting
+        multiprocessing.process._parent_process = parent
+    from websocket_proxy import app_integration
+    results.put((app_integration._websocket_server_started, app_integration._websocket_processes))
+    # The app's schedulers and executors keep non-daemon threads running
+    results.close()
+    results.join_thread()
+    os._exit(0)
+
+
+def _should_start(results):
+    from websocket_proxy.app_integration import should_start_websocket
+    results.put(should_start_websocket())
+
+
+def _run_spawned(target):
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    process = context.Process(target=target, args=(results,))
+    process.start()
+    process.join(300)
+    assert process.exitcode == 0
+    return results.get(timeout=10)
+
+
+def test_app_import_under_spawn():
+    """Test that a spawned process importing app.py doesn't start the proxy again"""
+    if not os.path.exists(os.path.join(ROOT, '.env')):
+        pytest.skip("importing app.py needs a configured .env")
+    started, processes = _run_spawned(_import_app_as_spawned)
+    assert started is False and processes is None
+    print("✅ PASSED: App import under spawn")
+
+
+def test_should_start_in_spawned_process():
+    """Test that spawned processes never start the WebSocket server"""
+    assert _run_spawned(_should_start) is False
+    print("✅ PASSED: Should start in spawned process")
+
+
+if __name__ == '__main__':
+    test_app_import_under_spawn()
+    test_should_start_in_spawned_process()
+    print("\nAll sharded startup tests passed")
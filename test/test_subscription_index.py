@@ -0,0 +1,84 @@
+"""
+Test suite for the WebSocket proxy subscription index
+
+Tests:
+- Adding and removing subscriptions
+- Fan-out lookup with and without a broker name in the topic
+- Client cleanup
+"""
+
+import sys
+import os
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from websocket_proxy.subscription_index import SubscriptionIndex
+
+
+def test_add_and_lookup():
+    """Test that lookups return only subscribed clients"""
+    index = SubscriptionIndex()
+
+    assert index.add(1, "angel", "NSE", "RELIANCE", 1), "First add should be new"
+    assert not index.add(1, "angel", "NSE", "RELIANCE", 1), "Duplicate add should be ignored"
+    index.add(2, "angel", "NSE", "RELIANCE", 1)
+    index.add(3, "angel", "NSE", "TCS", 1)
+    index.add(4, "angel", "NSE", "RELIANCE", 2)
+
+    assert index.get_clients("angel", "NSE", "RELIANCE", 1) == {1, 2}
+    assert index.get_clients("angel", "NSE", "RELIANCE", 2) == {4}
+    assert index.get_clients("zerodha", "NSE", "RELIANCE", 1) == set()
+    print("✅ PASSED: Add and lookup")
+
+
+def test_topic_without_broker():
+    """Test that topics without a broker name match every broker"""
+    index = SubscriptionIndex()
+    index.add(1, "angel", "NSE_INDEX", "NIFTY", 2)
+    index.add(2, "zerodha", "NSE_INDEX", "NIFTY", 2)
+
+    assert index.get_clients("unknown", "NSE_INDEX", "NIFTY", 2) == {1, 2}
+    assert index.get_clients(None, "NSE_INDEX", "NIFTY", 2) == {1, 2}
+    print("✅ PASSED: Topic without broker")
+
+
+def test_remove_and_cleanup():
+    """Test that removals leave no empty index entries behind"""
+    index = SubscriptionIndex()
+    index.add(1, "angel", "NSE", "RELIANCE", 1)
+    index.add(1, "angel", "NSE", "TCS", 1)
+    index.add(2, "angel", "NSE", "TCS", 1)
+
+    assert index.remove(1, "angel", "NSE", "RELIANCE", 1)
+    assert not index.remove(1, "angel", "NSE", "RELIANCE", 1), "Second remove should be a no-op"
+    assert not index.has_subscribers("angel", "NSE", "RELIANCE", 1)
+
+    removed = index.remove_client(1)
+    assert removed == [("angel", "NSE", "TCS", 1)]
+    assert index.get_clients("angel", "NSE", "TCS", 1) == {2}
+
+    index.remove_client(2)
+    assert len(index) == 0, "Index should be empty after all clients are removed"
+    assert index.get_clients(None, "NSE", "TCS", 1) == set()
+    print("✅ PASSED: Remove and cleanup")
+
+
+def test_lookup_returns_snapshot():
+    """Test that the returned set is safe to iterate while the index changes"""
+    index = SubscriptionIndex()
+    index.add(1, "angel", "NSE", "SBIN", 1)
+    index.add(2, "angel", "NSE", "SBIN", 1)
+
+    for client_id in index.get_clients("angel", "NSE", "SBIN", 1):
+        index.remove_client(client_id)
+
+    assert len(index) == 0
+    print("✅ PASSED: Lookup returns snapshot")
+
+
+if __name__ == '__main__':
+    test_add_and_lookup()
+    test_topic_without_broker()
+    test_remove_and_cleanup()
+    test_lookup_returns_snapshot()
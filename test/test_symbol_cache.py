@@ -0,0 +1,279 @@
+"""
+Test suite for the in-memory symbol cache (database.token_db_enhanced)
+
+Tests:
+- Lookups by symbol, token and broker symbol per exchange
+- Strings shared through the string table and None round trips
+- Measured memory reported by get_cache_info
+- Snapshot round trip, and stale snapshots being ignored
+- Corrupt snapshots being ignored and unmapped
+- Search ranking (exact > prefix > substring), multiple terms, exchange
+  filter and strikes
+- Full rows by symbol, with their database id, and symbol existence
+- Lookups staying consistent while the cache is reloaded in another thread
+- Search and derivatives indexes built when a broker's cache is loaded
+"""
+
+import sys
+import os
+import json
+import mmap
+import tempfile
+import threading
+from types import SimpleNamespace
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.token_db_enhanced import BrokerSymbolCache, SymbolData
+from database import symbol_snapshot
+from database.symbol_snapshot import read_snapshot, write_snapshot
+
+SAMPLE_ROWS = [
+    ("SBIN", "SBIN-EQ", "STATE BANK OF INDIA", "NSE", "NSE", "3045", None, None, 1, "EQ", 0.05),
+    ("SBIN", "SBIN", "STATE BANK OF INDIA", "BSE", "BSE", "500112", None, None, 1, "EQ", 0.05),
+    ("NIFTY28OCT2525000CE", "NIFTY28OCT25C25000", "NIFTY", "NFO", "NFO", "43001", "28-OCT-25", 25000.0, 75, "CE", 0.05),
+    ("NIFTY28OCT2525000PE", "NIFTY28OCT25P25000", "NIFTY", "NFO", "NFO", "43002", "28-OCT-25", 25000.0, 75, "PE", 0.05),
+]
+
+SEARCH_ROWS = SAMPLE_ROWS + [
+    ("SBICARD", "SBICARD-EQ", "SBI CARDS AND PAYMENT", "NSE", "NSE", "17971", None, None, 1, "EQ", 0.05),
+    ("NIFTY", "Nifty 50", "NIFTY", "NSE_INDEX", "NSE", "99926000", None, None, 1, "INDEX", 0.05),
+    ("BANKNIFTY28OCT2525000CE", "BANKNIFTY28OCT25C25000", "BANKNIFTY", "NFO", "NFO", "43101", "28-OCT-25", 25000.0, 35, "CE", 0.05),
+    ("NIFTY28OCT2525500CE", "NIFTY28OCT25C25500", "NIFTY", "NFO", "NFO", "43003", "28-OCT-25", 25500.0, 75, "CE", 0.05),
+]
+
+
+def _load_sample():
+    cache = BrokerSymbolCache()
+    assert cache.load_rows("angel", iter(SAMPLE_ROWS))
+    return cache
+
+
+def test_lookups():
+    """Test the per-exchange lookups used by token_db"""
+    cache = _load_sample()
+
+    assert cache.get_token("SBIN", "NSE") == "3045"
+    assert cache.get_token("SBIN", "BSE") == "500112"
+    assert cache.get_symbol("43002", "NFO") == "NIFTY28OCT2525000PE"
+    assert cache.get_br_symbol("SBIN", "NSE") == "SBIN-EQ"
+    assert cache.get_oa_symbol("NIFTY28OCT25C25000", "NFO") == "NIFTY28OCT2525000CE"
+    assert cache.get_brexchange("SBIN", "BSE") == "BSE"
+    assert cache.get_token("SBIN", "NFO") is None
+    assert cache.get_tokens_bulk([("SBIN", "NSE"), ("INFY", "NSE")]) == ["3045", None]
+    assert cache.stats.misses == 2
+    print("✅ PASSED: Lookups")
+
+
+def test_rows_and_string_table():
+    """Test that rows round trip and repeated strings are stored once"""
+    cache = _load_sample()
+
+    assert cache.get_symbol_data("3045") == SymbolData(*SAMPLE_ROWS[0])
+    assert cache.get_symbol_data("43001").strike == 25000.0
+    assert cache.get_symbol_data("3045").expiry is None
+
+    strings = cache.store.strings
+    assert strings.count("NFO") == 1
+    assert strings.count("STATE BANK OF INDIA") == 1
+    assert [s.symbol for s in cache.search_symbols("nifty", "NFO")] == ["NIFTY28OCT2525000CE", "NIFTY28OCT2525000PE"]
+    print("✅ PASSED: Rows and string table")
+
+
+def test_measured_memory():
+    """Test that memory is measured rather than estimated per symbol"""
+    cache = _load_sample()
+    info = cache.get_cache_info()
+
+    assert info['total_symbols'] == len(SAMPLE_ROWS)
+    assert info['memory_bytes'] > 0
+    assert info['memory_bytes'] != len(SAMPLE_ROWS) * 500
+
+    cache.clear_cache()
+    assert cache.get_cache_info()['memory_bytes'] == 0
+    assert cache.get_token("SBIN", "NSE") is None
+    print("✅ PASSED: Measured memory")
+
+
+def test_snapshot_round_trip():
+    """Test that a mapped snapshot serves the same lookups and stale ones are ignored"""
+    cache = _load_sample()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "symbols-angel.snapshot")
+        assert write_snapshot(cache.store, "angel", "2025-10-01T08:30:00", path)
+
+        assert read_snapshot("angel", "2025-10-02T08:30:00", path) is None
+        assert read_snapshot("zerodha", "2025-10-01T08:30:00", path) is None
+
+        store = read_snapshot("angel", "2025-10-01T08:30:00", path)
+        warm = BrokerSymbolCache()
+        assert warm.load_store("angel", store)
+
+        assert warm.get_cache_info()['source'] == 'snapshot'
+        assert warm.get_cache_info()['mapped_bytes'] > 0
+        assert warm.get_token("SBIN", "BSE") == "500112"
+        assert warm.get_oa_symbol("NIFTY28OCT25P25000", "NFO") == "NIFTY28OCT2525000PE"
+        for row in SAMPLE_ROWS:
+            assert warm.get_symbol_data(row[5]) == SymbolData(*row)
+
+        warm.clear_cache()
+        del store
+    print("✅ PASSED: Snapshot round trip")
+
+
+def test_corrupt_snapshot():
+    """Test that a snapshot with a corrupt string table is ignored and unmapped"""
+    cache = _load_sample()
+    mappings = []
+
+    class TrackedMmap(mmap.mmap):
+        def __init__(self, *args, **kwargs):
+            mappings.append(self)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "symbols-angel.snapshot")
+        assert write_snapshot(cache.store, "angel", "2025-10-01T08:30:00", path)
+
+        # Claim one more string than the table holds, keeping the header length
+        with open(path, 'r+b') as f:
+            _, header_length = symbol_snapshot._PREFIX.unpack(f.read(symbol_snapshot._PREFIX.size))
+            header = json.loads(f.read(header_length))
+            header['string_count'] += 1
+            header_bytes = json.dumps(header).encode()
+            assert len(header_bytes) <= header_length
+            f.seek(symbol_snapshot._PREFIX.size)
+            f.write(header_bytes.ljust(header_length))
+
+        symbol_snapshot.mmap = SimpleNamespace(mmap=TrackedMmap, ACCESS_READ=mmap.ACCESS_READ)
+        try:
+            assert read_snapshot("angel", "2025-10-01T08:30:00", path) is None
+        finally:
+            symbol_snapshot.mmap = mmap
+        assert len(mappings) == 1 and mappings[0].closed
+    print("✅ PASSED: Corrupt snapshot")
+
+
+def test_search():
+    """Test search ranking, multiple terms, exchange filter and strikes"""
+    cache = BrokerSymbolCache()
+    assert cache.load_rows("angel", iter(SEARCH_ROWS))
+
+    def search(query, exchange=None, limit=50):
+        return [(s.symbol, s.exchange) for s in cache.search_symbols(query, exchange, limit)]
+
+    # Exact before prefix before substring
+    assert search("nifty")[0] == ("NIFTY", "NSE_INDEX")
+    assert search("nifty")[-1] == ("BANKNIFTY28OCT2525000CE", "NFO")
+    assert search("SBI") == [("SBICARD", "NSE"), ("SBIN", "NSE"), ("SBIN", "BSE")]
+    assert [symbol for symbol, _ in search("SBIN")] == ["SBIN", "SBIN"]
+    assert search("sbin", "BSE") == [("SBIN", "BSE")]
+    assert search("2885") == []
+
+    # Names, tokens and substrings of symbols
+    assert search("state bank") == [("SBIN", "NSE"), ("SBIN", "BSE")]
+    assert search("43002") == [("NIFTY28OCT2525000PE", "NFO")]
+    assert search("0011") == [("SBIN", "BSE")]
+    assert search("0011 sbin") == [("SBIN", "BSE")]
+    assert search("OCT2525500") == [("NIFTY28OCT2525500CE", "NFO")]
+
+    # All terms must match; a spelled out symbol ranks first
+    assert search("NIFTY 28OCT25 25000 CE") == [("NIFTY28OCT2525000CE", "NFO"), ("BANKNIFTY28OCT2525000CE", "NFO")]
+    assert search("NIFTY 25000", "NFO") == [("NIFTY28OCT2525000CE", "NFO"), ("NIFTY28OCT2525000PE", "NFO"),
+                                            ("BANKNIFTY28OCT2525000CE", "NFO")]
+    assert search("25000 pe") == [("NIFTY28OCT2525000PE", "NFO")]
+
+    # Limits, unknown exchanges and empty queries
+    assert len(search("nifty", limit=2)) == 2
+    assert search("nifty", "MCX") == []
+    assert len(search("", "NFO")) == 4
+    print("✅ PASSED: Search")
+
+
+def test_symbol_info():
+    """Test full rows by symbol and exchange, with the database id kept through a snapshot"""
+    cache = BrokerSymbolCache()
+    rows = [row + (index + 1,) for index, row in enumerate(SAMPLE_ROWS)]
+    assert cache.load_rows("angel", iter(rows))
+
+    assert cache.get_symbol_info("SBIN", "BSE") == SymbolData(*rows[1])
+    assert cache.get_symbol_info("SBIN", "BSE").id == 2
+    assert cache.get_symbol_info("SBIN", "NFO") is None
+    assert cache.has_symbol("NIFTY28OCT2525000PE", "NFO")
+    assert not cache.has_symbol("NIFTY28OCT2525000PE", "BFO")
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "symbols-angel.snapshot")
+        assert write_snapshot(cache.store, "angel", "2025-10-01T08:30:00", path)
+        warm = BrokerSymbolCache()
+        assert warm.load_store("angel", read_snapshot("angel", "2025-10-01T08:30:00", path))
+        assert warm.get_symbol_info("NIFTY28OCT2525000CE", "NFO").id == 3
+        warm.clear_cache()
+    print("✅ PASSED: Symbol info")
+
+
+def test_lookups_during_reload():
+    """Test that lookups never see a store without its indexes while another thread reloads"""
+    cache = _load_sample()
+    rows = [row + (index + 1,) for index, row in enumerate(SAMPLE_ROWS)]
+    done = threading.Event()
+    errors = []
+
+    def reload():
+        try:
+            for count in range(200):
+                if count % 2:
+                    cache.load_rows("angel", iter(SAMPLE_ROWS))
+                else:
+                    cache.apply_changes("angel", [4], [rows[3]])
+        except Exception as e:
+            errors.append(e)
+        finally:
+            done.set()
+
+    thread = threading.Thread(target=reload)
+    thread.start()
+    while not done.is_set():
+        try:
+            assert cache.get_token("SBIN", "NSE") == "3045"
+            assert cache.get_symbol_info("NIFTY28OCT2525000PE", "NFO").token == "43002"
+            assert cache.get_symbols_bulk([("500112", "BSE")]) == ["SBIN"]
+        except Exception as e:
+            errors.append(e)
+            break
+    thread.join()
+
+    assert errors == []
+    assert cache.cache_loaded and len(cache.store) == len(SAMPLE_ROWS)
+    print("✅ PASSED: Lookups during reload")
+
+
+def test_indexes_built_on_load():
+    """Test that loading a broker's cache builds the search and derivatives indexes up front"""
+    from database import token_db_enhanced
+    from database.master_contract_refresh import ContractChanges
+
+    cache = _load_sample()
+    original = token_db_enhanced._cache_instance
+    token_db_enhanced._cache_instance = cache
+    try:
+        assert token_db_enhanced.load_cache_for_broker("angel", ContractChanges(unchanged=True))
+    finally:
+        token_db_enhanced._cache_instance = original
+    assert set(cache._derived_indexes) == {"search", "derivatives"}
+    assert all(index.store is cache.store for index in cache._derived_indexes.values())
+    print("✅ PASSED: Indexes built on load")
+
+
+if __name__ == '__main__':
+    test_lookups()
+    test_rows_and_string_table()
+    test_measured_memory()
+    test_snapshot_round_trip()
+    test_corrupt_snapshot()
+    test_search()
+    test_symbol_info()
+    test_lookups_during_reload()
+    test_indexes_built_on_load()
+    print("\nAll symbol cache tests passed")
@@ -0,0 +1,166 @@
+"""
+Test suite for the symtoken bulk loader
+
+Tests:
+- Rows land in symtoken with NaN loaded as NULL and missing columns as NULL
+- Rows whose token (or token and exchange) already exist are skipped
+- Indexes are rebuilt after a load that dropped them, and kept for small loads
+- A failed load rolls back with the caller's transaction
+- SQLite pragmas are restored after the load
+"""
+
+import sys
+import os
+import tempfile
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+from sqlalchemy import create_engine, inspect, Column, Integer, String, Float, Sequence, Index
+from sqlalchemy.orm import declarative_base, sessionmaker
+
+from database.symtoken_loader import bulk_load_symtoken
+
+Base = declarative_base()
+
+
+class SymToken(Base):
+    __tablename__ = 'symtoken'
+    id = Column(Integer, Sequence('symtoken_id_seq'), primary_key=True)
+    symbol = Column(String, nullable=False, index=True)
+    brsymbol = Column(String, nullable=False, index=True)
+    name = Column(String)
+    exchange = Column(String, index=True)
+    brexchange = Column(String, index=True)
+    token = Column(String, index=True)
+    expiry = Column(String)
+    strike = Column(Float)
+    lotsize = Column(Integer)
+    instrumenttype = Column(String)
+    tick_size = Column(Float)
+
+    __table_args__ = (
+        Index('idx_symbol_exchange', 'symbol', 'exchange'),
+        Index('idx_symbol_name', 'symbol', 'name'),
+        Index('idx_brsymbol_exchange', 'brsymbol', 'exchange'),
+    )
+
+
+def _frame(count, exchange='NFO', start=0):
+    return pd.DataFrame({
+        'symbol': [f"NIFTY28OCT25{20000 + i}CE" for i in range(start, start + count)],
+        'brsymbol': [f"NIFTY25OCT{20000 + i}CE" for i in range(start, start + count)],
+        'name': 'NIFTY',
+        'exchange': exchange,
+        'brexchange': exchange,
+        'token': [str(40000 + i) for i in range(start, start + count)],
+        'expiry': '28-OCT-25',
+        'strike': [float(20000 + i) for i in range(start, start + count)],
+        'lotsize': 75,
+        'instrumenttype': 'CE',
+    })
+
+
+def _session():
+    path = os.path.join(tempfile.mkdtemp(), 'symtoken.db')
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    return engine, sessionmaker(bind=engine)()
+
+
+def _index_names(engine):
+    return sorted(index['name'] for index in inspect(engine).get_indexes('symtoken'))
+
+
+def test_load():
+    """Test that rows are loaded with NaN and missing columns as NULL"""
+    engine, session = _session()
+    df = _frame(25000)
+    df.loc[0, 'expiry'] = float('nan')
+
+    assert bulk_load_symtoken(session.connection(), df) == 25000
+    session.commit()
+
+    rows = session.query(SymToken).order_by(SymToken.id).all()
+    assert len(rows) == 25000
+    assert rows[0].expiry is None and rows[0].tick_size is None
+    assert (rows[1].symbol, rows[1].token, rows[1].strike, rows[1].lotsize) == ("NIFTY28OCT2520001CE", "40001", 20001.0, 75)
+    print("✅ PASSED: Load")
+
+
+def test_skip_existing():
+    """Test that rows with existing tokens, or token and exchange, are skipped"""
+    engine, session = _session()
+    bulk_load_symtoken(session.connection(), _frame(10))
+    session.commit()
+
+    # Tokens 40005-40014: the first five exist
+    assert bulk_load_symtoken(session.connection(), _frame(10, start=5)) == 5
+    # Same tokens on another exchange are new by token and exchange
+    assert bulk_load_symtoken(session.connection(), _frame(10, exchange='BFO'), ('token', 'exchange')) == 10
+    assert bulk_load_symtoken(session.connection(), _frame(3), None) == 3
+    session.commit()
+    assert session.query(SymToken).count() == 28
+    print("✅ PASSED: Skip existing")
+
+
+def test_indexes():
+    """Test that indexes are rebuilt after a large load and the query plan uses them"""
+    engine, session = _session()
+    before = _index_names(engine)
+    assert 'idx_symbol_exchange' in before and 'ix_symtoken_token' in before
+
+    bulk_load_symtoken(session.connection(), _frame(1000))
+    bulk_load_symtoken(session.connection(), _frame(10, start=1000))
+    session.commit()
+    assert _index_names(engine) == before
+
+    with engine.connect() as connection:
+        plan = connection.exec_driver_sql(
+            "EXPLAIN QUERY PLAN SELECT * FROM symtoken WHERE symbol = 'X' AND exchange = 'NFO'").fetchall()
+    assert 'idx_symbol_exchange' in str(plan)
+    print("✅ PASSED: Indexes")
+
+
+def test_rollback():
+    """Test that a failed load leaves the table and its indexes unchanged"""
+    engine, session = _session()
+    bulk_load_symtoken(session.connection(), _frame(10))
+    session.commit()
+    before = _index_names(engine)
+
+    df = _frame(100, start=10)
+    df.loc[50, 'symbol'] = None  # symbol is NOT NULL
+    try:
+        bulk_load_symtoken(session.connection(), df)
+        assert False, "expected the load to fail"
+    except Exception:
+        session.rollback()
+
+    assert session.query(SymToken).count() == 10
+    assert _index_names(engine) == before
+    print("✅ PASSED: Rollback")
+
+
+def test_pragmas_restored():
+    """Test that the SQLite load pragmas are restored afterwards"""
+    engine, session = _session()
+    connection = session.connection()
+    cache_size = connection.exec_driver_sql("PRAGMA cache_size").scalar()
+    temp_store = connection.exec_driver_sql("PRAGMA temp_store").scalar()
+
+    bulk_load_symtoken(connection, _frame(10))
+    assert connection.exec_driver_sql("PRAGMA cache_size").scalar() == cache_size
+    assert connection.exec_driver_sql("PRAGMA temp_store").scalar() == temp_store
+    session.commit()
+    print("✅ PASSED: Pragmas restored")
+
+
+if __name__ == '__main__':
+    test_load()
+    test_skip_existing()
+    test_indexes()
+    test_rollback()
+    test_pragmas_restored()
+    print("\nAll symtoken loader tests passed")
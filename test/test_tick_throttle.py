@@ -0,0 +1,69 @@
+"""
+Test suite for the WebSocket proxy per-subscription throttle
+
+Tests:
+- Interval bookkeeping per client and instrument
+- Coalescing to the latest pending update
+- Cleanup of a client's throttle state
+"""
+
+import sys
+import os
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from websocket_proxy.tick_throttle import TickThrottle
+
+KEY = ("NSE", "SBIN", 1)
+
+
+def test_interval():
+    """Test that updates are due once per interval"""
+    throttle = TickThrottle()
+    throttle.set_interval(1, KEY, 0.2)
+
+    assert throttle.is_throttled(1, KEY)
+    assert not throttle.is_throttled(2, KEY), "Other clients get the full stream"
+    assert throttle.due_in(1, KEY, 10.0) <= 0, "First update is sent immediately"
+
+    throttle.mark_sent(1, KEY, 10.0)
+    assert abs(throttle.due_in(1, KEY, 10.05) - 0.15) < 1e-9
+    assert throttle.due_in(1, KEY, 10.2) <= 0
+    print("✅ PASSED: Interval")
+
+
+def test_coalesce_latest():
+    """Test that only the latest held update is flushed"""
+    throttle = TickThrottle()
+    throttle.set_interval(1, KEY, 0.2)
+
+    assert throttle.hold(1, KEY, {"ltp": 1.0}), "First held update needs a flush"
+    assert not throttle.hold(1, KEY, {"ltp": 2.0}), "Flush is already scheduled"
+    assert throttle.has_pending(1, KEY)
+    assert throttle.take(1, KEY) == {"ltp": 2.0}
+    assert throttle.take(1, KEY) is None
+    print("✅ PASSED: Coalesce latest")
+
+
+def test_remove():
+    """Test that clearing a throttle drops its pending update"""
+    throttle = TickThrottle()
+    throttle.set_interval(1, KEY, 0.2)
+    throttle.set_interval(1, ("NSE", "TCS", 1), 1.0)
+    throttle.hold(1, KEY, {"ltp": 1.0})
+
+    throttle.set_interval(1, KEY, None)
+    assert not throttle.is_throttled(1, KEY)
+    assert throttle.take(1, KEY) is None, "Pending update of an unthrottled subscription is dropped"
+
+    throttle.remove_client(1)
+    assert not throttle.is_throttled(1, ("NSE", "TCS", 1))
+    print("✅ PASSED: Remove")
+
+
+if __name__ == '__main__':
+    test_interval()
+    test_coalesce_latest()
+    test_remove()
+    print("\nAll tick throttle tests passed")
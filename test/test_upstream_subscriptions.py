@@ -0,0 +1,78 @@
+"""
+Test suite for the WebSocket proxy upstream subscription refcounts
+
+Tests:
+- Adapter calls only on 0 -> 1 and 1 -> 0 transitions
+- Recorded subscribe responses are shared by later clients
+- Dropping all of a user's subscriptions
+"""
+
+import sys
+import os
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from websocket_proxy.upstream_subscriptions import UpstreamSubscriptions
+
+
+def test_acquire_and_release_transitions():
+    """Test that only the first acquire and the last release report a transition"""
+    upstream = UpstreamSubscriptions()
+
+    assert upstream.acquire("user1", "NSE", "SBIN", 1), "First reference should be 0 -> 1"
+    assert not upstream.acquire("user1", "NSE", "SBIN", 1), "Second reference should not"
+    assert upstream.refcount("user1", "NSE", "SBIN", 1) == 2
+
+    assert not upstream.release("user1", "NSE", "SBIN", 1), "Releasing one of two should not"
+    assert upstream.is_subscribed("user1", "NSE", "SBIN", 1)
+    assert upstream.release("user1", "NSE", "SBIN", 1), "Last release should be 1 -> 0"
+    assert not upstream.is_subscribed("user1", "NSE", "SBIN", 1)
+    assert not upstream.release("user1", "NSE", "SBIN", 1), "Releasing an unknown key is a no-op"
+    assert len(upstream) == 0
+    print("✅ PASSED: Acquire and release transitions")
+
+
+def test_keys_are_per_user_and_mode():
+    """Test that users and modes are counted separately"""
+    upstream = UpstreamSubscriptions()
+
+    assert upstream.acquire("user1", "NSE", "SBIN", 1)
+    assert upstream.acquire("user2", "NSE", "SBIN", 1), "Another user's adapter needs its own subscription"
+    assert upstream.acquire("user1", "NSE", "SBIN", 3), "Another mode needs its own subscription"
+    assert len(upstream) == 3
+    print("✅ PASSED: Keys are per user and mode")
+
+
+def test_response_is_shared():
+    """Test that the first subscribe response is returned for later references"""
+    upstream = UpstreamSubscriptions()
+
+    upstream.acquire("user1", "NSE", "SBIN", 3, {"status": "success", "actual_depth": 5})
+    upstream.acquire("user1", "NSE", "SBIN", 3, {"status": "success", "actual_depth": 20})
+    assert upstream.get_response("user1", "NSE", "SBIN", 3)["actual_depth"] == 5
+    assert upstream.get_response("user1", "NSE", "TCS", 3) is None
+    print("✅ PASSED: Response is shared")
+
+
+def test_remove_user():
+    """Test that removing a user drops only that user's subscriptions"""
+    upstream = UpstreamSubscriptions()
+    upstream.acquire("user1", "NSE", "SBIN", 1)
+    upstream.acquire("user1", "NSE", "SBIN", 1)
+    upstream.acquire("user1", "NSE_INDEX", "NIFTY", 2)
+    upstream.acquire("user2", "NSE", "SBIN", 1)
+
+    removed = upstream.remove_user("user1")
+    assert sorted(removed) == [("user1", "NSE", "SBIN", 1), ("user1", "NSE_INDEX", "NIFTY", 2)]
+    assert not upstream.is_subscribed("user1", "NSE", "SBIN", 1)
+    assert upstream.is_subscribed("user2", "NSE", "SBIN", 1)
+    print("✅ PASSED: Remove user")
+
+
+if __name__ == '__main__':
+    test_acquire_and_release_transitions()
+    test_keys_are_per_user_and_mode()
+    test_response_is_shared()
+    test_remove_user()
+    print("\nAll upstream subscription tests passed")
@@ -0,0 +1,63 @@
+"""
+Test suite for WebSocket proxy ZeroMQ topic encoding
+
+Tests:
+- Structured topic build/parse round trip
+- Conversion of legacy underscore topics published by broker adapters
+- Subscription prefixes only match the intended instrument and mode
+"""
+
+import sys
+import os
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from websocket_proxy.topics import (
+    build_topic, normalize_topic, parse_topic, subscription_prefix
+)
+
+
+def test_round_trip():
+    """Test that structured topics parse back without heuristics"""
+    assert parse_topic(build_topic("NSE_INDEX", "NIFTY", "LTP")) == ("unknown", "NSE_INDEX", "NIFTY", "LTP")
+    assert parse_topic(build_topic("NFO", "NIFTY_28NOV24_FUT", "QUOTE", "dhan")) == \
+        ("dhan", "NFO", "NIFTY_28NOV24_FUT", "QUOTE")
+    assert parse_topic("NSE_RELIANCE_LTP") is None, "Legacy topics are not structured"
+    print("✅ PASSED: Round trip")
+
+
+def test_normalize_legacy_topics():
+    """Test conversion of the topics adapters publish today"""
+    data = {"exchange": "NSE", "symbol": "RELIANCE"}
+    assert normalize_topic("NSE_RELIANCE_LTP", data) == "NSE|RELIANCE|LTP|"
+    assert normalize_topic("dhan_NSE_RELIANCE_QUOTE", data) == "NSE|RELIANCE|QUOTE|dhan"
+
+    # Market data fields make symbols with underscores unambiguous
+    data = {"exchange": "NFO", "symbol": "ABC_XYZ"}
+    assert normalize_topic("NFO_ABC_XYZ_DEPTH", data) == "NFO|ABC_XYZ|DEPTH|"
+
+    # Without market data fields the legacy heuristics are used
+    assert normalize_topic("NSE_INDEX_NIFTY_LTP") == "NSE_INDEX|NIFTY|LTP|"
+    assert normalize_topic("BSE_INDEX_SENSEX_QUOTE", {}) == "BSE_INDEX|SENSEX|QUOTE|"
+
+    assert normalize_topic("DEBUG_MARKET_DATA", {}) is None
+    assert normalize_topic("NSE|SBIN|LTP|") == "NSE|SBIN|LTP|"
+    print("✅ PASSED: Normalize legacy topics")
+
+
+def test_subscription_prefix():
+    """Test that a prefix matches only its own instrument and mode"""
+    prefix = subscription_prefix("NSE", "SBIN", 1)
+    assert prefix == b"NSE|SBIN|LTP|"
+    assert build_topic("NSE", "SBIN", "LTP", "angel").encode().startswith(prefix)
+    assert not build_topic("NSE", "SBINX", "LTP").encode().startswith(prefix)
+    assert not build_topic("NSE", "SBIN", "QUOTE").encode().startswith(prefix)
+    assert subscription_prefix("NSE", "SBIN", "Unknown") is None
+    print("✅ PASSED: Subscription prefix")
+
+
+if __name__ == '__main__':
+    test_round_trip()
+    test_normalize_legacy_topics()
+    test_subscription_prefix()
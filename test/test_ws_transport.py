@@ -0,0 +1,77 @@
+"""
+Test suite for the market data bus transport selection
+
+Tests:
+- Resolving 'auto' for single and multi-process proxies
+- Endpoints per transport and shard
+- Adapters publishing to an inproc endpoint bound by the proxy side
+"""
+
+import sys
+import os
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import zmq
+
+from websocket_proxy import transport
+
+
+def test_resolve_transport():
+    """Test that auto picks inproc in one process and never inproc across processes"""
+    assert transport.resolve_transport("auto") == "inproc"
+    assert transport.resolve_transport("auto", multiprocess=True) in ("ipc", "tcp")
+    assert transport.resolve_transport("inproc", multiprocess=True) != "inproc"
+    assert transport.resolve_transport("tcp", multiprocess=True) == "tcp"
+
+    try:
+        transport.resolve_transport("udp")
+        assert False, "Unknown transports should be rejected"
+    except ValueError:
+        pass
+    print("✅ PASSED: Resolve transport")
+
+
+def test_endpoints():
+    """Test that each shard gets its own endpoint"""
+    assert transport.bus_endpoint("inproc").startswith("inproc://")
+    assert transport.bus_endpoint("ipc", 0) != transport.bus_endpoint("ipc", 1)
+
+    zmq_port = int(os.getenv('ZMQ_PORT', '5555'))
+    assert transport.bus_endpoint("tcp", 2).endswith(f":{zmq_port + 2}")
+    print("✅ PASSED: Endpoints")
+
+
+def test_inproc_publish():
+    """Test that a PUB socket connected to publish_endpoints reaches a bound SUB socket"""
+    endpoint = transport.bus_endpoint("inproc", 7)
+    transport.set_publish_endpoints([endpoint])
+    try:
+        context = transport.bus_context()
+        sub = context.socket(zmq.SUB)
+        sub.bind(endpoint)
+        sub.setsockopt(zmq.SUBSCRIBE, b"NSE|SBIN|")
+        pub = context.socket(zmq.PUB)
+        for publish_endpoint in transport.publish_endpoints():
+            pub.connect(publish_endpoint)
+
+        received = None
+        for _ in range(100):
+            pub.send_multipart([b"NSE|SBIN|LTP|", b"{}"])
+            if sub.poll(10):
+                received = sub.recv_multipart()
+                break
+        pub.close(linger=0)
+        sub.close(linger=0)
+        assert received == [b"NSE|SBIN|LTP|", b"{}"]
+    finally:
+        transport._publish_endpoints = None
+    print("✅ PASSED: Inproc publish")
+
+
+if __name__ == '__main__':
+    test_resolve_transport()
+    test_endpoints()
+    test_inproc_publish()
+    print("\nAll transport tests passed")
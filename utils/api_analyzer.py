@@ -1,7 +1,7 @@
 from datetime import datetime, timedelta
 import pytz
 from database.analyzer_db import AnalyzerLog, db_session
-from database.symbol import SymToken
+from database.token_db_enhanced import symbol_exists
 from sqlalchemy import func
 import json
 from extensions import socketio
@@ -76,13 +76,9 @@ def check_rate_limits(user_id):
         return False
 
 def validate_symbol(symbol: str, exchange: str) -> bool:
-    """Validate if symbol exists in the database for given exchange"""
+    """Validate if symbol exists in the master contract for given exchange"""
     try:
-        symbol_exists = SymToken.query.filter(
-            SymToken.symbol == symbol,
-            SymToken.exchange == exchange
-        ).first() is not None
-        return symbol_exists
+        return symbol_exists(symbol, exchange)
     except Exception as e:
         logger.error(f"Error validating symbol: {str(e)}")
         return False
@@ -4,6 +4,7 @@ from threading import Thread
 from utils.session import get_session_expiry_time, set_session_login_time
 from database.auth_db import upsert_auth, get_feed_token as db_get_feed_token
 from database.master_contract_status_db import init_broker_status, update_status
+from database.master_contract_refresh import master_contract_refresh
 import importlib
 from utils.logging import get_logger
 
@@ -46,7 +47,9 @@ def async_master_contract_download(broker):
 
     # Use the dynamically imported module's master_contract_download function
     try:
-        master_contract_status = master_contract_module.master_contract_download()
+        # Applied to symtoken as a diff against the previous contract once the download returns
+        with master_contract_refresh(broker) as refresh:
+            master_contract_status = master_contract_module.master_contract_download()
         
         # Most brokers return the socketio.emit result, we need to check completion
         # by looking at the module's actual completion
@@ -66,7 +69,7 @@ def async_master_contract_download(broker):
         try:
             from database.master_contract_cache_hook import hook_into_master_contract_download
             logger.info(f"Loading symbols into memory cache for broker: {broker}")
-            hook_into_master_contract_download(broker)
+            hook_into_master_contract_download(broker, refresh.changes)
         except Exception as cache_error:
             logger.error(f"Failed to load symbols into cache: {cache_error}")
             # Don't fail the whole process if cache loading fails
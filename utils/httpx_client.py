@@ -2,6 +2,10 @@
 Shared httpx client module with connection pooling support for all broker APIs
 with automatic protocol negotiation (HTTP/2 when available, HTTP/1.1 fallback)
 """
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
 import httpx
 from typing import Optional
 from utils.logging import get_logger
@@ -12,6 +16,104 @@ logger = get_logger(__name__)
 # Global httpx client for connection pooling
 _httpx_client = None
 
+# Broker calls made through the shared client while a caller is timing them
+_broker_calls: ContextVar[Optional['BrokerCalls']] = ContextVar('broker_calls', default=None)
+
+
+class BrokerCall:
+    """One HTTP call to a broker made through the shared client"""
+
+    __slots__ = ('method', 'url', 'status_code', 'sent_at', 'headers_at', 'response')
+
+    def __init__(self, method, url, status_code, sent_at, headers_at, response):
+        self.method = method
+        self.url = url
+        self.status_code = status_code
+        self.sent_at = sent_at  # time.perf_counter() when the request was sent
+        self.headers_at = headers_at  # time.perf_counter() when the response headers arrived
+        self.response = response
+
+    @property
+    def elapsed(self) -> float:
+        """Seconds from sending the request to reading the whole response"""
+        try:
+            return self.response.elapsed.total_seconds()
+        except RuntimeError:
+            # Response not read (yet): time to the response headers
+            return self.headers_at - self.sent_at
+
+    @property
+    def received_at(self) -> float:
+        return self.sent_at + self.elapsed
+
+
+class BrokerCalls(list):
+    """The BrokerCall objects recorded by track_broker_calls, in completion order"""
+
+    def __init__(self):
+        super().__init__()
+        self._pending = {}
+        # Worker threads running in a copy of the caller's context share this list
+        self._lock = threading.Lock()
+
+    def _sent(self, request: httpx.Request):
+        with self._lock:
+            self._pending[id(request)] = time.perf_counter()
+
+    def _received(self, response: httpx.Response):
+        headers_at = time.perf_counter()
+        request = response.request
+        with self._lock:
+            sent_at = self._pending.pop(id(request), None)
+            if sent_at is not None:
+                self.append(BrokerCall(request.method, str(request.url), response.status_code,
+                                       sent_at, headers_at, response))
+
+    @property
+    def elapsed(self) -> float:
+        """Seconds during which at least one broker call was in flight"""
+        total, busy_until = 0.0, None
+        for call in sorted(self, key=lambda call: call.sent_at):
+            start, end = call.sent_at, call.received_at
+            if busy_until is not None and start < busy_until:
+                start = busy_until  # overlaps a concurrent call
+            if end > start:
+                total += end - start
+                busy_until = end
+        return total
+
+
+@contextmanager
+def track_broker_calls():
+    """
+    Record the broker calls made through the shared client in this context
+
+    Calls made from other threads are recorded only when the thread runs in
+    a copy of the caller's context, e.g. a function submitted to an executor
+    as contextvars.copy_context().run.
+
+    Yields:
+        BrokerCalls: Filled in as the calls complete
+    """
+    calls = BrokerCalls()
+    token = _broker_calls.set(calls)
+    try:
+        yield calls
+    finally:
+        _broker_calls.reset(token)
+
+
+def _on_request(request: httpx.Request):
+    calls = _broker_calls.get()
+    if calls is not None:
+        calls._sent(request)
+
+
+def _on_response(response: httpx.Response):
+    calls = _broker_calls.get()
+    if calls is not None:
+        calls._received(response)
+
 def get_httpx_client() -> httpx.Client:
     """
     Returns an HTTP client with automatic protocol negotiation.
@@ -99,7 +201,9 @@ def _create_http_client() -> httpx.Client:
                 keepalive_expiry=120.0  # 2 minutes - good balance
             ),
             # Add verify parameter to handle SSL/TLS issues in standalone mode
-            verify=True  # Can be set to False for debugging SSL issues (not recommended for production)
+            verify=True,  # Can be set to False for debugging SSL issues (not recommended for production)
+            # Time broker calls for the latency monitor (see track_broker_calls)
+            event_hooks={'request': [_on_request], 'response': [_on_response]}
         )
         
         if is_standalone:
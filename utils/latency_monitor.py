@@ -1,56 +1,71 @@
 import time
 from functools import wraps
 from flask import g, request
-from database.latency_db import OrderLatency, latency_session, init_latency_db
+from database.latency_db import init_latency_db, executor, async_log_latency
 from database.auth_db import get_broker_name
+from utils.httpx_client import track_broker_calls
 from utils.logging import get_logger
 from flask_restx import Resource
 
 logger = get_logger(__name__)
 
 class LatencyTracker:
-    """Helper class to track latencies across different stages of order execution"""
+    """
+    Helper class to split an API request's time between the broker and OpenAlgo
+
+    The round-trip time is the time spent in the broker HTTP calls made
+    through the shared httpx client while serving the request; concurrent
+    calls from worker threads count once. Everything else is our overhead:
+    the time before the first broker call (validation, auth, building the
+    request) and after the last one (handling the response).
+    """
     
     def __init__(self):
-        self.start_time = time.time()
-        self.stage_times = {}
-        self.current_stage = None
-        self.stage_start = None
-        self.request_start = None
-        self.request_end = None
-    
-    def start_stage(self, stage_name):
-        """Start timing a new stage"""
-        self.current_stage = stage_name
-        self.stage_start = time.time()
-        if stage_name == 'broker_request':
-            self.request_start = self.stage_start
+        self.start_time = time.perf_counter()
+        self.end_time = None
+        self.broker_calls = []
+        self.broker_time = 0
     
-    def end_stage(self):
-        """End timing the current stage"""
-        if self.current_stage and self.stage_start:
-            current_time = time.time()
-            duration = (current_time - self.stage_start) * 1000  # Convert to milliseconds
-            self.stage_times[self.current_stage] = duration
-            if self.current_stage == 'broker_request':
-                self.request_end = current_time
-            self.current_stage = None
-            self.stage_start = None
+    def finish(self, broker_calls):
+        """Stop timing, with the broker calls made while serving the request"""
+        self.end_time = time.perf_counter()
+        self.broker_calls = sorted(broker_calls, key=lambda call: call.sent_at)
+        self.broker_time = broker_calls.elapsed
     
     def get_total_time(self):
-        """Get total time since tracker was created"""
-        return (time.time() - self.start_time) * 1000  # Convert to milliseconds
+        """Get total time of the request in milliseconds"""
+        end_time = self.end_time or time.perf_counter()
+        return (end_time - self.start_time) * 1000
     
     def get_rtt(self):
-        """Get round-trip time (comparable to Postman/Bruno)"""
-        if self.request_start and self.request_end:
-            return (self.request_end - self.request_start) * 1000
-        return 0
+        """Get round-trip time of the broker calls (comparable to Postman/Bruno)"""
+        return self.broker_time * 1000
+    
+    def get_pre_request_time(self):
+        """Get time spent before the first broker call"""
+        if not self.broker_calls:
+            return self.get_total_time()
+        return (self.broker_calls[0].sent_at - self.start_time) * 1000
+    
+    def get_post_response_time(self):
+        """Get time spent after the last broker call"""
+        if not self.broker_calls or self.end_time is None:
+            return 0
+        last_received_at = max(call.received_at for call in self.broker_calls)
+        return max(self.end_time - last_received_at, 0) * 1000
     
     def get_overhead(self):
         """Get total overhead from our processing"""
-        return (self.stage_times.get('validation', 0) + 
-                self.stage_times.get('broker_response', 0))
+        return max(self.get_total_time() - self.get_rtt(), 0)
+    
+    def get_latencies(self):
+        return {
+            'rtt': self.get_rtt(),  # Round-trip time (comparable to Postman/Bruno)
+            'validation': self.get_pre_request_time(),
+            'broker_response': self.get_post_response_time(),
+            'overhead': self.get_overhead(),
+            'total': self.get_total_time()
+        }
 
 def track_latency(api_type):
     """Decorator to track latency for API endpoints"""
@@ -60,28 +75,18 @@ def track_latency(api_type):
             # Initialize latency tracker
             tracker = LatencyTracker()
             g.latency_tracker = tracker
+            request_data = None
             
             try:
-                # Start validation stage
-                tracker.start_stage('validation')
-                
                 # Get request data for logging
                 request_data = request.get_json() if request.is_json else {}
                 
-                # End validation stage after getting request data
-                tracker.end_stage()
-                
-                # Start broker request stage
-                tracker.start_stage('broker_request')
-                
-                # Execute the actual endpoint
-                response = f(*args, **kwargs)
-                
-                # End broker request stage
-                tracker.end_stage()
-                
-                # Start response processing stage
-                tracker.start_stage('broker_response')
+                # Execute the actual endpoint, timing its broker calls
+                with track_broker_calls() as broker_calls:
+                    try:
+                        response = f(*args, **kwargs)
+                    finally:
+                        tracker.finish(broker_calls)
                 
                 # Get response data
                 if hasattr(response, 'json'):
@@ -91,45 +96,23 @@ def track_latency(api_type):
                 else:
                     response_data = {}
                 
-                # End response processing stage
-                tracker.end_stage()
-                
                 # Get status code
                 if isinstance(response, tuple):
                     status_code = response[1] if len(response) > 1 else 200
                 else:
                     status_code = getattr(response, 'status_code', 200)
                 
-                # Calculate latencies
-                rtt = tracker.get_rtt()
-                overhead = tracker.get_overhead()
-                total = rtt + overhead
-                
                 # Log the latency data
                 # Handle the case where orderid might be null in the response
                 order_id = response_data.get('orderid')
                 if order_id is None:
                     order_id = response_data.get('request_id', 'unknown')
                 
-                # Get broker name from auth_db using API key
-                broker_name = None
-                if 'apikey' in request_data:
-                    broker_name = get_broker_name(request_data['apikey'])
-                
-                OrderLatency.log_latency(
+                _submit_latency(
+                    tracker,
                     order_id=order_id,
-                    user_id=g.get('user_id'),
-                    broker=broker_name,
-                    symbol=request_data.get('symbol'),
                     order_type=api_type,
-                    latencies={
-                        'rtt': rtt,  # Round-trip time (comparable to Postman/Bruno)
-                        'validation': tracker.stage_times.get('validation', 0),
-                        'broker_response': tracker.stage_times.get('broker_response', 0),
-                        'overhead': overhead,
-                        'total': total
-                    },
-                    request_body=request_data,
+                    request_data=request_data,
                     response_body=response_data,
                     status='SUCCESS' if status_code < 400 else 'FAILED',
                     error=response_data.get('message') if status_code >= 400 else None
@@ -139,41 +122,46 @@ def track_latency(api_type):
                 
             except Exception as e:
                 # Log error latency
-                total_time = tracker.get_total_time()
-                rtt = tracker.get_rtt()
-                overhead = tracker.get_overhead()
-                
-                # Get broker name from auth_db using API key if available
-                broker_name = None
-                if 'request_data' in locals() and 'apikey' in request_data:
-                    broker_name = get_broker_name(request_data['apikey'])
-                
-                OrderLatency.log_latency(
+                if tracker.end_time is None:
+                    tracker.finish([])
+                _submit_latency(
+                    tracker,
                     order_id='error',
-                    user_id=g.get('user_id'),
-                    broker=broker_name,
-                    symbol=request_data.get('symbol') if 'request_data' in locals() else None,
                     order_type=api_type,
-                    latencies={
-                        'rtt': rtt,
-                        'validation': tracker.stage_times.get('validation', 0),
-                        'broker_response': 0,
-                        'overhead': overhead,
-                        'total': total_time
-                    },
-                    request_body=request_data if 'request_data' in locals() else None,
+                    request_data=request_data,
                     response_body=None,
                     status='FAILED',
                     error=str(e)
                 )
                 raise
                 
-            finally:
-                latency_session.remove()
-                
         return wrapped
     return decorator
 
+def _submit_latency(tracker, order_id, order_type, request_data, response_body, status, error):
+    """Write the request's latency row from the latency executor"""
+    try:
+        # Get broker name from auth_db using API key
+        broker_name = None
+        if request_data and 'apikey' in request_data:
+            broker_name = get_broker_name(request_data['apikey'])
+        
+        executor.submit(
+            async_log_latency,
+            order_id=order_id,
+            user_id=g.get('user_id'),
+            broker=broker_name,
+            symbol=request_data.get('symbol') if request_data else None,
+            order_type=order_type,
+            latencies=tracker.get_latencies(),
+            request_body=request_data,
+            response_body=response_body,
+            status=status,
+            error=error
+        )
+    except Exception as e:
+        logger.error(f"Error submitting latency log: {e}")
+
 def wrap_resource_methods(resource_class, api_type):
     """Helper function to wrap all methods of a Resource class with latency tracking"""
     for method in ['get', 'post', 'put', 'delete', 'patch']:
@@ -0,0 +1,201 @@
+# utils/master_contract.py
+"""
+Vectorized helpers for processing broker master contracts
+
+Brokers publish 100k+ instruments and the master contract download blocks
+trading until it is processed, so these work on whole columns instead of
+row-wise apply(). They build the OpenAlgo symbol formats:
+
+    futures: NAME + DDMMMYY + FUT          (NIFTY28OCT25FUT)
+    options: NAME + DDMMMYY + STRIKE + CE  (NIFTY28OCT2525000CE)
+
+Instrument files are streamed to disk and read back in chunks of
+MASTER_CONTRACT_CHUNK_ROWS rows, so the memory a download needs is bounded
+by the chunk size rather than by the size of the broker's file.
+"""
+
+import json
+import os
+import re
+
+import pandas as pd
+
+# Rows of an instrument file parsed, processed and loaded at a time
+MASTER_CONTRACT_CHUNK_ROWS = int(os.getenv('MASTER_CONTRACT_CHUNK_ROWS', '50000'))
+
+# Bytes read from the network or disk at a time
+DOWNLOAD_BLOCK_SIZE = 1 << 20
+
+_JSON_SEPARATORS = re.compile(r'[\s,]*')
+
+
+def format_expiry(expiry: pd.Series, date_format: str, keep_unparsed: bool = False) -> pd.Series:
+    """
+    Convert expiry dates to OpenAlgo's DD-MMM-YY format (28-OCT-25)
+
+    Args:
+        expiry: Expiry dates as strings in the broker's format
+        date_format: pd.to_datetime format of the broker's dates (e.g., %d-%b-%Y or ISO8601)
+        keep_unparsed: Keep values that don't parse instead of setting them to NaN
+
+    Returns:
+        Series: The formatted expiries
+    """
+    # A master contract has a few hundred distinct expiries: convert each once
+    dates = pd.Series(expiry.dropna().unique())
+    parsed = pd.to_datetime(dates, format=date_format, errors='coerce')
+    converted = dict(zip(dates, parsed.dt.strftime('%d-%b-%y').str.upper()))
+    formatted = expiry.map(converted)
+    if keep_unparsed:
+        return formatted.where(formatted.notna(), expiry)
+    return formatted
+
+
+def compact_expiry(expiry: pd.Series) -> pd.Series:
+    """Expiries as written in symbols: 28-OCT-25 -> 28OCT25, missing -> ''"""
+    return expiry.fillna('').astype(str).str.replace('-', '', regex=False)
+
+
+def parse_strike(strike: pd.Series, default: float = -1) -> pd.Series:
+    """Strike prices as floats, with default for missing or invalid ones"""
+    return pd.to_numeric(strike, errors='coerce').fillna(default)
+
+
+def format_strike(strike: pd.Series, decimals: int = None) -> pd.Series:
+    """
+    Strike prices as written in symbols: 25000.0 -> 25000, 82.5 -> 82.5
+
+    Args:
+        strike: Strike prices as floats
+        decimals: Round fractional strikes to this many decimals, dropping
+            trailing zeros (default: shortest float repr)
+
+    Returns:
+        Series: The strikes as strings
+    """
+    strike = strike.astype(float)
+    text = strike.astype(str)
+    whole = strike.notna() & (strike % 1 == 0)
+    text.loc[whole] = strike[whole].astype('int64').astype(str)
+    if decimals is not None:
+        # Fractional strikes are rare (currency, some commodities), format only those
+        fractional = strike.notna() & ~whole
+        text.loc[fractional] = strike[fractional].map(
+            lambda value: f"{value:.{decimals}f}".rstrip('0').rstrip('.'))
+    return text
+
+
+def future_symbols(name: pd.Series, expiry: pd.Series) -> pd.Series:
+    """Futures symbols from names and compact expiries (NIFTY28OCT25FUT)"""
+    return name + expiry + 'FUT'
+
+
+def option_symbols(name: pd.Series, expiry: pd.Series, strike: pd.Series, option_type) -> pd.Series:
+    """Option symbols from names, compact expiries, formatted strikes and CE/PE (NIFTY28OCT2525000CE)"""
+    return name + expiry + strike + option_type
+
+
+def download_to_file(url: str, path: str, headers: dict = None, client=None) -> int:
+    """
+    Stream a file to disk without holding the response in memory
+
+    The file is written next to path and moved into place once complete,
+    so a failed download never leaves a partial file behind.
+
+    Args:
+        url: File to download
+        path: Where to save it
+        headers: Request headers (e.g., authorization)
+        client: httpx client (default: the shared client)
+
+    Returns:
+        int: Size of the downloaded file in bytes
+    """
+    if client is None:
+        from utils.httpx_client import get_httpx_client
+        client = get_httpx_client()
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    partial = f"{path}.part"
+    size = 0
+    try:
+        with client.stream('GET', url, headers=headers) as response:
+            response.raise_for_status()
+            with open(partial, 'wb') as f:
+                for block in response.iter_bytes(DOWNLOAD_BLOCK_SIZE):
+                    f.write(block)
+                    size += len(block)
+        os.replace(partial, path)
+    finally:
+        if os.path.exists(partial):
+            os.remove(partial)
+    return size
+
+
+def iter_csv_chunks(path: str, chunk_rows: int = None, **kwargs):
+    """
+    Read a CSV instrument file in chunks of rows
+
+    Args:
+        path: The file
+        chunk_rows: Rows per chunk (default: MASTER_CONTRACT_CHUNK_ROWS)
+        **kwargs: Passed to pd.read_csv; give dtype for columns whose type
+            must not depend on the rows in a chunk
+
+    Yields:
+        DataFrame: Each chunk
+    """
+    with pd.read_csv(path, chunksize=chunk_rows or MASTER_CONTRACT_CHUNK_ROWS, **kwargs) as reader:
+        yield from reader
+
+
+def iter_json_records(path: str, chunk_rows: int = None):
+    """
+    Read a JSON instrument file holding an array of objects in chunks of records
+
+    Only the current block of the file and one chunk of records are in
+    memory at a time, unlike json.load or pd.read_json.
+
+    Args:
+        path: The file
+        chunk_rows: Records per chunk (default: MASTER_CONTRACT_CHUNK_ROWS)
+
+    Yields:
+        list: Each chunk of decoded records
+    """
+    chunk_rows = chunk_rows or MASTER_CONTRACT_CHUNK_ROWS
+    decoder = json.JSONDecoder()
+    records = []
+
+    with open(path, encoding='utf-8') as f:
+        buffer = f.read(DOWNLOAD_BLOCK_SIZE).lstrip()
+        if not buffer.startswith('['):
+            raise ValueError(f"{path} does not hold a JSON array")
+        position = 1
+        eof = False
+        while True:
+            position = _JSON_SEPARATORS.match(buffer, position).end()
+            if buffer.startswith(']', position):
+                break
+            try:
+                record, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                # The record continues in the next block
+                if eof:
+                    raise
+                block = f.read(DOWNLOAD_BLOCK_SIZE)
+                eof = not block
+                buffer = buffer[position:] + block
+                position = 0
+                continue
+            records.append(record)
+            position = end
+            if len(records) >= chunk_rows:
+                yield records
+                records = []
+
+    if records:
+        yield records
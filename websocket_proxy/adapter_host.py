@@ -0,0 +1,284 @@
+import json
+import os
+import signal
+import threading
+from typing import Any, Dict, List, Optional, Set
+
+import zmq
+
+from utils.logging import get_logger
+from .broker_factory import create_broker_adapter
+from .transport import set_publish_endpoints
+
+logger = get_logger(__name__)
+
+# Control channel between the proxy workers and the adapter host. Workers
+# send JSON requests on a REQ socket; the host answers on a ROUTER socket.
+# It is unauthenticated, so the host binds it on ZMQ_HOST (loopback by
+# default) and never on every interface.
+ADAPTER_CONTROL_HOST = os.getenv('ZMQ_HOST', '127.0.0.1')
+ADAPTER_CONTROL_PORT = int(os.getenv('ZMQ_CONTROL_PORT', '5554'))
+ADAPTER_CONTROL_TIMEOUT_MS = int(os.getenv('ZMQ_CONTROL_TIMEOUT_MS', '30000'))
+
+
+def control_address(host: str = ADAPTER_CONTROL_HOST, port: int = ADAPTER_CONTROL_PORT) -> str:
+    """Get the ZeroMQ address of the adapter host control channel"""
+    return f"tcp://{host}:{port}"
+
+
+class AdapterHost:
+    """
+    Owns the broker adapters when the WebSocket proxy runs as several worker processes.
+
+    Every worker accepts its share of the client connections (SO_REUSEPORT)
+    and subscribes to the adapters' ZeroMQ PUB socket for market data, but
+    only this process talks to the brokers, so each user still has a single
+    broker connection. Workers forward their own 0 -> 1 and 1 -> 0
+    subscription transitions here; the host counts them per worker and only
+    calls the adapter on the first subscribe and the last unsubscribe
+    across all workers.
+    """
+
+    def __init__(self, address: Optional[str] = None):
+        self.address = address or control_address()
+        self.adapters = {}  # Maps user_id to broker adapter
+        self.user_workers: Dict[str, Set[str]] = {}  # Maps user_id to the workers using its adapter
+        # Maps (user_id, exchange, symbol, mode) to the workers holding it and the adapter response
+        self.holders: Dict[tuple, Dict[str, Any]] = {}
+        self.running = False
+
+        self.context = zmq.Context()
+        self.socket = self.context.socket(zmq.ROUTER)
+        self.socket.setsockopt(zmq.LINGER, 0)
+
+    def serve_forever(self):
+        """Answer worker requests until stop() is called"""
+        self.socket.bind(self.address)
+        self.running = True
+        logger.info(f"Broker adapter host listening on {self.address}")
+
+        poller = zmq.Poller()
+        poller.register(self.socket, zmq.POLLIN)
+        try:
+            while self.running:
+                if not poller.poll(500):
+                    continue
+                identity, empty, payload = self.socket.recv_multipart()
+                try:
+                    reply = self.handle_request(json.loads(payload))
+                except Exception as e:
+                    logger.exception(f"Error handling adapter host request: {e}")
+                    reply = {"success": False, "error": str(e)}
+                self.socket.send_multipart([identity, empty, json.dumps(reply).encode('utf-8')])
+        finally:
+            self.close()
+
+    def stop(self):
+        """Ask serve_forever to return"""
+        self.running = False
+
+    def close(self):
+        """Disconnect every adapter and close the control socket"""
+        for user_id, adapter in list(self.adapters.items()):
+            try:
+                adapter.disconnect()
+            except Exception as e:
+                logger.error(f"Error disconnecting adapter for user {user_id}: {e}")
+        self.adapters.clear()
+        self.socket.close()
+        self.context.term()
+
+    def handle_request(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Handle one request from a proxy worker
+
+        Args:
+            request: Dict with 'op', 'user_id' and 'worker', plus per-op fields
+
+        Returns:
+            dict: The reply sent back to the worker
+        """
+        op = request.get("op")
+        user_id = request.get("user_id")
+        worker = request.get("worker")
+
+        if op == "attach":
+            return self._attach(user_id, request.get("broker"), worker)
+        if op == "subscribe":
+            return {"responses": [self._subscribe(user_id, worker, *call) for call in request.get("calls", [])]}
+        if op == "unsubscribe":
+            return {"responses": [self._unsubscribe(user_id, worker, *call) for call in request.get("calls", [])]}
+        if op == "detach":
+            return self._detach(user_id, worker, request.get("keep_alive", False))
+        return {"success": False, "error": f"Unknown operation: {op}"}
+
+    def _attach(self, user_id, broker_name, worker):
+        if user_id not in self.adapters:
+            adapter = create_broker_adapter(broker_name)
+            if not adapter:
+                return {"success": False, "error": f"Failed to create adapter for broker: {broker_name}"}
+
+            initialization_result = adapter.initialize(broker_name, user_id)
+            if initialization_result and not initialization_result.get('success', True):
+                return {"success": False, "error": initialization_result.get('error', 'Failed to initialize broker adapter')}
+
+            connect_result = adapter.connect()
+            if connect_result and not connect_result.get('success', True):
+                return {"success": False, "error": connect_result.get('error', 'Failed to connect to broker')}
+
+            self.adapters[user_id] = adapter
+            logger.info(f"Adapter host created and connected {broker_name} adapter for user {user_id}")
+
+        self.user_workers.setdefault(user_id, set()).add(worker)
+        return {"success": True}
+
+    def _subscribe(self, user_id, worker, symbol, exchange, mode, depth_level=5):
+        adapter = self.adapters.get(user_id)
+        if not adapter:
+            return {"status": "error", "message": "Broker adapter not found"}
+
+        key = (user_id, exchange, symbol, mode)
+        entry = self.holders.get(key)
+        if entry is None:
+            response = adapter.subscribe(symbol, exchange, mode, depth_level)
+            if not response or response.get("status") != "success":
+                return response or {"status": "error", "message": "Subscription failed"}
+            entry = self.holders[key] = {"workers": set(), "response": response}
+
+        entry["workers"].add(worker)
+        self.user_workers.setdefault(user_id, set()).add(worker)
+        return entry["response"]
+
+    def _unsubscribe(self, user_id, worker, symbol, exchange, mode):
+        key = (user_id, exchange, symbol, mode)
+        entry = self.holders.get(key)
+        if entry is None:
+            return {"status": "success"}
+
+        entry["workers"].discard(worker)
+        if entry["workers"]:
+            return {"status": "success"}
+
+        del self.holders[key]
+        adapter = self.adapters.get(user_id)
+        if not adapter:
+            return {"status": "success"}
+        return adapter.unsubscribe(symbol, exchange, mode) or {"status": "success"}
+
+    def _detach(self, user_id, worker, keep_alive):
+        for key in [key for key in self.holders if key[0] == user_id]:
+            self._unsubscribe(user_id, worker, key[2], key[1], key[3])
+
+        workers = self.user_workers.get(user_id, set())
+        workers.discard(worker)
+        if workers or user_id not in self.adapters:
+            return {"success": True}
+
+        # No worker has clients of this user any more
+        self.user_workers.pop(user_id, None)
+        adapter = self.adapters[user_id]
+        if keep_alive and hasattr(adapter, 'unsubscribe_all'):
+            logger.info(f"Adapter host: last worker detached from user {user_id}, unsubscribing all symbols")
+            adapter.unsubscribe_all()
+        else:
+            logger.info(f"Adapter host: last worker detached from user {user_id}, disconnecting adapter")
+            adapter.disconnect()
+            del self.adapters[user_id]
+        return {"success": True}
+
+
+class RemoteBrokerAdapter:
+    """
+    Stand-in for a broker adapter inside a proxy worker process.
+
+    Implements the adapter methods the proxy calls by sending requests to
+    the AdapterHost. Calls are blocking, like those of a real adapter, and
+    serialized per instance.
+    """
+
+    def __init__(self, broker_name: str, address: Optional[str] = None):
+        self.broker_name = broker_name
+        self.address = address or control_address()
+        self.worker = str(os.getpid())
+        self.user_id = None
+        self._lock = threading.Lock()
+        self._socket = None
+
+    @classmethod
+    def factory(cls, address: Optional[str] = None):
+        """Get an adapter factory for WebSocketProxy that creates remote adapters"""
+        return lambda broker_name: cls(broker_name, address)
+
+    def initialize(self, broker_name: str, user_id: str, auth_data: Optional[Dict[str, str]] = None):
+        self.broker_name = broker_name
+        self.user_id = user_id
+
+    def connect(self):
+        return self._request({"op": "attach", "broker": self.broker_name})
+
+    def subscribe(self, symbol: str, exchange: str, mode: int = 2, depth_level: int = 5):
+        return self.subscribe_batch([(symbol, exchange, mode, depth_level)])[0]
+
+    def unsubscribe(self, symbol: str, exchange: str, mode: int = 2):
+        return self.unsubscribe_batch([(symbol, exchange, mode)])[0]
+
+    def subscribe_batch(self, calls: List[tuple]) -> List[Dict[str, Any]]:
+        """Subscribe several instruments with a single round trip to the host"""
+        return self._batch("subscribe", calls)
+
+    def unsubscribe_batch(self, calls: List[tuple]) -> List[Dict[str, Any]]:
+        """Unsubscribe several instruments with a single round trip to the host"""
+        return self._batch("unsubscribe", calls)
+
+    def unsubscribe_all(self):
+        return self._request({"op": "detach", "keep_alive": True})
+
+    def disconnect(self):
+        result = self._request({"op": "detach", "keep_alive": False})
+        with self._lock:
+            if self._socket is not None:
+                self._socket.close()
+                self._socket = None
+        return result
+
+    def _batch(self, op, calls):
+        reply = self._request({"op": op, "calls": [list(call) for call in calls]})
+        responses = reply.get("responses")
+        if responses is None:
+            error = {"status": "error", "message": reply.get("error", "Adapter host request failed")}
+            return [error] * len(calls)
+        return responses
+
+    def _request(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        request.update(user_id=self.user_id, worker=self.worker)
+        with self._lock:
+            if self._socket is None:
+                self._socket = zmq.Context.instance().socket(zmq.REQ)
+                self._socket.setsockopt(zmq.LINGER, 0)
+                self._socket.setsockopt(zmq.RCVTIMEO, ADAPTER_CONTROL_TIMEOUT_MS)
+                self._socket.connect(self.address)
+            try:
+                self._socket.send(json.dumps(request).encode('utf-8'))
+                return json.loads(self._socket.recv())
+            except zmq.ZMQError as e:
+                # A REQ socket cannot be reused after a lost reply
+                self._socket.close()
+                self._socket = None
+                logger.error(f"Adapter host request {request.get('op')} failed: {e}")
+                return {"success": False, "error": f"Adapter host unavailable: {e}"}
+
+
+def run_adapter_host(address: Optional[str] = None, publish_endpoints: Optional[List[str]] = None):
+    """
+    Process entry point: serve broker adapters to the proxy workers until SIGTERM/SIGINT
+
+    Args:
+        address: Control channel address to bind
+        publish_endpoints: Market data endpoints of the workers the adapters publish to
+    """
+    if publish_endpoints:
+        set_publish_endpoints(publish_endpoints)
+    host = AdapterHost(address)
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda signum, frame: host.stop())
+    host.serve_forever()
@@ -1,4 +1,5 @@
 import asyncio
+import multiprocessing
 import threading
 import sys
 import platform
@@ -18,6 +19,7 @@ if platform.system() == 'Windows':
 _websocket_server_started = False
 _websocket_proxy_instance = None
 _websocket_thread = None
+_websocket_processes = None  # Adapter host and worker processes in sharded mode
 
 logger = get_logger(__name__)
 
@@ -33,6 +35,11 @@ def should_start_websocket():
     Returns:
         bool: True if we should start the WebSocket server, False otherwise
     """
+    # Processes of the sharded proxy are spawned, which re-imports the main
+    # module (app.py) in each of them; only the parent starts the proxy
+    if multiprocessing.parent_process() is not None:
+        return False
+    
     # In debug mode, only start in the Flask child process
     if os.environ.get('FLASK_DEBUG', '').lower() in ('1', 'true'):
         # WERKZEUG_RUN_MAIN is set to 'true' by Flask in the child process
@@ -44,11 +51,16 @@ def should_start_websocket():
 
 def cleanup_websocket_server():
     """Clean up WebSocket server resources - cross-platform compatible"""
-    global _websocket_proxy_instance, _websocket_thread
+    global _websocket_proxy_instance, _websocket_thread, _websocket_processes
     
     try:
         logger.info("Cleaning up WebSocket server...")
         
+        if _websocket_processes:
+            from .sharded import stop_sharded_proxy
+            stop_sharded_proxy(_websocket_processes)
+            _websocket_processes = None
+        
         if _websocket_proxy_instance:
             # For Windows compatibility, set a shutdown flag instead of trying to 
             # manipulate the event loop from a different thread
@@ -70,13 +82,9 @@ def cleanup_websocket_server():
                         _websocket_proxy_instance.socket.close()
                     except Exception as e:
                         logger.warning(f"Error closing ZMQ socket: {e}")
+
+                # The ZeroMQ context is shared with the broker adapters and is not terminated here
                 
-                if hasattr(_websocket_proxy_instance, 'context') and _websocket_proxy_instance.context:
-                    try:
-                        _websocket_proxy_instance.context.term()
-                    except Exception as e:
-                        logger.warning(f"Error terminating ZMQ context: {e}")
-                        
             except Exception as e:
                 logger.error(f"Error during WebSocket cleanup: {e}")
             finally:
@@ -96,6 +104,7 @@ def cleanup_websocket_server():
         # Last resort: force cleanup
         _websocket_proxy_instance = None
         _websocket_thread = None
+        _websocket_processes = None
 
 def signal_handler(signum, frame):
     """Handle SIGINT (Ctrl+C) and SIGTERM signals"""
@@ -108,8 +117,23 @@ def start_websocket_server():
     """
     Start the WebSocket proxy server in a separate thread.
     This function should be called when the Flask app starts.
+    
+    With WEBSOCKET_WORKERS > 1 the proxy runs as that many worker processes
+    sharing the port plus a broker adapter host process instead.
     """
-    global _websocket_proxy_instance, _websocket_thread
+    global _websocket_proxy_instance, _websocket_thread, _websocket_processes
+    
+    # WEBSOCKET_WORKERS > 1 runs the proxy as several processes sharing the port
+    workers = int(os.getenv('WEBSOCKET_WORKERS', '1'))
+    if workers > 1:
+        from .sharded import sharding_supported, start_sharded_proxy
+        if sharding_supported():
+            ws_host = os.getenv('WEBSOCKET_HOST', '127.0.0.1')
+            ws_port = int(os.getenv('WEBSOCKET_PORT', '8765'))
+            _websocket_processes = start_sharded_proxy(ws_host, ws_port, workers)
+            atexit.register(cleanup_websocket_server)
+            return None
+        logger.warning("WEBSOCKET_WORKERS > 1 requires SO_REUSEPORT, which this platform lacks. Using a single worker.")
     
     logger.info("Starting WebSocket proxy server in a separate thread")
     
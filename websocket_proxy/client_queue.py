@@ -0,0 +1,96 @@
+import asyncio as aio
+import itertools
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+
+class ConflatingSendQueue:
+    """
+    Bounded outbound queue for a single websocket client.
+
+    Market data frames are queued under a conflation key such as
+    (exchange, symbol, mode). If a frame for the same key is still waiting to
+    be written, it is replaced in place by the newer one, so a slow client
+    only ever receives the latest tick for an instrument. Control messages
+    (responses, errors) are never conflated.
+
+    When the queue is full the oldest market data frame is dropped to make
+    room; control messages are always accepted.
+    """
+
+    def __init__(self, maxsize: int = 1000):
+        self.maxsize = maxsize
+        self._pending: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._market_data_count = 0
+        self._control_seq = itertools.count()
+        self._not_empty = aio.Event()
+
+        # Counters exposed through WebSocketProxy.get_client_queue_stats
+        self.enqueued = 0
+        self.sent = 0
+        self.conflated = 0
+        self.dropped = 0
+        self.max_depth = 0
+
+    def put(self, frame: Any, conflation_key: Optional[Hashable] = None):
+        """
+        Queue a frame for sending without blocking
+
+        Args:
+            frame: Encoded message to send
+            conflation_key: Key identifying the instrument, or None for control messages
+        """
+        self.enqueued += 1
+
+        if conflation_key is None:
+            self._pending[("control", next(self._control_seq))] = frame
+        else:
+            key = ("data", conflation_key)
+            if key in self._pending:
+                # Keep the queue position, replace the stale tick with the newest one
+                self._pending[key] = frame
+                self.conflated += 1
+                return
+
+            if self._market_data_count >= self.maxsize:
+                self._drop_oldest_market_data()
+
+            self._pending[key] = frame
+            self._market_data_count += 1
+
+        depth = len(self._pending)
+        if depth > self.max_depth:
+            self.max_depth = depth
+        self._not_empty.set()
+
+    async def get(self) -> Any:
+        """Wait for and return the next frame to send"""
+        while not self._pending:
+            self._not_empty.clear()
+            await self._not_empty.wait()
+
+        key, frame = self._pending.popitem(last=False)
+        if key[0] == "data":
+            self._market_data_count -= 1
+        return frame
+
+    def qsize(self) -> int:
+        return len(self._pending)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "queued": len(self._pending),
+            "enqueued": self.enqueued,
+            "sent": self.sent,
+            "conflated": self.conflated,
+            "dropped": self.dropped,
+            "max_depth": self.max_depth
+        }
+
+    def _drop_oldest_market_data(self):
+        for key in self._pending:
+            if key[0] == "data":
+                del self._pending[key]
+                self._market_data_count -= 1
+                self.dropped += 1
+                return
@@ -0,0 +1,83 @@
+import json
+import os
+from typing import Any, Union
+
+from utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    msgpack = None
+    MSGPACK_AVAILABLE = False
+
+# Wire encodings a websocket client can negotiate at authentication
+ENCODING_JSON = "json"
+ENCODING_MSGPACK = "msgpack"
+
+# Codec used on the internal adapter -> proxy ZeroMQ bus
+ZMQ_CODEC = os.getenv('ZMQ_CODEC', ENCODING_MSGPACK).strip().lower()
+
+
+def negotiate_encoding(requested: str) -> str:
+    """
+    Resolve the encoding requested by a client to one the server can provide
+
+    Args:
+        requested: Encoding name sent by the client, e.g. 'json' or 'msgpack'
+
+    Returns:
+        str: ENCODING_MSGPACK if requested and available, otherwise ENCODING_JSON
+    """
+    if requested and str(requested).lower() == ENCODING_MSGPACK:
+        if MSGPACK_AVAILABLE:
+            return ENCODING_MSGPACK
+        logger.warning("Client requested msgpack encoding but msgpack is not installed, using json")
+    return ENCODING_JSON
+
+
+def encode_message(message: Any, encoding: str = ENCODING_JSON) -> Union[str, bytes]:
+    """
+    Encode a message for a websocket client
+
+    JSON messages are returned as str (sent as text frames), MessagePack
+    messages as bytes (sent as binary frames).
+    """
+    if encoding == ENCODING_MSGPACK:
+        return msgpack.packb(message, use_bin_type=True)
+    return json.dumps(message)
+
+
+def decode_message(message: Union[str, bytes]) -> Any:
+    """
+    Decode a message received from a websocket client
+
+    Text frames are JSON; binary frames are MessagePack when available.
+    """
+    if isinstance(message, bytes) and MSGPACK_AVAILABLE and not message.lstrip().startswith(b"{"):
+        return msgpack.unpackb(message, raw=False)
+    return json.loads(message)
+
+
+def encode_bus_payload(data: Any) -> bytes:
+    """Encode market data for publishing on the internal ZeroMQ bus"""
+    if ZMQ_CODEC == ENCODING_MSGPACK and MSGPACK_AVAILABLE:
+        return msgpack.packb(data, use_bin_type=True)
+    return json.dumps(data).encode('utf-8')
+
+
+def decode_bus_payload(payload: bytes) -> Any:
+    """
+    Decode market data received from the internal ZeroMQ bus
+
+    Payloads are self-describing: market data is always a map, so a JSON
+    payload starts with '{' while a MessagePack map never does. This lets
+    the proxy read from adapters using either codec.
+    """
+    if payload[:1] == b"{":
+        return json.loads(payload)
+    if not MSGPACK_AVAILABLE:
+        raise ValueError("Received a binary market data payload but msgpack is not installed")
+    return msgpack.unpackb(payload, raw=False)
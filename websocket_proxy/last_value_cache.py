@@ -0,0 +1,65 @@
+import time
+from typing import Any, Dict, Optional, Tuple
+
+# (exchange, symbol, mode)
+InstrumentKey = Tuple[str, str, int]
+
+# (broker, market data, receive time in epoch milliseconds)
+CachedValue = Tuple[str, Any, int]
+
+
+class LastValueCache:
+    """
+    Latest market data received per instrument, mode and broker.
+
+    Fed by the ZeroMQ listener so a client subscribing to an instrument that
+    is already streaming can be sent the current value immediately instead
+    of waiting for the next tick, and so clients can poll a snapshot without
+    taking a subscription of their own.
+    """
+
+    def __init__(self, maxsize: int = 20000):
+        self.maxsize = maxsize
+        self._values: Dict[InstrumentKey, Dict[str, Tuple[Any, int]]] = {}
+
+    def update(self, broker: str, exchange: str, symbol: str, mode: int, data: Any):
+        """
+        Record the latest market data for an instrument
+
+        Args:
+            broker: Broker from the topic, or "unknown" if it was not published
+        """
+        key = (exchange, symbol, mode)
+        values = self._values.get(key)
+        if values is None:
+            if len(self._values) >= self.maxsize:
+                # Evict the instrument cached the longest
+                del self._values[next(iter(self._values))]
+            values = self._values[key] = {}
+        values[broker] = (data, int(time.time() * 1000))
+
+    def get(self, broker: Optional[str], exchange: str, symbol: str, mode: int) -> Optional[CachedValue]:
+        """
+        Get the latest market data for an instrument
+
+        Values published for the given broker are preferred, then values
+        published without a broker name.
+
+        Returns:
+            tuple: (broker, data, received_at_ms), or None if nothing is cached
+        """
+        values = self._values.get((exchange, symbol, mode))
+        if not values:
+            return None
+        for candidate in (broker, "unknown"):
+            cached = values.get(candidate)
+            if cached:
+                return candidate, cached[0], cached[1]
+        return None
+
+    def discard(self, exchange: str, symbol: str, mode: int):
+        """Drop an instrument, e.g. once nobody is subscribed and the value would go stale"""
+        self._values.pop((exchange, symbol, mode), None)
+
+    def __len__(self) -> int:
+        return len(self._values)
@@ -18,6 +18,16 @@ from sqlalchemy import text
 from database.auth_db import verify_api_key
 from .broker_factory import create_broker_adapter
 from .base_adapter import BaseBrokerWebSocketAdapter
+from .subscription_index import SubscriptionIndex
+from .client_queue import ConflatingSendQueue
+from .upstream_subscriptions import UpstreamSubscriptions
+from .last_value_cache import LastValueCache
+from .tick_throttle import TickThrottle
+from .transport import bus_context, bus_endpoint, resolve_transport
+from .topics import MODE_NUMBERS, parse_topic, subscription_prefix
+from .codec import (
+    ENCODING_JSON, decode_bus_payload, decode_message, encode_message, negotiate_encoding
+)
 
 # Initialize logger
 logger = get_logger("websocket_proxy")
@@ -29,19 +39,25 @@ class WebSocketProxy:
     Supports dynamic broker selection based on user configuration.
     """
     
-    def __init__(self, host: str = "127.0.0.1", port: int = 8765):
+    def __init__(self, host: str = "127.0.0.1", port: int = 8765, adapter_factory=None, check_port: bool = True,
+                 zmq_endpoint: Optional[str] = None):
         """
         Initialize the WebSocket Proxy
         
         Args:
             host: Hostname to bind the WebSocket server to
             port: Port number to bind the WebSocket server to
+            adapter_factory: Callable creating a broker adapter from a broker name
+                (defaults to create_broker_adapter; sharded workers use remote adapters)
+            check_port: Fail if the port is in use. Sharded workers share the port and skip this.
+            zmq_endpoint: Market data endpoint to bind (defaults to the one for ZMQ_TRANSPORT)
         """
         self.host = host
         self.port = port
+        self.adapter_factory = adapter_factory or create_broker_adapter
         
         # Check if the required port is already in use - wait briefly for cleanup to complete
-        if is_port_in_use(host, port, wait_time=2.0):  # Wait up to 2 seconds for port release
+        if check_port and is_port_in_use(host, port, wait_time=2.0):  # Wait up to 2 seconds for port release
             error_msg = (
                 f"WebSocket port {port} is already in use on {host}.\n"
                 f"This port is required for SDK compatibility (see strategies/ltp_example.py).\n"
@@ -55,22 +71,33 @@ class WebSocketProxy:
             raise RuntimeError(error_msg)
         
         self.clients = {}  # Maps client_id to websocket connection
-        self.subscriptions = {}  # Maps client_id to set of subscriptions
+        self.subscriptions = {}  # Maps client_id to {(exchange, symbol, mode): subscription_info}
+        self.subscription_index = SubscriptionIndex()  # Maps (broker, exchange, symbol, mode) to client_ids
         self.broker_adapters = {}  # Maps user_id to broker adapter
+        self.upstream_subscriptions = UpstreamSubscriptions()  # Refcounts of (user_id, exchange, symbol, mode) held with adapters
+        self.user_locks = {}  # Maps user_id to the lock serializing its adapter (un)subscribe calls
         self.user_mapping = {}  # Maps client_id to user_id
         self.user_broker_mapping = {}  # Maps user_id to broker_name
+        self.client_queues = {}  # Maps client_id to its outbound ConflatingSendQueue
+        self.client_writers = {}  # Maps client_id to the task draining its queue
+        self.client_encodings = {}  # Maps client_id to its negotiated wire encoding (json/msgpack)
+        self.client_queue_size = int(os.getenv('WEBSOCKET_CLIENT_QUEUE_SIZE', '1000'))
+        self.queue_stats_interval = float(os.getenv('WEBSOCKET_QUEUE_STATS_INTERVAL', '60'))  # Seconds between lagging client reports, 0 to disable
+        self.tick_throttle = TickThrottle()  # Per-client max_rate/throttle_ms limits
+        self.last_values = LastValueCache(int(os.getenv('WEBSOCKET_LAST_VALUE_CACHE_SIZE', '20000')))  # Latest tick per instrument
         self.running = False
         
-        # ZeroMQ context for subscribing to broker adapters
-        self.context = zmq.asyncio.Context()
+        # ZeroMQ socket receiving market data from the broker adapters. It shares
+        # the adapters' context so inproc works, and binds a fixed endpoint that
+        # every adapter's PUB socket connects to.
+        self.context = zmq.asyncio.Context.shadow(bus_context().underlying)
         self.socket = self.context.socket(zmq.SUB)
-        # Connecting to ZMQ
-        ZMQ_HOST = os.getenv('ZMQ_HOST', '127.0.0.1')
-        ZMQ_PORT = os.getenv('ZMQ_PORT')
-        self.socket.connect(f"tcp://{ZMQ_HOST}:{ZMQ_PORT}")  # Connect to broker adapter publisher
+        self.zmq_endpoint = zmq_endpoint or bus_endpoint(resolve_transport())
+        self.socket.bind(self.zmq_endpoint)
+        logger.info(f"Receiving market data on {self.zmq_endpoint}")
         
-        # Set up ZeroMQ subscriber to receive all messages
-        self.socket.setsockopt(zmq.SUBSCRIBE, b"")  # Subscribe to all topics
+        # No blanket subscription: per-instrument topic prefixes are subscribed
+        # as clients subscribe, so libzmq discards data nobody asked for
     
     async def start(self):
         """Start the WebSocket server and ZeroMQ listener"""
@@ -86,6 +113,9 @@ class WebSocketProxy:
             # Create the ZMQ listener task
             zmq_task = loop.create_task(self.zmq_listener())
             
+            # Periodically report clients that can't keep up with the market data rate
+            queue_stats_task = loop.create_task(self.log_lagging_clients()) if self.queue_stats_interval > 0 else None
+            
             # Start WebSocket server
             stop = aio.Future()  # Used to stop the server
             
@@ -136,12 +166,15 @@ class WebSocketProxy:
                 
                 await stop  # Wait until stopped
                 
-                # Cancel the monitor task
-                monitor_task.cancel()
-                try:
-                    await monitor_task
-                except aio.CancelledError:
-                    pass
+                # Cancel the monitor tasks
+                for task in (monitor_task, queue_stats_task):
+                    if task is None:
+                        continue
+                    task.cancel()
+                    try:
+                        await task
+                    except aio.CancelledError:
+                        pass
                 
             except Exception as e:
                 logger.exception(f"Failed to start WebSocket server: {e}")
@@ -213,12 +246,7 @@ class WebSocketProxy:
                 except Exception as e:
                     logger.error(f"Error closing ZMQ socket: {e}")
             
-            # Close ZeroMQ context with timeout
-            if hasattr(self, 'context') and self.context:
-                try:
-                    self.context.term()
-                except Exception as e:
-                    logger.error(f"Error terminating ZMQ context: {e}")
+            # The ZeroMQ context is shared with the broker adapters, so it is not terminated here
             
             logger.info("WebSocket server stopped and resources cleaned up")
             
@@ -234,7 +262,13 @@ class WebSocketProxy:
         """
         client_id = id(websocket)
         self.clients[client_id] = websocket
-        self.subscriptions[client_id] = set()
+        self.subscriptions[client_id] = {}
+        
+        # Each client gets its own outbound queue and writer so a slow
+        # connection cannot hold up delivery to anyone else
+        queue = ConflatingSendQueue(maxsize=self.client_queue_size)
+        self.client_queues[client_id] = queue
+        self.client_writers[client_id] = aio.create_task(self.client_writer(client_id, websocket, queue))
         
         # Get path info from websocket if available
         path = getattr(websocket, 'path', '/unknown')
@@ -272,35 +306,36 @@ class WebSocketProxy:
         if client_id in self.clients:
             del self.clients[client_id]
         
-        # Clean up subscriptions
-        if client_id in self.subscriptions:
-            subscriptions = self.subscriptions[client_id]
-            # Unsubscribe from all subscriptions
-            for sub_json in subscriptions:
-                try:
-                    # Parse the JSON string to get the subscription info
-                    sub_info = json.loads(sub_json)
-                    symbol = sub_info.get('symbol')
-                    exchange = sub_info.get('exchange')
-                    mode = sub_info.get('mode')
-                    
-                    # Get the user's broker adapter
-                    user_id = self.user_mapping.get(client_id)
-                    if user_id and user_id in self.broker_adapters:
-                        adapter = self.broker_adapters[user_id]
-                        adapter.unsubscribe(symbol, exchange, mode)
-                except json.JSONDecodeError as e:
-                    logger.exception(f"Error parsing subscription: {sub_json}, Error: {e}")
-                except Exception as e:
-                    logger.exception(f"Error processing subscription: {e}")
-                    continue
-            
-            del self.subscriptions[client_id]
+        # Stop the client's writer and report if it had been lagging
+        writer = self.client_writers.pop(client_id, None)
+        if writer:
+            writer.cancel()
+        queue = self.client_queues.pop(client_id, None)
+        if queue and (queue.conflated or queue.dropped):
+            logger.info(f"Client {client_id} send queue stats at disconnect: {queue.stats()}")
+        self.client_encodings.pop(client_id, None)
+        self.tick_throttle.remove_client(client_id)
         
-        # Remove from user mapping
-        if client_id in self.user_mapping:
-            user_id = self.user_mapping[client_id]
-            
+        # Remove the client from the fan-out index before touching the adapter
+        for key in self.subscription_index.remove_client(client_id):
+            self._zmq_unsubscribe(*key[1:])
+        
+        user_id = self.user_mapping.get(client_id)
+        if not user_id:
+            self.subscriptions.pop(client_id, None)
+            return
+
+        async with self._get_user_lock(user_id):
+            # Release the client's references; the adapter is only told about
+            # instruments no other client of this user still wants
+            subscriptions = self.subscriptions.pop(client_id, {})
+            if subscriptions:
+                responses = await self._release_upstream(user_id, list(subscriptions.keys()))
+                for (exchange, symbol, mode), response in responses.items():
+                    if response.get("status") != "success":
+                        logger.warning(f"Error unsubscribing {exchange}:{symbol} mode {mode} for user {user_id}: "
+                                       f"{response.get('message')}")
+
             # Check if this was the last client for this user
             is_last_client = True
             for other_client_id, other_user_id in self.user_mapping.items():
@@ -312,6 +347,7 @@ class WebSocketProxy:
             if is_last_client and user_id in self.broker_adapters:
                 adapter = self.broker_adapters[user_id]
                 broker_name = self.user_broker_mapping.get(user_id)
+                self.upstream_subscriptions.remove_user(user_id)
 
                 # For Flattrade and Shoonya, keep the connection alive and just unsubscribe from data
                 if broker_name in ['flattrade', 'shoonya'] and hasattr(adapter, 'unsubscribe_all'):
@@ -336,7 +372,13 @@ class WebSocketProxy:
             message: The message from the client
         """
         try:
-            data = json.loads(message)
+            data = decode_message(message)
+        except ValueError:
+            logger.exception(f"Invalid message from client {client_id}: {message!r}")
+            await self.send_error(client_id, "INVALID_JSON", "Invalid JSON message")
+            return
+        
+        try:
             logger.debug(f"Parsed message from client {client_id}: {data}")
             
             # Accept both 'action' and 'type' fields for better compatibility with different clients
@@ -353,12 +395,13 @@ class WebSocketProxy:
                 await self.get_broker_info(client_id)
             elif action == "get_supported_brokers":
                 await self.get_supported_brokers(client_id)
+            elif action == "get_stats":
+                await self.get_client_stats(client_id)
+            elif action == "get_snapshot":
+                await self.get_snapshot(client_id, data)
             else:
                 logger.warning(f"Client {client_id} requested invalid action: {action}")
                 await self.send_error(client_id, "INVALID_ACTION", f"Invalid action: {action}")
-        except json.JSONDecodeError as e:
-            logger.exception(f"Invalid JSON from client {client_id}: {message}")
-            await self.send_error(client_id, "INVALID_JSON", "Invalid JSON message")
         except Exception as e:
             logger.exception(f"Error processing client message: {e}")
             await self.send_error(client_id, "SERVER_ERROR", str(e))
@@ -463,55 +506,66 @@ class WebSocketProxy:
         # Store the broker mapping for this user
         self.user_broker_mapping[user_id] = broker_name
         
-        # Create or reuse broker adapter
-        if user_id not in self.broker_adapters:
-            try:
-                # Create broker adapter with dynamic broker selection
-                adapter = create_broker_adapter(broker_name)
-                if not adapter:
-                    await self.send_error(client_id, "BROKER_ERROR", f"Failed to create adapter for broker: {broker_name}")
-                    return
-                
-                # Initialize adapter with broker configuration
-                # The adapter's initialize method should handle broker-specific setup
-                initialization_result = adapter.initialize(broker_name, user_id)
-                if initialization_result and not initialization_result.get('success', True):
-                    error_msg = initialization_result.get('error', 'Failed to initialize broker adapter')
-                    await self.send_error(client_id, "BROKER_INIT_ERROR", error_msg)
-                    return
-                
-                # Connect to the broker
-                connect_result = adapter.connect()
-                if connect_result and not connect_result.get('success', True):
-                    error_msg = connect_result.get('error', 'Failed to connect to broker')
-                    await self.send_error(client_id, "BROKER_CONNECTION_ERROR", error_msg)
+        # Create or reuse broker adapter. The user's lock keeps concurrent logins
+        # from creating two adapters while the first one is connecting
+        async with self._get_user_lock(user_id):
+            if user_id not in self.broker_adapters:
+                try:
+                    # Create broker adapter with dynamic broker selection
+                    adapter = self.adapter_factory(broker_name)
+                    if not adapter:
+                        await self.send_error(client_id, "BROKER_ERROR", f"Failed to create adapter for broker: {broker_name}")
+                        return
+                    
+                    # Initialize adapter with broker configuration
+                    # The adapter's initialize method should handle broker-specific setup.
+                    # initialize() and connect() block (a round trip to the adapter host
+                    # when sharded), so they run in the default executor off the event loop
+                    loop = aio.get_running_loop()
+                    initialization_result = await loop.run_in_executor(None, adapter.initialize, broker_name, user_id)
+                    if initialization_result and not initialization_result.get('success', True):
+                        error_msg = initialization_result.get('error', 'Failed to initialize broker adapter')
+                        await self.send_error(client_id, "BROKER_INIT_ERROR", error_msg)
+                        return
+                    
+                    # Connect to the broker
+                    connect_result = await loop.run_in_executor(None, adapter.connect)
+                    if connect_result and not connect_result.get('success', True):
+                        error_msg = connect_result.get('error', 'Failed to connect to broker')
+                        await self.send_error(client_id, "BROKER_CONNECTION_ERROR", error_msg)
+                        return
+                    
+                    # Store the adapter
+                    self.broker_adapters[user_id] = adapter
+                    
+                    logger.info(f"Successfully created and connected {broker_name} adapter for user {user_id}")
+                    
+                except Exception as e:
+                    logger.error(f"Failed to create broker adapter for {broker_name}: {e}")
+                    import traceback
+                    logger.error(traceback.format_exc())
+                    await self.send_error(client_id, "BROKER_ERROR", str(e))
                     return
-                
-                # Store the adapter
-                self.broker_adapters[user_id] = adapter
-                
-                logger.info(f"Successfully created and connected {broker_name} adapter for user {user_id}")
-                
-            except Exception as e:
-                logger.error(f"Failed to create broker adapter for {broker_name}: {e}")
-                import traceback
-                logger.error(traceback.format_exc())
-                await self.send_error(client_id, "BROKER_ERROR", str(e))
-                return
         
-        # Send success response with broker information
+        # Clients may opt in to binary MessagePack frames; everyone else keeps JSON
+        encoding = negotiate_encoding(data.get("encoding"))
+        
+        # Send success response with broker information. The response itself is
+        # always JSON; the negotiated encoding applies to every later message.
         await self.send_message(client_id, {
             "type": "auth",
             "status": "success",
             "message": "Authentication successful",
             "broker": broker_name,
             "user_id": user_id,
+            "encoding": encoding,
             "supported_features": {
                 "ltp": True,
                 "quote": True,
                 "depth": True
             }
         })
+        self.client_encodings[client_id] = encoding
     
     async def get_supported_brokers(self, client_id):
         """
@@ -566,6 +620,178 @@ class WebSocketProxy:
             "user_id": user_id
         })
     
+    async def get_client_stats(self, client_id):
+        """
+        Send a client the counters of its own outbound queue
+        
+        Args:
+            client_id: ID of the client
+        """
+        queue = self.client_queues.get(client_id)
+        await self.send_message(client_id, {
+            "type": "stats",
+            "status": "success",
+            "queue": queue.stats() if queue else {}
+        })
+    
+    def get_client_queue_stats(self):
+        """
+        Get outbound queue counters for every connected client
+        
+        Clients with growing 'conflated' or 'dropped' counts are not keeping up
+        with the market data rate.
+        
+        Returns:
+            dict: Maps client_id to its user_id and queue counters
+        """
+        return {
+            client_id: {"user_id": self.user_mapping.get(client_id), **queue.stats()}
+            for client_id, queue in list(self.client_queues.items())
+        }
+    
+    async def log_lagging_clients(self):
+        """
+        Log the clients that dropped market data since the last check
+        
+        Runs every queue_stats_interval seconds until the proxy stops. A client
+        only drops frames once its queue is full of instruments it hasn't been
+        sent yet, so it is far behind the market data rate.
+        """
+        last_dropped = {}
+        while self.running:
+            await aio.sleep(self.queue_stats_interval)
+            stats = self.get_client_queue_stats()
+            lagging = 0
+            for client_id, counters in stats.items():
+                dropped = counters["dropped"] - last_dropped.get(client_id, 0)
+                if dropped > 0:
+                    lagging += 1
+                    logger.warning(f"Client {client_id} (user {counters['user_id']}) is lagging: dropped {dropped} frames "
+                                   f"({counters['dropped']} in total, {counters['conflated']} conflated), "
+                                   f"{counters['queued']} queued, max depth {counters['max_depth']}")
+            if lagging:
+                logger.warning(f"{lagging} of {len(stats)} clients dropped market data "
+                               f"in the last {self.queue_stats_interval:g} seconds")
+            last_dropped = {client_id: counters["dropped"] for client_id, counters in stats.items()}
+    
+    async def get_snapshot(self, client_id, data):
+        """
+        Send a client the latest cached market data without subscribing
+        
+        Only instruments that are streaming (subscribed by any client) are
+        cached; others are reported with status 'error'.
+        
+        Args:
+            client_id: ID of the client
+            data: Request data with 'symbols' (or 'symbol' and 'exchange') and 'mode'
+        """
+        # Check if the client is authenticated
+        if client_id not in self.user_mapping:
+            await self.send_error(client_id, "NOT_AUTHENTICATED", "You must authenticate first")
+            return
+        
+        symbols = data.get("symbols") or []
+        mode_str = data.get("mode", "Quote")
+        mode = self._client_mode(mode_str)
+        
+        # Handle case where a single symbol is passed directly instead of as an array
+        if not symbols and (data.get("symbol") and data.get("exchange")):
+            symbols = [{
+                "symbol": data.get("symbol"),
+                "exchange": data.get("exchange")
+            }]
+        
+        if not symbols:
+            await self.send_error(client_id, "INVALID_PARAMETERS", "At least one symbol must be specified")
+            return
+        
+        broker_name = self.user_broker_mapping.get(self.user_mapping[client_id], "unknown")
+        
+        snapshots = []
+        for symbol_info in symbols:
+            symbol = symbol_info.get("symbol")
+            exchange = symbol_info.get("exchange")
+            
+            if not symbol or not exchange:
+                continue  # Skip invalid symbols
+            
+            cached = self.last_values.get(broker_name, exchange, symbol, mode)
+            if cached:
+                snapshots.append({
+                    "symbol": symbol,
+                    "exchange": exchange,
+                    "mode": mode,
+                    "status": "success",
+                    "data": cached[1],
+                    "received_at": cached[2]
+                })
+            else:
+                snapshots.append({
+                    "symbol": symbol,
+                    "exchange": exchange,
+                    "mode": mode,
+                    "status": "error",
+                    "message": "No cached data for this instrument"
+                })
+        
+        await self.send_message(client_id, {
+            "type": "snapshot",
+            "status": "success" if all(s["status"] == "success" for s in snapshots) else "partial",
+            "snapshots": snapshots,
+            "broker": broker_name
+        })
+    
+    def _send_cached_value(self, client_id, broker_name, exchange, symbol, mode):
+        """Queue the cached value of an instrument to a client as a market_data message"""
+        cached = self.last_values.get(broker_name, exchange, symbol, mode)
+        if not cached:
+            return
+        
+        self.broadcast_message([client_id], {
+            "type": "market_data",
+            "symbol": symbol,
+            "exchange": exchange,
+            "mode": mode,
+            "broker": cached[0] if cached[0] != "unknown" else broker_name,
+            "data": cached[1],
+            "snapshot": True
+        }, conflation_key=(exchange, symbol, mode))
+    
+    @staticmethod
+    def _client_mode(mode_str):
+        """Map a client mode ('LTP', 'Quote', 'Depth') to its numeric mode"""
+        mode_mapping = {
+            "LTP": 1,
+            "Quote": 2, 
+            "Depth": 3
+        }
+        return mode_mapping.get(mode_str, mode_str) if isinstance(mode_str, str) else mode_str
+    
+    @staticmethod
+    def _throttle_interval(data):
+        """
+        Get the minimum seconds between updates requested on a subscribe
+        
+        'throttle_ms' takes precedence over 'max_rate' (updates per second).
+        
+        Returns:
+            float: The interval, or None for the full stream
+            
+        Raises:
+            ValueError: If the value is not a positive number
+        """
+        throttle_ms = data.get("throttle_ms")
+        max_rate = data.get("max_rate")
+        if throttle_ms is not None:
+            interval = float(throttle_ms) / 1000
+        elif max_rate is not None:
+            interval = 1 / float(max_rate)
+        else:
+            return None
+        if not interval > 0:
+            raise ValueError("Throttle interval must be positive")
+        return interval
+    
     async def subscribe_client(self, client_id, data):
         """
         Subscribe a client to market data using their configured broker
@@ -584,15 +810,15 @@ class WebSocketProxy:
         mode_str = data.get("mode", "Quote")  # Get mode as string (LTP, Quote, Depth)
         depth_level = data.get("depth", 5)  # Default to 5 levels
         
-        # Map string mode to numeric mode
-        mode_mapping = {
-            "LTP": 1,
-            "Quote": 2, 
-            "Depth": 3
-        }
-        
         # Convert string mode to numeric if needed
-        mode = mode_mapping.get(mode_str, mode_str) if isinstance(mode_str, str) else mode_str
+        mode = self._client_mode(mode_str)
+        
+        # Optional rate limit for clients that do not need every tick
+        try:
+            throttle_interval = self._throttle_interval(data)
+        except (TypeError, ValueError):
+            await self.send_error(client_id, "INVALID_PARAMETERS", "max_rate and throttle_ms must be positive numbers")
+            return
         
         # Handle case where a single symbol is passed directly instead of as an array
         if not symbols and (data.get("symbol") and data.get("exchange")):
@@ -614,54 +840,84 @@ class WebSocketProxy:
         adapter = self.broker_adapters[user_id]
         broker_name = self.user_broker_mapping.get(user_id, "unknown")
         
-        # Process each symbol in the subscription request
-        subscription_responses = []
-        subscription_success = True
-        
+        # Collect the requested instruments, ignoring invalid entries and duplicates
+        requested = []
         for symbol_info in symbols:
             symbol = symbol_info.get("symbol")
             exchange = symbol_info.get("exchange")
             
             if not symbol or not exchange:
                 continue  # Skip invalid symbols
-                
-            # Subscribe to market data
-            response = adapter.subscribe(symbol, exchange, mode, depth_level)
+            if (symbol, exchange) not in requested:
+                requested.append((symbol, exchange))
+        
+        # Process each symbol in the subscription request
+        subscription_responses = []
+        subscription_success = True
+        
+        async with self._get_user_lock(user_id):
+            client_subscriptions = self.subscriptions.setdefault(client_id, {})
             
-            if response.get("status") == "success":
-                # Store the subscription
-                subscription_info = {
-                    "symbol": symbol,
-                    "exchange": exchange,
-                    "mode": mode,
-                    "depth_level": depth_level,
-                    "broker": broker_name
-                }
+            # Only instruments no client of this user holds yet go to the broker,
+            # in one batch that runs off the event loop
+            new_upstream = [
+                (symbol, exchange) for symbol, exchange in requested
+                if not self.upstream_subscriptions.is_subscribed(user_id, exchange, symbol, mode)
+            ]
+            responses = {}
+            if new_upstream:
+                results = await self._run_adapter_batch(
+                    adapter, "subscribe",
+                    [(symbol, exchange, mode, depth_level) for symbol, exchange in new_upstream]
+                )
+                responses = dict(zip(new_upstream, results))
+            
+            for symbol, exchange in requested:
+                key = (exchange, symbol, mode)
+                response = responses.get((symbol, exchange))
                 
-                if client_id in self.subscriptions:
-                    self.subscriptions[client_id].add(json.dumps(subscription_info))
+                if response is None or response.get("status") == "success":
+                    if key not in client_subscriptions:
+                        self.upstream_subscriptions.acquire(user_id, exchange, symbol, mode, response)
+                    response = self.upstream_subscriptions.get_response(user_id, exchange, symbol, mode) or {}
+                    
+                    # Store the subscription
+                    subscription_info = {
+                        "symbol": symbol,
+                        "exchange": exchange,
+                        "mode": mode,
+                        "depth_level": depth_level,
+                        "broker": broker_name,
+                        "throttle_ms": round(throttle_interval * 1000) if throttle_interval else None
+                    }
+                    
+                    client_subscriptions[key] = subscription_info
+                    self.tick_throttle.set_interval(client_id, key, throttle_interval)
+                    if self.subscription_index.add(client_id, broker_name, exchange, symbol, mode):
+                        self._zmq_subscribe(exchange, symbol, mode)
+                    
+                    # Add to successful subscriptions
+                    subscription_response = {
+                        "symbol": symbol,
+                        "exchange": exchange,
+                        "status": "success",
+                        "mode": mode_str,
+                        "depth": response.get("actual_depth", depth_level),
+                        "broker": broker_name
+                    }
+                    if throttle_interval:
+                        subscription_response["throttle_ms"] = subscription_info["throttle_ms"]
+                    subscription_responses.append(subscription_response)
                 else:
-                    self.subscriptions[client_id] = {json.dumps(subscription_info)}
-                
-                # Add to successful subscriptions
-                subscription_responses.append({
-                    "symbol": symbol,
-                    "exchange": exchange,
-                    "status": "success",
-                    "mode": mode_str,
-                    "depth": response.get("actual_depth", depth_level),
-                    "broker": broker_name
-                })
-            else:
-                subscription_success = False
-                # Add to failed subscriptions
-                subscription_responses.append({
-                    "symbol": symbol,
-                    "exchange": exchange,
-                    "status": "error",
-                    "message": response.get("message", "Subscription failed"),
-                    "broker": broker_name
-                })
+                    subscription_success = False
+                    # Add to failed subscriptions
+                    subscription_responses.append({
+                        "symbol": symbol,
+                        "exchange": exchange,
+                        "status": "error",
+                        "message": response.get("message", "Subscription failed"),
+                        "broker": broker_name
+                    })
         
         # Send combined response
         await self.send_message(client_id, {
@@ -671,6 +927,11 @@ class WebSocketProxy:
             "message": "Subscription processing complete",
             "broker": broker_name
         })
+        
+        # Give new subscribers the current value of instruments that are already streaming
+        for response in subscription_responses:
+            if response["status"] == "success":
+                self._send_cached_value(client_id, broker_name, response["exchange"], response["symbol"], mode)
     
     async def unsubscribe_client(self, client_id, data):
         """
@@ -717,98 +978,105 @@ class WebSocketProxy:
         successful_unsubscriptions = []
         failed_unsubscriptions = []
         
-        # Handle unsubscribe_all case
-        if is_unsubscribe_all:
-            # Get all current subscriptions
-            if client_id in self.subscriptions:
-                # Convert all stored subscription strings back to dictionaries
-                all_subscriptions = []
-                for sub_json in self.subscriptions[client_id]:
-                    try:
-                        sub_dict = json.loads(sub_json)
-                        all_subscriptions.append(sub_dict)
-                    except json.JSONDecodeError:
-                        logger.error(f"Failed to parse subscription: {sub_json}")
+        async with self._get_user_lock(user_id):
+            client_subscriptions = self.subscriptions.get(client_id, {})
+            
+            # Handle unsubscribe_all case
+            if is_unsubscribe_all:
+                # Stop routing data to this client before unsubscribing upstream
+                for key in self.subscription_index.remove_client(client_id):
+                    self._zmq_unsubscribe(*key[1:])
                 
-                # Unsubscribe from each subscription
-                for sub in all_subscriptions:
-                    symbol = sub.get("symbol")
-                    exchange = sub.get("exchange")
-                    mode = sub.get("mode")
-                    
-                    if symbol and exchange:
-                        response = adapter.unsubscribe(symbol, exchange, mode)
-                        
-                        if response.get("status") == "success":
-                            successful_unsubscriptions.append({
-                                "symbol": symbol,
-                                "exchange": exchange,
-                                "status": "success",
-                                "broker": broker_name
-                            })
-                        else:
-                            failed_unsubscriptions.append({
-                                "symbol": symbol,
-                                "exchange": exchange,
-                                "status": "error",
-                                "message": response.get("message", "Unsubscription failed"),
-                                "broker": broker_name
-                            })
+                # Release every subscription; the adapter is only called for
+                # instruments no other client of this user still holds
+                keys = list(client_subscriptions.keys())
+                responses = await self._release_upstream(user_id, keys)
+                for exchange, symbol, mode in keys:
+                    response = responses.get((exchange, symbol, mode), {"status": "success"})
+                    if response.get("status") == "success":
+                        successful_unsubscriptions.append({
+                            "symbol": symbol,
+                            "exchange": exchange,
+                            "status": "success",
+                            "broker": broker_name
+                        })
+                    else:
+                        failed_unsubscriptions.append({
+                            "symbol": symbol,
+                            "exchange": exchange,
+                            "status": "error",
+                            "message": response.get("message", "Unsubscription failed"),
+                            "broker": broker_name
+                        })
                 
                 # Clear all subscriptions for this client
-                self.subscriptions[client_id].clear()
-        else:
-            # Process specific symbols
-            for symbol_info in symbols:
-                symbol = symbol_info.get("symbol")
-                exchange = symbol_info.get("exchange")
-                mode = symbol_info.get("mode", 2)  # Default to Quote mode
-                
-                if not symbol or not exchange:
-                    continue  # Skip invalid symbols
+                client_subscriptions.clear()
+                self.tick_throttle.remove_client(client_id)
+            else:
+                # Process specific symbols
+                held_keys = []
+                for symbol_info in symbols:
+                    symbol = symbol_info.get("symbol")
+                    exchange = symbol_info.get("exchange")
+                    mode = symbol_info.get("mode", 2)  # Default to Quote mode
+                    
+                    if not symbol or not exchange:
+                        continue  # Skip invalid symbols
+                    
+                    key = (exchange, symbol, mode)
+                    if key in client_subscriptions:
+                        if key not in held_keys:
+                            held_keys.append(key)
+                    else:
+                        failed_unsubscriptions.append({
+                            "symbol": symbol,
+                            "exchange": exchange,
+                            "status": "error",
+                            "message": "Not subscribed",
+                            "broker": broker_name
+                        })
                 
-                # Unsubscribe from market data
-                response = adapter.unsubscribe(symbol, exchange, mode)
+                # Unsubscribe from market data where this client holds the last reference
+                final_keys = [
+                    key for key in held_keys
+                    if self.upstream_subscriptions.refcount(user_id, *key) == 1
+                ]
+                responses = {}
+                if final_keys:
+                    results = await self._run_adapter_batch(
+                        adapter, "unsubscribe",
+                        [(symbol, exchange, mode) for exchange, symbol, mode in final_keys]
+                    )
+                    responses = dict(zip(final_keys, results))
                 
-                if response.get("status") == "success":
-                    # Try to remove subscription
-                    if client_id in self.subscriptions:
-                        subscription_info = {
+                for key in held_keys:
+                    exchange, symbol, mode = key
+                    response = responses.get(key, {"status": "success"})
+                    
+                    if response.get("status") == "success":
+                        # Remove the subscription, its fan-out index entry and its reference
+                        sub_info = client_subscriptions.pop(key)
+                        self.tick_throttle.remove(client_id, key)
+                        if self.subscription_index.remove(
+                            client_id, sub_info.get("broker", broker_name), exchange, symbol, mode
+                        ):
+                            self._zmq_unsubscribe(exchange, symbol, mode)
+                        self.upstream_subscriptions.release(user_id, exchange, symbol, mode)
+                        
+                        successful_unsubscriptions.append({
                             "symbol": symbol,
                             "exchange": exchange,
-                            "mode": mode,
+                            "status": "success",
                             "broker": broker_name
-                        }
-                        subscription_key = json.dumps(subscription_info)
-                        # Remove any matching subscription (with or without broker info)
-                        subscriptions_to_remove = []
-                        for sub_key in self.subscriptions[client_id]:
-                            try:
-                                sub_data = json.loads(sub_key)
-                                if (sub_data.get("symbol") == symbol and 
-                                    sub_data.get("exchange") == exchange and 
-                                    sub_data.get("mode") == mode):
-                                    subscriptions_to_remove.append(sub_key)
-                            except json.JSONDecodeError:
-                                continue
-                        
-                        for sub_key in subscriptions_to_remove:
-                            self.subscriptions[client_id].discard(sub_key)
-                    
-                    successful_unsubscriptions.append({
-                        "symbol": symbol,
-                        "exchange": exchange,
-                        "status": "success",
-                        "broker": broker_name
-                    })
-                else:
-                    failed_unsubscriptions.append({
-                        "symbol": symbol,
-                        "exchange": exchange,
-                        "status": "error",
-                        "message": response.get("message", "Unsubscription failed"),
-                        "broker": broker_name
-                    })
+                        })
+                    else:
+                        failed_unsubscriptions.append({
+                            "symbol": symbol,
+                            "exchange": exchange,
+                            "status": "error",
+                            "message": response.get("message", "Unsubscription failed"),
+                            "broker": broker_name
+                        })
         
         # Send combined response
         status = "success"
@@ -826,6 +1094,104 @@ class WebSocketProxy:
             "broker": broker_name
         })
     
+    def _get_user_lock(self, user_id):
+        """Get the lock that serializes subscription changes for a user's adapter"""
+        lock = self.user_locks.get(user_id)
+        if lock is None:
+            lock = self.user_locks[user_id] = aio.Lock()
+        return lock
+    
+    async def _release_upstream(self, user_id, keys):
+        """
+        Drop one reference per key and unsubscribe the adapter where it was the last one
+        
+        Must be called with the user's lock held.
+        
+        Args:
+            user_id: User whose adapter holds the subscriptions
+            keys: (exchange, symbol, mode) keys released by a client
+            
+        Returns:
+            dict: Adapter response per key that reached zero references
+        """
+        final_keys = [
+            key for key in keys
+            if self.upstream_subscriptions.release(user_id, *key)
+        ]
+        adapter = self.broker_adapters.get(user_id)
+        if not final_keys or not adapter:
+            return {}
+        
+        results = await self._run_adapter_batch(
+            adapter, "unsubscribe",
+            [(symbol, exchange, mode) for exchange, symbol, mode in final_keys]
+        )
+        return dict(zip(final_keys, results))
+    
+    async def _run_adapter_batch(self, adapter, method, calls):
+        """
+        Run a batch of adapter subscribe/unsubscribe calls in a worker thread
+        
+        Adapter calls are blocking (they may wait on the broker's socket), so
+        they run off the event loop and other clients keep being served.
+        
+        Args:
+            adapter: Broker adapter
+            method: 'subscribe' or 'unsubscribe'
+            calls: List of argument tuples, one per call
+            
+        Returns:
+            list: Adapter responses, in the order of calls
+        """
+        loop = aio.get_running_loop()
+        return await loop.run_in_executor(None, self._call_adapter_batch, adapter, method, calls)
+    
+    @staticmethod
+    def _call_adapter_batch(adapter, method, calls):
+        # Adapters that can take a whole batch in one call (e.g. RemoteBrokerAdapter) get it at once
+        batch = getattr(adapter, f"{method}_batch", None)
+        if batch:
+            try:
+                return batch(calls)
+            except Exception as e:
+                logger.exception(f"Error in adapter {method}_batch: {e}")
+                return [{"status": "error", "message": str(e)}] * len(calls)
+        
+        func = getattr(adapter, method)
+        responses = []
+        for args in calls:
+            try:
+                response = func(*args)
+            except Exception as e:
+                logger.exception(f"Error in adapter {method} for {args[:2]}: {e}")
+                response = {"status": "error", "message": str(e)}
+            responses.append(response or {"status": "error", "message": f"No response from adapter {method}"})
+        return responses
+    
+    def _zmq_subscribe(self, exchange, symbol, mode):
+        """
+        Subscribe the ZeroMQ socket to one instrument's topic prefix
+        
+        libzmq reference-counts identical subscriptions, so this is called once
+        per subscription index entry and paired with _zmq_unsubscribe.
+        """
+        prefix = subscription_prefix(exchange, symbol, mode)
+        if prefix:
+            self.socket.setsockopt(zmq.SUBSCRIBE, prefix)
+    
+    def _zmq_unsubscribe(self, exchange, symbol, mode):
+        """Release a topic prefix subscription taken by _zmq_subscribe"""
+        # Once nobody receives an instrument its cached value would go stale
+        if not self.subscription_index.get_clients(None, exchange, symbol, mode):
+            self.last_values.discard(exchange, symbol, mode)
+        
+        prefix = subscription_prefix(exchange, symbol, mode)
+        if prefix:
+            try:
+                self.socket.setsockopt(zmq.UNSUBSCRIBE, prefix)
+            except zmq.ZMQError as e:
+                logger.warning(f"Error unsubscribing ZeroMQ topic {prefix!r}: {e}")
+    
     async def send_message(self, client_id, message):
         """
         Send a message to a client
@@ -834,12 +1200,83 @@ class WebSocketProxy:
             client_id: ID of the client
             message: The message to send
         """
-        if client_id in self.clients:
-            websocket = self.clients[client_id]
-            try:
-                await websocket.send(json.dumps(message))
-            except websockets.exceptions.ConnectionClosed:
-                logger.info(f"Connection closed while sending message to client {client_id}")
+        queue = self.client_queues.get(client_id)
+        if queue:
+            queue.put(encode_message(message, self.client_encodings.get(client_id, ENCODING_JSON)))
+    
+    def broadcast_message(self, client_ids, message, conflation_key=None):
+        """
+        Send the same message to several clients, serializing it only once
+        per wire encoding
+        
+        The encoded frame is placed on each client's outbound queue, where a
+        newer frame with the same conflation_key replaces one not yet sent.
+        
+        Args:
+            client_ids: IDs of the clients to send to
+            message: The message to send
+            conflation_key: Key identifying the instrument, e.g. (exchange, symbol, mode)
+        """
+        frames = {}
+        for client_id in client_ids:
+            queue = self.client_queues.get(client_id)
+            if queue is None:
+                continue
+            
+            encoding = self.client_encodings.get(client_id, ENCODING_JSON)
+            frame = frames.get(encoding)
+            if frame is None:
+                frame = frames[encoding] = encode_message(message, encoding)
+            queue.put(frame, conflation_key)
+    
+    def _send_throttled(self, client_id, key, message):
+        """
+        Send a tick to a rate-limited subscription, or keep it as the latest pending update
+        
+        Args:
+            client_id: ID of the client
+            key: (exchange, symbol, mode) of the subscription
+            message: Market data message
+        """
+        loop = aio.get_running_loop()
+        now = loop.time()
+        delay = self.tick_throttle.due_in(client_id, key, now)
+        
+        if delay <= 0 and not self.tick_throttle.has_pending(client_id, key):
+            self.tick_throttle.mark_sent(client_id, key, now)
+            self.broadcast_message([client_id], message, conflation_key=key)
+        elif self.tick_throttle.hold(client_id, key, message):
+            loop.call_later(max(delay, 0), self._flush_throttled, client_id, key)
+    
+    def _flush_throttled(self, client_id, key):
+        """Send the latest update coalesced while a subscription's interval was running"""
+        message = self.tick_throttle.take(client_id, key)
+        if message is None or client_id not in self.client_queues:
+            return
+        
+        self.tick_throttle.mark_sent(client_id, key, aio.get_running_loop().time())
+        self.broadcast_message([client_id], message, conflation_key=key)
+    
+    async def client_writer(self, client_id, websocket, queue):
+        """
+        Drain a client's outbound queue onto its websocket
+        
+        Args:
+            client_id: ID of the client
+            websocket: The WebSocket connection
+            queue: The client's ConflatingSendQueue
+        """
+        try:
+            while True:
+                frame = await queue.get()
+                await websocket.send(frame)
+                queue.sent += 1
+        except websockets.exceptions.ConnectionClosed:
+            logger.info(f"Connection closed while sending message to client {client_id}")
+        except aio.CancelledError:
+            pass
+        except Exception as e:
+            logger.error(f"Error in writer for client {client_id}: {e}")
     
     async def send_error(self, client_id, code, message):
         """
@@ -878,97 +1315,62 @@ class WebSocketProxy:
                 
                 # Parse the message
                 topic_str = topic.decode('utf-8')
-                data_str = data.decode('utf-8')
-                market_data = json.loads(data_str)
+                market_data = decode_bus_payload(data)
                 
-                # Extract topic components
-                # Support both formats:
-                # New format: BROKER_EXCHANGE_SYMBOL_MODE (with broker name)
-                # Old format: EXCHANGE_SYMBOL_MODE (without broker name)
-                # Special case: NSE_INDEX_SYMBOL_MODE (exchange contains underscore)
-                parts = topic_str.split('_')
-                
-                # Special case handling for NSE_INDEX and BSE_INDEX
-                if len(parts) >= 4 and parts[0] == "NSE" and parts[1] == "INDEX":
-                    broker_name = "unknown"
-                    exchange = "NSE_INDEX"
-                    symbol = parts[2]
-                    mode_str = parts[3]
-                elif len(parts) >= 4 and parts[0] == "BSE" and parts[1] == "INDEX":
-                    broker_name = "unknown"
-                    exchange = "BSE_INDEX"
-                    symbol = parts[2]
-                    mode_str = parts[3]
-                elif len(parts) >= 5 and parts[1] == "INDEX":  # BROKER_NSE_INDEX_SYMBOL_MODE format
-                    broker_name = parts[0]
-                    exchange = f"{parts[1]}_{parts[2]}"
-                    symbol = parts[3]
-                    mode_str = parts[4]
-                elif len(parts) >= 4:
-                    # Standard format with broker name
-                    broker_name = parts[0]
-                    exchange = parts[1]
-                    symbol = parts[2]
-                    mode_str = parts[3]
-                elif len(parts) >= 3:
-                    # Old format without broker name
-                    broker_name = "unknown"
-                    exchange = parts[0]
-                    symbol = parts[1] 
-                    mode_str = parts[2]
-                else:
+                # Topics are structured as EXCHANGE|SYMBOL|MODE|BROKER
+                parsed = parse_topic(topic_str)
+                if not parsed:
                     logger.warning(f"Invalid topic format: {topic_str}")
                     continue
+                broker_name, exchange, symbol, mode_str = parsed
                 
                 # Map mode string to mode number
-                mode_map = {"LTP": 1, "QUOTE": 2, "DEPTH": 3}
-                mode = mode_map.get(mode_str)
+                mode = MODE_NUMBERS.get(mode_str)
                 
                 if not mode:
                     logger.warning(f"Invalid mode in topic: {mode_str}")
                     continue
                 
-                # Find clients subscribed to this data
-                # Create a snapshot of the subscriptions before iteration to avoid
-                # 'dictionary changed size during iteration' errors
-                subscriptions_snapshot = list(self.subscriptions.items())
+                # Look up only the clients subscribed to this instrument.
+                # get_clients returns a snapshot, so clients may (un)subscribe while we send.
+                client_ids = self.subscription_index.get_clients(broker_name, exchange, symbol, mode)
+                if not client_ids:
+                    continue  # Late tick for an instrument that was just unsubscribed
+                self.last_values.update(broker_name, exchange, symbol, mode, market_data)
                 
-                for client_id, subscriptions in subscriptions_snapshot:
+                # Group recipients by the broker name shown in the envelope, so each
+                # distinct envelope is built and serialized once per tick
+                key = (exchange, symbol, mode)
+                recipients = {}
+                throttled = []
+                for client_id in client_ids:
                     user_id = self.user_mapping.get(client_id)
                     if not user_id:
                         continue
                     
-                    # Check if this client's broker matches the message broker (if broker is specified)
                     client_broker = self.user_broker_mapping.get(user_id)
-                    if broker_name != "unknown" and client_broker and client_broker != broker_name:
-                        continue  # Skip if broker doesn't match
-                    
-                    # Create a snapshot of the subscription set before iteration
-                    subscriptions_list = list(subscriptions)
-                    for sub_json in subscriptions_list:
-                        try:
-                            sub = json.loads(sub_json)
-                            
-                            # Check subscription match
-                            if (sub.get("symbol") == symbol and 
-                                sub.get("exchange") == exchange and 
-                                (sub.get("mode") == mode or 
-                                 (mode_str == "LTP" and sub.get("mode") == 1) or
-                                 (mode_str == "QUOTE" and sub.get("mode") == 2) or
-                                 (mode_str == "DEPTH" and sub.get("mode") == 3))):
-                                
-                                # Forward data to the client
-                                await self.send_message(client_id, {
-                                    "type": "market_data",
-                                    "symbol": symbol,
-                                    "exchange": exchange,
-                                    "mode": mode,
-                                    "broker": broker_name if broker_name != "unknown" else client_broker,
-                                    "data": market_data
-                                })
-                        except json.JSONDecodeError as e:
-                            logger.error(f"Error parsing subscription: {sub_json}, Error: {e}")
-                            continue
+                    envelope_broker = broker_name if broker_name != "unknown" else client_broker
+                    if self.tick_throttle.is_throttled(client_id, key):
+                        throttled.append((client_id, envelope_broker))
+                    else:
+                        recipients.setdefault(envelope_broker, []).append(client_id)
+                
+                messages = {}
+                for envelope_broker in set(recipients).union(b for _, b in throttled):
+                    messages[envelope_broker] = {
+                        "type": "market_data",
+                        "symbol": symbol,
+                        "exchange": exchange,
+                        "mode": mode,
+                        "broker": envelope_broker,
+                        "data": market_data
+                    }
+                
+                # Forward data to the clients
+                for envelope_broker, broker_client_ids in recipients.items():
+                    self.broadcast_message(broker_client_ids, messages[envelope_broker], conflation_key=key)
+                for client_id, envelope_broker in throttled:
+                    self._send_throttled(client_id, key, messages[envelope_broker])
             
             except Exception as e:
                 logger.error(f"Error in ZeroMQ listener: {e}")
@@ -988,6 +1390,15 @@ async def main():
         ws_host = os.getenv('WEBSOCKET_HOST', '127.0.0.1')
         ws_port = int(os.getenv('WEBSOCKET_PORT', '8765'))
         
+        # WEBSOCKET_WORKERS > 1 runs the proxy as several processes sharing the port
+        workers = int(os.getenv('WEBSOCKET_WORKERS', '1'))
+        if workers > 1:
+            from .sharded import serve_sharded_proxy, sharding_supported
+            if sharding_supported():
+                await serve_sharded_proxy(ws_host, ws_port, workers)
+                return
+            logger.warning("WEBSOCKET_WORKERS > 1 requires SO_REUSEPORT, which this platform lacks. Using a single worker.")
+        
         # Create and start the WebSocket proxy
         proxy = WebSocketProxy(host=ws_host, port=ws_port)
         
@@ -0,0 +1,116 @@
+import asyncio
+import multiprocessing
+import os
+import signal
+import socket
+from typing import List, Optional
+
+from utils.logging import get_logger
+from .adapter_host import RemoteBrokerAdapter, control_address, run_adapter_host
+from .port_check import is_port_in_use
+from .transport import bus_endpoint, resolve_transport
+
+logger = get_logger(__name__)
+
+
+def sharding_supported() -> bool:
+    """Check whether several processes can share the WebSocket port on this platform"""
+    return hasattr(socket, 'SO_REUSEPORT')
+
+
+def run_proxy_worker(host: str, port: int, address: str, zmq_endpoint: str):
+    """
+    Process entry point for one WebSocket proxy worker
+
+    The worker shares the listening port with its siblings through
+    SO_REUSEPORT, so the kernel spreads client connections across them.
+    Broker adapters are reached through the adapter host at address and
+    publish market data to the worker's own zmq_endpoint.
+    """
+    from .server import WebSocketProxy
+
+    async def serve():
+        proxy = WebSocketProxy(host, port, adapter_factory=RemoteBrokerAdapter.factory(address),
+                               check_port=False, zmq_endpoint=zmq_endpoint)
+        try:
+            await proxy.start()
+        finally:
+            await proxy.stop()
+
+    asyncio.run(serve())
+
+
+def start_sharded_proxy(host: str, port: int, workers: int) -> List[multiprocessing.Process]:
+    """
+    Start the adapter host and N proxy worker processes sharing one port
+
+    Args:
+        host: Hostname to bind the WebSocket server to
+        port: Port number shared by every worker
+        workers: Number of proxy worker processes
+
+    Returns:
+        list: The started processes, adapter host first
+    """
+    if is_port_in_use(host, port, wait_time=2.0):
+        raise RuntimeError(f"WebSocket port {port} is already in use on {host}")
+
+    # Spawn rather than fork: the parent runs Flask and other threads
+    context = multiprocessing.get_context("spawn")
+    address = control_address()
+    transport = resolve_transport(multiprocess=True)
+    endpoints = [bus_endpoint(transport, shard) for shard in range(workers)]
+
+    # Adapters in the host publish to every worker's endpoint
+    processes = [context.Process(target=run_adapter_host, args=(address, endpoints),
+                                 name="openalgo-ws-adapters", daemon=True)]
+    for index, endpoint in enumerate(endpoints):
+        processes.append(context.Process(target=run_proxy_worker, args=(host, port, address, endpoint),
+                                         name=f"openalgo-ws-worker-{index + 1}", daemon=True))
+
+    for process in processes:
+        process.start()
+
+    logger.info(f"Started WebSocket adapter host and {workers} proxy workers sharing port {port}")
+    return processes
+
+
+async def serve_sharded_proxy(host: str, port: int, workers: int):
+    """
+    Run the sharded proxy in the foreground (standalone mode)
+
+    Returns on SIGTERM/SIGINT, or when one of the processes exits, after
+    stopping all of them.
+    """
+    processes = start_sharded_proxy(host, port, workers)
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stopping.set)
+    try:
+        while not stopping.is_set():
+            exited = [process.name for process in processes if not process.is_alive()]
+            if exited:
+                logger.error(f"{', '.join(exited)} exited, stopping the WebSocket proxy")
+                break
+            try:
+                await asyncio.wait_for(stopping.wait(), timeout=1)
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.remove_signal_handler(sig)
+        stop_sharded_proxy(processes)
+
+
+def stop_sharded_proxy(processes: List[multiprocessing.Process], timeout: Optional[float] = 3.0):
+    """Stop the proxy workers first, then the adapter host"""
+    for group in (processes[1:], processes[:1]):
+        for process in group:
+            if process.is_alive():
+                os.kill(process.pid, signal.SIGTERM)
+        for process in group:
+            process.join(timeout)
+            if process.is_alive():
+                logger.warning(f"{process.name} did not stop gracefully, killing it")
+                process.kill()
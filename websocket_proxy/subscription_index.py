@@ -0,0 +1,118 @@
+from typing import Dict, Set, Tuple, List, Optional
+
+# (broker, exchange, symbol, mode)
+SubscriptionKey = Tuple[str, str, str, int]
+
+
+class SubscriptionIndex:
+    """
+    Inverted index mapping (broker, exchange, symbol, mode) to the set of
+    client IDs subscribed to that instrument.
+
+    Lets the ZeroMQ listener resolve the recipients of a tick with a single
+    dict lookup instead of scanning every client's subscriptions.
+    """
+
+    def __init__(self):
+        self._index: Dict[SubscriptionKey, Set[int]] = {}
+        self._client_keys: Dict[int, Set[SubscriptionKey]] = {}
+        # Number of index keys per broker, used to resolve topics without a broker name
+        self._broker_counts: Dict[str, int] = {}
+
+    def add(self, client_id: int, broker: str, exchange: str, symbol: str, mode: int) -> bool:
+        """
+        Register a client's interest in an instrument
+
+        Returns:
+            bool: True if the subscription was new for this client
+        """
+        key = (broker, exchange, symbol, mode)
+        client_keys = self._client_keys.setdefault(client_id, set())
+        if key in client_keys:
+            return False
+
+        client_keys.add(key)
+        clients = self._index.get(key)
+        if clients is None:
+            self._index[key] = {client_id}
+            self._broker_counts[broker] = self._broker_counts.get(broker, 0) + 1
+        else:
+            clients.add(client_id)
+        return True
+
+    def remove(self, client_id: int, broker: str, exchange: str, symbol: str, mode: int) -> bool:
+        """
+        Remove a client's interest in an instrument
+
+        Returns:
+            bool: True if the client was subscribed
+        """
+        key = (broker, exchange, symbol, mode)
+        client_keys = self._client_keys.get(client_id)
+        if not client_keys or key not in client_keys:
+            return False
+
+        client_keys.discard(key)
+        if not client_keys:
+            del self._client_keys[client_id]
+        self._discard_from_index(key, client_id)
+        return True
+
+    def remove_client(self, client_id: int) -> List[SubscriptionKey]:
+        """
+        Remove every subscription held by a client
+
+        Returns:
+            list: The keys the client was subscribed to
+        """
+        client_keys = self._client_keys.pop(client_id, set())
+        for key in client_keys:
+            self._discard_from_index(key, client_id)
+        return list(client_keys)
+
+    def get_clients(self, broker: Optional[str], exchange: str, symbol: str, mode: int) -> Set[int]:
+        """
+        Get the clients subscribed to an instrument
+
+        Args:
+            broker: Broker name, or None/"unknown" to match subscriptions of any broker
+
+        Returns:
+            set: A snapshot of the subscribed client IDs (safe to iterate while the index changes)
+        """
+        if broker and broker != "unknown":
+            clients = self._index.get((broker, exchange, symbol, mode))
+            return set(clients) if clients else set()
+
+        # Topics published without a broker name match every active broker
+        result = set()
+        for known_broker in self._broker_counts:
+            clients = self._index.get((known_broker, exchange, symbol, mode))
+            if clients:
+                result.update(clients)
+        return result
+
+    def get_client_keys(self, client_id: int) -> Set[SubscriptionKey]:
+        """Get a snapshot of the keys a client is subscribed to"""
+        return set(self._client_keys.get(client_id, ()))
+
+    def has_subscribers(self, broker: str, exchange: str, symbol: str, mode: int) -> bool:
+        """Check whether any client is subscribed to an instrument"""
+        return (broker, exchange, symbol, mode) in self._index
+
+    def __len__(self):
+        return len(self._index)
+
+    def _discard_from_index(self, key: SubscriptionKey, client_id: int):
+        clients = self._index.get(key)
+        if clients is None:
+            return
+        clients.discard(client_id)
+        if not clients:
+            del self._index[key]
+            broker = key[0]
+            remaining = self._broker_counts.get(broker, 0) - 1
+            if remaining > 0:
+                self._broker_counts[broker] = remaining
+            else:
+                self._broker_counts.pop(broker, None)
@@ -0,0 +1,86 @@
+from typing import Any, Dict, Hashable, Optional
+
+
+class TickThrottle:
+    """
+    Per-client, per-instrument rate limits for market data delivery.
+
+    A throttled subscription is sent at most one update per interval. Ticks
+    arriving in between are coalesced: only the latest is kept and it is
+    sent once the interval has elapsed, so a throttled client always ends
+    up with the current value. Times are event loop times in seconds.
+    """
+
+    def __init__(self):
+        # client_id -> {instrument key: minimum seconds between updates}
+        self._intervals: Dict[int, Dict[Hashable, float]] = {}
+        # (client_id, instrument key) -> time the last update was sent
+        self._last_sent: Dict[tuple, float] = {}
+        # (client_id, instrument key) -> latest message waiting for the interval to elapse
+        self._pending: Dict[tuple, Any] = {}
+
+    def set_interval(self, client_id: int, key: Hashable, interval: Optional[float]):
+        """
+        Set or clear the rate limit of a client's subscription
+
+        Args:
+            interval: Minimum seconds between updates, or None/0 for the full stream
+        """
+        if interval and interval > 0:
+            self._intervals.setdefault(client_id, {})[key] = interval
+        else:
+            self.remove(client_id, key)
+
+    def is_throttled(self, client_id: int, key: Hashable) -> bool:
+        """Check whether a client's subscription is rate limited"""
+        intervals = self._intervals.get(client_id)
+        return bool(intervals) and key in intervals
+
+    def due_in(self, client_id: int, key: Hashable, now: float) -> float:
+        """Get the seconds until the next update may be sent (<= 0 means now)"""
+        last_sent = self._last_sent.get((client_id, key))
+        if last_sent is None:
+            return 0.0
+        return last_sent + self._intervals.get(client_id, {}).get(key, 0.0) - now
+
+    def has_pending(self, client_id: int, key: Hashable) -> bool:
+        """Check whether a coalesced update is waiting to be sent"""
+        return (client_id, key) in self._pending
+
+    def mark_sent(self, client_id: int, key: Hashable, now: float):
+        """Record that an update was sent"""
+        self._last_sent[(client_id, key)] = now
+
+    def hold(self, client_id: int, key: Hashable, message: Any) -> bool:
+        """
+        Keep the latest message until the interval elapses
+
+        Returns:
+            bool: True if nothing was pending before, i.e. a flush needs to be scheduled
+        """
+        first = (client_id, key) not in self._pending
+        self._pending[(client_id, key)] = message
+        return first
+
+    def take(self, client_id: int, key: Hashable) -> Optional[Any]:
+        """Remove and return the pending message, if the subscription is still throttled"""
+        message = self._pending.pop((client_id, key), None)
+        if message is None or not self.is_throttled(client_id, key):
+            return None
+        return message
+
+    def remove(self, client_id: int, key: Hashable):
+        """Drop the rate limit and state of one subscription"""
+        intervals = self._intervals.get(client_id)
+        if intervals:
+            intervals.pop(key, None)
+            if not intervals:
+                del self._intervals[client_id]
+        self._last_sent.pop((client_id, key), None)
+        self._pending.pop((client_id, key), None)
+
+    def remove_client(self, client_id: int):
+        """Drop every rate limit and pending update of a client"""
+        for key in list(self._intervals.pop(client_id, {})):
+            self._last_sent.pop((client_id, key), None)
+            self._pending.pop((client_id, key), None)
@@ -0,0 +1,134 @@
+from functools import lru_cache
+from typing import Any, Optional, Tuple
+
+# Market data topics on the internal ZeroMQ bus have the form
+#
+#     EXCHANGE|SYMBOL|MODE|BROKER
+#
+# where BROKER may be empty. Fields are separated by '|', which never occurs
+# in exchange codes or OpenAlgo symbols, so a topic is parsed with a single
+# split. Because the instrument and mode come first, the proxy can subscribe
+# to the prefix 'EXCHANGE|SYMBOL|MODE|' and let libzmq drop every other
+# instrument before it reaches Python.
+
+TOPIC_SEPARATOR = "|"
+
+MODE_NAMES = {1: "LTP", 2: "QUOTE", 3: "DEPTH"}
+MODE_NUMBERS = {name: number for number, name in MODE_NAMES.items()}
+
+# (broker, exchange, symbol, mode_str); broker is "unknown" when not published
+ParsedTopic = Tuple[str, str, str, str]
+
+
+def build_topic(exchange: str, symbol: str, mode_str: str, broker: Optional[str] = None) -> str:
+    """
+    Build a structured market data topic
+
+    Args:
+        exchange: OpenAlgo exchange code (e.g., 'NSE', 'NSE_INDEX')
+        symbol: OpenAlgo symbol (e.g., 'RELIANCE')
+        mode_str: 'LTP', 'QUOTE' or 'DEPTH'
+        broker: Broker name, if the publisher wants to tag the topic with it
+    """
+    return f"{topic_prefix(exchange, symbol, mode_str)}{broker or ''}"
+
+
+def topic_prefix(exchange: str, symbol: str, mode_str: str) -> str:
+    """Get the topic prefix matching one instrument and mode from any broker"""
+    return f"{exchange}{TOPIC_SEPARATOR}{symbol}{TOPIC_SEPARATOR}{mode_str}{TOPIC_SEPARATOR}"
+
+
+def subscription_prefix(exchange: str, symbol: str, mode: int) -> Optional[bytes]:
+    """
+    Get the ZeroMQ SUBSCRIBE prefix for a client subscription
+
+    Returns:
+        bytes: The prefix, or None if the mode has no published topic
+    """
+    mode_str = MODE_NAMES.get(mode)
+    if not mode_str:
+        return None
+    return topic_prefix(exchange, symbol, mode_str).encode('utf-8')
+
+
+def parse_topic(topic: str) -> Optional[ParsedTopic]:
+    """
+    Parse a structured market data topic
+
+    Returns:
+        tuple: (broker, exchange, symbol, mode_str), or None if the topic is not structured
+    """
+    parts = topic.split(TOPIC_SEPARATOR)
+    if len(parts) != 4:
+        return None
+    exchange, symbol, mode_str, broker = parts
+    return broker or "unknown", exchange, symbol, mode_str
+
+
+def parse_legacy_topic(topic: str) -> Optional[ParsedTopic]:
+    """
+    Parse an underscore-separated topic as built by the broker adapters
+
+    Supports EXCHANGE_SYMBOL_MODE and BROKER_EXCHANGE_SYMBOL_MODE, with the
+    special case of NSE_INDEX/BSE_INDEX exchanges that contain an underscore.
+
+    Returns:
+        tuple: (broker, exchange, symbol, mode_str), or None if the topic is invalid
+    """
+    parts = topic.split('_')
+
+    if len(parts) >= 4 and parts[0] in ("NSE", "BSE") and parts[1] == "INDEX":
+        return "unknown", f"{parts[0]}_INDEX", parts[2], parts[3]
+    if len(parts) >= 5 and parts[1] == "INDEX":  # BROKER_NSE_INDEX_SYMBOL_MODE format
+        return parts[0], f"{parts[1]}_{parts[2]}", parts[3], parts[4]
+    if len(parts) >= 4:  # BROKER_EXCHANGE_SYMBOL_MODE format
+        return parts[0], parts[1], parts[2], parts[3]
+    if len(parts) >= 3:  # EXCHANGE_SYMBOL_MODE format
+        return "unknown", parts[0], parts[1], parts[2]
+    return None
+
+
+def normalize_topic(topic: str, data: Any = None) -> Optional[str]:
+    """
+    Convert a topic passed to publish_market_data into the structured form
+
+    Structured topics are returned unchanged. For legacy EXCHANGE_SYMBOL_MODE
+    topics the exchange and symbol carried in the market data are used to
+    split the topic exactly, so symbols containing underscores are handled;
+    the split heuristics are only a fallback.
+
+    Returns:
+        str: The structured topic, or None if it cannot be interpreted as market data
+    """
+    if TOPIC_SEPARATOR in topic:
+        return topic
+
+    exchange = symbol = None
+    if isinstance(data, dict):
+        exchange = data.get('exchange')
+        symbol = data.get('symbol')
+    return _normalize_legacy_topic(
+        topic,
+        exchange if isinstance(exchange, str) else None,
+        symbol if isinstance(symbol, str) else None
+    )
+
+
+@lru_cache(maxsize=65536)
+def _normalize_legacy_topic(topic: str, exchange: Optional[str], symbol: Optional[str]) -> Optional[str]:
+    head, sep, mode_str = topic.rpartition('_')
+    if not sep or mode_str not in MODE_NUMBERS:
+        return None
+
+    if exchange and symbol:
+        instrument = f"{exchange}_{symbol}"
+        if head == instrument:
+            return build_topic(exchange, symbol, mode_str)
+        if head.endswith(f"_{instrument}"):
+            return build_topic(exchange, symbol, mode_str, head[:-len(instrument) - 1])
+
+    parsed = parse_legacy_topic(topic)
+    if not parsed:
+        return None
+    broker, exchange, symbol, mode_str = parsed
+    return build_topic(exchange, symbol, mode_str, None if broker == "unknown" else broker)
@@ -0,0 +1,89 @@
+import os
+import tempfile
+from typing import List, Optional
+
+import zmq
+
+# Transport of the market data bus between the broker adapters and the proxy.
+#
+# The proxy's SUB socket binds one well-known endpoint and every adapter's
+# PUB socket connects to it, so no ports are scanned or handed over at
+# runtime. ZMQ_TRANSPORT selects the endpoint:
+#
+#   inproc - adapters and proxy in one process (the default Flask setup)
+#   ipc    - adapters in another process on the same host (sharded proxy)
+#   tcp    - adapters on another host, using ZMQ_HOST and ZMQ_PORT
+#   auto   - inproc for a single proxy process, ipc for the sharded proxy
+
+TRANSPORT_AUTO = "auto"
+TRANSPORT_INPROC = "inproc"
+TRANSPORT_IPC = "ipc"
+TRANSPORT_TCP = "tcp"
+
+ZMQ_TRANSPORT = os.getenv('ZMQ_TRANSPORT', TRANSPORT_AUTO).strip().lower()
+
+# Endpoints adapters in this process publish to, when set explicitly (sharded adapter host)
+_publish_endpoints: Optional[List[str]] = None
+
+
+def bus_context() -> zmq.Context:
+    """
+    Get the ZeroMQ context shared by the adapters and the proxy in this process
+
+    inproc endpoints only connect sockets of the same context.
+    """
+    return zmq.Context.instance()
+
+
+def resolve_transport(transport: Optional[str] = None, multiprocess: bool = False) -> str:
+    """
+    Resolve the configured transport to a concrete one
+
+    Args:
+        transport: 'auto', 'inproc', 'ipc' or 'tcp' (defaults to ZMQ_TRANSPORT)
+        multiprocess: True if adapters and proxy run in different processes
+
+    Returns:
+        str: 'inproc', 'ipc' or 'tcp'
+    """
+    transport = transport or ZMQ_TRANSPORT
+    if transport == TRANSPORT_AUTO:
+        if not multiprocess:
+            return TRANSPORT_INPROC
+        return TRANSPORT_IPC if zmq.has('ipc') else TRANSPORT_TCP
+    if transport == TRANSPORT_INPROC and multiprocess:
+        # inproc cannot cross processes
+        return TRANSPORT_IPC if zmq.has('ipc') else TRANSPORT_TCP
+    if transport not in (TRANSPORT_INPROC, TRANSPORT_IPC, TRANSPORT_TCP):
+        raise ValueError(f"Invalid ZMQ_TRANSPORT: {transport}")
+    return transport
+
+
+def bus_endpoint(transport: str, shard: int = 0) -> str:
+    """
+    Get the endpoint a proxy SUB socket binds and adapters connect to
+
+    Args:
+        transport: A resolved transport ('inproc', 'ipc' or 'tcp')
+        shard: Index of the proxy worker; each worker of a sharded proxy binds its own endpoint
+    """
+    zmq_port = int(os.getenv('ZMQ_PORT', '5555'))
+    if transport == TRANSPORT_INPROC:
+        return f"inproc://openalgo-market-data-{shard}"
+    if transport == TRANSPORT_IPC:
+        ipc_dir = os.getenv('ZMQ_IPC_DIR') or tempfile.gettempdir()
+        return f"ipc://{os.path.join(ipc_dir, f'openalgo-market-data-{zmq_port}-{shard}.ipc')}"
+    return f"tcp://{os.getenv('ZMQ_HOST', '127.0.0.1')}:{zmq_port + shard}"
+
+
+def set_publish_endpoints(endpoints: List[str]):
+    """Make adapters created in this process publish to the given proxy endpoints"""
+    global _publish_endpoints
+    _publish_endpoints = list(endpoints)
+
+
+def publish_endpoints() -> List[str]:
+    """Get the endpoints an adapter's PUB socket connects to"""
+    if _publish_endpoints:
+        return list(_publish_endpoints)
+    return [bus_endpoint(resolve_transport())]
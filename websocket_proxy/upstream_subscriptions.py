@@ -0,0 +1,83 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+# (user_id, exchange, symbol, mode)
+UpstreamKey = Tuple[str, str, str, int]
+
+
+class UpstreamSubscriptions:
+    """
+    Reference counts for the subscriptions held with each user's broker adapter.
+
+    Every client of a user shares that user's adapter, so an instrument only
+    needs to be subscribed upstream once no matter how many clients want it.
+    The proxy forwards to the adapter only when a count goes from 0 to 1 or
+    from 1 to 0; the adapter response of the first subscribe is kept so later
+    clients get the same details (e.g. the actual depth level) back.
+    """
+
+    def __init__(self):
+        self._refcounts: Dict[UpstreamKey, int] = {}
+        self._responses: Dict[UpstreamKey, Dict[str, Any]] = {}
+
+    def is_subscribed(self, user_id: str, exchange: str, symbol: str, mode: int) -> bool:
+        """Check whether the instrument is currently subscribed with the user's adapter"""
+        return (user_id, exchange, symbol, mode) in self._refcounts
+
+    def refcount(self, user_id: str, exchange: str, symbol: str, mode: int) -> int:
+        """Get the number of client subscriptions sharing an upstream subscription"""
+        return self._refcounts.get((user_id, exchange, symbol, mode), 0)
+
+    def get_response(self, user_id: str, exchange: str, symbol: str, mode: int) -> Optional[Dict[str, Any]]:
+        """Get the adapter response recorded when the upstream subscription was made"""
+        return self._responses.get((user_id, exchange, symbol, mode))
+
+    def acquire(self, user_id: str, exchange: str, symbol: str, mode: int,
+                response: Optional[Dict[str, Any]] = None) -> bool:
+        """
+        Take a reference on an upstream subscription
+
+        Args:
+            response: Adapter subscribe response, recorded on the first reference
+
+        Returns:
+            bool: True if this was the first reference (0 -> 1)
+        """
+        key = (user_id, exchange, symbol, mode)
+        count = self._refcounts.get(key, 0)
+        self._refcounts[key] = count + 1
+        if count == 0:
+            self._responses[key] = response or {"status": "success"}
+            return True
+        return False
+
+    def release(self, user_id: str, exchange: str, symbol: str, mode: int) -> bool:
+        """
+        Drop a reference on an upstream subscription
+
+        Returns:
+            bool: True if this was the last reference (1 -> 0)
+        """
+        key = (user_id, exchange, symbol, mode)
+        count = self._refcounts.get(key, 0)
+        if count <= 1:
+            self._refcounts.pop(key, None)
+            self._responses.pop(key, None)
+            return count == 1
+        self._refcounts[key] = count - 1
+        return False
+
+    def remove_user(self, user_id: str) -> List[UpstreamKey]:
+        """
+        Forget every upstream subscription of a user, e.g. when its adapter is disconnected
+
+        Returns:
+            list: The keys that were removed
+        """
+        keys = [key for key in self._refcounts if key[0] == user_id]
+        for key in keys:
+            del self._refcounts[key]
+            self._responses.pop(key, None)
+        return keys
+
+    def __len__(self) -> int:
+        return len(self._refcounts)